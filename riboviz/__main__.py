@@ -0,0 +1,128 @@
+"""
+Run a riboviz command-line tool.
+
+Usage::
+
+    python -m riboviz [-h] TOOL [TOOL_OPTIONS]
+
+    -h, --help            show this help message, including the
+                          available tools, and exit
+    TOOL                  Tool, a module in riboviz.tools
+    TOOL_OPTIONS          Tool options (run ``python -m riboviz TOOL
+                          -h`` for help)
+
+``python -m riboviz TOOL [TOOL_OPTIONS]`` is equivalent to
+``python -m riboviz.tools.TOOL [TOOL_OPTIONS]``. Only the module for
+``TOOL``, and the modules it imports, are imported. Tool descriptions
+are read from the tools' module docstrings without importing them.
+"""
+import ast
+import os
+import runpy
+import sys
+import riboviz
+
+TOOLS_PACKAGE = "riboviz.tools"
+""" Package with command-line tools. """
+HELP_FLAGS = ["-h", "--help"]
+""" Help flags. """
+
+
+def get_tool_names():
+    """
+    Get names of command-line tools in :py:const:`TOOLS_PACKAGE`.
+
+    :return: Tool names
+    :rtype: list(str or unicode)
+    """
+    return sorted(file_name[:-len(".py")]
+                  for file_name in os.listdir(riboviz.PY_SCRIPTS)
+                  if file_name.endswith(".py") and
+                  not file_name.startswith("_"))
+
+
+def get_tool_description(tool):
+    """
+    Get the first line of a tool's module docstring, without
+    importing the tool.
+
+    :param tool: Tool name
+    :type tool: str or unicode
+    :return: Description
+    :rtype: str or unicode
+    """
+    with open(os.path.join(riboviz.PY_SCRIPTS, tool + ".py")) as f:
+        docstring = ast.get_docstring(ast.parse(f.read())) or ""
+    return docstring.split("\n\n")[0].replace("\n", " ")
+
+
+def get_usage():
+    """
+    Get usage message, including the available tools.
+
+    :return: Usage message
+    :rtype: str or unicode
+    """
+    lines = ["usage: python -m riboviz [-h] TOOL [TOOL_OPTIONS]",
+             "",
+             "Run a riboviz command-line tool. For tool options run:",
+             "",
+             "    python -m riboviz TOOL -h",
+             "",
+             "tools:"]
+    tools = get_tool_names()
+    width = max(len(tool) for tool in tools)
+    lines.extend("  {}  {}".format(tool.ljust(width),
+                                   get_tool_description(tool))
+                 for tool in tools)
+    return "\n".join(lines)
+
+
+def run_tool(tool, args):
+    """
+    Run a tool as if it was invoked via ``python -m`` with the given
+    command-line arguments.
+
+    :param tool: Tool name
+    :type tool: str or unicode
+    :param args: Command-line arguments
+    :type args: list(str or unicode)
+    :raises ValueError: If the tool does not exist
+    """
+    if tool not in get_tool_names():
+        raise ValueError("No such tool: {}".format(tool))
+    sys.argv = [sys.argv[0]] + list(args)
+    runpy.run_module("{}.{}".format(TOOLS_PACKAGE, tool),
+                     run_name="__main__",
+                     alter_sys=True)
+
+
+def main(args=None):
+    """
+    Parse command-line arguments then run a tool (see
+    :py:func:`run_tool`) or print usage. Exceptions raised by the
+    tool are not caught.
+
+    :param args: Command-line arguments (if ``None`` then \
+    ``sys.argv[1:]`` is used)
+    :type args: list(str or unicode)
+    :return: Exit code
+    :rtype: int
+    """
+    if args is None:
+        args = sys.argv[1:]
+    if not args or args[0] in HELP_FLAGS:
+        print(get_usage())
+        return 0 if args else 2
+    tool = args[0]
+    if tool not in get_tool_names():
+        print("ValueError: No such tool: {}".format(tool),
+              file=sys.stderr)
+        print(get_usage(), file=sys.stderr)
+        return 2
+    run_tool(tool, args[1:])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""
+Convert BAM files to riboviz H5 files.
+
+This is a Python alternative to ``rscripts/bam_to_h5.R`` (see
+``BamToH5`` in ``rscripts/bam_to_h5_functions.R``) which creates H5
+files with the same layout and attributes. Rather than querying the
+BAM file once per gene, the BAM file is read once, from start to end,
+and the 5' position and length of each alignment are counted, in
+batches, into preallocated per-gene matrices of read counts.
+
+See :py:mod:`riboviz.h5` for the H5 file layout.
+"""
+import os
+import h5py
+import numpy as np
+import pysam
+from riboviz import h5
+from riboviz.fasta_gff import create_gff_db
+
+UTR5 = "UTR5"
+""" GFF UTR5 feature type. """
+UTR3 = "UTR3"
+""" GFF UTR3 feature type. """
+STOP_CODON_OFFSET = 2
+""" Offset of stop codon start from feature end. """
+STOP_CODON_OFFSET_NOT_IN_FEATURE = -1
+"""
+Offset of stop codon start from feature end, if stop codons are not
+part of the feature annotations.
+"""
+BATCH_SIZE = 2**20
+""" Default number of alignments to count at a time. """
+
+
+class _Gene:
+    """
+    Gene location and matrix of read counts by read length (rows) and
+    position (columns).
+    """
+
+    def __init__(self, name, seqid, strand, positions, feature_start,
+                 feature_end, num_lengths):
+        """
+        Constructor.
+
+        :param self: Object reference
+        :type self: _Gene
+        :param name: Gene name
+        :type name: str or unicode
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :param strand: Strand, ``+`` or ``-``
+        :type strand: str or unicode
+        :param positions: 1-indexed positions on the sequence of \
+        each column of read counts, in ascending order
+        :type positions: numpy.ndarray
+        :param feature_start: Feature start position
+        :type feature_start: int
+        :param feature_end: Feature end position
+        :type feature_end: int
+        :param num_lengths: Number of read lengths
+        :type num_lengths: int
+        """
+        self.name = name
+        self.seqid = seqid
+        self.strand = strand
+        self.positions = positions
+        self.feature_start = feature_start
+        self.feature_end = feature_end
+        # 32-bit counts, as written by ``BamToH5``.
+        self.counts = np.zeros((num_lengths, len(positions)),
+                               dtype=np.int32)
+
+    def add(self, positions, length_indices):
+        """
+        Count reads.
+
+        :param self: Object reference
+        :type self: _Gene
+        :param positions: 1-indexed 5' positions of reads, within \
+        ``[self.positions[0], self.positions[-1]]``
+        :type positions: numpy.ndarray
+        :param length_indices: Row of each read
+        :type length_indices: numpy.ndarray
+        """
+        columns = np.searchsorted(self.positions, positions)
+        in_gene = self.positions[columns] == positions
+        columns = columns[in_gene]
+        if self.strand == "-":
+            columns = len(self.positions) - 1 - columns
+        # Update only the cells with reads, so the cost is
+        # proportional to the number of reads, not the matrix size.
+        cells, counts = np.unique(
+            length_indices[in_gene] * len(self.positions) + columns,
+            return_counts=True)
+        self.counts.reshape(-1)[cells] += counts.astype(np.int32)
+
+
+def get_gff_features(gff, primary_id, secondary_id=None):
+    """
+    Get features from a GFF file grouped by gene, in file order.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param primary_id: Attribute holding gene names
+    :type primary_id: str or unicode
+    :param secondary_id: Attribute holding alternative gene names \
+    or ``None``
+    :type secondary_id: str or unicode
+    :return: Map from gene names to features and map from gene \
+    names to alternative gene names
+    :rtype: tuple(dict(str or unicode => \
+    list(gffutils.feature.Feature)), \
+    dict(str or unicode => str or unicode))
+    :raises FileNotFoundError: If the GFF file cannot be found
+    :raises ValueError: If the GFF file is empty or ``primary_id`` \
+    or ``secondary_id`` are not attributes of any feature
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    gffdb = create_gff_db(gff,
+                          keep_order=True,
+                          merge_strategy="create_unique")
+    gene_features = {}
+    aliases = {}
+    for feature in gffdb.all_features():
+        if primary_id not in feature.attributes:
+            continue
+        gene = feature.attributes[primary_id][0]
+        gene_features.setdefault(gene, []).append(feature)
+        if secondary_id is not None and \
+                secondary_id in feature.attributes:
+            aliases.setdefault(gene, feature.attributes[secondary_id][0])
+    if not gene_features:
+        raise ValueError("primary_id {} is not a GFF attribute ({})".format(
+            primary_id, gff))
+    if secondary_id is not None and not aliases:
+        raise ValueError(
+            "secondary_id {} is not a GFF attribute ({})".format(
+                secondary_id, gff))
+    return gene_features, aliases
+
+
+def get_gene(name, features, feature, buffer, is_riboviz_gff,
+             num_lengths):
+    """
+    Get gene location and flanking regions, consistent with
+    ``ReadsToCountMatrix`` in ``rscripts/bam_to_h5_functions.R``.
+
+    If ``is_riboviz_gff`` then the flanks are the widths of the
+    ``UTR5`` and ``UTR3`` features, otherwise they are ``buffer``.
+    The flanks are swapped for genes on the negative strand.
+
+    :param name: Gene name
+    :type name: str or unicode
+    :param features: Gene features
+    :type features: list(gffutils.feature.Feature)
+    :param feature: Feature type e.g. ``CDS``
+    :type feature: str or unicode
+    :param buffer: Length of flanking regions, if not \
+    ``is_riboviz_gff``
+    :type buffer: int
+    :param is_riboviz_gff: Do genes have ``UTR5``, feature and \
+    ``UTR3`` features?
+    :type is_riboviz_gff: bool
+    :param num_lengths: Number of read lengths
+    :type num_lengths: int
+    :return: Gene or ``None`` if the gene has no ``feature`` features
+    :rtype: _Gene
+    """
+    locations = [f for f in features if f.featuretype == feature]
+    if not locations:
+        return None
+    if is_riboviz_gff:
+        left_flank = sum(len(f) for f in features if f.featuretype == UTR5)
+        right_flank = sum(len(f) for f in features if f.featuretype == UTR3)
+    else:
+        left_flank = buffer
+        right_flank = buffer
+    strand = locations[0].strand
+    if strand == "-":
+        left_flank, right_flank = right_flank, left_flank
+    positions = np.unique(np.concatenate(
+        [np.arange(f.start, f.end + 1) for f in locations]))
+    positions = np.concatenate([
+        np.arange(positions[0] - left_flank, positions[0]),
+        positions,
+        np.arange(positions[-1] + 1, positions[-1] + 1 + right_flank)])
+    return _Gene(name, locations[0].seqid, strand, positions,
+                 locations[0].start, locations[0].end, num_lengths)
+
+
+def count_reads(bam_file, genes, min_read_length, max_read_length,
+                batch_size=BATCH_SIZE):
+    """
+    Read a BAM file once and count the reads whose 5' ends map to
+    each gene, by read length and position.
+
+    For reads on the positive strand the 5' position is the
+    alignment's leftmost position. For reads on the negative strand
+    the 5' position is the leftmost position plus the query width,
+    including soft clipping, minus 1. Only reads on the same strand as
+    a gene are counted for that gene.
+
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    :param genes: Genes
+    :type genes: list(_Gene)
+    :param min_read_length: Minimum read length
+    :type min_read_length: int
+    :param max_read_length: Maximum read length
+    :type max_read_length: int
+    :param batch_size: Number of alignments to count at a time
+    :type batch_size: int
+    :raises FileNotFoundError: If the BAM file cannot be found
+    """
+    if not os.path.exists(bam_file) or (not os.path.isfile(bam_file)):
+        raise FileNotFoundError(bam_file)
+    with pysam.AlignmentFile(bam_file, "rb") as bam:
+        # Index genes by reference ID and strand.
+        reference_genes = {}
+        for gene in genes:
+            reference_id = bam.get_tid(gene.seqid)
+            if reference_id < 0:
+                continue
+            reference_genes.setdefault(
+                (reference_id, gene.strand == "-"), []).append(gene)
+        reference_ids = np.zeros(batch_size, dtype=np.int64)
+        positions = np.zeros(batch_size, dtype=np.int64)
+        lengths = np.zeros(batch_size, dtype=np.int64)
+        is_reverse = np.zeros(batch_size, dtype=bool)
+        count = 0
+        for read in bam.fetch(until_eof=True):
+            if read.is_unmapped:
+                continue
+            width = read.infer_query_length(always=False)
+            if width is None or width < min_read_length or \
+                    width > max_read_length:
+                continue
+            reference_ids[count] = read.reference_id
+            positions[count] = read.reference_start + 1
+            lengths[count] = width
+            is_reverse[count] = read.is_reverse
+            count += 1
+            if count == batch_size:
+                _count_batch(reference_genes, reference_ids, positions,
+                             lengths, is_reverse, min_read_length)
+                count = 0
+        _count_batch(reference_genes, reference_ids[:count],
+                     positions[:count], lengths[:count], is_reverse[:count],
+                     min_read_length)
+
+
+def _count_batch(reference_genes, reference_ids, positions, lengths,
+                 is_reverse, min_read_length):
+    """
+    Count a batch of reads for each gene.
+
+    :param reference_genes: Map from reference ID and whether the \
+    strand is negative to genes
+    :type reference_genes: dict(tuple(int, bool) => list(_Gene))
+    :param reference_ids: Reference ID of each read
+    :type reference_ids: numpy.ndarray
+    :param positions: Leftmost 1-indexed position of each read
+    :type positions: numpy.ndarray
+    :param lengths: Query width of each read
+    :type lengths: numpy.ndarray
+    :param is_reverse: Is each read on the negative strand?
+    :type is_reverse: numpy.ndarray
+    :param min_read_length: Minimum read length
+    :type min_read_length: int
+    """
+    five_prime = np.where(is_reverse, positions + lengths - 1, positions)
+    # Sort reads by reference ID, strand and 5' position so the reads
+    # for each gene can be found by binary search.
+    keys = _get_keys(reference_ids, is_reverse, five_prime)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    five_prime = five_prime[order]
+    length_indices = lengths[order] - min_read_length
+    for (reference_id, reverse), genes in reference_genes.items():
+        for gene in genes:
+            start = np.searchsorted(
+                keys,
+                _get_keys(reference_id, reverse, gene.positions[0]),
+                "left")
+            end = np.searchsorted(
+                keys,
+                _get_keys(reference_id, reverse, gene.positions[-1]),
+                "right")
+            if start < end:
+                gene.add(five_prime[start:end], length_indices[start:end])
+
+
+def _get_keys(reference_ids, is_reverse, positions):
+    """
+    Get sort keys for reads combining reference ID, strand and
+    position.
+
+    :param reference_ids: Reference IDs
+    :type reference_ids: numpy.ndarray or int
+    :param is_reverse: Negative strand?
+    :type is_reverse: numpy.ndarray or bool
+    :param positions: Positions (greater than ``-2**31``)
+    :type positions: numpy.ndarray or int
+    :return: Keys
+    :rtype: numpy.ndarray or int
+    """
+    reference_ids = np.asarray(reference_ids, dtype=np.int64)
+    positions = np.asarray(positions, dtype=np.int64)
+    return ((reference_ids * 2 + is_reverse) << 32) + (positions + 2**31)
+
+
+def write_h5(h5_file, genes, aliases, dataset, lengths,
+             stop_codon_offset, num_data_files=1):
+    """
+    Write genes to an H5 file, and complementary data files, with the
+    same layout and attributes as those written by ``BamToH5`` in
+    ``rscripts/bam_to_h5_functions.R``.
+
+    Gene ``i`` (1-indexed) is written to data file ``<h5_file>.<j>``
+    where ``j = (i % num_data_files) + 1``.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param genes: Genes
+    :type genes: list(_Gene)
+    :param aliases: Map from gene names to alternative gene names
+    :type aliases: dict(str or unicode => str or unicode)
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param lengths: Read lengths
+    :type lengths: numpy.ndarray
+    :param stop_codon_offset: Offset of stop codon start from \
+    feature end
+    :type stop_codon_offset: int
+    :param num_data_files: Number of complementary data files
+    :type num_data_files: int
+    """
+    data_files = [h5.H5_DATA_FILE_FORMAT.format(h5_file, index + 1)
+                  for index in range(num_data_files)]
+    with h5py.File(h5_file, "w") as master:
+        for gene_id, gene in enumerate(genes, 1):
+            master[gene.name] = h5py.ExternalLink(
+                os.path.basename(data_files[gene_id % num_data_files]),
+                gene.name)
+        for gene in genes:
+            alias = aliases.get(gene.name, gene.name)
+            if alias != gene.name:
+                master[alias] = h5py.ExternalLink(
+                    os.path.basename(h5_file), gene.name)
+    handles = [h5py.File(data_file, "w") for data_file in data_files]
+    try:
+        for gene_id, gene in enumerate(genes, 1):
+            reads = handles[gene_id % num_data_files].create_group(
+                h5.READS_PATH_FORMAT.format(gene=gene.name, dataset=dataset))
+            counts = gene.counts
+            num_positions = counts.shape[1]
+            start_codon_pos = np.arange(gene.feature_start,
+                                        gene.feature_start + 3)
+            stop_codon_loc = gene.feature_end - stop_codon_offset
+            stop_codon_pos = np.arange(stop_codon_loc, stop_codon_loc + 3)
+            # Attribute and dataset shapes are those written by
+            # rhdf5, which reverses dimensions.
+            attributes = [
+                (h5.READS_TOTAL, [counts.sum()]),
+                (h5.BUFFER_LEFT, [gene.feature_start - 1]),
+                (h5.BUFFER_RIGHT, [num_positions - stop_codon_pos[2]]),
+                (h5.START_CODON_POS, start_codon_pos),
+                (h5.STOP_CODON_POS, stop_codon_pos),
+                (h5.READS_BY_LEN, counts.sum(axis=1)),
+                (h5.LENGTHS, lengths)]
+            for name, value in attributes:
+                reads.attrs[name] = np.array(
+                    value, dtype=np.int32).reshape(-1, 1)
+            reads.create_dataset(h5.DATA, data=counts.T,
+                                 chunks=(num_positions, 1),
+                                 compression=h5.GZIP,
+                                 compression_opts=h5.GZIP_LEVEL)
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def bam_to_h5(bam_file,
+              orf_gff_file,
+              h5_file,
+              feature="CDS",
+              min_read_length=10,
+              max_read_length=50,
+              buffer=250,
+              primary_id="Name",
+              secondary_id=None,
+              dataset="data",
+              stop_in_feature=False,
+              is_riboviz_gff=True,
+              num_data_files=1,
+              batch_size=BATCH_SIZE):
+    """
+    Convert a BAM file to a riboviz H5 file, and complementary data
+    files, consistent with ``BamToH5`` in
+    ``rscripts/bam_to_h5_functions.R``.
+
+    All reads are mapped to their 5' ends.
+
+    If ``is_riboviz_gff`` then feature, ``UTR5`` and ``UTR3`` features
+    from ``orf_gff_file`` are used and ``buffer`` is ignored.
+    Otherwise only feature features are used, ``buffer`` is used as
+    the width of the left and right flanks and ``stop_in_feature``
+    states whether the stop codon is within the feature.
+
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    :param orf_gff_file: GFF file
+    :type orf_gff_file: str or unicode
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param feature: Feature type e.g. ``CDS``, ``ORF``, or ``uORF``
+    :type feature: str or unicode
+    :param min_read_length: Minimum read length
+    :type min_read_length: int
+    :param max_read_length: Maximum read length
+    :type max_read_length: int
+    :param buffer: Length of flanking regions, if not \
+    ``is_riboviz_gff``
+    :type buffer: int
+    :param primary_id: Attribute holding gene names
+    :type primary_id: str or unicode
+    :param secondary_id: Attribute holding alternative gene names, \
+    or ``None``, used to create links to each gene
+    :type secondary_id: str or unicode
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param stop_in_feature: Are stop codons part of the feature \
+    annotations?
+    :type stop_in_feature: bool
+    :param is_riboviz_gff: Do genes have ``UTR5``, feature and \
+    ``UTR3`` features?
+    :type is_riboviz_gff: bool
+    :param num_data_files: Number of complementary data files
+    :type num_data_files: int
+    :param batch_size: Number of alignments to count at a time
+    :type batch_size: int
+    :raises FileNotFoundError: If the BAM or GFF files cannot be \
+    found
+    :raises ValueError: If the GFF file is empty, has no ``feature`` \
+    features or ``primary_id`` or ``secondary_id`` are not \
+    attributes of any feature
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    if not os.path.exists(bam_file) or (not os.path.isfile(bam_file)):
+        raise FileNotFoundError(bam_file)
+    gene_features, aliases = get_gff_features(orf_gff_file, primary_id,
+                                              secondary_id)
+    lengths = np.arange(min_read_length, max_read_length + 1)
+    genes = []
+    for name, features in gene_features.items():
+        if not is_riboviz_gff:
+            features = [f for f in features if f.featuretype == feature]
+        gene = get_gene(name, features, feature, buffer, is_riboviz_gff,
+                        len(lengths))
+        if gene is not None:
+            genes.append(gene)
+    if not genes:
+        raise ValueError("No {} features found in {}".format(
+            feature, orf_gff_file))
+    count_reads(bam_file, genes, min_read_length, max_read_length,
+                batch_size)
+    if (not is_riboviz_gff) and (not stop_in_feature):
+        stop_codon_offset = STOP_CODON_OFFSET_NOT_IN_FEATURE
+    else:
+        stop_codon_offset = STOP_CODON_OFFSET
+    write_h5(h5_file, genes, aliases, dataset, lengths,
+             stop_codon_offset, num_data_files)
@@ -0,0 +1,884 @@
+"""
+Benchmark the throughput and peak memory use of riboviz's Python
+workflow stages and file comparators on generated data, keep a
+history of benchmark runs and report regressions against a
+baseline run.
+
+For each scale (number of reads) the following input data are
+generated, once, into a data directory (see :py:func:`generate_data`):
+
+* A multiplexed FASTQ file and sample sheet (see
+  :py:func:`riboviz.simulate_fastq.simulate_multiplex`).
+* ORF FASTA and GFF files, with ``UTR5``, ``CDS`` and ``UTR3``
+  features, with one gene per :py:const:`READS_PER_GENE` reads.
+* A coordinate-sorted SAM file, and indexed BAM file, of reads
+  aligned to the ORFs, some with a 5' mismatch.
+* A bedGraph file of the 5' positions of the aligned reads.
+* A workflow configuration file and input, temporary and output
+  directories for :py:mod:`riboviz.count_reads`.
+* If ``h5diff`` is available, an H5 file of the aligned reads.
+
+Each benchmark (see :py:const:`BENCHMARKS`) is run in a new process,
+so its peak resident set size (RSS), including that of any processes
+it creates, can be measured. Each benchmark is repeated and the
+fastest time and largest peak RSS are reported. Peak RSS includes the
+memory used by the Python interpreter and riboviz modules.
+
+A benchmark run is appended to a JSON history file as a dictionary
+with the run provenance (see
+:py:func:`riboviz.provenance.get_run_provenance`), host information
+and a list of results (see :py:const:`RESULT_KEYS`). A run can be
+compared to a baseline run to flag regressions (see
+:py:func:`compare_runs`).
+"""
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from queue import Empty
+from riboviz import process_utils
+from riboviz import provenance
+
+DEMULTIPLEX_FASTQ = "demultiplex_fastq"
+""" Benchmark :py:func:`riboviz.demultiplex_fastq.demultiplex`. """
+TRIM_5P_MISMATCH = "trim_5p_mismatch"
+""" Benchmark :py:func:`riboviz.trim_5p_mismatch.trim_5p_mismatch`. """
+FASTQ_COUNT_SEQUENCES = "fastq_count_sequences"
+""" Benchmark :py:func:`riboviz.fastq.count_sequences`. """
+SAM_BAM_COUNT_SEQUENCES = "sam_bam_count_sequences"
+""" Benchmark :py:func:`riboviz.sam_bam.count_sequences`. """
+COUNT_READS = "count_reads"
+""" Benchmark :py:func:`riboviz.count_reads.count_reads`. """
+GET_CDS_CODONS = "get_cds_codons"
+""" Benchmark :py:func:`riboviz.get_cds_codons.get_cds_codons_file`. """
+CHECK_FASTA_GFF = "check_fasta_gff"
+""" Benchmark :py:func:`riboviz.check_fasta_gff.check_fasta_gff`. """
+SUBSAMPLE_BIOSEQFILE = "subsample_bioseqfile"
+"""
+Benchmark :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+(``skip`` mode).
+"""
+EQUAL_FASTQ = "equal_fastq"
+""" Benchmark :py:func:`riboviz.fastq.equal_fastq`. """
+EQUAL_SAM = "equal_sam"
+""" Benchmark :py:func:`riboviz.sam_bam.equal_sam`. """
+EQUAL_BAM = "equal_bam"
+""" Benchmark :py:func:`riboviz.sam_bam.equal_bam`. """
+EQUAL_BEDGRAPH = "equal_bedgraph"
+""" Benchmark :py:func:`riboviz.bedgraph.equal_bedgraph`. """
+EQUAL_H5 = "equal_h5"
+""" Benchmark :py:func:`riboviz.h5.equal_h5`. """
+
+FASTQ = "fastq"
+""" Input data key (multiplexed FASTQ file). """
+FASTQ_COPY = "fastq_copy"
+""" Input data key (copy of multiplexed FASTQ file). """
+SAMPLE_SHEET = "sample_sheet"
+""" Input data key (sample sheet file). """
+ORF_FASTA = "orf_fasta"
+""" Input data key (ORF FASTA file). """
+ORF_GFF = "orf_gff"
+""" Input data key (ORF GFF file). """
+SAM = "sam"
+""" Input data key (SAM file). """
+SAM_COPY = "sam_copy"
+""" Input data key (copy of SAM file). """
+BAM = "bam"
+""" Input data key (BAM file). """
+BAM_COPY = "bam_copy"
+""" Input data key (copy of BAM file). """
+BEDGRAPH = "bedgraph"
+""" Input data key (bedGraph file). """
+BEDGRAPH_COPY = "bedgraph_copy"
+""" Input data key (copy of bedGraph file). """
+H5 = "h5"
+""" Input data key (H5 file). """
+H5_COPY = "h5_copy"
+""" Input data key (copy of H5 file). """
+CONFIG_FILE = "config_file"
+""" Input data key (workflow configuration file). """
+INPUT_DIR = "input_dir"
+""" Input data key (workflow input directory). """
+TMP_DIR = "tmp_dir"
+""" Input data key (workflow temporary directory). """
+OUTPUT_DIR = "output_dir"
+""" Input data key (workflow output directory). """
+NUM_READS = "num_reads"
+""" Input data key (number of reads). """
+NUM_GENES = "num_genes"
+""" Input data key (number of genes). """
+NUM_ROWS = "num_rows"
+""" Input data key (number of bedGraph rows). """
+
+READS = "reads"
+""" Unit of benchmark items (reads). """
+GENES = "genes"
+""" Unit of benchmark items (genes). """
+ROWS = "rows"
+""" Unit of benchmark items (bedGraph rows). """
+UNITS = {NUM_READS: READS, NUM_GENES: GENES, NUM_ROWS: ROWS}
+""" Unit of benchmark items for each count input data key. """
+
+BENCHMARKS = {
+    DEMULTIPLEX_FASTQ: (NUM_READS, [FASTQ]),
+    TRIM_5P_MISMATCH: (NUM_READS, [SAM]),
+    FASTQ_COUNT_SEQUENCES: (NUM_READS, [FASTQ]),
+    SAM_BAM_COUNT_SEQUENCES: (NUM_READS, [BAM]),
+    COUNT_READS: (NUM_READS, [FASTQ, FASTQ_COPY, SAM]),
+    GET_CDS_CODONS: (NUM_GENES, [ORF_FASTA, ORF_GFF]),
+    CHECK_FASTA_GFF: (NUM_GENES, [ORF_FASTA, ORF_GFF]),
+    SUBSAMPLE_BIOSEQFILE: (NUM_READS, [FASTQ]),
+    EQUAL_FASTQ: (NUM_READS, [FASTQ, FASTQ_COPY]),
+    EQUAL_SAM: (NUM_READS, [SAM, SAM_COPY]),
+    EQUAL_BAM: (NUM_READS, [BAM, BAM_COPY]),
+    EQUAL_BEDGRAPH: (NUM_ROWS, [BEDGRAPH, BEDGRAPH_COPY]),
+    EQUAL_H5: (NUM_GENES, [H5, H5_COPY])
+}
+"""
+Benchmarks, as a map from benchmark names to the input data key for
+the number of items processed and the input data keys of the files
+read.
+"""
+
+SCALES = [10000, 100000]
+""" Default scales (number of reads). """
+READS_PER_GENE = 100
+""" Number of reads per generated gene. """
+UTR_LENGTH = 250
+""" UTR length of generated genes. """
+NUM_CODONS = 200
+""" Number of codons, including start and stop, of generated genes. """
+READ_LENGTH = 30
+""" Length of generated aligned reads. """
+MISMATCH_FRACTION = 0.1
+""" Fraction of generated aligned reads with a 5' mismatch. """
+SAMPLE = "Sample"
+""" Sample name used in the generated workflow directories. """
+SUBSAMPLE_PROBABILITY = 0.01
+""" Subsampling probability. """
+REPEATS = 3
+""" Default number of times each benchmark is repeated. """
+POLL_INTERVAL = 1
+"""
+Interval (seconds) at which a benchmark process is checked while
+waiting for its result.
+"""
+THRESHOLD = 0.2
+"""
+Default fractional increase in time or peak RSS over the baseline
+above which a result is flagged as a regression.
+"""
+HISTORY_FILE = "benchmark_history.json"
+""" Default benchmark history file. """
+REPORT_FILE = "benchmark_report.tsv"
+""" Default benchmark report file. """
+
+BENCHMARK = "benchmark"
+""" Result key (benchmark name). """
+SCALE = "scale"
+""" Result key (scale). """
+UNIT = "unit"
+""" Result key (unit of items). """
+ITEMS = "items"
+""" Result key (number of items processed). """
+MEGABYTES = "megabytes"
+""" Result key (size of files read, MB). """
+SECONDS = "seconds"
+""" Result key (fastest time, seconds). """
+ITEMS_PER_SECOND = "items_per_second"
+""" Result key (throughput, items per second). """
+MB_PER_SECOND = "mb_per_second"
+""" Result key (throughput, MB per second). """
+PEAK_RSS_MB = "peak_rss_mb"
+""" Result key (peak resident set size, MB). """
+SKIPPED = "skipped"
+""" Result key (reason the benchmark was skipped, or ``None``). """
+RESULT_KEYS = [BENCHMARK, SCALE, UNIT, ITEMS, MEGABYTES, SECONDS,
+               ITEMS_PER_SECOND, MB_PER_SECOND, PEAK_RSS_MB, SKIPPED]
+""" Result keys. """
+RESULTS = "results"
+""" Run key (results). """
+HOST = "host"
+""" Run key (host information). """
+RUNS = "runs"
+""" History key (runs). """
+
+BASELINE_PREFIX = "baseline_"
+""" Prefix of baseline values in comparisons. """
+TIME_RATIO = "time_ratio"
+""" Comparison column (time over baseline time). """
+RSS_RATIO = "rss_ratio"
+""" Comparison column (peak RSS over baseline peak RSS). """
+STATUS = "status"
+""" Comparison column (status). """
+STATUS_OK = "ok"
+""" Status (within threshold of baseline). """
+STATUS_REGRESSION = "regression"
+""" Status (slower, or more memory, than baseline, beyond threshold). """
+STATUS_IMPROVEMENT = "improvement"
+""" Status (faster than baseline, beyond threshold). """
+STATUS_NEW = "new"
+""" Status (not in baseline). """
+STATUS_SKIPPED = "skipped"
+""" Status (benchmark skipped). """
+COMPARISON_COLUMNS = [BENCHMARK, SCALE, SECONDS, BASELINE_PREFIX + SECONDS,
+                      TIME_RATIO, PEAK_RSS_MB, BASELINE_PREFIX + PEAK_RSS_MB,
+                      RSS_RATIO, ITEMS_PER_SECOND, MB_PER_SECOND, STATUS]
+""" Comparison columns. """
+
+
+def write_orfs(fasta_file, gff_file, num_genes, rng):
+    """
+    Write ORF FASTA and GFF files with random genes, each with
+    :py:const:`UTR_LENGTH` nt UTRs and a CDS of
+    :py:const:`NUM_CODONS` codons, from a start codon to a stop
+    codon.
+
+    :param fasta_file: FASTA file
+    :type fasta_file: str or unicode
+    :param gff_file: GFF file
+    :type gff_file: str or unicode
+    :param num_genes: Number of genes
+    :type num_genes: int
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :return: Gene sequences
+    :rtype: list(str or unicode)
+    """
+    from riboviz import fasta_gff
+    from riboviz import get_cds_codons
+    from riboviz import simulate_fastq
+    sense_codons = [codon for codon in get_cds_codons.CODONS
+                    if codon not in fasta_gff.STOP_CODONS]
+    codons = rng.integers(0, len(sense_codons),
+                          size=(num_genes, NUM_CODONS - 2))
+    utrs = simulate_fastq.random_codes(rng, (num_genes, 2, UTR_LENGTH))
+    sequences = [
+        simulate_fastq.codes_to_str(utr5) + fasta_gff.START_CODON +
+        "".join(sense_codons[codon] for codon in gene_codons) +
+        fasta_gff.STOP_CODONS[0] + simulate_fastq.codes_to_str(utr3)
+        for gene_codons, (utr5, utr3) in zip(codons, utrs)]
+    cds_end = UTR_LENGTH + 3 * NUM_CODONS
+    with open(fasta_file, "w") as fasta, open(gff_file, "w") as gff:
+        gff.write("##gff-version 3\n")
+        for index, sequence in enumerate(sequences):
+            gene = "G{:06d}".format(index)
+            fasta.write(">{}\n{}\n".format(gene, sequence))
+            for featuretype, start, end in [
+                    ("UTR5", 1, UTR_LENGTH),
+                    ("CDS", UTR_LENGTH + 1, cds_end),
+                    ("UTR3", cds_end + 1, cds_end + UTR_LENGTH)]:
+                gff.write("{}\triboviz\t{}\t{}\t{}\t.\t+\t.\tName={}\n".format(
+                    gene, featuretype, start, end, gene))
+    return sequences
+
+
+def write_alignments(sam_file, bedgraph_file, sequences, num_reads, rng):
+    """
+    Write a coordinate-sorted SAM file of reads aligned to genes,
+    :py:const:`MISMATCH_FRACTION` of which have a 5' mismatch, and a
+    bedGraph file of the number of reads at each 5' position.
+
+    :param sam_file: SAM file
+    :type sam_file: str or unicode
+    :param bedgraph_file: bedGraph file
+    :type bedgraph_file: str or unicode
+    :param sequences: Gene sequences (see :py:func:`write_orfs`)
+    :type sequences: list(str or unicode)
+    :param num_reads: Number of reads
+    :type num_reads: int
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :return: Number of bedGraph rows
+    :rtype: int
+    """
+    import numpy as np
+    genes = np.sort(rng.integers(0, len(sequences), size=num_reads))
+    starts = rng.integers(0, len(sequences[0]) - READ_LENGTH + 1,
+                          size=num_reads)
+    order = np.lexsort((starts, genes))
+    genes = genes[order]
+    starts = starts[order]
+    mismatches = rng.random(num_reads) < MISMATCH_FRACTION
+    quality = "I" * READ_LENGTH
+    with open(sam_file, "w") as f:
+        f.write("@HD\tVN:1.0\tSO:coordinate\n")
+        for index, sequence in enumerate(sequences):
+            f.write("@SQ\tSN:G{:06d}\tLN:{}\n".format(index, len(sequence)))
+        for index, (gene, start, mismatch) in enumerate(
+                zip(genes, starts, mismatches)):
+            read = sequences[gene][start:start + READ_LENGTH]
+            if mismatch:
+                base = "C" if read[0] == "A" else "A"
+                tags = "MD:Z:0{}{}\tNM:i:1".format(read[0], READ_LENGTH - 1)
+                read = base + read[1:]
+            else:
+                tags = "MD:Z:{}\tNM:i:0".format(READ_LENGTH)
+            f.write("R{}\t0\tG{:06d}\t{}\t255\t{}M\t*\t0\t0\t{}\t{}\t{}\n"
+                    .format(index, gene, start + 1, READ_LENGTH, read,
+                            quality, tags))
+    positions, counts = np.unique(genes * len(sequences[0]) + starts,
+                                  return_counts=True)
+    with open(bedgraph_file, "w") as f:
+        f.write("track type=bedGraph\n")
+        for position, count in zip(positions, counts):
+            gene, start = divmod(int(position), len(sequences[0]))
+            f.write("G{:06d}\t{}\t{}\t{}\n".format(gene, start, start + 1,
+                                                   count))
+    return len(positions)
+
+
+def generate_data(data_dir, scale, seed=42):
+    """
+    Generate benchmark input data, unless it already exists. See the
+    module documentation for the data generated.
+
+    :param data_dir: Data directory, into which data is generated \
+    in a subdirectory named after the scale
+    :type data_dir: str or unicode
+    :param scale: Scale (number of reads)
+    :type scale: int
+    :param seed: Random seed value
+    :type seed: int
+    :return: Map from input data keys to file names or counts
+    :rtype: dict(str or unicode => str or unicode or int)
+    """
+    scale_dir = os.path.join(data_dir, str(scale))
+    data_file = os.path.join(scale_dir, "data.json")
+    if os.path.exists(data_file):
+        with open(data_file) as f:
+            return json.load(f)
+    import numpy as np
+    import pysam
+    from riboviz import simulate_fastq
+    from riboviz import workflow_files
+    os.makedirs(scale_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    data = {NUM_READS: scale,
+            NUM_GENES: max(1, scale // READS_PER_GENE)}
+    for key, name in [(FASTQ, simulate_fastq.MULTIPLEX_FORMAT.format(
+                           "fastq")),
+                      (FASTQ_COPY, "copy.fastq"),
+                      (SAMPLE_SHEET, simulate_fastq.BARCODES_FILE),
+                      (ORF_FASTA, "orfs.fa"),
+                      (ORF_GFF, "orfs.gff3"),
+                      (SAM, "orf_map.sam"),
+                      (SAM_COPY, "copy.sam"),
+                      (BAM, "orf_map.bam"),
+                      (BAM_COPY, "copy.bam"),
+                      (BEDGRAPH, "plus.bedgraph"),
+                      (BEDGRAPH_COPY, "copy.bedgraph"),
+                      (CONFIG_FILE, "config.yaml"),
+                      (INPUT_DIR, "input"),
+                      (TMP_DIR, "tmp"),
+                      (OUTPUT_DIR, "output")]:
+        data[key] = os.path.join(scale_dir, name)
+    simulate_fastq.simulate_multiplex(scale_dir, scale, seed=seed)
+    sequences = write_orfs(data[ORF_FASTA], data[ORF_GFF], data[NUM_GENES],
+                           rng)
+    data[NUM_ROWS] = write_alignments(data[SAM], data[BEDGRAPH], sequences,
+                                      scale, rng)
+    with pysam.AlignmentFile(data[SAM], "r") as sam, \
+            pysam.AlignmentFile(data[BAM], "wb", template=sam) as bam:
+        for read in sam:
+            bam.write(read)
+    for key in [FASTQ, SAM, BAM, BEDGRAPH]:
+        shutil.copyfile(data[key], data[key + "_copy"])
+    for key in [BAM, BAM_COPY]:
+        pysam.index(data[key])
+    sample_dir = os.path.join(data[TMP_DIR], SAMPLE)
+    for directory in [data[INPUT_DIR], sample_dir, data[OUTPUT_DIR]]:
+        os.makedirs(directory, exist_ok=True)
+    shutil.copyfile(data[FASTQ], os.path.join(data[INPUT_DIR],
+                                              "sample.fastq"))
+    shutil.copyfile(data[FASTQ], os.path.join(sample_dir,
+                                              workflow_files.ADAPTER_TRIM_FQ))
+    shutil.copyfile(data[SAM], os.path.join(sample_dir,
+                                            workflow_files.ORF_MAP_CLEAN_SAM))
+    with open(data[CONFIG_FILE], "w") as f:
+        json.dump({"fq_files": {SAMPLE: "sample.fastq"}}, f)
+    if shutil.which("h5diff"):
+        from riboviz import bam_to_h5
+        data[H5] = os.path.join(scale_dir, "orf_map.h5")
+        data[H5_COPY] = os.path.join(scale_dir, "copy.h5")
+        bam_to_h5.bam_to_h5(data[BAM], data[ORF_GFF], data[H5])
+        shutil.copyfile(data[H5], data[H5_COPY])
+    with open(data_file, "w") as f:
+        json.dump(data, f)
+    return data
+
+
+def get_skip_reason(name, data):
+    """
+    Get the reason a benchmark cannot be run, if any.
+
+    :param name: Benchmark name, one of :py:const:`BENCHMARKS`
+    :type name: str or unicode
+    :param data: Input data (see :py:func:`generate_data`)
+    :type data: dict(str or unicode => str or unicode or int)
+    :return: Reason or ``None``
+    :rtype: str or unicode
+    """
+    if name == EQUAL_H5 and (H5 not in data or not shutil.which("h5diff")):
+        return "h5diff not found"
+    return None
+
+
+def run_stage(name, data, out_dir):
+    """
+    Run the workflow stage or comparator for a benchmark.
+
+    :param name: Benchmark name, one of :py:const:`BENCHMARKS`
+    :type name: str or unicode
+    :param data: Input data (see :py:func:`generate_data`)
+    :type data: dict(str or unicode => str or unicode or int)
+    :param out_dir: Directory for output files
+    :type out_dir: str or unicode
+    :raise ValueError: If the benchmark name is invalid
+    """
+    if name == DEMULTIPLEX_FASTQ:
+        from riboviz import demultiplex_fastq
+        demultiplex_fastq.demultiplex(data[SAMPLE_SHEET], data[FASTQ],
+                                      mismatches=1, out_dir=out_dir)
+    elif name == TRIM_5P_MISMATCH:
+        from riboviz import trim_5p_mismatch
+        trim_5p_mismatch.trim_5p_mismatch(
+            data[SAM], os.path.join(out_dir, "trimmed.sam"))
+    elif name == FASTQ_COUNT_SEQUENCES:
+        from riboviz import fastq
+        fastq.count_sequences(data[FASTQ])
+    elif name == SAM_BAM_COUNT_SEQUENCES:
+        from riboviz import sam_bam
+        sam_bam.count_sequences(data[BAM])
+    elif name == COUNT_READS:
+        from riboviz import count_reads
+        count_reads.count_reads(data[CONFIG_FILE], data[INPUT_DIR],
+                                data[TMP_DIR], data[OUTPUT_DIR],
+                                os.path.join(out_dir, "read_counts.tsv"))
+    elif name == GET_CDS_CODONS:
+        from riboviz import get_cds_codons
+        get_cds_codons.get_cds_codons_file(
+            data[ORF_FASTA], data[ORF_GFF],
+            os.path.join(out_dir, "codons.tsv"))
+    elif name == CHECK_FASTA_GFF:
+        from riboviz import check_fasta_gff
+        check_fasta_gff.check_fasta_gff(
+            data[ORF_FASTA], data[ORF_GFF],
+            os.path.join(out_dir, "issues.tsv"))
+    elif name == SUBSAMPLE_BIOSEQFILE:
+        from riboviz import subsample_bioseqfile
+        subsample_bioseqfile.subsample_bioseqfile(
+            data[FASTQ], os.path.join(out_dir, "subsampled.fastq"),
+            "fastq", SUBSAMPLE_PROBABILITY, True, 1, False,
+            subsample_bioseqfile.SKIP)
+    elif name == EQUAL_FASTQ:
+        from riboviz import fastq
+        fastq.equal_fastq(data[FASTQ], data[FASTQ_COPY])
+    elif name == EQUAL_SAM:
+        from riboviz import sam_bam
+        sam_bam.equal_sam(data[SAM], data[SAM_COPY])
+    elif name == EQUAL_BAM:
+        from riboviz import sam_bam
+        sam_bam.equal_bam(data[BAM], data[BAM_COPY])
+    elif name == EQUAL_BEDGRAPH:
+        from riboviz import bedgraph
+        bedgraph.equal_bedgraph(data[BEDGRAPH], data[BEDGRAPH_COPY])
+    elif name == EQUAL_H5:
+        from riboviz import h5
+        h5.equal_h5(data[H5], data[H5_COPY])
+    else:
+        raise ValueError("Invalid benchmark {}, expected one of {}".format(
+            name, list(BENCHMARKS)))
+
+
+PROC_STATUS = "/proc/self/status"
+""" Linux process status file. """
+PEAK_RSS_FIELD = "VmHWM:"
+"""
+Linux process status file peak resident set size field. Unlike
+``ru_maxrss``, this is reset when a process calls ``exec``, so it
+does not include the memory used by the process that started it.
+"""
+
+
+def get_peak_rss():
+    """
+    Get the peak resident set size of the current process and of its
+    terminated child processes, whichever is larger. The current
+    process's peak is read from :py:const:`PROC_STATUS`, if it
+    exists, or from ``resource.getrusage`` otherwise.
+
+    :return: Peak resident set size (MB)
+    :rtype: float
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if os.path.exists(PROC_STATUS):
+        with open(PROC_STATUS) as f:
+            for line in f:
+                if line.startswith(PEAK_RSS_FIELD):
+                    peak = int(line.split()[1])
+                    break
+    peak = max(peak,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return process_utils.maxrss_to_mb(peak)
+
+
+def time_stage(queue, name, data, repeats):
+    """
+    Run a benchmark's stage ``repeats`` times, each with a new output
+    directory, and put the fastest time and peak RSS, or any
+    exception raised, on a queue. Standard output, including that of
+    any processes the stage creates, is discarded. This is intended
+    to be run in a new process (see :py:func:`run_benchmark`).
+
+    :param queue: Queue for fastest time (seconds) and peak RSS (MB) \
+    or exception
+    :type queue: multiprocessing.Queue
+    :param name: Benchmark name, one of :py:const:`BENCHMARKS`
+    :type name: str or unicode
+    :param data: Input data (see :py:func:`generate_data`)
+    :type data: dict(str or unicode => str or unicode or int)
+    :param repeats: Number of times to repeat the benchmark
+    :type repeats: int
+    """
+    seconds = None
+    sys.stdout.flush()
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), sys.stdout.fileno())
+    try:
+        for _ in range(repeats):
+            out_dir = tempfile.mkdtemp()
+            try:
+                start = time.perf_counter()
+                run_stage(name, data, out_dir)
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(out_dir)
+            if seconds is None or elapsed < seconds:
+                seconds = elapsed
+    except Exception as e:
+        queue.put(e)
+        return
+    queue.put((seconds, get_peak_rss()))
+
+
+def wait_for_outcome(process, queue):
+    """
+    Wait for a process to put an outcome on a queue, polling the
+    queue and checking that the process is still alive every
+    :py:const:`POLL_INTERVAL` seconds, then wait for the process to
+    exit.
+
+    :param process: Process
+    :type process: multiprocessing.Process
+    :param queue: Queue
+    :type queue: multiprocessing.Queue
+    :return: Outcome
+    :rtype: object
+    :raise RuntimeError: If the process exits without putting an \
+    outcome on the queue
+    """
+    # Check if the process is alive before polling, so an outcome
+    # put on the queue just before the process exited is not missed.
+    is_alive = True
+    while is_alive:
+        is_alive = process.is_alive()
+        try:
+            outcome = queue.get(timeout=POLL_INTERVAL)
+        except Empty:
+            continue
+        process.join()
+        return outcome
+    process.join()
+    raise RuntimeError(
+        "Process {} exited with code {} without a result".format(
+            process.name, process.exitcode))
+
+
+def run_benchmark(name, scale, data, repeats=REPEATS):
+    """
+    Run a benchmark in a new process (see :py:func:`time_stage`).
+
+    :param name: Benchmark name, one of :py:const:`BENCHMARKS`
+    :type name: str or unicode
+    :param scale: Scale
+    :type scale: int
+    :param data: Input data (see :py:func:`generate_data`)
+    :type data: dict(str or unicode => str or unicode or int)
+    :param repeats: Number of times to repeat the benchmark
+    :type repeats: int
+    :return: Result, with keys :py:const:`RESULT_KEYS`
+    :rtype: dict
+    :raise ValueError: If the benchmark name is invalid or repeats \
+    is less than 1
+    :raise RuntimeError: If the process running the stage exits \
+    without a result (see :py:func:`wait_for_outcome`)
+    :raise Exception: Any exception raised by the stage
+    """
+    if name not in BENCHMARKS:
+        raise ValueError("Invalid benchmark {}, expected one of {}".format(
+            name, list(BENCHMARKS)))
+    if repeats < 1:
+        raise ValueError("Repeats must be at least 1")
+    items_key, file_keys = BENCHMARKS[name]
+    result = dict.fromkeys(RESULT_KEYS)
+    result.update({BENCHMARK: name,
+                   SCALE: scale,
+                   UNIT: UNITS[items_key],
+                   ITEMS: data[items_key]})
+    result[SKIPPED] = get_skip_reason(name, data)
+    if result[SKIPPED] is not None:
+        return result
+    result[MEGABYTES] = sum(os.path.getsize(data[key])
+                            for key in file_keys) / 1e6
+    # A process, not a pool, is used as stages may create processes
+    # of their own, which daemonic pool workers cannot.
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=time_stage,
+                              args=(queue, name, data, repeats))
+    process.start()
+    outcome = wait_for_outcome(process, queue)
+    if isinstance(outcome, Exception):
+        raise outcome
+    seconds, peak_rss = outcome
+    seconds = max(seconds, 1e-9)
+    result.update({SECONDS: seconds,
+                   ITEMS_PER_SECOND: result[ITEMS] / seconds,
+                   MB_PER_SECOND: result[MEGABYTES] / seconds,
+                   PEAK_RSS_MB: peak_rss})
+    return result
+
+
+def run_benchmarks(data_dir, benchmarks=list(BENCHMARKS), scales=SCALES,
+                   repeats=REPEATS, seed=42):
+    """
+    Generate input data and run benchmarks at each scale.
+
+    :param data_dir: Data directory (see :py:func:`generate_data`)
+    :type data_dir: str or unicode
+    :param benchmarks: Benchmark names, from :py:const:`BENCHMARKS`
+    :type benchmarks: list(str or unicode)
+    :param scales: Scales
+    :type scales: list(int)
+    :param repeats: Number of times to repeat each benchmark
+    :type repeats: int
+    :param seed: Random seed value for generating data
+    :type seed: int
+    :return: Run, with run provenance, :py:const:`HOST` information \
+    and :py:const:`RESULTS`
+    :rtype: dict
+    :raise ValueError: If a benchmark name is invalid or repeats is \
+    less than 1
+    """
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            raise ValueError(
+                "Invalid benchmark {}, expected one of {}".format(
+                    name, list(BENCHMARKS)))
+    run = dict(provenance.get_run_provenance())
+    run[HOST] = {"node": platform.node(),
+                 "machine": platform.machine(),
+                 "python": platform.python_version(),
+                 "cpus": os.cpu_count()}
+    run[RESULTS] = []
+    for scale in scales:
+        data = generate_data(data_dir, scale, seed)
+        for name in benchmarks:
+            run[RESULTS].append(run_benchmark(name, scale, data, repeats))
+    return run
+
+
+def load_history(history_file):
+    """
+    Load benchmark history.
+
+    :param history_file: History file
+    :type history_file: str or unicode
+    :return: History, with :py:const:`RUNS`, or an empty history if \
+    the file does not exist
+    :rtype: dict
+    :raise ValueError: If the file is not a valid history file
+    """
+    if not os.path.exists(history_file):
+        return {RUNS: []}
+    with open(history_file) as f:
+        history = json.load(f)
+    if not isinstance(history, dict) or \
+            not isinstance(history.get(RUNS), list):
+        raise ValueError("Invalid benchmark history file ({})".format(
+            history_file))
+    return history
+
+
+def save_run(history_file, run):
+    """
+    Append a run to a benchmark history file. The file is replaced
+    atomically.
+
+    :param history_file: History file
+    :type history_file: str or unicode
+    :param run: Run (see :py:func:`run_benchmarks`)
+    :type run: dict
+    :raise ValueError: If the file is not a valid history file
+    """
+    history = load_history(history_file)
+    history[RUNS].append(run)
+    directory = os.path.dirname(os.path.abspath(history_file))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=directory, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_file, history_file)
+
+
+def load_baseline(baseline_file):
+    """
+    Load a baseline run, either a run saved as JSON or the last run
+    in a benchmark history file.
+
+    :param baseline_file: Baseline file
+    :type baseline_file: str or unicode
+    :return: Run
+    :rtype: dict
+    :raise FileNotFoundError: If the file cannot be found
+    :raise ValueError: If the file is not a valid run or history \
+    file, or is a history file with no runs
+    """
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if isinstance(baseline, dict) and isinstance(baseline.get(RUNS), list):
+        if not baseline[RUNS]:
+            raise ValueError("No runs in benchmark history file ({})".format(
+                baseline_file))
+        baseline = baseline[RUNS][-1]
+    if not isinstance(baseline, dict) or \
+            not isinstance(baseline.get(RESULTS), list):
+        raise ValueError("Invalid benchmark baseline file ({})".format(
+            baseline_file))
+    return baseline
+
+
+def save_baseline(baseline_file, run):
+    """
+    Save a run as a baseline.
+
+    :param baseline_file: Baseline file
+    :type baseline_file: str or unicode
+    :param run: Run (see :py:func:`run_benchmarks`)
+    :type run: dict
+    """
+    with open(baseline_file, "w") as f:
+        json.dump(run, f, indent=2)
+
+
+def compare_runs(run, baseline=None, threshold=THRESHOLD):
+    """
+    Compare each result of a run with the baseline result for the
+    same benchmark and scale. A result's status is:
+
+    * :py:const:`STATUS_SKIPPED` if the benchmark was skipped.
+    * :py:const:`STATUS_NEW` if there is no baseline result.
+    * :py:const:`STATUS_REGRESSION` if the time or peak RSS exceeds
+      the baseline by more than ``threshold`` (a fraction).
+    * :py:const:`STATUS_IMPROVEMENT` if the time is less than the
+      baseline by more than ``threshold``.
+    * :py:const:`STATUS_OK` otherwise.
+
+    :param run: Run (see :py:func:`run_benchmarks`)
+    :type run: dict
+    :param baseline: Baseline run or ``None``
+    :type baseline: dict
+    :param threshold: Threshold
+    :type threshold: float
+    :return: Comparison with columns :py:const:`COMPARISON_COLUMNS`
+    :rtype: pandas.core.frame.DataFrame
+    """
+    import pandas as pd
+    baseline_results = {}
+    if baseline is not None:
+        baseline_results = {
+            (result[BENCHMARK], result[SCALE]): result
+            for result in baseline[RESULTS] if result[SKIPPED] is None}
+    rows = []
+    for result in run[RESULTS]:
+        row = dict.fromkeys(COMPARISON_COLUMNS)
+        row.update({key: result[key] for key in COMPARISON_COLUMNS
+                    if key in result})
+        base = baseline_results.get((result[BENCHMARK], result[SCALE]))
+        if result[SKIPPED] is not None:
+            row[STATUS] = STATUS_SKIPPED
+        elif base is None:
+            row[STATUS] = STATUS_NEW
+        else:
+            row[BASELINE_PREFIX + SECONDS] = base[SECONDS]
+            row[BASELINE_PREFIX + PEAK_RSS_MB] = base[PEAK_RSS_MB]
+            row[TIME_RATIO] = result[SECONDS] / base[SECONDS]
+            row[RSS_RATIO] = result[PEAK_RSS_MB] / base[PEAK_RSS_MB]
+            if row[TIME_RATIO] > 1 + threshold or \
+                    row[RSS_RATIO] > 1 + threshold:
+                row[STATUS] = STATUS_REGRESSION
+            elif row[TIME_RATIO] < 1 - threshold:
+                row[STATUS] = STATUS_IMPROVEMENT
+            else:
+                row[STATUS] = STATUS_OK
+        rows.append(row)
+    return pd.DataFrame(rows, columns=COMPARISON_COLUMNS)
+
+
+def benchmark(data_dir,
+              benchmarks=list(BENCHMARKS),
+              scales=SCALES,
+              repeats=REPEATS,
+              history_file=HISTORY_FILE,
+              baseline_file=None,
+              report_file=REPORT_FILE,
+              threshold=THRESHOLD,
+              seed=42):
+    """
+    Run benchmarks (see :py:func:`run_benchmarks`), append the run to
+    a history file (see :py:func:`save_run`) and compare the run to a
+    baseline (see :py:func:`compare_runs`). The comparison is saved
+    as a tab-separated values file, with a provenance header.
+
+    :param data_dir: Data directory (see :py:func:`generate_data`)
+    :type data_dir: str or unicode
+    :param benchmarks: Benchmark names, from :py:const:`BENCHMARKS`
+    :type benchmarks: list(str or unicode)
+    :param scales: Scales
+    :type scales: list(int)
+    :param repeats: Number of times to repeat each benchmark
+    :type repeats: int
+    :param history_file: History file
+    :type history_file: str or unicode
+    :param baseline_file: Baseline file (see \
+    :py:func:`load_baseline`) or ``None``
+    :type baseline_file: str or unicode
+    :param report_file: Comparison file
+    :type report_file: str or unicode
+    :param threshold: Regression threshold (see \
+    :py:func:`compare_runs`)
+    :type threshold: float
+    :param seed: Random seed value for generating data
+    :type seed: int
+    :return: Run and comparison
+    :rtype: tuple(dict, pandas.core.frame.DataFrame)
+    :raise FileNotFoundError: If the baseline file cannot be found
+    :raise ValueError: If a benchmark name is invalid, repeats is \
+    less than 1 or the history or baseline files are invalid
+    """
+    baseline = None
+    if baseline_file is not None:
+        baseline = load_baseline(baseline_file)
+    load_history(history_file)
+    run = run_benchmarks(data_dir, benchmarks, scales, repeats, seed)
+    save_run(history_file, run)
+    comparison = compare_runs(run, baseline, threshold)
+    provenance.write_provenance_header(__file__, report_file)
+    comparison.to_csv(report_file, mode='a', sep="\t", index=False)
+    return run, comparison
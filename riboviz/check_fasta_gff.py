@@ -1,19 +1,23 @@
 """
 Functions to check FASTA and GFF files for coding sequence (CDS) features.
 """
-import bisect
 import csv
+import heapq
+import multiprocessing
 import os
 import warnings
-from Bio import SeqIO
-import gffutils
-from pyfaidx import Fasta
+from collections import Counter
+import numpy as np
 from pyfaidx import FastaIndexingError
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
+from riboviz.fasta_gff import FastaSequences
+from riboviz.fasta_gff import FeatureCache
+from riboviz.fasta_gff import get_fasta_index
+from riboviz.fasta_gff import load_gff
 from riboviz.fasta_gff import START_CODON
 from riboviz.fasta_gff import STOP_CODONS
 from riboviz.get_cds_codons import get_feature_id
-from riboviz.get_cds_codons import sequence_to_codons
+from riboviz.get_cds_codons import sequence_to_codon_array
 from riboviz import provenance
 
 SEQUENCE = "Sequence"
@@ -92,28 +96,385 @@ def get_fasta_sequence_ids(fasta):
     """
     Get a list of the unique IDs of sequences in a FASTA file.
 
+    The IDs are read from the FASTA file's ``.fai`` index (see
+    :py:func:`riboviz.fasta_gff.get_fasta_index`).
+
     :param fasta: FASTA file
     :type fasta: str or unicode
     :return: Unique sequence IDs
     :rtype: set(str or unicode)
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
+    :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
+    formatted sequences
+    """
+    return set(get_fasta_index(fasta).keys())
+
+
+def get_feature_issue_options(feature_format=CDS_FEATURE_FORMAT,
+                              use_feature_name=False,
+                              start_codons=[START_CODON]):
+    """
+    Get options that affect the issues for a feature, for use in
+    feature hashes (see :py:func:`riboviz.fasta_gff.get_feature_hash`).
+
+    :param feature_format: Feature name format for features which \
+    do not define ``ID``  or ``Name`` attributes.
+    :type feature_format: str or unicode
+    :param use_feature_name: Use ``Name`` in reporting?
+    :type use_feature_name: bool
+    :param start_codons: Allowable start codons.
+    :type start_codons: list(str or unicode)
+    :return: Options
+    :rtype: dict
+    """
+    return {"feature_format": feature_format,
+            "use_feature_name": use_feature_name,
+            "start_codons": list(start_codons)}
+
+
+def check_feature(feature,
+                  fasta_genes,
+                  feature_format=CDS_FEATURE_FORMAT,
+                  use_feature_name=False,
+                  start_codons=[START_CODON]):
+    """
+    Check a coding sequence (CDS) feature and return a list of issues
+    for the feature. Issues are as for :py:func:`get_issues` but
+    exclude those which depend upon other features (multiple CDS
+    per sequence, duplicate feature IDs) or other sequences.
+
+    :param feature: CDS feature
+    :type feature: gffutils.feature.Feature
+    :param fasta_genes: FASTA genes
+    :type fasta_genes: riboviz.fasta_gff.FastaSequences
+    :param feature_format: Feature name format for features which \
+    do not define ``ID``  or ``Name`` attributes. This format is \
+    applied to the sequence ID to create a feature name.
+    :type feature_format: str or unicode
+    :param use_feature_name: If a feature defines both ``ID`` and \
+    ``Name`` attributes then use ``Name`` in reporting, otherwise use \
+    ``ID``.
+    :type use_feature_name: bool
+    :param start_codons: Allowable start codons.
+    :type start_codons: list(str or unicode)
+    :return: Issues for the feature or ``None`` if the feature's \
+    sequence could not be retrieved for a reason other than it not \
+    being in the FASTA file (a warning is raised)
+    :rtype: list(tuple(str or unicode, str or unicode, \
+    str or unicode, object))
+    :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
+    formatted sequences
     """
-    if not os.path.exists(fasta) or (not os.path.isfile(fasta)):
-        raise FileNotFoundError(fasta)
-    seq_ids = set()
-    with open(fasta, 'r') as f:
-        # 'fasta' is https://biopython.org/wiki/SeqIO file type.
-        for record in SeqIO.parse(f, "fasta"):
-            seq_ids.add(record.id)
-    return seq_ids
+    issues = []
+    feature_id_name = get_feature_id(feature, use_feature_name)
+    if feature_id_name is None:
+        feature_id_name = feature_format.format(feature.seqid)
+        issues.append((feature.seqid, feature_id_name,
+                       NO_ID_NAME, None))
+    try:
+        sequence = fasta_genes.get_feature_sequence(feature)
+    except KeyError as e:  # Missing sequence.
+        issues.append((feature.seqid,
+                       NOT_APPLICABLE,
+                       SEQUENCE_NOT_IN_FASTA,
+                       None))
+        return issues
+    except FastaIndexingError as e:
+        raise e
+    except Exception as e:
+        warnings.warn(str(e))
+        return None
+    seq_len_remainder = len(sequence) % 3
+    if seq_len_remainder != 0:
+        issues.append((feature.seqid, feature_id_name,
+                       INCOMPLETE_FEATURE, None))
+        sequence = bytes(sequence) + (b"N" * (3 - seq_len_remainder))
+
+    sequence_codons = sequence_to_codon_array(sequence)
+    start_codon = sequence_codons[0].decode()
+    stop_codon = sequence_codons[-1].decode()
+    if start_codon not in start_codons:
+        issues.append((feature.seqid, feature_id_name,
+                       NO_START_CODON, start_codon))
+    if stop_codon not in STOP_CODONS:
+        issues.append((feature.seqid, feature_id_name,
+                       NO_STOP_CODON, stop_codon))
+    if np.isin(sequence_codons[:-1],
+               np.array(STOP_CODONS, dtype=sequence_codons.dtype)).any():
+        issues.append((feature.seqid, feature_id_name,
+                       INTERNAL_STOP_CODON, None))
+    return issues
+
+
+def get_feature_issues(fasta,
+                       features,
+                       feature_format=CDS_FEATURE_FORMAT,
+                       use_feature_name=False,
+                       start_codons=[START_CODON],
+                       feature_cache=None,
+                       fasta_index=None):
+    """
+    Check coding sequence (CDS) features against a FASTA file and
+    return a list of issues for each feature, in the same order as
+    the features. See :py:func:`check_feature`.
+
+    If ``feature_cache`` is provided then the hash of each feature is
+    calculated (see
+    :py:meth:`riboviz.fasta_gff.FeatureCache.get_feature_hash`) and,
+    if the hash is in ``feature_cache``, the cached issues are used
+    and the feature is not checked.
+
+    :param fasta: FASTA file
+    :type fasta: str or unicode
+    :param features: CDS features
+    :type features: list(gffutils.feature.Feature)
+    :param feature_format: Feature name format for features which \
+    do not define ``ID``  or ``Name`` attributes. This format is \
+    applied to the sequence ID to create a feature name.
+    :type feature_format: str or unicode
+    :param use_feature_name: If a feature defines both ``ID`` and \
+    ``Name`` attributes then use ``Name`` in reporting, otherwise use \
+    ``ID``.
+    :type use_feature_name: bool
+    :param start_codons: Allowable start codons.
+    :type start_codons: list(str or unicode)
+    :param feature_cache: Feature cache, with issues for each \
+    feature (see :py:func:`get_feature_issue_options`)
+    :type feature_cache: riboviz.fasta_gff.FeatureCache
+    :param fasta_index: FASTA file index, from \
+    :py:func:`riboviz.fasta_gff.get_fasta_index` (if ``None`` then \
+    the index is read from the FASTA file's ``.fai`` index)
+    :type fasta_index: dict(str or unicode => tuple(int, int, int, int))
+    :return: Issues for each feature and hash of each feature \
+    (``None`` if ``feature_cache`` is ``None`` or the feature could \
+    not be checked)
+    :rtype: tuple(list(list(tuple(str or unicode, str or unicode, \
+    str or unicode, object))), list(str or unicode))
+    :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
+    formatted sequences
+    """
+    features_issues = []
+    feature_hashes = []
+    with FastaSequences(fasta, fasta_index) as fasta_genes:
+        for feature in features:
+            feature_hash = None
+            if feature_cache is not None:
+                feature_hash = feature_cache.get_feature_hash(
+                    feature, fasta_genes)
+                cached_issues = feature_cache.get(feature_hash)
+                if cached_issues is not None:
+                    features_issues.append(
+                        [tuple(issue) for issue in cached_issues])
+                    feature_hashes.append(feature_hash)
+                    continue
+            issues = check_feature(feature, fasta_genes, feature_format,
+                                   use_feature_name, start_codons)
+            if issues is None:
+                issues = []
+                feature_hash = None
+            features_issues.append(issues)
+            feature_hashes.append(feature_hash)
+    return features_issues, feature_hashes
+
+
+def partition_features(features, processes):
+    """
+    Partition features by sequence ID into at most ``processes``
+    partitions. All features for a sequence are in the same
+    partition. Sequences are assigned, largest first, to the
+    partition with the fewest features so far, so the partitions are
+    balanced and deterministic.
+
+    :param features: Features
+    :type features: list(gffutils.feature.Feature)
+    :param processes: Number of partitions
+    :type processes: int
+    :return: Indices of features in each non-empty partition, in \
+    increasing order
+    :rtype: list(list(int))
+    """
+    seq_indices = {}
+    for index, feature in enumerate(features):
+        seq_indices.setdefault(feature.seqid, []).append(index)
+    partitions = [[] for _ in range(max(1, processes))]
+    for indices in sorted(seq_indices.values(), key=len, reverse=True):
+        min(partitions, key=len).extend(indices)
+    return [sorted(partition) for partition in partitions if partition]
+
+
+def get_issue_lists(fasta,
+                    gff,
+                    feature_format=CDS_FEATURE_FORMAT,
+                    use_feature_name=False,
+                    start_codons=[START_CODON],
+                    gff_cache_dir=None,
+                    use_gffutils=False,
+                    processes=1,
+                    feature_cache_file=None):
+    """
+    Check FASTA and GFF files for coding sequence (CDS) features and
+    return lists of issues for each category of issue, and counts of
+    the issues of each type. See :py:func:`get_issues` for
+    information on sequences, features, issue types, related data
+    and the order of the issues.
+
+    The lists can be merged into a single sequence of issues using
+    :py:func:`merge_issues`.
+
+    :param fasta: FASTA file
+    :type fasta: str or unicode
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param feature_format: Feature name format for features which \
+    do not define ``ID``  or ``Name`` attributes. This format is \
+    applied to the sequence ID to create a feature name.
+    :type feature_format: str or unicode
+    :param use_feature_name: If a feature defines both ``ID`` and \
+    ``Name`` attributes then use ``Name`` in reporting, otherwise use \
+    ``ID``.
+    :type use_feature_name: bool
+    :param start_codons: Allowable start codons.
+    :type start_codons: list(str or unicode)
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param processes: Number of processes to check features with
+    :type processes: int
+    :param feature_cache_file: Feature cache file, or ``None`` for \
+    no caching
+    :type feature_cache_file: str or unicode
+    :return: Number of FASTA sequences, number of GFF features, \
+    number of GFF CDS features, lists of issues (see \
+    :py:func:`merge_issues`) and list of tuples of form (issue \
+    type, count) sorted by count (see :py:func:`count_issues`)
+    :rtype: tuple(int, int, int, tuple(list(tuple(str or unicode, \
+    str or unicode, str or unicode, object))), \
+    list(tuple(str or unicode, int)))
+    :raises FileNotFoundError: If the FASTA or GFF files \
+    cannot be found
+    :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
+    formatted sequences
+    :raises ValueError: If GFF file is empty or badly formatted
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    for f in [fasta, gff]:
+        if not os.path.exists(f) or (not os.path.isfile(f)):
+            raise FileNotFoundError(f)
+    gffdb = load_gff(gff, use_gffutils, gff_cache_dir)
+    # Track IDs of features encountered. Each ID must be unique within
+    # a GFF file. See http://gmod.org/wiki/GFF3.
+    feature_ids = {}
+    # Track sequences encountered and counts of features for
+    # each.
+    sequence_features = {}
+    features = list(gffdb.features_of_type('CDS'))
+    for feature in features:
+        if feature.seqid not in sequence_features:
+            sequence_features[feature.seqid] = 0
+        sequence_features[feature.seqid] += 1
+        if "ID" in feature.attributes:
+            feature_id = feature.attributes["ID"][0].strip()
+            if feature_id in feature_ids:
+                feature_ids[feature_id].append(feature.seqid)
+            else:
+                feature_ids[feature_id] = [feature.seqid]
+
+    # Check features, partitioned by sequence ID, then merge the
+    # issues for each feature in the order of the features.
+    feature_cache = None
+    if feature_cache_file is not None:
+        feature_cache = FeatureCache(
+            feature_cache_file, fasta,
+            get_feature_issue_options(feature_format, use_feature_name,
+                                      start_codons))
+    fasta_index = get_fasta_index(fasta)
+    partitions = partition_features(features, processes)
+    arguments = [(fasta,
+                  [features[index] for index in partition],
+                  feature_format,
+                  use_feature_name,
+                  start_codons,
+                  feature_cache,
+                  fasta_index) for partition in partitions]
+    if processes > 1 and len(arguments) > 1:
+        with multiprocessing.Pool(len(arguments)) as pool:
+            partitions_issues = pool.starmap(get_feature_issues, arguments)
+    else:
+        partitions_issues = [get_feature_issues(*argument)
+                             for argument in arguments]
+    features_issues = [None] * len(features)
+    feature_hashes = [None] * len(features)
+    for partition, (partition_issues, partition_hashes) in \
+            zip(partitions, partitions_issues):
+        for index, feature_issues, feature_hash in \
+                zip(partition, partition_issues, partition_hashes):
+            features_issues[index] = feature_issues
+            feature_hashes[index] = feature_hash
+    if feature_cache is not None:
+        for feature, feature_hash, feature_issues in \
+                zip(features, feature_hashes, features_issues):
+            if feature_hash is not None:
+                feature_cache.add(feature, feature_hash,
+                                  [list(issue) for issue in feature_issues])
+        feature_cache.save()
+    counts = Counter({issue: 0 for issue in ISSUE_TYPES})
+    issues = []
+    for feature_issues in features_issues:
+        for issue in feature_issues:
+            issues.append(issue)
+            counts[issue[2]] += 1
+    del features_issues
+
+    multiple_cds_issues = sorted(
+        (sequence, WILDCARD, MULTIPLE_CDS, count)
+        for sequence, count in sequence_features.items() if count > 1)
+    duplicate_feature_ids = [(feature_id, seq_ids)
+                             for feature_id, seq_ids in feature_ids.items()
+                             if len(seq_ids) > 1]
+    duplicate_feature_id_issues = sorted(
+        (seq_id, feature_id, DUPLICATE_FEATURE_ID, None)
+        for feature_id, seq_ids in duplicate_feature_ids
+        for seq_id in seq_ids)
+    duplicate_feature_ids_issues = [
+        (WILDCARD, feature_id, DUPLICATE_FEATURE_IDS, len(seq_ids))
+        for feature_id, seq_ids in duplicate_feature_ids]
+    gff_seq_ids = set(sequence_features.keys())
+    fasta_seq_ids = set(fasta_index)
+    sequence_not_in_gff_issues = [
+        (seq_id, NOT_APPLICABLE, SEQUENCE_NOT_IN_GFF, None)
+        for seq_id in sorted(fasta_seq_ids - gff_seq_ids)]
+    issue_lists = (issues,
+                   multiple_cds_issues,
+                   duplicate_feature_id_issues,
+                   duplicate_feature_ids_issues,
+                   sequence_not_in_gff_issues)
+    counts[MULTIPLE_CDS] += len(multiple_cds_issues)
+    counts[DUPLICATE_FEATURE_ID] += len(duplicate_feature_id_issues)
+    counts[DUPLICATE_FEATURE_IDS] += len(duplicate_feature_ids_issues)
+    counts[SEQUENCE_NOT_IN_GFF] += len(sequence_not_in_gff_issues)
+    num_sequences = len(fasta_seq_ids)
+    num_features = gffdb.count_features_of_type()
+    num_cds_features = gffdb.count_features_of_type('CDS')
+    return num_sequences, num_features, num_cds_features, issue_lists, \
+        sort_issue_counts(counts)
 
 
 def get_issues(fasta,
                gff,
                feature_format=CDS_FEATURE_FORMAT,
                use_feature_name=False,
-               start_codons=[START_CODON]):
+               start_codons=[START_CODON],
+               gff_cache_dir=None,
+               use_gffutils=False,
+               processes=1,
+               feature_cache_file=None):
     """
     Check FASTA and GFF files for coding sequence (CDS) features and
     return a list of issues for relating to coding sequences, ``CDS``,
@@ -184,6 +545,34 @@ def get_issues(fasta,
     Issue data is supplementary data relating to the issue. Unless
     already noted above this will be ``None``.
 
+    Issues are ordered as follows (see :py:func:`merge_issues`).
+    Issues for features, in the order of the features in the GFF
+    file, are merged with :py:const:`MULTIPLE_CDS` and
+    :py:const:`DUPLICATE_FEATURE_ID` issues, each of which is placed
+    before the first issue that sorts after it. These are followed
+    by :py:const:`DUPLICATE_FEATURE_IDS` issues and then
+    :py:const:`SEQUENCE_NOT_IN_GFF` issues, sorted by sequence ID.
+
+    If ``processes`` is greater than 1 then CDS features are
+    partitioned by sequence ID (see :py:func:`partition_features`)
+    and each partition is checked by :py:func:`get_feature_issues` in
+    a separate process. Issues are merged in the order of the
+    features, so they are the same whatever the number of processes.
+
+    The FASTA file's index is read, or created, once (see
+    :py:func:`riboviz.fasta_gff.get_fasta_index`) and passed to each
+    process, so processes never race to create a missing or stale
+    ``.fai`` index.
+
+    If ``feature_cache_file`` is provided then the issues for each
+    feature are cached in this file, keyed by a hash of the feature's
+    GFF record, its sequence bytes in the FASTA file and the options
+    that affect its issues (see
+    :py:class:`riboviz.fasta_gff.FeatureCache`). On later runs,
+    only features whose hashes are not in the cache are checked. The
+    cache is then replaced with the entries for the current features.
+    The issues are the same as for a run with no cache.
+
     :param fasta: FASTA file
     :type fasta: str or unicode
     :param gff: GFF file
@@ -198,111 +587,77 @@ def get_issues(fasta,
     :type use_feature_name: bool
     :param start_codons: Allowable start codons.
     :type start_codons: list(str or unicode)
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param processes: Number of processes to check features with
+    :type processes: int
+    :param feature_cache_file: Feature cache file, or ``None`` for \
+    no caching
+    :type feature_cache_file: str or unicode
     :return: Number of FASTA sequences, number of GFF features, \
-    number of GFF CDS features, list of unique sequence IDs in GFF \
-    file and list of issues for sequences and features.
+    number of GFF CDS features and list of issues for sequences and \
+    features.
     :rtype: tuple(int, int, int, list(tuple(str or unicode, \
     str or unicode, str or unicode, object))
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
     :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
     formatted sequences
-    :raises ValueError: If GFF file is empty
+    :raises ValueError: If GFF file is empty or badly formatted
     :raises Exception: Exceptions specific to gffutils.create_db \
     (these are undocumented in the gffutils documentation)
     """
-    for f in [fasta, gff]:
-        if not os.path.exists(f) or (not os.path.isfile(f)):
-            raise FileNotFoundError(f)
-    try:
-        gffdb = gffutils.create_db(gff,
-                                   dbfn='gff.db',
-                                   force=True,
-                                   keep_order=True,
-                                   merge_strategy='merge',
-                                   sort_attribute_values=True)
-    except ValueError as e:
-        # Wrap and rethrow exception so file name is included
-        raise ValueError("{} ({})".format(e, gff)) from e
-    issues = []
-    # Track IDs of features encountered. Each ID must be unique within
-    # a GFF file. See http://gmod.org/wiki/GFF3.
-    feature_ids = {}
-    # Track sequences encountered and counts of features for
-    # each.
-    sequence_features = {}
-    fasta_genes = Fasta(fasta)
-    for feature in gffdb.features_of_type('CDS'):
-        if feature.seqid not in sequence_features:
-            sequence_features[feature.seqid] = 0
-        sequence_features[feature.seqid] += 1
-
-        feature_id = None
-        if "ID" in feature.attributes:
-            feature_id = feature.attributes["ID"][0].strip()
-            if feature_id in feature_ids:
-                feature_ids[feature_id].append(feature.seqid)
-            else:
-                feature_ids[feature_id] = [feature.seqid]
-        feature_id_name = get_feature_id(feature, use_feature_name)
-        if feature_id_name is None:
-            feature_id_name = feature_format.format(feature.seqid)
-            issues.append((feature.seqid, feature_id_name,
-                           NO_ID_NAME, None))
-        try:
-            sequence = feature.sequence(fasta_genes)
-        except KeyError as e:  # Missing sequence.
-            issues.append((feature.seqid,
-                           NOT_APPLICABLE,
-                           SEQUENCE_NOT_IN_FASTA,
-                           None))
-            continue
-        except FastaIndexingError as e:
-            raise e
-        except Exception as e:
-            warnings.warn(str(e))
-            continue
-        seq_len_remainder = len(sequence) % 3
-        if seq_len_remainder != 0:
-            issues.append((feature.seqid, feature_id_name,
-                           INCOMPLETE_FEATURE, None))
-            sequence += ("N" * (3 - seq_len_remainder))
-
-        sequence_codons = sequence_to_codons(sequence)
-        if sequence_codons[0] not in start_codons:
-            issues.append((feature.seqid, feature_id_name,
-                           NO_START_CODON, sequence_codons[0]))
-        if not sequence_codons[-1] in STOP_CODONS:
-            issues.append((feature.seqid, feature_id_name,
-                           NO_STOP_CODON, sequence_codons[-1]))
-        if any([codon in STOP_CODONS
-                for codon in sequence_codons[:-1]]):
-            issues.append((feature.seqid, feature_id_name,
-                           INTERNAL_STOP_CODON, None))
-
-    for sequence, count in list(sequence_features.items()):
-        if count > 1:
-            # Insert issue, respect ordering by sequence ID.
-            bisect.insort(issues, (sequence, WILDCARD, MULTIPLE_CDS, count))
-
-    for feature_id, seq_ids in feature_ids.items():
-        if len(seq_ids) > 1:
-            issues.append((WILDCARD, feature_id,
-                           DUPLICATE_FEATURE_IDS, len(seq_ids)))
-            for seq_id in seq_ids:
-                # Insert issue, respect ordering by sequence ID.
-                bisect.insort(issues, (seq_id, feature_id,
-                                       DUPLICATE_FEATURE_ID, None))
-
-    gff_seq_ids = set(sequence_features.keys())
-    fasta_seq_ids = get_fasta_sequence_ids(fasta)
-    fasta_only_seq_ids = fasta_seq_ids - gff_seq_ids
-    for seq_id in fasta_only_seq_ids:
-        issues.append((seq_id, NOT_APPLICABLE, SEQUENCE_NOT_IN_GFF, None))
-    num_sequences = len(fasta_seq_ids)
-    num_features = len(list(gffdb.all_features()))
-    num_cds_features = len(list(gffdb.features_of_type('CDS')))
-    return num_sequences, num_features, num_cds_features, issues
+    num_sequences, num_features, num_cds_features, issue_lists, _ = \
+        get_issue_lists(fasta,
+                        gff,
+                        feature_format=feature_format,
+                        use_feature_name=use_feature_name,
+                        start_codons=start_codons,
+                        gff_cache_dir=gff_cache_dir,
+                        use_gffutils=use_gffutils,
+                        processes=processes,
+                        feature_cache_file=feature_cache_file)
+    return num_sequences, num_features, num_cds_features, \
+        list(merge_issues(issue_lists))
+
+
+def merge_issues(issue_lists):
+    """
+    Merge lists of issues, from :py:func:`get_issue_lists`, into a
+    single sequence of issues.
+
+    Issues for features are lazily merged with
+    :py:const:`MULTIPLE_CDS` and :py:const:`DUPLICATE_FEATURE_ID`
+    issues, which are sorted, so each of these is placed before the
+    first issue that sorts after it, comparing whole tuples. These
+    are followed by :py:const:`DUPLICATE_FEATURE_IDS` and
+    :py:const:`SEQUENCE_NOT_IN_GFF` issues.
+
+    :param issue_lists: Issues for features, in the order of the \
+    features in the GFF file, and sorted :py:const:`MULTIPLE_CDS`, \
+    sorted :py:const:`DUPLICATE_FEATURE_ID`, \
+    :py:const:`DUPLICATE_FEATURE_IDS` and \
+    :py:const:`SEQUENCE_NOT_IN_GFF` issues
+    :type issue_lists: tuple(list(tuple(str or unicode, \
+    str or unicode, str or unicode, object)))
+    :return: Issues
+    :rtype: generator(tuple(str or unicode, str or unicode, \
+    str or unicode, object))
+    """
+    feature_issues, multiple_cds_issues, duplicate_feature_id_issues, \
+        duplicate_feature_ids_issues, sequence_not_in_gff_issues = \
+        issue_lists
+    yield from heapq.merge(feature_issues,
+                           multiple_cds_issues,
+                           duplicate_feature_id_issues)
+    yield from duplicate_feature_ids_issues
+    yield from sequence_not_in_gff_issues
 
 
 def write_issues_to_csv(issues, csv_file, header={}, delimiter="\t"):
@@ -317,9 +672,12 @@ def write_issues_to_csv(issues, csv_file, header={}, delimiter="\t"):
     * :py:const:`ISSUE_TYPE`: issue type.
     * :py:const:`ISSUE_DATA`: issue data or ``None``.
 
-    :param issues: List of tuples of form (sequence ID, feature ID ('' if \
+    Issues are written as they are iterated, so ``issues`` can be a
+    generator.
+
+    :param issues: Tuples of form (sequence ID, feature ID ('' if \
     not applicable to the issue), issue type, issue data).
-    :type issues: list(tuple(str or unicode, str or unicode, \
+    :type issues: iterable(tuple(str or unicode, str or unicode, \
     str or unicode, object))
     :param csv_file: CSV file name
     :type csv_file: str or unicode
@@ -328,50 +686,62 @@ def write_issues_to_csv(issues, csv_file, header={}, delimiter="\t"):
     :param delimiter: Delimiter
     :type delimiter: str or unicode
     """
-    provenance.write_provenance_header(__file__, csv_file)
-    with open(csv_file, 'a', newline='') as f:
+    with open(csv_file, 'w', newline='') as f:
+        provenance.write_provenance(f, __file__)
         for key, value in header.items():
             f.write("# {}: {}\n".format(key, value))
-    with open(csv_file, 'a', newline='') as f:
         writer = csv.writer(f, delimiter=delimiter, lineterminator=os.linesep)
         writer.writerow([SEQUENCE, FEATURE, ISSUE_TYPE, ISSUE_DATA])
-        for (sequence_id, feature_id, issue_type, issue_data) in issues:
-            writer.writerow([sequence_id, feature_id, issue_type,
-                             issue_data])
+        writer.writerows(issues)
 
 
 def count_issues(issues):
     """
     Iterate through issues and count number of unique issues of each type.
 
-    :param issues: List of tuples of form (sequence ID, feature ID \
+    :param issues: Tuples of form (sequence ID, feature ID \
     '' if not applicable to the issue), issue type, issue data).
-    :type issues: list(tuple(str or unicode, str or unicode, \
+    :type issues: iterable(tuple(str or unicode, str or unicode, \
     str or unicode, object))
     :return: List of tuples of form (issue type, count) sorted by 'count'
     :type issues: list(tuple(str or unicode, int))
     """
-    counts = {issue: 0 for issue in ISSUE_TYPES}
-    for (_, _, issue_type, _) in issues:
-        counts[issue_type] += 1
-    counts = sorted(counts.items(),
-                    key=lambda item: item[1],
-                    reverse=True)
-    return counts
+    counts = Counter({issue: 0 for issue in ISSUE_TYPES})
+    counts.update(issue_type for (_, _, issue_type, _) in issues)
+    return sort_issue_counts(counts)
+
+
+def sort_issue_counts(counts):
+    """
+    Sort counts of issues of each type by count.
+
+    :param counts: Counts of issues of each type
+    :type counts: collections.Counter
+    :return: List of tuples of form (issue type, count) sorted by \
+    'count'
+    :rtype: list(tuple(str or unicode, int))
+    """
+    return sorted(counts.items(), key=lambda item: item[1], reverse=True)
 
 
 def run_fasta_gff_check(fasta,
                         gff,
                         feature_format=CDS_FEATURE_FORMAT,
                         use_feature_name=False,
-                        start_codons=[START_CODON]):
+                        start_codons=[START_CODON],
+                        gff_cache_dir=None,
+                        use_gffutils=False,
+                        processes=1,
+                        feature_cache_file=None):
     """
     Check FASTA and GFF files for coding sequence (CDS) features
-    and get a list of issues for each sequence and coding sequence,
-    ``CDS``, feature.
+    and get lists of issues for each sequence and coding sequence,
+    ``CDS``, feature, and counts of the issues of each type.
 
     See :py:func:`get_issues` for information on sequences, features,
-    issue types and related data.
+    issue types and related data, and :py:func:`get_issue_lists` for
+    the lists of issues, which can be merged using
+    :py:func:`merge_issues`.
 
     The following is also returned:
 
@@ -402,21 +772,44 @@ def run_fasta_gff_check(fasta,
     :type use_feature_name: bool
     :param start_codons: Allowable start codons.
     :type start_codons: list(str or unicode)
-    :return: Configuration, metadata, issues
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param processes: Number of processes to check features with \
+    (see :py:func:`get_issues`)
+    :type processes: int
+    :param feature_cache_file: Feature cache file (see \
+    :py:func:`get_issues`)
+    :type feature_cache_file: str or unicode
+    :return: Configuration, metadata, lists of issues and list of \
+    tuples of form (issue type, count) sorted by count
+    :rtype: tuple(dict, dict, tuple(list(tuple(str or unicode, \
+    str or unicode, str or unicode, object))), \
+    list(tuple(str or unicode, int)))
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
     :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
     formatted sequences
-    :raises ValueError: If GFF file is empty
+    :raises ValueError: If GFF file is empty or badly formatted
     :raises Exception: Exceptions specific to gffutils.create_db \
     (these are undocumented in the gffutils documentation)
     """
-    num_sequences, num_features, num_cds_features, issues = \
-        get_issues(fasta,
-                   gff,
-                   feature_format=feature_format,
-                   use_feature_name=use_feature_name,
-                   start_codons=start_codons)
+    num_sequences, num_features, num_cds_features, issue_lists, \
+        issue_counts = get_issue_lists(
+            fasta,
+            gff,
+            feature_format=feature_format,
+            use_feature_name=use_feature_name,
+            start_codons=start_codons,
+            gff_cache_dir=gff_cache_dir,
+            use_gffutils=use_gffutils,
+            processes=processes,
+            feature_cache_file=feature_cache_file)
     config = {}
     config[FASTA_FILE] = fasta
     config[GFF_FILE] = gff
@@ -425,7 +818,7 @@ def run_fasta_gff_check(fasta,
     metadata[NUM_SEQUENCES] = num_sequences
     metadata[NUM_FEATURES] = num_features
     metadata[NUM_CDS_FEATURES] = num_cds_features
-    return config, metadata, issues
+    return config, metadata, issue_lists, issue_counts
 
 
 def check_fasta_gff(fasta,
@@ -435,7 +828,11 @@ def check_fasta_gff(fasta,
                     use_feature_name=False,
                     start_codons=[START_CODON],
                     is_verbose=False,
-                    delimiter="\t"):
+                    delimiter="\t",
+                    gff_cache_dir=None,
+                    use_gffutils=False,
+                    processes=1,
+                    feature_cache_file=None):
     """
     Check FASTA and GFF files for coding sequence (CDS) features
     and both print and save a list of issues for each sequence and
@@ -473,21 +870,36 @@ def check_fasta_gff(fasta,
     :type is_verbose: bool
     :param delimiter: Delimiter
     :type delimiter: str or unicode
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param processes: Number of processes to check features with \
+    (see :py:func:`get_issues`)
+    :type processes: int
+    :param feature_cache_file: Feature cache file (see \
+    :py:func:`get_issues`)
+    :type feature_cache_file: str or unicode
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
     :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
     formatted sequences
-    :raises ValueError: If GFF file is empty
+    :raises ValueError: If GFF file is empty or badly formatted
     :raises Exception: Exceptions specific to gffutils.create_db \
     (these are undocumented in the gffutils documentation)
     """
-    config, metadata, issues = run_fasta_gff_check(
-        fasta, gff, feature_format, use_feature_name, start_codons)
-    issue_counts = count_issues(issues)
+    config, metadata, issue_lists, issue_counts = run_fasta_gff_check(
+        fasta, gff, feature_format, use_feature_name, start_codons,
+        gff_cache_dir, use_gffutils, processes, feature_cache_file)
     header = dict(config)
     header.update(metadata)
     header.update(issue_counts)
-    write_issues_to_csv(issues, issues_file, header, delimiter)
+    write_issues_to_csv(merge_issues(issue_lists), issues_file, header,
+                        delimiter)
     print("Configuration:")
     for (tag, value) in config.items():
         print("{}\t{}".format(tag, value))
@@ -500,7 +912,8 @@ def check_fasta_gff(fasta,
         print("{}\t{}".format(tag, value))
     if is_verbose:
         print("\nIssue details:")
-        for (sequence_id, feature_id, issue_type, issue_data) in issues:
+        for (sequence_id, feature_id, issue_type, issue_data) in \
+                merge_issues(issue_lists):
             if issue_type in ISSUE_FORMATS:
                 print(ISSUE_FORMATS[issue_type].format(sequence=sequence_id,
                                                        feature=feature_id,
@@ -572,7 +572,7 @@ def count_reads_df(config_file, input_dir, tmp_dir, output_dir):
         else:
             rows.append(i[1].get())
     rows = [row for row in rows if row is not None]
-    df = df.append(rows)
+    df = pd.concat([df] + rows)
     return df
 
 
@@ -408,7 +408,8 @@ def create_fastq_simdata(output_dir):
     # Append entry for sample Tag3, barcode CCC.
     sample_rows.append([tag_format.format(num_barcodes), 'CCC'])
     sample_rows_df = pd.DataFrame(sample_rows, columns=sample_sheet.columns)
-    sample_sheet = sample_sheet.append(sample_rows_df, ignore_index=True)
+    sample_sheet = pd.concat([sample_sheet, sample_rows_df],
+                             ignore_index=True)
     sample_sheet[list(sample_sheet.columns)].to_csv(
         os.path.join(output_dir, "multiplex_barcodes.tsv"),
         sep="\t", index=False)
@@ -0,0 +1,414 @@
+"""
+Export riboviz H5 files to partitioned, compressed, columnar files of
+read counts in long format.
+
+Each record has the read count for a gene, read length and position,
+consistent with ``TidyDatamatrix`` in
+``rscripts/read_count_functions.R``. Records with a zero count are
+omitted. Records for each sample are written to a partition
+directory, ``<output_dir>/sample=<sample>/``, as a series of files,
+``part-00000.<ext>``, ``part-00001.<ext>`` etc., each with up to a
+fixed number of records and with columns:
+
+* ``gene``: gene name.
+* ``read_length``: read length.
+* ``position``: 1-indexed position, relative to the start of the
+  gene's matrix of read counts.
+* ``count``: read count.
+
+Following Hive's partitioning convention, the sample is recorded in
+the partition directory name and not as a column within the files.
+
+Files can be written in Parquet format (requires ``pyarrow``) or as
+H5 files with one compressed dataset per column.
+
+Genes, read lengths and positions can be filtered. Only the read
+counts for the selected genes, read lengths and positions are read
+from the H5 files.
+"""
+import importlib
+import multiprocessing
+import os
+import shutil
+import h5py
+import numpy as np
+import pandas as pd
+from riboviz import h5
+
+PARQUET = "parquet"
+""" Parquet output format. """
+H5 = h5.H5_EXT
+""" H5 output format. """
+FORMATS = [PARQUET, H5]
+""" Output formats. """
+PARTITION_FORMAT = "sample={}"
+""" Sample partition directory name format. """
+PART_FORMAT = "part-{:05d}.{}"
+""" Part file name format (index, format). """
+BATCH_SIZE = 2**20
+""" Default maximum number of records per part file. """
+
+GENE = "gene"
+""" Column name. """
+READ_LENGTH = "read_length"
+""" Column name. """
+POSITION = "position"
+""" Column name. """
+COUNT = "count"
+""" Column name. """
+COLUMNS = [GENE, READ_LENGTH, POSITION, COUNT]
+""" Column names. """
+
+SAMPLE = "sample"
+""" Export summary column name. """
+NUM_GENES = "num_genes"
+""" Export summary column name. """
+NUM_RECORDS = "num_records"
+""" Export summary column name. """
+NUM_FILES = "num_files"
+""" Export summary column name. """
+
+
+def get_sample_name(h5_file):
+    """
+    Get sample name from an H5 file name, ``<sample>.h5``.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :return: Sample name
+    :rtype: str or unicode
+    """
+    name = os.path.basename(h5_file)
+    suffix = "." + h5.H5_EXT
+    if name.endswith(suffix):
+        name = name[:-len(suffix)]
+    return name
+
+
+def check_format(output_format):
+    """
+    Check an output format is valid and any libraries it requires are
+    available.
+
+    :param output_format: Output format, one of :py:const:`FORMATS`
+    :type output_format: str or unicode
+    :raise ValueError: If ``output_format`` is invalid or ``pyarrow`` \
+    is required and is not available
+    """
+    if output_format not in FORMATS:
+        raise ValueError("Invalid format {}, expected one of {}".format(
+            output_format, FORMATS))
+    if output_format == PARQUET:
+        try:
+            importlib.import_module("pyarrow")
+        except ImportError as e:
+            raise ValueError("{} format requires pyarrow".format(
+                PARQUET)) from e
+
+
+def write_part(records, part_file, output_format):
+    """
+    Write records to a part file.
+
+    :param records: Records, with columns :py:const:`COLUMNS`
+    :type records: pandas.core.frame.DataFrame
+    :param part_file: Part file
+    :type part_file: str or unicode
+    :param output_format: Output format, one of :py:const:`FORMATS`
+    :type output_format: str or unicode
+    """
+    if output_format == PARQUET:
+        records.to_parquet(part_file, engine="pyarrow", index=False,
+                           compression="snappy")
+        return
+    with h5py.File(part_file, "w") as f:
+        for column in COLUMNS:
+            values = records[column].to_numpy()
+            if column == GENE:
+                values = values.astype(object)
+                dtype = h5py.string_dtype()
+            else:
+                dtype = np.int32
+            f.create_dataset(column, data=values, dtype=dtype,
+                             compression=h5.GZIP,
+                             compression_opts=h5.GZIP_LEVEL,
+                             shuffle=True)
+
+
+def read_part(part_file):
+    """
+    Read records from a part file.
+
+    :param part_file: Part file
+    :type part_file: str or unicode
+    :return: Records, with columns :py:const:`COLUMNS`
+    :rtype: pandas.core.frame.DataFrame
+    """
+    if part_file.endswith("." + PARQUET):
+        return pd.read_parquet(part_file, engine="pyarrow")
+    with h5py.File(part_file, "r") as f:
+        return pd.DataFrame({GENE: f[GENE].asstr()[()],
+                             READ_LENGTH: f[READ_LENGTH][()],
+                             POSITION: f[POSITION][()],
+                             COUNT: f[COUNT][()]})
+
+
+def get_gene_records(f, gene, dataset, lengths, min_read_length=None,
+                     max_read_length=None, min_position=None,
+                     max_position=None):
+    """
+    Get non-zero read counts for a gene as records.
+
+    :param f: H5 file
+    :type f: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param lengths: Read lengths, in ascending order
+    :type lengths: numpy.ndarray
+    :param min_read_length: Minimum read length (if ``None`` then no \
+    minimum)
+    :type min_read_length: int
+    :param max_read_length: Maximum read length (if ``None`` then no \
+    maximum)
+    :type max_read_length: int
+    :param min_position: Minimum 1-indexed position (if ``None`` then \
+    no minimum)
+    :type min_position: int
+    :param max_position: Maximum 1-indexed position (if ``None`` then \
+    no maximum)
+    :type max_position: int
+    :return: Read lengths, positions and counts
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    row_start = 0 if min_read_length is None else \
+        int(np.searchsorted(lengths, min_read_length, "left"))
+    row_stop = len(lengths) if max_read_length is None else \
+        int(np.searchsorted(lengths, max_read_length, "right"))
+    column_start = 0 if min_position is None else max(0, min_position - 1)
+    column_stop = None if max_position is None else max(0, max_position)
+    if row_start >= row_stop or \
+            (column_stop is not None and column_start >= column_stop):
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, empty
+    matrix = h5.get_gene_datamatrix(f, gene, dataset,
+                                    slice(row_start, row_stop),
+                                    slice(column_start, column_stop))
+    rows, columns = np.nonzero(matrix)
+    return (np.asarray(lengths[row_start + rows], dtype=np.int32),
+            (column_start + columns + 1).astype(np.int32),
+            matrix[rows, columns].astype(np.int32))
+
+
+def export_sample(h5_file,
+                  sample,
+                  output_dir,
+                  dataset=None,
+                  genes=None,
+                  min_read_length=None,
+                  max_read_length=None,
+                  min_position=None,
+                  max_position=None,
+                  output_format=PARQUET,
+                  batch_size=BATCH_SIZE):
+    """
+    Export an H5 file for a sample to a partition directory of part
+    files. Any existing partition directory for the sample is
+    replaced.
+
+    :param h5_file: H5 file, standard or packed
+    :type h5_file: str or unicode
+    :param sample: Sample name
+    :type sample: str or unicode
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    the file)
+    :type dataset: str or unicode
+    :param genes: Gene names, or alternative gene names, to export \
+    (if ``None`` then all genes)
+    :type genes: list(str or unicode)
+    :param min_read_length: Minimum read length (if ``None`` then no \
+    minimum)
+    :type min_read_length: int
+    :param max_read_length: Maximum read length (if ``None`` then no \
+    maximum)
+    :type max_read_length: int
+    :param min_position: Minimum 1-indexed position (if ``None`` then \
+    no minimum)
+    :type min_position: int
+    :param max_position: Maximum 1-indexed position (if ``None`` then \
+    no maximum)
+    :type max_position: int
+    :param output_format: Output format, one of :py:const:`FORMATS`
+    :type output_format: str or unicode
+    :param batch_size: Maximum number of records per part file
+    :type batch_size: int
+    :return: Export summary for the sample, with keys \
+    :py:const:`SAMPLE`, :py:const:`NUM_GENES`, \
+    :py:const:`NUM_RECORDS`, :py:const:`NUM_FILES`
+    :rtype: dict
+    :raise FileNotFoundError: If the H5 file cannot be found
+    :raise ValueError: If the H5 file has no genes
+    :raise KeyError: If a gene is not in the file
+    """
+    if not os.path.exists(h5_file) or (not os.path.isfile(h5_file)):
+        raise FileNotFoundError(h5_file)
+    partition_dir = os.path.join(output_dir, PARTITION_FORMAT.format(sample))
+    if os.path.exists(partition_dir):
+        shutil.rmtree(partition_dir)
+    os.makedirs(partition_dir)
+    num_records = 0
+    num_files = 0
+    batch = []
+    batch_records = 0
+
+    def flush(final):
+        """
+        Write whole batches of records and, if ``final``, any
+        remaining records.
+
+        :param final: Write remaining records?
+        :type final: bool
+        """
+        nonlocal batch, batch_records, num_files
+        if not batch:
+            return
+        records = pd.concat(batch, ignore_index=True)
+        start = 0
+        while len(records) - start >= batch_size or \
+                (final and start < len(records)):
+            part_file = os.path.join(
+                partition_dir, PART_FORMAT.format(num_files, output_format))
+            write_part(records.iloc[start:start + batch_size]
+                       .reset_index(drop=True), part_file, output_format)
+            num_files += 1
+            start += batch_size
+        batch = [records.iloc[start:]] if start < len(records) else []
+        batch_records = len(records) - min(start, len(records))
+
+    with h5py.File(h5_file, "r") as f:
+        aliases = h5.get_aliases(f)
+        if genes is None:
+            export_genes = [gene for gene in h5.get_genes(f)
+                            if gene not in aliases]
+        else:
+            export_genes = [aliases.get(gene, gene) for gene in genes]
+        if not export_genes:
+            if genes is None:
+                raise ValueError("No genes found in {}".format(h5_file))
+            return {SAMPLE: sample, NUM_GENES: 0, NUM_RECORDS: 0,
+                    NUM_FILES: 0}
+        if dataset is None:
+            if h5.is_packed(f):
+                dataset = h5.get_packed_dataset_name(f)
+            else:
+                dataset = h5.get_gene_dataset_name(f, export_genes[0])
+        lengths = None
+        for gene in export_genes:
+            if lengths is None or not h5.is_packed(f):
+                lengths = h5.get_gene_attribute(f, gene, dataset, h5.LENGTHS)
+            read_lengths, positions, counts = get_gene_records(
+                f, gene, dataset, lengths, min_read_length,
+                max_read_length, min_position, max_position)
+            if len(counts) == 0:
+                continue
+            batch.append(pd.DataFrame({GENE: gene,
+                                       READ_LENGTH: read_lengths,
+                                       POSITION: positions,
+                                       COUNT: counts}))
+            batch_records += len(counts)
+            num_records += len(counts)
+            if batch_records >= batch_size:
+                flush(False)
+        flush(True)
+    return {SAMPLE: sample,
+            NUM_GENES: len(export_genes),
+            NUM_RECORDS: num_records,
+            NUM_FILES: num_files}
+
+
+def export_h5(h5_files,
+              output_dir,
+              samples=None,
+              dataset=None,
+              genes=None,
+              min_read_length=None,
+              max_read_length=None,
+              min_position=None,
+              max_position=None,
+              output_format=PARQUET,
+              batch_size=BATCH_SIZE,
+              processes=1):
+    """
+    Export H5 files, one per sample, to partitioned part files, using
+    :py:func:`export_sample`. Samples are exported in parallel.
+
+    :param h5_files: H5 files, standard or packed
+    :type h5_files: list(str or unicode)
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param samples: Sample names, one per H5 file (if ``None`` then \
+    derived from the H5 file names using :py:func:`get_sample_name`)
+    :type samples: list(str or unicode)
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    each file)
+    :type dataset: str or unicode
+    :param genes: Gene names, or alternative gene names, to export \
+    (if ``None`` then all genes)
+    :type genes: list(str or unicode)
+    :param min_read_length: Minimum read length (if ``None`` then no \
+    minimum)
+    :type min_read_length: int
+    :param max_read_length: Maximum read length (if ``None`` then no \
+    maximum)
+    :type max_read_length: int
+    :param min_position: Minimum 1-indexed position (if ``None`` then \
+    no minimum)
+    :type min_position: int
+    :param max_position: Maximum 1-indexed position (if ``None`` then \
+    no maximum)
+    :type max_position: int
+    :param output_format: Output format, one of :py:const:`FORMATS`
+    :type output_format: str or unicode
+    :param batch_size: Maximum number of records per part file
+    :type batch_size: int
+    :param processes: Number of processes
+    :type processes: int
+    :return: Export summary, with columns :py:const:`SAMPLE`, \
+    :py:const:`NUM_GENES`, :py:const:`NUM_RECORDS`, \
+    :py:const:`NUM_FILES`
+    :rtype: pandas.core.frame.DataFrame
+    :raise FileNotFoundError: If an H5 file cannot be found
+    :raise ValueError: If ``output_format`` is invalid, ``pyarrow`` \
+    is required but not available, the number of samples does not \
+    match the number of H5 files, sample names are not unique, \
+    ``batch_size`` is less than 1 or an H5 file has no genes
+    :raise KeyError: If a gene is not in a file
+    """
+    check_format(output_format)
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    if samples is None:
+        samples = [get_sample_name(h5_file) for h5_file in h5_files]
+    if len(samples) != len(h5_files):
+        raise ValueError("Expected {} sample names but found {}".format(
+            len(h5_files), len(samples)))
+    if len(set(samples)) != len(samples):
+        raise ValueError("Sample names are not unique: {}".format(samples))
+    for h5_file in h5_files:
+        if not os.path.exists(h5_file) or (not os.path.isfile(h5_file)):
+            raise FileNotFoundError(h5_file)
+    os.makedirs(output_dir, exist_ok=True)
+    arguments = [(h5_file, sample, output_dir, dataset, genes,
+                  min_read_length, max_read_length, min_position,
+                  max_position, output_format, batch_size)
+                 for h5_file, sample in zip(h5_files, samples)]
+    if processes > 1 and len(arguments) > 1:
+        with multiprocessing.Pool(min(processes, len(arguments))) as pool:
+            results = pool.starmap(export_sample, arguments)
+    else:
+        results = [export_sample(*argument) for argument in arguments]
+    return pd.DataFrame(results,
+                        columns=[SAMPLE, NUM_GENES, NUM_RECORDS, NUM_FILES])
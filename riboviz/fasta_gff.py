@@ -1,6 +1,46 @@
 """
 General FASTA and GFF related constants and functions.
+
+GFF files are read by :py:func:`read_gff` into compact per-sequence
+arrays of feature coordinates, strands, phases and offsets into a
+buffer of attribute text. Features are created on demand, as
+``gffutils.feature.Feature`` objects, when iterated. This is fast
+and has a small memory footprint but supports iteration only.
+
+FASTA files are read by :py:class:`FastaSequences`, which
+memory-maps the FASTA file and uses its ``.fai`` index to locate
+sequences. Slices that lie within a single line of the FASTA file are
+returned as views of the mapped file, without copying.
+
+Results of per-feature processing can be cached in a feature cache
+file (see :py:class:`FeatureCache`), keyed by
+:py:func:`get_feature_hash`, a hash of a feature's GFF record and its
+raw bytes in the FASTA file. Tools use this to only reprocess
+features that have changed since a previous run.
+
+Alternatively, GFF files can be loaded into ``gffutils`` databases by
+:py:func:`create_gff_db`. If a cache directory is provided, either
+explicitly or via the :py:const:`GFF_CACHE_DIR_ENV` environment
+variable, then databases are cached in that directory, keyed by a
+hash of the GFF file's content and the database creation options, and
+reused by later invocations. Otherwise databases are created in
+memory.
 """
+import glob
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import sqlite3
+import tempfile
+from array import array
+from urllib.parse import unquote
+import numpy as np
+import gffutils
+from gffutils.exceptions import EmptyInputError
+from pyfaidx import Faidx
+from pyfaidx import FastaIndexingError
 
 CDS_FEATURE_FORMAT = "{}_CDS"
 """
@@ -11,3 +51,988 @@ START_CODON = "ATG"
 """ Canonical start codon. """
 STOP_CODONS = ["TAA", "TAG", "TGA"]
 """ Canonical stop codons. """
+
+GFF_DB_OPTIONS = {"keep_order": True,
+                  "merge_strategy": "merge",
+                  "sort_attribute_values": True}
+""" Default ``gffutils.create_db`` options. """
+GFF_CACHE_DIR_ENV = "RIBOVIZ_GFF_CACHE_DIR"
+""" Environment variable with GFF database cache directory. """
+GFF_CACHE_MAX_SIZE_ENV = "RIBOVIZ_GFF_CACHE_MAX_SIZE"
+""" Environment variable with GFF database cache maximum size (bytes). """
+GFF_CACHE_MAX_SIZE = 2 * 1024**3
+""" Default GFF database cache maximum size (bytes). """
+GFF_DB_EXT = "db"
+""" GFF database cache file extension. """
+GFF_DB_ATTEMPTS = 3
+"""
+Number of times to rebuild a cached GFF database deleted by another
+process before giving up.
+"""
+HASH_BLOCK_SIZE = 2**20
+""" Number of bytes to read at a time when hashing a file. """
+GFF_FASTA_DIRECTIVE = b"##FASTA"
+""" GFF directive marking the start of embedded FASTA sequences. """
+GFF_NUM_COLUMNS = 9
+""" Number of columns in a GFF feature line. """
+STRANDS = [".", "+", "-", "?"]
+""" GFF strands, indexed by strand code. """
+NO_PHASE = -1
+""" Phase code for features with no phase (``.``). """
+LINE_BREAKS = b"\r\n"
+""" Line break characters in FASTA files. """
+COMPLEMENT_BASES = (b"ACTGNactgnYRWSKMDVHBXyrwskmdvhbx",
+                    b"TGACNtgacnRYWSMKHBDVXrywsmkhbdvx")
+"""
+Bases and their complements, including IUPAC ambiguity codes, as
+supported by ``pyfaidx``.
+"""
+COMPLEMENT_TABLE = bytes.maketrans(*COMPLEMENT_BASES)
+""" Translation table from bases to their complements. """
+FEATURE_CACHE_VERSION = 2
+""" Feature cache file format version. """
+FEATURE_CACHE_VERSION_KEY = "version"
+""" Feature cache file key for format version. """
+FEATURE_CACHE_OPTIONS_KEY = "options"
+""" Feature cache file key for processing options. """
+FEATURE_CACHE_FASTA_KEY = "fasta"
+""" Feature cache file key for FASTA file size and modification time. """
+FEATURE_CACHE_LOCATIONS_KEY = "locations"
+""" Feature cache file key for map from feature keys to hashes. """
+FEATURE_CACHE_ENTRIES_KEY = "entries"
+""" Feature cache file key for entries. """
+
+
+def get_gff_db_key(gff, options):
+    """
+    Get cache key for a GFF database, a hash of the GFF file's
+    content, the database creation options and the ``gffutils``
+    version.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param options: ``gffutils.create_db`` options
+    :type options: dict
+    :return: Key
+    :rtype: str or unicode
+    """
+    digest = hashlib.sha256()
+    with open(gff, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    digest.update(gffutils.__version__.encode())
+    return digest.hexdigest()
+
+
+def evict_gff_db_cache(cache_dir, max_size, keep=None):
+    """
+    Delete the least recently used GFF databases from a cache
+    directory until the total size of the databases is at most
+    ``max_size`` bytes.
+
+    :param cache_dir: Cache directory
+    :type cache_dir: str or unicode
+    :param max_size: Maximum size (bytes)
+    :type max_size: int
+    :param keep: Database file not to delete
+    :type keep: str or unicode
+    """
+    db_files = []
+    for db_file in glob.glob(os.path.join(cache_dir, "*." + GFF_DB_EXT)):
+        try:
+            stat = os.stat(db_file)
+        except FileNotFoundError:
+            continue  # Deleted by another process.
+        db_files.append((stat.st_mtime, stat.st_size, db_file))
+    db_files.sort()
+    total_size = sum(size for _, size, _ in db_files)
+    for _, size, db_file in db_files:
+        if total_size <= max_size:
+            break
+        if keep is not None and os.path.abspath(db_file) == \
+                os.path.abspath(keep):
+            continue
+        try:
+            os.remove(db_file)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def create_gff_db(gff, cache_dir=None, max_cache_size=None, **options):
+    """
+    Create a ``gffutils`` database for a GFF file, or reuse a cached
+    database.
+
+    If ``cache_dir`` is ``None`` then the value of the
+    :py:const:`GFF_CACHE_DIR_ENV` environment variable, if defined,
+    is used. If there is no cache directory then the database is
+    created in memory.
+
+    Cached databases are named ``<key>.db`` where ``<key>`` is from
+    :py:func:`get_gff_db_key`. New databases are written to a
+    temporary file and then renamed, so concurrent invocations never
+    see partially-written databases. After a database is created,
+    least recently used databases are deleted so that the cache is at
+    most ``max_cache_size`` bytes. If a cached database is deleted by
+    another process before it is opened then it is rebuilt.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param cache_dir: Cache directory
+    :type cache_dir: str or unicode
+    :param max_cache_size: Maximum cache size in bytes (if ``None`` \
+    then the value of the :py:const:`GFF_CACHE_MAX_SIZE_ENV` \
+    environment variable, if defined, or \
+    :py:const:`GFF_CACHE_MAX_SIZE` is used)
+    :type max_cache_size: int
+    :param options: ``gffutils.create_db`` options (if none then \
+    :py:const:`GFF_DB_OPTIONS` are used)
+    :type options: dict
+    :return: Database
+    :rtype: gffutils.interface.FeatureDB
+    :raises FileNotFoundError: If the GFF file cannot be found, or \
+    the cached database is deleted by other processes \
+    :py:const:`GFF_DB_ATTEMPTS` times
+    :raises ValueError: If the GFF file is empty
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    if not os.path.exists(gff) or (not os.path.isfile(gff)):
+        raise FileNotFoundError(gff)
+    if not options:
+        options = dict(GFF_DB_OPTIONS)
+    if cache_dir is None:
+        cache_dir = os.environ.get(GFF_CACHE_DIR_ENV)
+    if max_cache_size is None:
+        max_cache_size = int(os.environ.get(GFF_CACHE_MAX_SIZE_ENV,
+                                            GFF_CACHE_MAX_SIZE))
+    try:
+        if not cache_dir:
+            return gffutils.create_db(gff, dbfn=":memory:", **options)
+        os.makedirs(cache_dir, exist_ok=True)
+        db_file = os.path.join(cache_dir, "{}.{}".format(
+            get_gff_db_key(gff, options), GFF_DB_EXT))
+        for _ in range(GFF_DB_ATTEMPTS):
+            try:
+                # Record use for least recently used eviction.
+                os.utime(db_file)
+            except FileNotFoundError:
+                build_gff_db(gff, db_file, options)
+                evict_gff_db_cache(cache_dir, max_cache_size, db_file)
+            try:
+                return open_gff_db(db_file, options)
+            except FileNotFoundError:
+                # Evicted by another process, so rebuild.
+                continue
+    except (ValueError, EmptyInputError) as e:
+        # Wrap and rethrow exception so file name is included
+        raise ValueError("{} ({})".format(e, gff)) from e
+    raise FileNotFoundError(
+        "{} was evicted from the cache {} times ({})".format(
+            db_file, GFF_DB_ATTEMPTS, gff))
+
+
+def build_gff_db(gff, db_file, options):
+    """
+    Create a ``gffutils`` database for a GFF file. The database is
+    written to a temporary file and then renamed, so concurrent
+    invocations never see a partially-written database.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param db_file: Database file
+    :type db_file: str or unicode
+    :param options: ``gffutils.create_db`` options
+    :type options: dict
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    tmp_fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(db_file),
+                                        suffix=".tmp")
+    os.close(tmp_fd)
+    try:
+        gffutils.create_db(gff, dbfn=tmp_file, force=True, **options)
+        os.replace(tmp_file, db_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def open_gff_db(db_file, options):
+    """
+    Open a ``gffutils`` database.
+
+    The database file is opened without being created, so a database
+    deleted by another process is never replaced by an empty file.
+    Once opened, the database remains readable even if it is then
+    deleted.
+
+    :param db_file: Database file
+    :type db_file: str or unicode
+    :param options: ``gffutils.create_db`` options
+    :type options: dict
+    :return: Database
+    :rtype: gffutils.interface.FeatureDB
+    :raises FileNotFoundError: If the database file cannot be found
+    """
+    uri = "{}?mode=rw".format(pathlib.Path(os.path.abspath(db_file))
+                              .as_uri())
+    try:
+        connection = sqlite3.connect(uri, uri=True)
+    except sqlite3.OperationalError as e:
+        if os.path.exists(db_file):
+            raise
+        raise FileNotFoundError(db_file) from e
+    return gffutils.FeatureDB(
+        connection,
+        keep_order=options.get("keep_order", False),
+        sort_attribute_values=options.get("sort_attribute_values", False))
+
+
+class GffFeatures:
+    """
+    GFF features held in per-sequence arrays, created by
+    :py:func:`read_gff`.
+
+    This supports the subset of the ``gffutils.interface.FeatureDB``
+    interface used by riboviz: :py:meth:`all_features`,
+    :py:meth:`features_of_type` and :py:meth:`count_features_of_type`.
+    Features are iterated in file order.
+
+    As for ``gffutils``, features with no ``ID`` attribute are given
+    IDs ``<featuretype>_<n>``, where ``<n>`` counts such features of
+    the same type, and repeated IDs are given suffixes ``_1``, ``_2``
+    etc.
+    """
+
+    def __init__(self, sequences, featuretypes, sources, scores):
+        """
+        :param sequences: Map from sequence IDs to maps from column \
+        names (``order``, ``start``, ``end``, ``strand``, ``phase``, \
+        ``featuretype``, ``source``, ``score``, ``offsets``) to \
+        arrays and ``attributes`` to attribute text
+        :type sequences: dict(str or unicode => dict(str or unicode \
+        => numpy.ndarray or bytes))
+        :param featuretypes: Feature types, indexed by feature type code
+        :type featuretypes: list(str or unicode)
+        :param sources: Sources, indexed by source code
+        :type sources: list(str or unicode)
+        :param scores: Scores, indexed by score code
+        :type scores: list(str or unicode)
+        """
+        self.sequences = sequences
+        self.featuretypes = featuretypes
+        self.sources = sources
+        self.scores = scores
+
+    def __len__(self):
+        return sum(len(columns["order"])
+                   for columns in self.sequences.values())
+
+    def _get_rows(self, featuretype=None):
+        """
+        Get sequence IDs and row indices of features, in file order.
+
+        :param featuretype: Feature type (if ``None`` then all \
+        features)
+        :type featuretype: str or unicode
+        :return: Sequence IDs and row indices
+        :rtype: list(tuple(str or unicode, int))
+        """
+        if featuretype is None:
+            code = None
+        elif featuretype in self.featuretypes:
+            code = self.featuretypes.index(featuretype)
+        else:
+            return []
+        orders = []
+        rows = []
+        seqids = []
+        for seqid, columns in self.sequences.items():
+            if code is None:
+                row = np.arange(len(columns["order"]))
+            else:
+                row = np.flatnonzero(columns["featuretype"] == code)
+            orders.append(columns["order"][row])
+            rows.append(row)
+            seqids.extend([seqid] * len(row))
+        if not rows:
+            return []
+        order = np.argsort(np.concatenate(orders), kind="stable")
+        rows = np.concatenate(rows)[order]
+        return [(seqids[index], int(row))
+                for index, row in zip(order, rows)]
+
+    def _get_feature(self, seqid, row, feature_ids):
+        """
+        Create a feature.
+
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :param row: Row index
+        :type row: int
+        :param feature_ids: Number of times each ID, or feature type \
+        for features with no ID, has been seen so far, updated by \
+        this function
+        :type feature_ids: dict(str or unicode => int)
+        :return: Feature
+        :rtype: gffutils.feature.Feature
+        """
+        columns = self.sequences[seqid]
+        featuretype = self.featuretypes[columns["featuretype"][row]]
+        attributes = get_gff_attributes(
+            columns["attributes"][columns["offsets"][row]:
+                                  columns["offsets"][row + 1]])
+        if "ID" in attributes and attributes["ID"]:
+            feature_id = attributes["ID"][0]
+            count = feature_ids.get(feature_id, 0)
+            if count > 0:
+                feature_id = "{}_{}".format(feature_id, count)
+            feature_ids[attributes["ID"][0]] = count + 1
+        else:
+            count = feature_ids.get(featuretype, 0) + 1
+            feature_id = "{}_{}".format(featuretype, count)
+            feature_ids[featuretype] = count
+        phase = int(columns["phase"][row])
+        return gffutils.Feature(
+            seqid=seqid,
+            source=self.sources[columns["source"][row]],
+            featuretype=featuretype,
+            start=int(columns["start"][row]),
+            end=int(columns["end"][row]),
+            score=self.scores[columns["score"][row]],
+            strand=STRANDS[columns["strand"][row]],
+            frame="." if phase == NO_PHASE else str(phase),
+            attributes=attributes,
+            id=feature_id)
+
+    def all_features(self):
+        """
+        Iterate over all features.
+
+        :return: Features
+        :rtype: iterator(gffutils.feature.Feature)
+        """
+        feature_ids = {}
+        for seqid, row in self._get_rows():
+            yield self._get_feature(seqid, row, feature_ids)
+
+    def features_of_type(self, featuretype):
+        """
+        Iterate over features of a given type.
+
+        :param featuretype: Feature type
+        :type featuretype: str or unicode
+        :return: Features
+        :rtype: iterator(gffutils.feature.Feature)
+        """
+        feature_ids = {}
+        for seqid, row in self._get_rows(featuretype):
+            yield self._get_feature(seqid, row, feature_ids)
+
+    def count_features_of_type(self, featuretype=None):
+        """
+        Count features of a given type.
+
+        :param featuretype: Feature type (if ``None`` then all \
+        features)
+        :type featuretype: str or unicode
+        :return: Number of features
+        :rtype: int
+        """
+        if featuretype is None:
+            return len(self)
+        if featuretype not in self.featuretypes:
+            return 0
+        code = self.featuretypes.index(featuretype)
+        return int(sum(np.count_nonzero(columns["featuretype"] == code)
+                       for columns in self.sequences.values()))
+
+
+def get_gff_attributes(attributes):
+    """
+    Parse GFF attribute text, ``<key>=<value>,<value>;...``, into a
+    dictionary. Values are URL-decoded.
+
+    :param attributes: Attribute text
+    :type attributes: bytes
+    :return: Map from keys to values
+    :rtype: dict(str or unicode => list(str or unicode))
+    """
+    parsed = {}
+    attributes = attributes.decode()
+    is_encoded = "%" in attributes
+    for attribute in attributes.split(";"):
+        if not attribute.strip() or attribute == ".":
+            continue
+        key, _, values = attribute.partition("=")
+        key = key.strip()
+        values = values.split(",")
+        if is_encoded:
+            key = unquote(key)
+            values = [unquote(value) for value in values]
+        parsed[key] = values
+    return parsed
+
+
+def _get_code(value, values):
+    """
+    Get code for a value, adding the value to the list of values if
+    it has not been seen before.
+
+    :param value: Value
+    :type value: bytes
+    :param values: Map from values to codes, updated by this function
+    :type values: dict(bytes => int)
+    :return: Code
+    :rtype: int
+    """
+    if value not in values:
+        values[value] = len(values)
+    return values[value]
+
+
+def read_gff(gff, featuretypes=None):
+    """
+    Read GFF file into a :py:class:`GffFeatures`.
+
+    The file is read one line at a time, and each feature's
+    coordinates, strand, phase, type, source and score codes are
+    appended to compact per-sequence arrays and its attribute text to
+    a per-sequence buffer. Comment and directive lines are skipped and
+    reading stops at a :py:const:`GFF_FASTA_DIRECTIVE`. Lines with
+    no attributes column are accepted.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param featuretypes: Feature types to read (if ``None`` then all)
+    :type featuretypes: list(str or unicode)
+    :return: Features
+    :rtype: GffFeatures
+    :raises FileNotFoundError: If the GFF file cannot be found
+    :raises ValueError: If the GFF file is empty or has a badly \
+    formatted line
+    """
+    if not os.path.exists(gff) or (not os.path.isfile(gff)):
+        raise FileNotFoundError(gff)
+    if featuretypes is not None:
+        featuretypes = set(featuretype.encode()
+                           for featuretype in featuretypes)
+    strands = {strand.encode(): code for code, strand in enumerate(STRANDS)}
+    type_codes = {}
+    source_codes = {}
+    score_codes = {}
+    sequences = {}
+    num_features = 0
+    with open(gff, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            if line.startswith(GFF_FASTA_DIRECTIVE):
+                break
+            line = line.rstrip(b"\r\n")
+            if not line.strip() or line.startswith(b"#"):
+                continue
+            fields = line.split(b"\t")
+            if len(fields) == GFF_NUM_COLUMNS - 1:
+                fields.append(b"")  # No attributes.
+            if len(fields) != GFF_NUM_COLUMNS:
+                raise ValueError(
+                    "Expected {} columns but found {} at line {} ({})".format(
+                        GFF_NUM_COLUMNS, len(fields), line_number, gff))
+            seqid, source, featuretype, start, end, score, strand, \
+                phase, attributes = fields
+            num_features += 1
+            if featuretypes is not None and featuretype not in featuretypes:
+                continue
+            if seqid not in sequences:
+                sequences[seqid] = {
+                    "order": array("q"),
+                    "start": array("q"),
+                    "end": array("q"),
+                    "strand": array("b"),
+                    "phase": array("b"),
+                    "featuretype": array("H"),
+                    "source": array("H"),
+                    "score": array("I"),
+                    "offsets": array("q", [0]),
+                    "attributes": bytearray()
+                }
+            columns = sequences[seqid]
+            try:
+                columns["start"].append(int(start))
+                columns["end"].append(int(end))
+                columns["strand"].append(strands[strand])
+                columns["phase"].append(
+                    NO_PHASE if phase == b"." else int(phase))
+            except (ValueError, KeyError) as e:
+                raise ValueError("Invalid feature at line {} ({})".format(
+                    line_number, gff)) from e
+            columns["order"].append(num_features)
+            columns["featuretype"].append(_get_code(featuretype, type_codes))
+            columns["source"].append(_get_code(source, source_codes))
+            columns["score"].append(_get_code(score, score_codes))
+            columns["attributes"] += attributes
+            columns["offsets"].append(len(columns["attributes"]))
+    if num_features == 0:
+        raise ValueError("No features found ({})".format(gff))
+    sequences = {
+        seqid.decode(): {
+            name: bytes(values) if name == "attributes" else
+            np.frombuffer(values, dtype=values.typecode)
+            for name, values in columns.items()
+        } for seqid, columns in sequences.items()}
+    return GffFeatures(sequences,
+                       [value.decode() for value in type_codes],
+                       [value.decode() for value in source_codes],
+                       [value.decode() for value in score_codes])
+
+
+def load_gff(gff, use_gffutils=False, cache_dir=None, featuretypes=None):
+    """
+    Load GFF file, either into a :py:class:`GffFeatures` using
+    :py:func:`read_gff` or into a ``gffutils`` database using
+    :py:func:`create_gff_db`.
+
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database?
+    :type use_gffutils: bool
+    :param cache_dir: GFF database cache directory, used only if \
+    ``use_gffutils`` is ``True``
+    :type cache_dir: str or unicode
+    :param featuretypes: Feature types to read (if ``None`` then \
+    all), used only if ``use_gffutils`` is ``False``
+    :type featuretypes: list(str or unicode)
+    :return: Features
+    :rtype: GffFeatures or gffutils.interface.FeatureDB
+    :raises FileNotFoundError: If the GFF file cannot be found
+    :raises ValueError: If the GFF file is empty or badly formatted
+    :raises Exception: Exceptions specific to gffutils.create_db \
+    (these are undocumented in the gffutils documentation)
+    """
+    if use_gffutils:
+        return create_gff_db(gff, cache_dir)
+    return read_gff(gff, featuretypes)
+
+
+def get_fasta_index(fasta):
+    """
+    Get the index of a FASTA file. The index is read from the FASTA
+    file's ``.fai`` index, which is created, using ``pyfaidx``, if it
+    does not exist or is older than the FASTA file.
+
+    :param fasta: FASTA file
+    :type fasta: str or unicode
+    :return: Map from sequence IDs to tuples of sequence length, \
+    offset of sequence in file, bases per line and bytes per line
+    :rtype: dict(str or unicode => tuple(int, int, int, int))
+    :raises FileNotFoundError: If the FASTA file cannot be found
+    :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
+    formatted sequences
+    """
+    if not os.path.exists(fasta) or (not os.path.isfile(fasta)):
+        raise FileNotFoundError(fasta)
+    if os.path.getsize(fasta) == 0:
+        return {}
+    fasta_index = Faidx(str(fasta), duplicate_action="first")
+    index = {seq_id: (record.rlen, record.offset, record.lenc, record.lenb)
+             for seq_id, record in fasta_index.index.items()}
+    fasta_index.close()
+    return index
+
+
+class FastaSequences:
+    """
+    Sequences in a FASTA file, which is memory-mapped and indexed
+    using its ``.fai`` index (see :py:func:`get_fasta_index`).
+
+    Sequences are retrieved using :py:meth:`fetch` or
+    :py:meth:`get_feature_sequence`. Forward-strand slices that lie
+    within a single line of the FASTA file are returned as
+    ``memoryview`` objects which are views of the mapped file. Other
+    slices are copied into ``bytes`` with line breaks removed and,
+    for reverse-strand slices, reverse-complemented. As for
+    ``pyfaidx``, slices are truncated at the end of a sequence and
+    the case of bases is preserved.
+
+    The mapping is released by :py:meth:`close` once any views are
+    no longer referenced. :py:class:`FastaSequences` can be used as a
+    context manager.
+    """
+
+    def __init__(self, fasta, index=None):
+        """
+        :param fasta: FASTA file
+        :type fasta: str or unicode
+        :param index: FASTA file index, from \
+        :py:func:`get_fasta_index` (if ``None`` then the index is \
+        read using :py:func:`get_fasta_index`)
+        :type index: dict(str or unicode => tuple(int, int, int, int))
+        :raises FileNotFoundError: If the FASTA file cannot be found
+        :raises pyfaidx.FastaIndexingError: If the FASTA file is empty \
+        or has badly formatted sequences
+        """
+        self.filename = fasta
+        if index is None:
+            index = get_fasta_index(fasta)
+        self.index = index
+        if not self.index:
+            raise FastaIndexingError(
+                "The FASTA file {} does not contain a valid sequence. "
+                "Check that sequence definition lines start with "
+                "'>'.".format(fasta))
+        with open(fasta, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def __contains__(self, seqid):
+        return seqid in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Release the memory-mapped FASTA file.
+        """
+        self._view = None
+        self._mmap = None
+
+    def _get_record(self, seqid):
+        """
+        Get index record for a sequence.
+
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :return: Sequence length, offset of sequence in file, bases \
+        per line and bytes per line
+        :rtype: tuple(int, int, int, int)
+        :raises KeyError: If the sequence is not in the FASTA file
+        """
+        if seqid not in self.index:
+            raise KeyError("{} not in {}.".format(seqid, self.filename))
+        return self.index[seqid]
+
+    def _get_byte_range(self, seqid, start, end):
+        """
+        Get the range of bytes in the FASTA file, and the number of
+        bases, of a slice of a sequence. ``start`` and ``end`` are
+        0-based and end-exclusive and are clipped to the sequence.
+
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :param start: Start position
+        :type start: int
+        :param end: End position
+        :type end: int
+        :return: Start byte, end byte and number of bases
+        :rtype: tuple(int, int, int)
+        :raises KeyError: If the sequence is not in the FASTA file
+        """
+        length, offset, line_bases, line_bytes = self._get_record(seqid)
+        start = min(max(start, 0), length)
+        end = min(max(end, start), length)
+        if start == end:
+            return offset, offset, 0
+        start_byte = offset + (start // line_bases) * line_bytes + \
+            start % line_bases
+        end_byte = offset + ((end - 1) // line_bases) * line_bytes + \
+            (end - 1) % line_bases + 1
+        return start_byte, end_byte, end - start
+
+    def get_raw(self, seqid, start, end):
+        """
+        Get the raw bytes, including any line breaks, of a slice of a
+        sequence. ``start`` and ``end`` are 0-based and end-exclusive
+        and are clipped to the sequence.
+
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :param start: Start position
+        :type start: int
+        :param end: End position
+        :type end: int
+        :return: Bytes
+        :rtype: memoryview
+        :raises KeyError: If the sequence is not in the FASTA file
+        """
+        start_byte, end_byte, _ = self._get_byte_range(seqid, start, end)
+        return self._view[start_byte:end_byte]
+
+    def fetch(self, seqid, start, end, strand="+"):
+        """
+        Get a slice of a sequence. ``start`` and ``end`` are 1-based
+        and inclusive, as for GFF features. If ``strand`` is ``-``
+        then the slice is reverse-complemented.
+
+        :param seqid: Sequence ID
+        :type seqid: str or unicode
+        :param start: Start position
+        :type start: int
+        :param end: End position
+        :type end: int
+        :param strand: Strand
+        :type strand: str or unicode
+        :return: Sequence
+        :rtype: memoryview or bytes
+        :raises KeyError: If the sequence is not in the FASTA file
+        :raises ValueError: If a reverse-strand slice has characters \
+        that are not bases
+        """
+        start_byte, end_byte, num_bases = self._get_byte_range(
+            seqid, start - 1, end)
+        sequence = self._view[start_byte:end_byte]
+        if end_byte - start_byte != num_bases:
+            sequence = sequence.tobytes().translate(None, LINE_BREAKS)
+        if strand != "-":
+            return sequence
+        sequence = bytes(sequence)
+        invalid = sequence.translate(None, COMPLEMENT_BASES[0])
+        if invalid:
+            position = next(index for index, base in enumerate(sequence)
+                            if base in invalid)
+            raise ValueError(
+                "Sequence contains non-DNA character '{}' at position "
+                "{}".format(chr(sequence[position]), position + 1))
+        return sequence.translate(COMPLEMENT_TABLE)[::-1]
+
+    def get_feature_sequence(self, feature, use_strand=True):
+        """
+        Get the sequence of a feature. If ``use_strand`` is ``True``
+        and the feature is on the ``-`` strand then the sequence is
+        reverse-complemented.
+
+        :param feature: Feature
+        :type feature: gffutils.feature.Feature
+        :param use_strand: Reverse-complement ``-`` strand features?
+        :type use_strand: bool
+        :return: Sequence
+        :rtype: memoryview or bytes
+        :raises KeyError: If the sequence is not in the FASTA file
+        :raises ValueError: If a reverse-strand sequence has \
+        characters that are not bases
+        """
+        strand = feature.strand if use_strand else "+"
+        return self.fetch(feature.seqid, feature.start, feature.end,
+                          strand)
+
+
+def get_feature_key(feature):
+    """
+    Get a key for a feature's GFF record, from its sequence ID,
+    source, type, coordinates, score, strand, frame and attributes.
+    This is cheaper to compute than ``str(feature)``.
+
+    :param feature: Feature
+    :type feature: gffutils.feature.Feature
+    :return: Key
+    :rtype: str or unicode
+    """
+    return repr((feature.seqid, feature.source, feature.featuretype,
+                 feature.start, feature.end, feature.score,
+                 feature.strand, feature.frame,
+                 sorted(feature.attributes.items())))
+
+
+def get_feature_hash(feature, fasta_sequences, options=None):
+    """
+    Get hash of a feature's GFF record (see
+    :py:func:`get_feature_key`) and the raw bytes, including any line
+    breaks, of the feature's sequence in a FASTA file, together with
+    options that affect how the feature is processed. If the
+    feature's sequence is not in the FASTA file then the hash records
+    this.
+
+    :param feature: Feature
+    :type feature: gffutils.feature.Feature
+    :param fasta_sequences: FASTA sequences
+    :type fasta_sequences: FastaSequences
+    :param options: Options that affect how the feature is processed
+    :type options: dict
+    :return: Hash
+    :rtype: str or unicode
+    """
+    digest = hashlib.sha256()
+    digest.update(get_feature_key(feature).encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    if feature.seqid not in fasta_sequences:
+        digest.update(b"\0")
+        return digest.hexdigest()
+    digest.update(fasta_sequences.get_raw(feature.seqid,
+                                          feature.start - 1,
+                                          feature.end))
+    return digest.hexdigest()
+
+
+def load_feature_cache(cache_file):
+    """
+    Load feature cache file, a JSON file with the cache format
+    version, the options used to process the features, the size and
+    modification time of the FASTA file, a map from feature keys (see
+    :py:func:`get_feature_key`) to feature hashes (see
+    :py:func:`get_feature_hash`) and a map from feature hashes to
+    results of processing the features. If the file does not exist or
+    has a different version to :py:const:`FEATURE_CACHE_VERSION` then
+    an empty cache is returned.
+
+    :param cache_file: Cache file
+    :type cache_file: str or unicode
+    :return: Cache
+    :rtype: dict
+    :raises ValueError: If the file is not a valid JSON file
+    """
+    if not os.path.exists(cache_file):
+        return {}
+    with open(cache_file) as f:
+        try:
+            cache = json.load(f)
+        except ValueError as e:
+            # Wrap and rethrow exception so file name is included
+            raise ValueError("{} ({})".format(e, cache_file)) from e
+    if cache.get(FEATURE_CACHE_VERSION_KEY) != FEATURE_CACHE_VERSION:
+        return {}
+    return cache
+
+
+def save_feature_cache(cache_file, cache):
+    """
+    Save feature cache file (see :py:func:`load_feature_cache`). The
+    cache is written to a temporary file and then renamed, so an
+    interrupted run never leaves a partially-written cache.
+
+    :param cache_file: Cache file
+    :type cache_file: str or unicode
+    :param cache: Cache, without the format version
+    :type cache: dict
+    """
+    cache_dir = os.path.dirname(os.path.abspath(cache_file))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(tmp_fd, "w") as f:
+            json.dump({FEATURE_CACHE_VERSION_KEY: FEATURE_CACHE_VERSION,
+                       **cache}, f)
+        os.replace(tmp_file, cache_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+class FeatureCache:
+    """
+    Cache of results of processing features, held in a feature cache
+    file (see :py:func:`load_feature_cache`).
+
+    Results are keyed by feature hashes (see
+    :py:func:`get_feature_hash`), so a feature is only reprocessed if
+    its GFF record or its sequence has changed. If the FASTA file's
+    size and modification time are the same as when the cache was
+    saved then a feature's hash is looked up using its GFF record
+    (see :py:func:`get_feature_key`), without reading or hashing its
+    sequence. As for ``git``'s index, a FASTA file modified no earlier
+    than the cache was saved is not trusted to be unchanged, since a
+    later change within the resolution of the file system's clock
+    would not change its modification time.
+
+    If the options differ from those with which the cache was saved
+    then the cache is ignored.
+
+    Results must be JSON-serialisable and are returned as loaded from
+    JSON (for example, tuples are returned as lists).
+    """
+
+    def __init__(self, cache_file, fasta, options=None):
+        """
+        Load feature cache file.
+
+        :param cache_file: Cache file
+        :type cache_file: str or unicode
+        :param fasta: FASTA file
+        :type fasta: str or unicode
+        :param options: Options that affect how features are processed
+        :type options: dict
+        :raises ValueError: If the cache file is not a valid JSON file
+        """
+        self.cache_file = cache_file
+        self.options = options
+        fasta_stat = os.stat(fasta)
+        self.fasta_stat = [fasta_stat.st_size, fasta_stat.st_mtime_ns]
+        cache = load_feature_cache(cache_file)
+        if cache.get(FEATURE_CACHE_OPTIONS_KEY) != \
+                json.loads(json.dumps(options)):
+            cache = {}
+        self.entries = cache.get(FEATURE_CACHE_ENTRIES_KEY, {})
+        self.locations = {}
+        if cache.get(FEATURE_CACHE_FASTA_KEY) == self.fasta_stat and \
+                fasta_stat.st_mtime_ns < os.stat(cache_file).st_mtime_ns:
+            self.locations = cache.get(FEATURE_CACHE_LOCATIONS_KEY, {})
+        self.new_entries = {}
+        self.new_locations = {}
+
+    def get_feature_hash(self, feature, fasta_sequences):
+        """
+        Get hash of a feature (see
+        :py:func:`riboviz.fasta_gff.get_feature_hash`), looking it up
+        by the feature's GFF record if the FASTA file has not changed
+        since the cache was saved.
+
+        :param feature: Feature
+        :type feature: gffutils.feature.Feature
+        :param fasta_sequences: FASTA sequences
+        :type fasta_sequences: FastaSequences
+        :return: Hash
+        :rtype: str or unicode
+        """
+        feature_hash = self.locations.get(get_feature_key(feature))
+        if feature_hash is None or feature_hash not in self.entries:
+            feature_hash = get_feature_hash(feature, fasta_sequences,
+                                            self.options)
+        return feature_hash
+
+    def get(self, feature_hash):
+        """
+        Get cached result for a feature.
+
+        :param feature_hash: Hash
+        :type feature_hash: str or unicode
+        :return: Result or ``None`` if none
+        :rtype: object
+        """
+        return self.entries.get(feature_hash)
+
+    def add(self, feature, feature_hash, result):
+        """
+        Add result for a feature, to be saved by :py:meth:`save`.
+
+        :param feature: Feature
+        :type feature: gffutils.feature.Feature
+        :param feature_hash: Hash
+        :type feature_hash: str or unicode
+        :param result: Result
+        :type result: object
+        """
+        self.new_locations[get_feature_key(feature)] = feature_hash
+        self.new_entries[feature_hash] = result
+
+    def save(self):
+        """
+        Save the results added by :py:meth:`add`, replacing the
+        cache file. The cache file is only written if these differ
+        from the cached results, so features no longer present are
+        removed from the cache.
+        """
+        if self.new_locations == self.locations and \
+                self.new_entries == self.entries:
+            return
+        save_feature_cache(self.cache_file, {
+            FEATURE_CACHE_OPTIONS_KEY: self.options,
+            FEATURE_CACHE_FASTA_KEY: self.fasta_stat,
+            FEATURE_CACHE_LOCATIONS_KEY: self.new_locations,
+            FEATURE_CACHE_ENTRIES_KEY: self.new_entries})
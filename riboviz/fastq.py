@@ -3,7 +3,6 @@ FASTQ-related constants and functions.
 """
 import gzip
 import os.path
-from Bio import SeqIO
 from riboviz import utils
 
 FASTQ_EXT = "fastq"
@@ -74,6 +73,7 @@ def count_sequences(file_name):
     :return: number of sequences
     :rtype: int
     """
+    from Bio import SeqIO
     num_sequences = 0
     if is_fastq_gz(file_name):
         open_file = gzip.open
@@ -101,6 +101,7 @@ def equal_fastq(file1, file2):
     :raise AssertionError: If the files differ in their contents
     :raise Exception: If problems arise when loading the files
     """
+    from Bio import SeqIO
     seqs1 = {}
     for seq1 in SeqIO.parse(file1, "fastq"):
         seqs1[seq1.name] = seq1
@@ -1,14 +1,23 @@
 """
 Functions use CDS entries within a GFF file to get the codons from
 each coding sequence in a complementary FASTA file.
+
+Codons can also be saved in a codon index (see :py:class:`CodonIndex`),
+a compressed NumPy ``.npz`` file which supports lookup of the codons
+of a gene, and the genes and positions of a codon, without reading
+or filtering a codon positions file.
 """
-import csv
+import gzip
 import os
 import warnings
-import gffutils
-from pyfaidx import Fasta
+from itertools import product
+from itertools import repeat
+import numpy as np
 from riboviz import provenance
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
+from riboviz.fasta_gff import FastaSequences
+from riboviz.fasta_gff import FeatureCache
+from riboviz.fasta_gff import load_gff
 
 
 GENE = "Gene"
@@ -20,20 +29,86 @@ Codon positions column name (codon position in coding sequence,
 """
 CODON = "Codon"
 """ Codon positions column name (codon). """
+CODON_LENGTH = 3
+""" Codon length. """
+GZ_EXTS = ["gz", "gzip"]
+""" Extensions of codon positions files to be compressed. """
+CODONS = ["".join(bases) for bases in product("ACGT", repeat=CODON_LENGTH)]
+"""
+Codons with canonical bases, in the order of their codes in a codon
+index. Other codons in a codon index are given codes from 64 upwards.
+"""
+MAX_CODON_CODES = 256
+""" Maximum number of distinct codons in a codon index. """
+CODON_INDEX_GENES = "genes"
+""" Codon index array name (gene names). """
+CODON_INDEX_GENE_OFFSETS = "gene_offsets"
+""" Codon index array name (offsets of each gene's codon codes). """
+CODON_INDEX_CODONS = "codons"
+""" Codon index array name (codons, indexed by codon code). """
+CODON_INDEX_CODES = "codes"
+""" Codon index array name (codon codes of all genes). """
+CODON_INDEX_CODON_OFFSETS = "codon_offsets"
+"""
+Codon index array name (offsets of each codon's genes and
+positions).
+"""
+CODON_INDEX_CODON_GENES = "codon_genes"
+""" Codon index array name (gene indices, grouped by codon). """
+CODON_INDEX_CODON_POSITIONS = "codon_positions"
+"""
+Codon index array name (codon positions, 1-indexed, grouped by
+codon).
+"""
+CODON_INDEX_ARRAYS = [CODON_INDEX_GENES, CODON_INDEX_GENE_OFFSETS,
+                      CODON_INDEX_CODONS, CODON_INDEX_CODES,
+                      CODON_INDEX_CODON_OFFSETS, CODON_INDEX_CODON_GENES,
+                      CODON_INDEX_CODON_POSITIONS]
+""" Codon index array names. """
+FEATURE_CACHE_OPTIONS = {"result": "cds_codons_warning"}
+"""
+Options for feature hashes (see
+:py:func:`riboviz.fasta_gff.get_feature_hash`), distinguishing
+cached CDS codons from other cached results.
+"""
+
+
+def sequence_to_codon_array(sequence):
+    """
+    Given a sequence, split into an array of codons. The sequence's
+    bytes are reshaped into a ``(n, 3)`` array which is then viewed as
+    an array of ``n`` 3-byte strings, without copying. Any trailing
+    incomplete codon is ignored.
+
+    :param sequence: Sequence
+    :type sequence: str or unicode or bytes or memoryview
+    :return: Codons
+    :rtype: numpy.ndarray
+    """
+    if isinstance(sequence, str):
+        sequence = sequence.encode("ascii")
+    bases = np.frombuffer(sequence, dtype=np.uint8)
+    num_codons = len(bases) // CODON_LENGTH
+    return bases[:num_codons * CODON_LENGTH].reshape(
+        num_codons, CODON_LENGTH).view("S{}".format(CODON_LENGTH)).ravel()
 
 
 def sequence_to_codons(sequence):
     """
-    Given a sequence, split into a list of codons.
+    Given a sequence, split into a list of codons. Any trailing
+    incomplete codon is included as the last element.
+
+    See :py:func:`sequence_to_codon_array`.
 
     :param sequence: Sequence
     :type sequence: str or unicode
     :return: list of codons
     :rtype: list(str or unicode)
     """
-    codons = [sequence[i:i+3] for i in range(0, len(sequence), 3)]
-    # Validate split was done correctly.
-    assert "".join(codons) == sequence
+    codons = sequence_to_codon_array(sequence).astype(str).tolist()
+    remainder = len(sequence) % CODON_LENGTH
+    if remainder:
+        codons.append(sequence[-remainder:])
     return codons
 
 
@@ -80,20 +155,19 @@ def get_cds_from_fasta(feature, fasta):
     :param feature: GFF feature for the CDS
     :type feature: gffutils.feature.Feature
     :param fasta: FASTA genes
-    :type fasta: pyfaidx.Fasta
+    :type fasta: riboviz.fasta_gff.FastaSequences
     :return: sequence
-    :rtype: str or unicode
+    :rtype: memoryview or bytes
     :raises AssertionError: If sequence has length not divisible by 3
-    :raises Exception: Exceptions specific to \
-    gffutils.Feature.sequence (these are undocumented in the \
-    gffutils documentation - a typical exception that can be thrown \
-    is ``KeyError`` which can arise if the GFF file contains \
-    information on a sequence that is not in the FASTA file).
+    :raises KeyError: If the GFF file contains information on a \
+    sequence that is not in the FASTA file
+    :raises ValueError: If a reverse-strand sequence has characters \
+    that are not bases
     """
-    sequence = feature.sequence(fasta)
+    sequence = fasta.get_feature_sequence(feature)
     assert (len(sequence) % 3) == 0, \
         "Feature {} ({}) has length not divisible by 3".format(
-            feature.seqid, sequence)
+            feature.seqid, bytes(sequence).decode())
     return sequence
 
 
@@ -101,13 +175,19 @@ def get_cds_codons_from_fasta(fasta,
                               gff,
                               exclude_stop_codons=False,
                               cds_feature_format=CDS_FEATURE_FORMAT,
-                              use_feature_name=False):
+                              use_feature_name=False,
+                              gff_cache_dir=None,
+                              use_gffutils=False,
+                              as_arrays=False,
+                              feature_cache_file=None):
     """
     Using CDS entries within a GFF file, get the codons in each coding
     sequence in the complementary FASTA file.
 
     A dictionary of the codons for each CDS, keyed by CDS feature
-    name, is returned.
+    name, is returned. The codons are either lists of strings or, if
+    ``as_arrays`` is ``True``, arrays of byte strings, which are much
+    faster to create (see :py:func:`sequence_to_codon_array`).
 
     CDSs whose sequences don't have a length divisible by 3 are
     ignored.
@@ -121,8 +201,19 @@ def get_cds_codons_from_fasta(fasta,
     defined above. Subsequent CDSs for that sequence have the feature
     name with with the suffix ``.1``, ``.2`` etc. appended.
 
-    See also :py:func:`get_cds_from_fasta` and
-    :py:func:`sequence_to_codons`.
+    If ``feature_cache_file`` is provided then the codons of each
+    CDS, or the warning raised when retrieving them, are cached in
+    this file, keyed by a hash of the feature's GFF record and its
+    sequence bytes in the FASTA file (see
+    :py:class:`riboviz.fasta_gff.FeatureCache`). On later runs,
+    codons are only retrieved for features whose hashes are not in
+    the cache. The cache is then replaced with the entries for the
+    current features. The codons and warnings are the same as for a
+    run with no cache.
+
+    See also :py:func:`get_cds_from_fasta`,
+    :py:func:`sequence_to_codons` and
+    :py:func:`sequence_to_codon_array`.
 
     :param fasta: FASTA file
     :type fasta: str or unicode
@@ -139,54 +230,86 @@ def get_cds_codons_from_fasta(fasta,
     ``Name`` attributes then use ``Name`` in reporting, otherwise use \
     ``ID``.
     :type use_feature_name: bool
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param as_arrays: Return codons as arrays rather than lists?
+    :type as_arrays: bool
+    :param feature_cache_file: Feature cache file, or ``None`` for \
+    no caching
+    :type feature_cache_file: str or unicode
     :return: Codons for each coding sequence, keyed by feature name
-    :rtype: dict(str or unicode -> list(str or unicode))
+    :rtype: dict(str or unicode -> list(str or unicode)) or \
+    dict(str or unicode -> numpy.ndarray)
     :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
     formatted sequences
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
-    :raises ValueError: If GFF file is empty
+    :raises ValueError: If GFF file is empty or badly formatted
     :raises Exception: Exceptions specific to gffutils.create_db \
     (these are undocumented in the gffutils documentation)
     """
     for f in [fasta, gff]:
         if not os.path.exists(f) or (not os.path.isfile(f)):
             raise FileNotFoundError(f)
-    try:
-        gffdb = gffutils.create_db(gff,
-                                   dbfn='gff.db',
-                                   force=True,
-                                   keep_order=True,
-                                   merge_strategy='merge',
-                                   sort_attribute_values=True)
-    except ValueError as e:
-        # Wrap and rethrow exception so file name is included
-        raise ValueError("{} ({})".format(e, gff)) from e
+    gffdb = load_gff(gff, use_gffutils, gff_cache_dir, ["CDS"])
     cds_codons = {}
     same_feature_id_count = 0
-    fasta_genes = Fasta(fasta)
-    for feature in gffdb.features_of_type('CDS'):
-        try:
-            sequence = get_cds_from_fasta(feature, fasta_genes)
-            codons = sequence_to_codons(sequence)
-        except KeyError as e:  # Missing sequence.
-            warnings.warn(str(e))
-            continue
-        except AssertionError as e:  # Sequence length not divisible by 3.
-            warnings.warn(str(e))
-            continue
-        feature_id = get_feature_id(feature, use_feature_name)
-        if feature_id is None:
-            feature_id = cds_feature_format.format(feature.seqid)
-        if feature_id not in cds_codons:
-            same_feature_id_count = 0
-        else:
-            same_feature_id_count += 1
-            feature_id = "{}.{}".format(feature_id,
-                                        same_feature_id_count)
-        if exclude_stop_codons:
-            codons = codons[:-1]
-        cds_codons[feature_id] = codons
+    feature_cache = None
+    if feature_cache_file is not None:
+        feature_cache = FeatureCache(
+            feature_cache_file, fasta,
+            dict(FEATURE_CACHE_OPTIONS,
+                 exclude_stop_codons=exclude_stop_codons))
+    with FastaSequences(fasta) as fasta_genes:
+        for feature in gffdb.features_of_type('CDS'):
+            cached = None
+            if feature_cache is not None:
+                feature_hash = feature_cache.get_feature_hash(
+                    feature, fasta_genes)
+                cached = feature_cache.get(feature_hash)
+            if cached is not None:
+                codons, warning = cached
+                if codons is not None:
+                    codons = sequence_to_codon_array(codons)
+            else:
+                codons, warning = None, None
+                try:
+                    codons = sequence_to_codon_array(
+                        get_cds_from_fasta(feature, fasta_genes))
+                    if exclude_stop_codons:
+                        codons = codons[:-1]
+                except KeyError as e:  # Missing sequence.
+                    warning = str(e)
+                except AssertionError as e:  # Length not divisible by 3.
+                    warning = str(e)
+                if feature_cache is not None:
+                    cached = [None if codons is None else
+                              codons.tobytes().decode("ascii"), warning]
+            if feature_cache is not None:
+                feature_cache.add(feature, feature_hash, cached)
+            if warning is not None:
+                warnings.warn(warning)
+                continue
+            feature_id = get_feature_id(feature, use_feature_name)
+            if feature_id is None:
+                feature_id = cds_feature_format.format(feature.seqid)
+            if feature_id not in cds_codons:
+                same_feature_id_count = 0
+            else:
+                same_feature_id_count += 1
+                feature_id = "{}.{}".format(feature_id,
+                                            same_feature_id_count)
+            if not as_arrays:
+                codons = codons.astype(str).tolist()
+            cds_codons[feature_id] = codons
+    if feature_cache is not None:
+        feature_cache.save()
     return cds_codons
 
 
@@ -201,21 +324,260 @@ def write_feature_codons_to_csv(feature_codons, csv_file, delimiter="\t"):
     * :py:const:`POS`: codon position in coding sequence (1-indexed).
     * :py:const:`CODON`: codon.
 
+    The rows for each feature are joined into a single block of text
+    and written at once. If ``csv_file`` has an extension in
+    :py:const:`GZ_EXTS` then the file is compressed using ``gzip``.
+
     :param feature_codons: Codons for each feature, keyed by feature \
     name
-    :type feature_codons: dict(str or unicode -> list(str or unicode))
+    :type feature_codons: dict(str or unicode -> list(str or unicode)) \
+    or dict(str or unicode -> numpy.ndarray)
     :param csv_file: CSV file name
     :type csv_file: str or unicode
     :param delimiter: Delimiter
     :type delimiter: str or unicode
     """
-    provenance.write_provenance_header(__file__, csv_file)
-    with open(csv_file, 'a', newline='') as f:
-        writer = csv.writer(f, delimiter=delimiter, lineterminator=os.linesep)
-        writer.writerow([GENE, POS, CODON])
-        for feature_id, codons in list(feature_codons.items()):
-            for pos, codon in zip(range(0, len(codons)), codons):
-                writer.writerow([feature_id, pos+1, codon])
+    ext = csv_file.split(".")[-1].lower()
+    open_file = gzip.open if ext in GZ_EXTS else open
+    # Codon positions as strings, extended as required.
+    positions = []
+    with open_file(csv_file, "wt", newline="") as f:
+        provenance.write_provenance(f, __file__)
+        f.write(delimiter.join([GENE, POS, CODON]) + os.linesep)
+        for feature_id, codons in feature_codons.items():
+            if isinstance(codons, np.ndarray):
+                codons = codons.astype(str).tolist()
+            if not codons:
+                continue
+            positions.extend(str(pos) for pos in range(len(positions) + 1,
+                                                       len(codons) + 1))
+            rows = map(delimiter.join,
+                       zip(repeat(feature_id), positions, codons))
+            f.write(os.linesep.join(rows) + os.linesep)
+
+
+def read_feature_codons_from_csv(csv_file, delimiter="\t"):
+    """
+    Read a CSV file of the codons for features, as written by
+    :py:func:`write_feature_codons_to_csv`, into a dictionary of the
+    codons for each feature, keyed by feature name. Features are in
+    the order in which they first occur in the file and their codons
+    are ordered by position.
+
+    :param csv_file: CSV file name
+    :type csv_file: str or unicode
+    :param delimiter: Delimiter
+    :type delimiter: str or unicode
+    :return: Codons for each feature, keyed by feature name
+    :rtype: dict(str or unicode -> numpy.ndarray)
+    :raises FileNotFoundError: If the file cannot be found
+    :raises ValueError: If the file does not have the expected columns
+    """
+    import pandas as pd
+    if not os.path.exists(csv_file) or (not os.path.isfile(csv_file)):
+        raise FileNotFoundError(csv_file)
+    df = pd.read_csv(csv_file, sep=delimiter, comment="#",
+                     dtype={GENE: str, CODON: str},
+                     keep_default_na=False)
+    if not {GENE, POS, CODON}.issubset(df.columns):
+        raise ValueError("{} does not have columns {}, {} and {}".format(
+            csv_file, GENE, POS, CODON))
+    gene_codes, genes = pd.factorize(df[GENE])
+    order = np.lexsort((df[POS].to_numpy(), gene_codes))
+    codons = df[CODON].to_numpy()[order].astype(
+        "S{}".format(CODON_LENGTH))
+    splits = np.cumsum(np.bincount(gene_codes, minlength=len(genes)))
+    return dict(zip(genes, np.split(codons, splits[:-1])))
+
+
+class CodonIndex:
+    """
+    Index of the codons of each gene, created by
+    :py:func:`create_codon_index` or :py:func:`load_codon_index`.
+
+    Codons are held as ``uint8`` codes, concatenated for all genes,
+    with the offsets of each gene's codes. An inverted index holds,
+    for each codon, the genes and positions at which it occurs, in
+    gene and position order. :py:meth:`get_gene_codons` and
+    :py:meth:`get_codon_positions` take time proportional to the
+    size of their result.
+    """
+
+    def __init__(self, arrays):
+        """
+        :param arrays: Map from array names \
+        (:py:const:`CODON_INDEX_ARRAYS`) to arrays
+        :type arrays: dict(str or unicode => numpy.ndarray)
+        """
+        self.arrays = arrays
+        self.genes = arrays[CODON_INDEX_GENES]
+        self.codons = arrays[CODON_INDEX_CODONS]
+        self._gene_indices = {gene: index
+                              for index, gene in enumerate(self.genes)}
+        self._codon_codes = {codon: code
+                             for code, codon in enumerate(self.codons)}
+
+    def __len__(self):
+        return len(self.genes)
+
+    def __contains__(self, gene):
+        return gene in self._gene_indices
+
+    def get_gene_codons(self, gene):
+        """
+        Get the codons of a gene.
+
+        :param gene: Gene name
+        :type gene: str or unicode
+        :return: Codons
+        :rtype: numpy.ndarray
+        :raises KeyError: If the gene is not in the index
+        """
+        index = self._gene_indices[gene]
+        offsets = self.arrays[CODON_INDEX_GENE_OFFSETS]
+        codes = self.arrays[CODON_INDEX_CODES][offsets[index]:
+                                               offsets[index + 1]]
+        return self.codons[codes]
+
+    def get_codon_positions(self, codon):
+        """
+        Get the genes and positions (1-indexed) at which a codon
+        occurs, in gene and position order. If the codon does not
+        occur then empty arrays are returned.
+
+        :param codon: Codon
+        :type codon: str or unicode
+        :return: Gene names and positions
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+        code = self._codon_codes.get(codon)
+        positions = self.arrays[CODON_INDEX_CODON_POSITIONS]
+        if code is None:
+            return self.genes[:0], positions[:0]
+        offsets = self.arrays[CODON_INDEX_CODON_OFFSETS]
+        rows = slice(offsets[code], offsets[code + 1])
+        return (self.genes[self.arrays[CODON_INDEX_CODON_GENES][rows]],
+                positions[rows])
+
+    def get_feature_codons(self):
+        """
+        Get the codons for each gene.
+
+        :return: Codons for each gene, keyed by gene name
+        :rtype: dict(str or unicode -> numpy.ndarray)
+        """
+        return {gene: self.get_gene_codons(gene) for gene in self.genes}
+
+    def save(self, index_file):
+        """
+        Save codon index as a compressed NumPy ``.npz`` file.
+
+        :param index_file: Codon index file
+        :type index_file: str or unicode
+        """
+        with open(index_file, "wb") as f:
+            np.savez_compressed(f, **self.arrays)
+
+
+def create_codon_index(feature_codons):
+    """
+    Create a codon index from the codons for features. Canonical
+    codons (:py:const:`CODONS`) have codes 0 to 63. Other codons, for
+    example those with ambiguous bases, are given codes from 64
+    upwards, in sorted order.
+
+    :param feature_codons: Codons for each feature, keyed by feature \
+    name
+    :type feature_codons: dict(str or unicode -> list(str or unicode)) \
+    or dict(str or unicode -> numpy.ndarray)
+    :return: Codon index
+    :rtype: CodonIndex
+    :raises ValueError: If there are more than \
+    :py:const:`MAX_CODON_CODES` distinct codons
+    """
+    codon_dtype = "S{}".format(CODON_LENGTH)
+    genes = np.array(list(feature_codons.keys()), dtype=str)
+    lengths = np.array([len(codons) for codons in feature_codons.values()],
+                       dtype=np.int64)
+    gene_offsets = np.zeros(len(genes) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=gene_offsets[1:])
+    all_codons = np.concatenate(
+        [np.asarray(codons, dtype=codon_dtype)
+         for codons in feature_codons.values()] +
+        [np.array([], dtype=codon_dtype)])
+    unique_codons, inverse = np.unique(all_codons, return_inverse=True)
+    unique_codons = unique_codons.astype(str).tolist()
+    codons = CODONS + sorted(set(unique_codons) - set(CODONS))
+    if len(codons) > MAX_CODON_CODES:
+        raise ValueError("Codons have {} distinct values, the maximum is "
+                         "{}".format(len(codons), MAX_CODON_CODES))
+    codon_codes = {codon: code for code, codon in enumerate(codons)}
+    lookup = np.array([codon_codes[codon] for codon in unique_codons],
+                      dtype=np.uint8)
+    codes = lookup[inverse.ravel()]
+    order = np.argsort(codes, kind="stable")
+    codon_offsets = np.zeros(len(codons) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(codons)),
+              out=codon_offsets[1:])
+    gene_indices = np.repeat(np.arange(len(genes), dtype=np.int32),
+                             lengths)
+    positions = np.arange(len(codes), dtype=np.int64) - \
+        np.repeat(gene_offsets[:-1], lengths) + 1
+    return CodonIndex({
+        CODON_INDEX_GENES: genes,
+        CODON_INDEX_GENE_OFFSETS: gene_offsets,
+        CODON_INDEX_CODONS: np.array(codons, dtype=str),
+        CODON_INDEX_CODES: codes,
+        CODON_INDEX_CODON_OFFSETS: codon_offsets,
+        CODON_INDEX_CODON_GENES: gene_indices[order],
+        CODON_INDEX_CODON_POSITIONS: positions[order].astype(np.int32)
+    })
+
+
+def load_codon_index(index_file):
+    """
+    Load codon index from a compressed NumPy ``.npz`` file saved by
+    :py:meth:`CodonIndex.save`.
+
+    :param index_file: Codon index file
+    :type index_file: str or unicode
+    :return: Codon index
+    :rtype: CodonIndex
+    :raises FileNotFoundError: If the file cannot be found
+    :raises ValueError: If the file is not a codon index file
+    """
+    if not os.path.exists(index_file) or (not os.path.isfile(index_file)):
+        raise FileNotFoundError(index_file)
+    try:
+        with np.load(index_file, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in CODON_INDEX_ARRAYS}
+    except (KeyError, OSError, ValueError) as e:
+        raise ValueError("{} is not a codon index file ({})".format(
+            index_file, e)) from e
+    return CodonIndex(arrays)
+
+
+def create_codon_index_file(cds_codons_file, index_file, delimiter="\t"):
+    """
+    Create a codon index file from a codon positions file.
+
+    See :py:func:`read_feature_codons_from_csv`,
+    :py:func:`create_codon_index` and :py:meth:`CodonIndex.save`.
+
+    :param cds_codons_file: Coding sequence codons file
+    :type cds_codons_file: str or unicode
+    :param index_file: Codon index file
+    :type index_file: str or unicode
+    :param delimiter: Delimiter
+    :type delimiter: str or unicode
+    :raises FileNotFoundError: If the codons file cannot be found
+    :raises ValueError: If the codons file does not have the \
+    expected columns or has more than :py:const:`MAX_CODON_CODES` \
+    distinct codons
+    """
+    feature_codons = read_feature_codons_from_csv(cds_codons_file,
+                                                  delimiter)
+    create_codon_index(feature_codons).save(index_file)
 
 
 def get_cds_codons_file(fasta,
@@ -224,13 +586,20 @@ def get_cds_codons_file(fasta,
                         exclude_stop_codons=False,
                         cds_feature_format=CDS_FEATURE_FORMAT,
                         use_feature_name=False,
-                        delimiter="\t"):
+                        delimiter="\t",
+                        gff_cache_dir=None,
+                        use_gffutils=False,
+                        feature_cache_file=None,
+                        codon_index_file=None):
     """
     Using CDS entries within a GFF file, get the codons in each coding
     sequence in the complementary FASTA file.
 
     A tab-separated values file of the codons for each CDS, keyed by
-    CDS feature name, is saved.
+    CDS feature name, is saved. If ``cds_codons_file`` ends with
+    ``.gz`` then the file is compressed. If ``codon_index_file`` is
+    provided then a codon index is also saved (see
+    :py:func:`create_codon_index`).
 
     See :py:func:`get_cds_codons_from_fasta`.
 
@@ -256,17 +625,39 @@ def get_cds_codons_file(fasta,
     ``ID``.
     :param delimiter: Delimiter
     :type delimiter: str or unicode
+    :param gff_cache_dir: GFF database cache directory (see \
+    :py:func:`riboviz.fasta_gff.create_gff_db`), used only if \
+    ``use_gffutils`` is ``True``
+    :type gff_cache_dir: str or unicode
+    :param use_gffutils: Load GFF file into a ``gffutils`` database \
+    rather than reading it into memory (see \
+    :py:func:`riboviz.fasta_gff.load_gff`)?
+    :type use_gffutils: bool
+    :param feature_cache_file: Feature cache file (see \
+    :py:func:`get_cds_codons_from_fasta`)
+    :type feature_cache_file: str or unicode
+    :param codon_index_file: Codon index file, or ``None`` for no \
+    codon index
+    :type codon_index_file: str or unicode
     :raises FileNotFoundError: If the FASTA or GFF files \
     cannot be found
     :raises pyfaidx.FastaIndexingError: If the FASTA file has badly \
     formatted sequences
-    :raises ValueError: If GFF file is empty
+    :raises ValueError: If GFF file is empty or badly formatted, or \
+    there are more than :py:const:`MAX_CODON_CODES` distinct codons
     :raises Exception: Exceptions specific to gffutils.create_db \
     (these are undocumented in the gffutils documentation)
     """
-    cds_codons = get_cds_codons_from_fasta(fasta,
-                                           gff,
-                                           exclude_stop_codons,
-                                           cds_feature_format,
-                                           use_feature_name)
+    cds_codons = get_cds_codons_from_fasta(
+        fasta,
+        gff,
+        exclude_stop_codons,
+        cds_feature_format,
+        use_feature_name,
+        gff_cache_dir,
+        use_gffutils,
+        as_arrays=True,
+        feature_cache_file=feature_cache_file)
     write_feature_codons_to_csv(cds_codons, cds_codons_file, delimiter)
+    if codon_index_file is not None:
+        create_codon_index(cds_codons).save(codon_index_file)
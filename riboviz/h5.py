@@ -1,12 +1,106 @@
 """
 H5-related constants and functions.
+
+riboviz H5 files, as created by ``rscripts/bam_to_h5.R``, consist of
+a file of external links, one per gene, to complementary data files
+(``<file>.1``, ``<file>.2`` etc.). Each data file holds, for each
+gene, a group ``/<gene>/<dataset>/reads`` with per-gene attributes
+and a ``data`` dataset of read counts by position and read length.
+
+riboviz H5 files can also be packed, by
+:py:mod:`riboviz.tools.pack_h5`, into a single file holding one
+concatenated matrix of read counts for all genes together with a
+per-gene index and columnar per-gene attributes. The functions in
+this module to get gene data support both standard and packed files.
+
+A per-gene summary dataset can be added to the root of a standard H5
+file by :py:mod:`riboviz.tools.add_h5_summary`. If present, this is
+used by the functions in this module to get gene attributes, so that
+these can be read without accessing every gene's group.
 """
 import subprocess
+import weakref
+import h5py
+import numpy as np
 
 H5_EXT = "h5"
 """ File extension. """
 H5_FORMAT = "{}." + H5_EXT
 """ File name format. """
+H5_DATA_FILE_FORMAT = "{}.{:d}"
+""" Complementary data file name format (H5 file name, index). """
+
+READS = "reads"
+""" Name of per-gene group holding gene data and attributes. """
+DATA = "data"
+""" Name of per-gene read counts dataset. """
+READS_PATH_FORMAT = "/{gene}/{dataset}/" + READS
+""" Path to per-gene group holding gene data and attributes. """
+DATA_PATH_FORMAT = READS_PATH_FORMAT + "/" + DATA
+""" Path to per-gene read counts dataset. """
+BUFFER_LEFT = "buffer_left"
+""" Gene attribute (number of nts upstream of the start codon). """
+BUFFER_RIGHT = "buffer_right"
+""" Gene attribute (number of nts downstream of the stop codon). """
+START_CODON_POS = "start_codon_pos"
+""" Gene attribute (positions of start codon nts). """
+STOP_CODON_POS = "stop_codon_pos"
+""" Gene attribute (positions of stop codon nts). """
+LENGTHS = "lengths"
+""" Gene attribute (lengths of mapped reads). """
+READS_BY_LEN = "reads_by_len"
+""" Gene attribute (counts of reads of each length). """
+READS_TOTAL = "reads_total"
+""" Gene attribute (total number of reads). """
+GENE_ATTRIBUTES = [BUFFER_LEFT, BUFFER_RIGHT, START_CODON_POS,
+                   STOP_CODON_POS, LENGTHS, READS_BY_LEN, READS_TOTAL]
+""" Gene attributes. """
+
+FORMAT_ATTR = "riboviz_format"
+""" Root attribute identifying the layout of a non-standard H5 file. """
+FORMAT_VERSION_ATTR = "riboviz_format_version"
+""" Root attribute with the version of a non-standard H5 file layout. """
+DATASET_ATTR = "dataset"
+""" Root attribute with the name of the dataset in a packed H5 file. """
+PACKED_FORMAT = "packed"
+""" Value of :py:const:`FORMAT_ATTR` for packed H5 files. """
+PACKED_FORMAT_VERSION = 1
+""" Value of :py:const:`FORMAT_VERSION_ATTR` for packed H5 files. """
+PACKED = "packed"
+""" Name of group holding packed data, index and attributes. """
+GENE = "gene"
+""" Packed H5 dataset (gene names). """
+OFFSET = "offset"
+""" Packed H5 dataset (offset of each gene's first position). """
+WIDTH = "width"
+""" Packed H5 dataset (number of positions for each gene). """
+ALIAS = "alias"
+""" Packed H5 dataset (alternative gene names). """
+ALIAS_GENE = "alias_gene"
+""" Packed H5 dataset (gene name for each alternative gene name). """
+SUMMARY = "summary"
+""" Name of per-gene summary dataset at the root of an H5 file. """
+SUMMARY_ATTRIBUTES = [READS_TOTAL, READS_BY_LEN, BUFFER_LEFT,
+                      BUFFER_RIGHT, START_CODON_POS, STOP_CODON_POS]
+""" Per-gene summary dataset columns, in addition to :py:const:`GENE`. """
+
+GZIP = "gzip"
+""" Compression codec (deflate). """
+LZF = "lzf"
+""" Compression codec (LZF). """
+NO_CODEC = "none"
+""" Compression codec (no compression). """
+CODECS = [GZIP, LZF, NO_CODEC]
+""" Compression codecs. """
+GZIP_LEVEL = 7
+""" Default gzip level, consistent with ``rscripts/bam_to_h5.R``. """
+
+_INDEX_CACHE = weakref.WeakKeyDictionary()
+"""
+Gene name to index maps for open H5 files, keyed by ``h5py.File.id``,
+so that a map is built once per open file and released when the file
+is closed and its identifier is garbage collected.
+"""
 
 
 def equal_h5(file1, file2):
@@ -29,3 +123,558 @@ def equal_h5(file1, file2):
     assert return_code == 0,\
         "Non-zero return code (%d) from %s" % (
             return_code, ' '.join(map(str, cmd)))
+
+
+def get_compression_options(codec=GZIP, level=None, shuffle=False):
+    """
+    Get ``h5py`` dataset creation keyword arguments for a
+    compression codec.
+
+    :param codec: Codec, one of :py:const:`CODECS`
+    :type codec: str or unicode
+    :param level: Compression level (``gzip`` only, if ``None`` then \
+    :py:const:`GZIP_LEVEL` is used)
+    :type level: int
+    :param shuffle: Apply the HDF5 byte shuffle filter?
+    :type shuffle: bool
+    :return: Keyword arguments for ``h5py.Group.create_dataset``
+    :rtype: dict
+    :raise ValueError: If ``codec`` is not in :py:const:`CODECS` or \
+    ``level`` is not in 0-9
+    """
+    if codec not in CODECS:
+        raise ValueError("Unknown codec {}, expected one of {}".format(
+            codec, CODECS))
+    options = {}
+    if codec == GZIP:
+        if level is None:
+            level = GZIP_LEVEL
+        if not 0 <= level <= 9:
+            raise ValueError("Invalid gzip level {}".format(level))
+        options["compression"] = GZIP
+        options["compression_opts"] = level
+    elif codec == LZF:
+        options["compression"] = LZF
+    if shuffle:
+        options["shuffle"] = True
+    return options
+
+
+def is_packed(h5):
+    """
+    Is an H5 file a packed H5 file?
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: ``True`` if file is a packed H5 file
+    :rtype: bool
+    """
+    return h5.attrs.get(FORMAT_ATTR) == PACKED_FORMAT
+
+
+def get_packed_dataset_name(h5):
+    """
+    Get the name of the dataset held within a packed H5 file.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: Dataset name
+    :rtype: str or unicode
+    """
+    return h5.attrs[DATASET_ATTR]
+
+
+def get_aliases(h5):
+    """
+    Get alternative gene names and the gene names they refer to.
+
+    For a standard H5 file, these are links at the root of the file
+    whose target path differs from their name, as created
+    by ``rscripts/bam_to_h5.R`` for a secondary ID.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: Map from alternative gene names to gene names
+    :rtype: dict(str or unicode => str or unicode)
+    """
+    if is_packed(h5):
+        aliases = h5[PACKED][ALIAS].asstr()[()]
+        alias_genes = h5[PACKED][ALIAS_GENE].asstr()[()]
+        return dict(zip(aliases, alias_genes))
+    aliases = {}
+    for name in get_genes(h5):
+        link = h5.get(name, getlink=True)
+        if isinstance(link, (h5py.ExternalLink, h5py.SoftLink)):
+            target = link.path.strip("/")
+            if target != name:
+                aliases[name] = target
+    return aliases
+
+
+def get_genes(h5):
+    """
+    Get names of genes in an H5 file. For a standard H5 file these are
+    the names of all gene links, or groups, at the root of the file,
+    including alternative gene names. For a packed H5 file these are
+    the packed gene names followed by any alternative gene names.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: Gene names
+    :rtype: list(str or unicode)
+    """
+    if is_packed(h5):
+        genes = list(h5[PACKED][GENE].asstr()[()])
+        genes.extend(get_aliases(h5).keys())
+        return genes
+    return [name for name in h5.keys()
+            if not (name == SUMMARY and is_summary(h5))]
+
+
+def _get_cached_index(h5, name, create_index):
+    """
+    Get a gene name to index map for an open H5 file, creating it,
+    and caching it until the file is closed, if necessary.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param name: Map name
+    :type name: str or unicode
+    :param create_index: Function to create map, given ``h5``
+    :type create_index: function
+    :return: Map from gene names to indices
+    :rtype: dict(str or unicode => int)
+    """
+    indices = _INDEX_CACHE.setdefault(h5.id, {})
+    if name not in indices:
+        indices[name] = create_index(h5)
+    return indices[name]
+
+
+def _create_packed_gene_index(h5):
+    """
+    Create a map from gene names, and alternative gene names, to
+    indices in a packed H5 file.
+
+    :param h5: Packed H5 file
+    :type h5: h5py.File
+    :return: Map from gene names to indices
+    :rtype: dict(str or unicode => int)
+    """
+    genes = h5[PACKED][GENE].asstr()[()]
+    index = {gene: i for i, gene in enumerate(genes)}
+    for alias, gene in get_aliases(h5).items():
+        if alias not in index and gene in index:
+            index[alias] = index[gene]
+    return index
+
+
+def _get_packed_gene_index(h5, gene):
+    """
+    Get the index of a gene in a packed H5 file, resolving
+    alternative gene names if necessary.
+
+    :param h5: Packed H5 file
+    :type h5: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :return: Index
+    :rtype: int
+    :raise KeyError: If the gene is not in the file
+    """
+    return _get_cached_index(h5, PACKED, _create_packed_gene_index)[gene]
+
+
+def is_summary(h5):
+    """
+    Is :py:const:`SUMMARY`, at the root of a standard H5 file, a
+    per-gene summary dataset rather than a gene? Genes are links or
+    groups, whereas the summary is a dataset.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: ``True`` if the file has a summary dataset
+    :rtype: bool
+    """
+    if is_packed(h5):
+        return False
+    link = h5.get(SUMMARY, getlink=True)
+    return isinstance(link, h5py.HardLink) and \
+        isinstance(h5[SUMMARY], h5py.Dataset)
+
+
+def has_summary(h5, dataset):
+    """
+    Does a standard H5 file have a per-gene summary dataset for a
+    dataset?
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :return: ``True`` if the file has a summary dataset for \
+    ``dataset``
+    :rtype: bool
+    """
+    return is_summary(h5) and \
+        h5[SUMMARY].attrs.get(DATASET_ATTR) == dataset
+
+
+def _create_summary_gene_index(h5):
+    """
+    Create a map from gene names to rows of the per-gene summary
+    dataset of a standard H5 file.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :return: Map from gene names to indices
+    :rtype: dict(str or unicode => int)
+    """
+    genes = h5[SUMMARY].fields(GENE)[()]
+    return {gene.decode(): i for i, gene in enumerate(genes)}
+
+
+def _get_summary_value(h5, gene, dataset, attribute):
+    """
+    Get a gene attribute from the per-gene summary dataset of a
+    standard H5 file.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param attribute: Attribute name
+    :type attribute: str or unicode
+    :return: Attribute value or ``None`` if there is no summary \
+    dataset for ``dataset`` or the gene is not in the summary dataset
+    :rtype: numpy.ndarray
+    """
+    if not has_summary(h5, dataset):
+        return None
+    summary = h5[SUMMARY]
+    if attribute == LENGTHS:
+        return summary.attrs[LENGTHS]
+    index = _get_cached_index(h5, SUMMARY, _create_summary_gene_index)
+    if gene not in index:
+        return None
+    return summary[index[gene]][attribute]
+
+
+def get_gene_attribute(h5, gene, dataset, attribute):
+    """
+    Get a gene attribute, one of :py:const:`GENE_ATTRIBUTES`.
+
+    Attributes that are scalar values are returned as ``int``, the
+    others as 1-dimensional ``numpy.ndarray``.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param attribute: Attribute name
+    :type attribute: str or unicode
+    :return: Attribute value
+    :rtype: int or numpy.ndarray
+    :raise KeyError: If the gene, dataset or attribute is not in the \
+    file
+    """
+    if is_packed(h5):
+        if dataset != get_packed_dataset_name(h5):
+            raise KeyError(dataset)
+        packed = h5[PACKED]
+        if attribute == LENGTHS:
+            value = packed[LENGTHS][()]
+        else:
+            value = packed[attribute][_get_packed_gene_index(h5, gene)]
+    else:
+        value = _get_summary_value(h5, gene, dataset, attribute)
+        if value is None:
+            reads = h5[READS_PATH_FORMAT.format(gene=gene,
+                                                dataset=dataset)]
+            value = reads.attrs[attribute]
+    value = np.ravel(value)
+    if attribute in [BUFFER_LEFT, BUFFER_RIGHT, READS_TOTAL]:
+        return int(value[0])
+    return value
+
+
+def get_gene_datamatrix(h5, gene, dataset, rows=None, columns=None):
+    """
+    Get matrix of read counts by read length and position for a gene.
+    The matrix has one row per read length (see :py:const:`LENGTHS`)
+    and one column per position, consistent with
+    ``GetGeneDatamatrix`` in ``rscripts/read_count_functions.R``.
+
+    If ``rows`` or ``columns`` are provided then only the selected
+    read lengths and positions are read from the file.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param rows: Read length indices (if ``None`` then all)
+    :type rows: slice
+    :param columns: 0-indexed positions (if ``None`` then all)
+    :type columns: slice
+    :return: Read counts
+    :rtype: numpy.ndarray
+    :raise KeyError: If the gene or dataset is not in the file
+    """
+    if rows is None:
+        rows = slice(None)
+    if columns is None:
+        columns = slice(None)
+    if is_packed(h5):
+        if dataset != get_packed_dataset_name(h5):
+            raise KeyError(dataset)
+        packed = h5[PACKED]
+        index = _get_packed_gene_index(h5, gene)
+        offset = int(packed[OFFSET][index])
+        width = int(packed[WIDTH][index])
+        start, stop, step = columns.indices(width)
+        stop = max(start, stop)
+        return packed[DATA][rows, offset + start:offset + stop:step]
+    # Data is stored as (position, read length) in H5.
+    return h5[DATA_PATH_FORMAT.format(gene=gene, dataset=dataset)][
+        columns, rows].T
+
+
+def iterate_gene_datamatrices(h5, dataset, block_size=2**22):
+    """
+    Iterate through the matrices of read counts by read length and
+    position (see :py:func:`get_gene_datamatrix`) for every gene,
+    excluding alternative gene names.
+
+    For a packed H5 file, the matrices are read sequentially in
+    blocks of at least ``block_size`` positions.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param block_size: Minimum number of positions to read at a time \
+    (packed H5 files only)
+    :type block_size: int
+    :return: Gene name and read counts
+    :rtype: generator(tuple(str or unicode, numpy.ndarray))
+    :raise KeyError: If the dataset is not in the file
+    """
+    if not is_packed(h5):
+        aliases = get_aliases(h5)
+        for gene in get_genes(h5):
+            if gene not in aliases:
+                yield gene, get_gene_datamatrix(h5, gene, dataset)
+        return
+    if dataset != get_packed_dataset_name(h5):
+        raise KeyError(dataset)
+    packed = h5[PACKED]
+    genes = packed[GENE].asstr()[()]
+    offsets = packed[OFFSET][()]
+    widths = packed[WIDTH][()]
+    data = packed[DATA]
+    start = 0
+    while start < len(genes):
+        end = start
+        block_end = offsets[start]
+        while end < len(genes) and block_end - offsets[start] < block_size:
+            block_end = offsets[end] + widths[end]
+            end += 1
+        block = data[:, offsets[start]:block_end]
+        for index in range(start, end):
+            column = offsets[index] - offsets[start]
+            yield genes[index], block[:, column:column + widths[index]]
+        start = end
+
+
+def get_gene_dataset_name(h5, gene):
+    """
+    Get the name of the dataset for a gene within a standard H5 file,
+    assuming that the file holds data for a single dataset.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param gene: Gene name
+    :type gene: str or unicode
+    :return: Dataset name
+    :rtype: str or unicode
+    :raise ValueError: If the gene does not have exactly one dataset
+    """
+    datasets = list(h5[gene].keys())
+    if len(datasets) != 1:
+        raise ValueError("Expected 1 dataset for gene {} but found {}".format(
+            gene, datasets))
+    return datasets[0]
+
+
+def get_summary(h5, dataset):
+    """
+    Get the attributes of every gene, excluding alternative gene
+    names, as a dictionary of columns keyed by :py:const:`GENE` and
+    the names in :py:const:`SUMMARY_ATTRIBUTES` plus
+    :py:const:`LENGTHS`.
+
+    Values are taken from the per-gene summary dataset, if the H5
+    file has one for ``dataset``, from the per-gene columns of a
+    packed H5 file or, otherwise, from the attributes of each gene.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :return: Columns
+    :rtype: dict(str or unicode => list or numpy.ndarray)
+    :raise KeyError: If the dataset is not in the file
+    """
+    if is_packed(h5):
+        if dataset != get_packed_dataset_name(h5):
+            raise KeyError(dataset)
+        packed = h5[PACKED]
+        summary = {GENE: list(packed[GENE].asstr()[()])}
+        for attribute in SUMMARY_ATTRIBUTES + [LENGTHS]:
+            summary[attribute] = packed[attribute][()]
+        return summary
+    if has_summary(h5, dataset):
+        values = h5[SUMMARY][()]
+        summary = {GENE: [gene.decode() for gene in values[GENE]]}
+        for attribute in SUMMARY_ATTRIBUTES:
+            summary[attribute] = values[attribute]
+        summary[LENGTHS] = h5[SUMMARY].attrs[LENGTHS]
+        return summary
+    aliases = get_aliases(h5)
+    genes = [gene for gene in get_genes(h5) if gene not in aliases]
+    summary = {GENE: genes}
+    for attribute in SUMMARY_ATTRIBUTES:
+        summary[attribute] = np.array(
+            [get_gene_attribute(h5, gene, dataset, attribute)
+             for gene in genes], dtype=np.int32)
+    if genes:
+        summary[LENGTHS] = get_gene_attribute(h5, genes[0], dataset,
+                                              LENGTHS)
+    else:
+        summary[LENGTHS] = np.zeros(0, dtype=np.int32)
+    return summary
+
+
+def add_summary(h5_file, dataset=None):
+    """
+    Add a per-gene summary dataset, :py:const:`SUMMARY`, to the root
+    of a standard H5 file, replacing any existing summary dataset.
+
+    The summary dataset has one row per gene, excluding alternative
+    gene names, with columns :py:const:`GENE` and those in
+    :py:const:`SUMMARY_ATTRIBUTES`. The dataset has attributes
+    :py:const:`DATASET_ATTR`, the dataset name, and
+    :py:const:`LENGTHS`, the lengths of mapped reads.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    the first gene, which must have a single dataset)
+    :type dataset: str or unicode
+    :raise ValueError: If the H5 file is a packed H5 file, has no \
+    genes or has a gene called :py:const:`SUMMARY`
+    :raise Exception: If problems arise when reading or writing the \
+    file
+    """
+    with h5py.File(h5_file, "r+") as h5:
+        if is_packed(h5):
+            raise ValueError(
+                "{} is a packed H5 file, which needs no summary".format(
+                    h5_file))
+        if SUMMARY in h5:
+            if not is_summary(h5):
+                raise ValueError(
+                    "{} has a gene called {}, which clashes with the "
+                    "summary dataset name".format(h5_file, SUMMARY))
+            del h5[SUMMARY]
+        aliases = get_aliases(h5)
+        genes = [gene for gene in get_genes(h5) if gene not in aliases]
+        if not genes:
+            raise ValueError("No genes found in {}".format(h5_file))
+        if dataset is None:
+            dataset = get_gene_dataset_name(h5, genes[0])
+        summary = get_summary(h5, dataset)
+        num_lengths = len(summary[LENGTHS])
+        summary_type = np.dtype([
+            (GENE, h5py.string_dtype()),
+            (READS_TOTAL, np.int32),
+            (READS_BY_LEN, np.int32, (num_lengths,)),
+            (BUFFER_LEFT, np.int32),
+            (BUFFER_RIGHT, np.int32),
+            (START_CODON_POS, np.int32, (3,)),
+            (STOP_CODON_POS, np.int32, (3,))])
+        values = np.zeros(len(genes), dtype=summary_type)
+        values[GENE] = summary[GENE]
+        for attribute in SUMMARY_ATTRIBUTES:
+            values[attribute] = summary[attribute]
+        summary_dataset = h5.create_dataset(SUMMARY, data=values)
+        summary_dataset.attrs[DATASET_ATTR] = dataset
+        summary_dataset.attrs[LENGTHS] = np.array(summary[LENGTHS],
+                                                  dtype=np.int32)
+
+
+def calculate_gene_tpms(h5, dataset, other_buffer=50):
+    """
+    Calculate transcripts per million (TPM) for every gene, excluding
+    alternative gene names, consistent with
+    ``CalculateGeneTranscriptsPerMillion`` in
+    ``rscripts/stats_figs_block_functions.R``.
+
+    Reads per base for a gene is ``reads_total`` divided by the gene
+    length (``stop_codon_pos[0] - start_codon_pos[0]``) plus
+    ``other_buffer``.
+
+    See :py:func:`get_summary` for the source of the values used.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param other_buffer: Value added to each gene length
+    :type other_buffer: int
+    :return: Data frame with columns ``ORF``, ``readcount``, \
+    ``rpb``, ``tpm``
+    :rtype: pandas.core.frame.DataFrame
+    """
+    import pandas as pd
+    summary = get_summary(h5, dataset)
+    reads_total = np.asarray(summary[READS_TOTAL])
+    gene_lengths = np.asarray(summary[STOP_CODON_POS])[:, 0] - \
+        np.asarray(summary[START_CODON_POS])[:, 0]
+    reads_per_b = reads_total / (gene_lengths + other_buffer)
+    return pd.DataFrame({
+        "ORF": summary[GENE],
+        "readcount": reads_total,
+        "rpb": reads_per_b,
+        "tpm": reads_per_b * 1e6 / np.sum(reads_per_b)})
+
+
+def calculate_read_lengths(h5, dataset):
+    """
+    Calculate counts of reads of each length, summed across every
+    gene, excluding alternative gene names, consistent with
+    ``CalculateReadLengths`` in
+    ``rscripts/stats_figs_block_functions.R``.
+
+    See :py:func:`get_summary` for the source of the values used.
+
+    :param h5: H5 file
+    :type h5: h5py.File
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :return: Data frame with columns ``Length``, ``Counts``
+    :rtype: pandas.core.frame.DataFrame
+    """
+    import pandas as pd
+    summary = get_summary(h5, dataset)
+    reads_by_len = np.asarray(summary[READS_BY_LEN]).reshape(
+        -1, len(summary[LENGTHS]))
+    return pd.DataFrame({
+        "Length": summary[LENGTHS],
+        "Counts": reads_by_len.sum(axis=0)})
@@ -0,0 +1,621 @@
+"""
+Analyse Nextflow trace files (see Nextflow's `Trace report
+<https://www.nextflow.io/docs/latest/tracing.html#trace-report>`_)
+written by the workflow (see :py:const:`riboviz.params.NEXTFLOW_TRACE_FILE`).
+
+A trace file is loaded into a table with one row per task (see
+:py:func:`load_trace`). Both human-readable values (e.g. ``1m 2s``,
+``1.5 GB``, ``95.3%``) and raw values (milliseconds, bytes,
+percentages, written if ``trace.raw = true``) are supported.
+
+Tasks can be summarised by process or by sample (see
+:py:func:`summarise_trace`). Samples are identified by task tags,
+which, for per-sample processes in ``prep_riboviz.nf``, are sample
+IDs. CPU efficiency is the CPU time used as a fraction of the CPU
+time requested, where the number of CPUs requested is
+``num_processes`` for processes that use it (see
+:py:const:`MULTI_PROCESS_PROCESSES`), a task's ``cpus`` if the trace
+has this field, or 1.
+
+A trace does not record task dependencies, so the critical path is
+inferred from task timings (see :py:func:`get_critical_path`).
+
+Summaries of two traces can be compared to flag regressions (see
+:py:func:`compare_summaries`).
+"""
+import os
+import re
+import pandas as pd
+import yaml
+from riboviz import params
+from riboviz import provenance
+
+PROCESS = "Process"
+""" Task column (process name). """
+TAG = "Tag"
+""" Task column (tag, e.g. sample ID). """
+SAMPLE = "Sample"
+""" Summary column (sample, a task tag). """
+STATUS = "Status"
+""" Task column (status). """
+EXIT = "Exit"
+""" Task column (exit code). """
+SUBMIT = "Submit"
+""" Task column (submission time, seconds since the epoch). """
+START = "Start"
+""" Task column (start time, seconds since the epoch). """
+COMPLETE = "Complete"
+""" Task column (completion time, seconds since the epoch). """
+REALTIME = "Realtime"
+""" Task column (run time, seconds). """
+CPU_PERCENT = "CpuPercent"
+""" Task column (CPU usage, percent of 1 CPU). """
+PEAK_RSS = "PeakRss"
+""" Task column (peak resident set size, bytes). """
+READ_BYTES = "ReadBytes"
+""" Task column (bytes read). """
+WRITE_BYTES = "WriteBytes"
+""" Task column (bytes written). """
+CPUS = "Cpus"
+""" Task column (CPUs requested). """
+TASK_COLUMNS = [PROCESS, TAG, STATUS, EXIT, SUBMIT, START, COMPLETE,
+                REALTIME, CPU_PERCENT, PEAK_RSS, READ_BYTES, WRITE_BYTES,
+                CPUS]
+""" Task columns. """
+
+NUM_TASKS = "NumTasks"
+""" Summary column (number of tasks). """
+NUM_FAILED = "NumFailed"
+""" Summary column (number of tasks that did not complete). """
+REALTIME_SECONDS = "RealtimeSeconds"
+""" Summary column (total run time, seconds). """
+MAX_REALTIME_SECONDS = "MaxRealtimeSeconds"
+""" Summary column (longest task run time, seconds). """
+REALTIME_FRACTION = "RealtimeFraction"
+""" Summary column (fraction of total run time of all tasks). """
+CPU_SECONDS = "CpuSeconds"
+""" Summary column (CPU time used, seconds). """
+REQUESTED_CPUS = "RequestedCpus"
+""" Summary column (largest number of CPUs requested by a task). """
+CPU_EFFICIENCY = "CpuEfficiency"
+""" Summary column (CPU time used / CPU time requested). """
+MAX_PEAK_RSS_MB = "MaxPeakRssMB"
+""" Summary column (largest task peak resident set size, MB). """
+READ_MB = "ReadMB"
+""" Summary column (total MB read). """
+WRITE_MB = "WriteMB"
+""" Summary column (total MB written). """
+SUMMARY_COLUMNS = [NUM_TASKS, NUM_FAILED, REALTIME_SECONDS,
+                   MAX_REALTIME_SECONDS, REALTIME_FRACTION, CPU_SECONDS,
+                   REQUESTED_CPUS, CPU_EFFICIENCY, MAX_PEAK_RSS_MB, READ_MB,
+                   WRITE_MB]
+""" Summary columns, following the process or sample column. """
+
+START_OFFSET = "StartOffsetSeconds"
+""" Critical path column (start time relative to first submission). """
+COMPLETE_OFFSET = "CompleteOffsetSeconds"
+""" Critical path column (completion relative to first submission). """
+CRITICAL_PATH_COLUMNS = [PROCESS, TAG, START_OFFSET, COMPLETE_OFFSET,
+                         REALTIME]
+""" Critical path columns. """
+
+BASELINE_PREFIX = "Baseline"
+""" Prefix of baseline values in comparisons. """
+REALTIME_RATIO = "RealtimeRatio"
+""" Comparison column (run time / baseline run time). """
+PEAK_RSS_RATIO = "PeakRssRatio"
+""" Comparison column (peak RSS / baseline peak RSS). """
+COMPARISON_STATUS = "Status"
+""" Comparison column (status). """
+STATUS_OK = "ok"
+""" Comparison status (within threshold of baseline). """
+STATUS_REGRESSION = "regression"
+""" Comparison status (slower, or more memory, beyond threshold). """
+STATUS_IMPROVEMENT = "improvement"
+""" Comparison status (faster than baseline, beyond threshold). """
+STATUS_NEW = "new"
+""" Comparison status (not in baseline). """
+STATUS_REMOVED = "removed"
+""" Comparison status (only in baseline). """
+THRESHOLD = 0.2
+"""
+Default fractional increase in run time or peak RSS over the baseline
+above which a process or sample is flagged as a regression.
+"""
+
+COMPLETED_STATUSES = ["COMPLETED", "CACHED"]
+""" Statuses of tasks that completed. """
+MULTI_PROCESS_PROCESSES = ["hisat2rRNA", "hisat2ORF", "samViewSort",
+                           "bamToH5", "generateStatsFigs"]
+""" Processes in ``prep_riboviz.nf`` which use ``num_processes``. """
+TIME_UNITS = {"d": 86400, "h": 3600, "m": 60, "s": 1, "ms": 0.001}
+""" Nextflow time units, in seconds. """
+MEMORY_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3,
+                "TB": 1024 ** 4, "PB": 1024 ** 5}
+""" Nextflow memory units, in bytes. """
+MISSING = "-"
+""" Nextflow missing value. """
+PROCESS_SUMMARY_FILE = "trace_processes.tsv"
+""" Process summary file. """
+SAMPLE_SUMMARY_FILE = "trace_samples.tsv"
+""" Sample summary file. """
+CRITICAL_PATH_FILE = "trace_critical_path.tsv"
+""" Critical path file. """
+PROCESS_COMPARISON_FILE = "trace_processes_comparison.tsv"
+""" Process comparison file. """
+SAMPLE_COMPARISON_FILE = "trace_samples_comparison.tsv"
+""" Sample comparison file. """
+NAME_PATTERN = re.compile(r"^(?P<process>[^ ]+)(?: \((?P<tag>.*)\))?$")
+""" Pattern of Nextflow task names, ``process (tag)``. """
+TIME_PATTERN = re.compile(r"(?P<value>[0-9.]+)(?P<unit>ms|d|h|m|s)")
+""" Pattern of Nextflow time value components. """
+
+
+def parse_number(value):
+    """
+    Parse a raw Nextflow trace value.
+
+    :param value: Value
+    :type value: str or unicode
+    :return: Value or ``None`` if missing
+    :rtype: float
+    :raise ValueError: If the value is not a number
+    """
+    if value is None or pd.isna(value) or str(value).strip() in ["", MISSING]:
+        return None
+    return float(value)
+
+
+def parse_duration(value):
+    """
+    Parse a Nextflow time value, e.g. ``1h 2m 3s``, ``150ms`` or,
+    if raw, milliseconds.
+
+    :param value: Value
+    :type value: str or unicode
+    :return: Seconds or ``None`` if missing
+    :rtype: float
+    :raise ValueError: If the value is invalid
+    """
+    value = str(value).strip()
+    if value in ["", MISSING, "nan"]:
+        return None
+    try:
+        return float(value) / 1000
+    except ValueError:
+        pass
+    parts = value.split()
+    seconds = 0
+    for part in parts:
+        match = TIME_PATTERN.fullmatch(part)
+        if match is None:
+            raise ValueError("Invalid duration: {}".format(value))
+        seconds += float(match.group("value")) * \
+            TIME_UNITS[match.group("unit")]
+    return seconds
+
+
+def parse_memory(value):
+    """
+    Parse a Nextflow memory value, e.g. ``1.5 GB`` or, if raw, bytes.
+
+    :param value: Value
+    :type value: str or unicode
+    :return: Bytes or ``None`` if missing
+    :rtype: float
+    :raise ValueError: If the value is invalid
+    """
+    value = str(value).strip()
+    if value in ["", MISSING, "nan"]:
+        return None
+    parts = value.split()
+    if len(parts) == 1:
+        return float(parts[0])
+    if len(parts) != 2 or parts[1] not in MEMORY_UNITS:
+        raise ValueError("Invalid memory: {}".format(value))
+    return float(parts[0]) * MEMORY_UNITS[parts[1]]
+
+
+def parse_percent(value):
+    """
+    Parse a Nextflow percentage, e.g. ``95.3%`` or, if raw, ``95.3``.
+
+    :param value: Value
+    :type value: str or unicode
+    :return: Percentage or ``None`` if missing
+    :rtype: float
+    :raise ValueError: If the value is invalid
+    """
+    return parse_number(str(value).strip().rstrip("%"))
+
+
+def parse_timestamp(value):
+    """
+    Parse a Nextflow timestamp, e.g. ``2021-06-24 05:43:14.123`` or,
+    if raw, milliseconds since the epoch.
+
+    :param value: Value
+    :type value: str or unicode
+    :return: Seconds since the epoch or ``None`` if missing
+    :rtype: float
+    :raise ValueError: If the value is invalid
+    """
+    value = str(value).strip()
+    if value in ["", MISSING, "nan"]:
+        return None
+    try:
+        return float(value) / 1000
+    except ValueError:
+        pass
+    return pd.Timestamp(value).timestamp()
+
+
+def get_column(trace, names, parse):
+    """
+    Parse the first of a list of columns present in a trace.
+
+    :param trace: Trace, as read from file
+    :type trace: pandas.core.frame.DataFrame
+    :param names: Column names, in order of preference
+    :type names: list(str or unicode)
+    :param parse: Function to parse each value
+    :type parse: function
+    :return: Parsed values, or ``None`` for every task if no column \
+    is present
+    :rtype: list
+    """
+    for name in names:
+        if name in trace.columns:
+            return [parse(value) for value in trace[name]]
+    return [None] * len(trace)
+
+
+def load_trace(trace_file):
+    """
+    Load a Nextflow trace file. The process and tag are taken from
+    the ``process`` and ``tag`` fields, if present, or from the
+    ``name`` field. Bytes read and written are taken from the
+    ``read_bytes`` and ``write_bytes`` fields, if present, or from
+    the ``rchar`` and ``wchar`` fields. Start times are taken from
+    the ``start`` field, if present, or calculated from the
+    ``submit``, ``duration`` and ``realtime`` fields, and completion
+    times from the ``complete`` field, or ``submit`` and
+    ``duration``.
+
+    :param trace_file: Trace file
+    :type trace_file: str or unicode
+    :return: Tasks, with columns :py:const:`TASK_COLUMNS`
+    :rtype: pandas.core.frame.DataFrame
+    :raise FileNotFoundError: If the file cannot be found
+    :raise ValueError: If the file has no ``name`` or ``process`` \
+    field or has invalid values
+    """
+    trace = pd.read_csv(trace_file, sep="\t", dtype=str,
+                        keep_default_na=False)
+    if "process" in trace.columns:
+        processes = list(trace["process"])
+        tags = get_column(trace, ["tag"], str)
+    elif "name" in trace.columns:
+        processes = []
+        tags = []
+        for name in trace["name"]:
+            match = NAME_PATTERN.match(name.strip())
+            if match is None:
+                raise ValueError("Invalid task name: {}".format(name))
+            processes.append(match.group("process"))
+            tags.append(match.group("tag"))
+    else:
+        raise ValueError("Trace file {} has no name or process field".format(
+            trace_file))
+    tasks = pd.DataFrame({
+        PROCESS: processes,
+        TAG: [tag if tag not in [None, MISSING] else "" for tag in tags],
+        STATUS: get_column(trace, ["status"], str),
+        EXIT: get_column(trace, ["exit"], parse_number),
+        SUBMIT: get_column(trace, ["submit"], parse_timestamp),
+        START: get_column(trace, ["start"], parse_timestamp),
+        COMPLETE: get_column(trace, ["complete"], parse_timestamp),
+        REALTIME: get_column(trace, ["realtime"], parse_duration),
+        CPU_PERCENT: get_column(trace, ["%cpu"], parse_percent),
+        PEAK_RSS: get_column(trace, ["peak_rss"], parse_memory),
+        READ_BYTES: get_column(trace, ["read_bytes", "rchar"],
+                               parse_memory),
+        WRITE_BYTES: get_column(trace, ["write_bytes", "wchar"],
+                                parse_memory),
+        CPUS: get_column(trace, ["cpus"], parse_number)
+    }, columns=TASK_COLUMNS)
+    durations = pd.Series(get_column(trace, ["duration"], parse_duration),
+                          dtype=float)
+    for column in TASK_COLUMNS[3:]:
+        tasks[column] = tasks[column].astype(float)
+    tasks[COMPLETE] = tasks[COMPLETE].fillna(tasks[SUBMIT] + durations)
+    tasks[START] = tasks[START].fillna(tasks[COMPLETE] - tasks[REALTIME])
+    return tasks
+
+
+def get_requested_cpus(tasks, num_processes=1):
+    """
+    Get the number of CPUs requested by each task. This is
+    ``num_processes`` for :py:const:`MULTI_PROCESS_PROCESSES`, or the
+    task's :py:const:`CPUS`, if known, or 1.
+
+    :param tasks: Tasks (see :py:func:`load_trace`)
+    :type tasks: pandas.core.frame.DataFrame
+    :param num_processes: Number of processes to parallelize over
+    :type num_processes: int
+    :return: CPUs requested
+    :rtype: pandas.core.series.Series
+    """
+    cpus = tasks[CPUS].fillna(1)
+    multi_process = tasks[PROCESS].isin(MULTI_PROCESS_PROCESSES)
+    cpus[multi_process] = cpus[multi_process].clip(lower=num_processes)
+    return cpus
+
+
+def summarise_trace(tasks, by=PROCESS, num_processes=1):
+    """
+    Summarise tasks by process or by sample. Rows are sorted by
+    decreasing total run time.
+
+    :param tasks: Tasks (see :py:func:`load_trace`)
+    :type tasks: pandas.core.frame.DataFrame
+    :param by: :py:const:`PROCESS` or :py:const:`SAMPLE`
+    :type by: str or unicode
+    :param num_processes: Number of processes to parallelize over \
+    (see :py:func:`get_requested_cpus`)
+    :type num_processes: int
+    :return: Summary with columns ``by`` and \
+    :py:const:`SUMMARY_COLUMNS`
+    :rtype: pandas.core.frame.DataFrame
+    :raise ValueError: If ``by`` is invalid
+    """
+    if by not in [PROCESS, SAMPLE]:
+        raise ValueError("Invalid summary column {}, expected {} or "
+                         "{}".format(by, PROCESS, SAMPLE))
+    if tasks.empty:
+        return pd.DataFrame(columns=[by] + SUMMARY_COLUMNS)
+    realtime = tasks[REALTIME].fillna(0)
+    data = pd.DataFrame({
+        by: tasks[PROCESS if by == PROCESS else TAG],
+        NUM_TASKS: 1,
+        NUM_FAILED: (~tasks[STATUS].isin(COMPLETED_STATUSES)).astype(int),
+        REALTIME_SECONDS: realtime,
+        MAX_REALTIME_SECONDS: realtime,
+        CPU_SECONDS: realtime * tasks[CPU_PERCENT].fillna(0) / 100,
+        REQUESTED_CPUS: get_requested_cpus(tasks, num_processes),
+        MAX_PEAK_RSS_MB: tasks[PEAK_RSS] / 1e6,
+        READ_MB: tasks[READ_BYTES] / 1e6,
+        WRITE_MB: tasks[WRITE_BYTES] / 1e6
+    })
+    data["RequestedCpuSeconds"] = realtime * data[REQUESTED_CPUS]
+    summary = data.groupby(by, as_index=False, sort=False).agg({
+        NUM_TASKS: "sum",
+        NUM_FAILED: "sum",
+        REALTIME_SECONDS: "sum",
+        MAX_REALTIME_SECONDS: "max",
+        CPU_SECONDS: "sum",
+        REQUESTED_CPUS: "max",
+        MAX_PEAK_RSS_MB: "max",
+        READ_MB: lambda values: values.sum(min_count=1),
+        WRITE_MB: lambda values: values.sum(min_count=1),
+        "RequestedCpuSeconds": "sum"
+    })
+    total = summary[REALTIME_SECONDS].sum()
+    summary[REALTIME_FRACTION] = summary[REALTIME_SECONDS] / total \
+        if total > 0 else 0.0
+    requested = summary["RequestedCpuSeconds"]
+    summary[CPU_EFFICIENCY] = (summary[CPU_SECONDS] / requested).where(
+        requested > 0)
+    summary = summary.sort_values(REALTIME_SECONDS, ascending=False,
+                                  kind="stable")
+    return summary[[by] + SUMMARY_COLUMNS].reset_index(drop=True)
+
+
+def get_critical_path(tasks, tolerance=1.0):
+    """
+    Infer the critical path through a run: the chain of tasks, each
+    starting after the previous one completed, which ends with the
+    last task to complete. Working back from the last task to
+    complete, the previous task in the chain is the last task to
+    complete before (within ``tolerance`` of) the current task
+    started. Tasks that did not complete, or have no timings, are
+    ignored.
+
+    As task dependencies are not recorded in the trace, the path is
+    a heuristic. The sum of its tasks' run times, compared to the
+    time from the first task submission to the last task
+    completion, shows how much of the run was spent in, rather than
+    waiting for, the tasks that bound it.
+
+    :param tasks: Tasks (see :py:func:`load_trace`)
+    :type tasks: pandas.core.frame.DataFrame
+    :param tolerance: Tolerance for comparing times (seconds)
+    :type tolerance: float
+    :return: Critical path with columns \
+    :py:const:`CRITICAL_PATH_COLUMNS`, total run time of tasks on \
+    critical path (seconds) and time from first submission to last \
+    completion (seconds)
+    :rtype: tuple(pandas.core.frame.DataFrame, float, float)
+    """
+    timed = tasks[tasks[STATUS].isin(COMPLETED_STATUSES)]
+    timed = timed.dropna(subset=[START, COMPLETE]).sort_values(COMPLETE)
+    if timed.empty:
+        return pd.DataFrame(columns=CRITICAL_PATH_COLUMNS), 0.0, 0.0
+    first_submit = timed[SUBMIT].min()
+    if pd.isna(first_submit):
+        first_submit = timed[START].min()
+    path = []
+    current = timed.iloc[-1]
+    while current is not None:
+        path.append(current)
+        previous = timed[timed[COMPLETE] <= current[START] + tolerance]
+        previous = previous[previous.index != current.name]
+        # Avoid cycles where tasks overlap within the tolerance.
+        previous = previous[previous[COMPLETE] < current[COMPLETE]]
+        current = previous.iloc[-1] if not previous.empty else None
+    path = pd.DataFrame(path[::-1])
+    critical_path = pd.DataFrame({
+        PROCESS: path[PROCESS],
+        TAG: path[TAG],
+        START_OFFSET: path[START] - first_submit,
+        COMPLETE_OFFSET: path[COMPLETE] - first_submit,
+        REALTIME: path[REALTIME]
+    }, columns=CRITICAL_PATH_COLUMNS).reset_index(drop=True)
+    return (critical_path,
+            float(critical_path[REALTIME].sum()),
+            float(timed[COMPLETE].max() - first_submit))
+
+
+def compare_summaries(summary, baseline, threshold=THRESHOLD):
+    """
+    Compare a summary of a trace with a summary of a baseline trace,
+    both by process or both by sample (see
+    :py:func:`summarise_trace`). A row's status is:
+
+    * :py:const:`STATUS_NEW` if it is not in the baseline.
+    * :py:const:`STATUS_REMOVED` if it is only in the baseline.
+    * :py:const:`STATUS_REGRESSION` if its total run time or
+      maximum peak RSS exceeds the baseline by more than
+      ``threshold`` (a fraction).
+    * :py:const:`STATUS_IMPROVEMENT` if its total run time is less
+      than the baseline by more than ``threshold``.
+    * :py:const:`STATUS_OK` otherwise.
+
+    :param summary: Summary
+    :type summary: pandas.core.frame.DataFrame
+    :param baseline: Baseline summary
+    :type baseline: pandas.core.frame.DataFrame
+    :param threshold: Threshold
+    :type threshold: float
+    :return: Comparison
+    :rtype: pandas.core.frame.DataFrame
+    :raise ValueError: If the summaries are not both by process or \
+    both by sample
+    """
+    key = summary.columns[0]
+    if key != baseline.columns[0]:
+        raise ValueError("Cannot compare summaries by {} and {}".format(
+            key, baseline.columns[0]))
+    columns = [REALTIME_SECONDS, MAX_PEAK_RSS_MB, CPU_EFFICIENCY]
+    comparison = pd.merge(
+        summary[[key] + columns],
+        baseline[[key] + columns].rename(
+            columns={column: BASELINE_PREFIX + column
+                     for column in columns}),
+        on=key, how="outer", indicator=True, sort=False)
+    comparison[REALTIME_RATIO] = comparison[REALTIME_SECONDS] / \
+        comparison[BASELINE_PREFIX + REALTIME_SECONDS]
+    comparison[PEAK_RSS_RATIO] = comparison[MAX_PEAK_RSS_MB] / \
+        comparison[BASELINE_PREFIX + MAX_PEAK_RSS_MB]
+    statuses = []
+    for _, row in comparison.iterrows():
+        if row["_merge"] == "left_only":
+            statuses.append(STATUS_NEW)
+        elif row["_merge"] == "right_only":
+            statuses.append(STATUS_REMOVED)
+        elif row[REALTIME_RATIO] > 1 + threshold or \
+                row[PEAK_RSS_RATIO] > 1 + threshold:
+            statuses.append(STATUS_REGRESSION)
+        elif row[REALTIME_RATIO] < 1 - threshold:
+            statuses.append(STATUS_IMPROVEMENT)
+        else:
+            statuses.append(STATUS_OK)
+    comparison[COMPARISON_STATUS] = statuses
+    return comparison.drop(columns="_merge").reset_index(drop=True)
+
+
+def get_num_processes(config_file):
+    """
+    Get ``num_processes`` from a workflow configuration file.
+
+    :param config_file: Configuration file
+    :type config_file: str or unicode
+    :return: Number of processes, or 1 if undefined
+    :rtype: int
+    :raise FileNotFoundError: If the file cannot be found
+    """
+    with open(config_file, 'r') as f:
+        config = yaml.load(f, yaml.SafeLoader)
+    num_processes = config.get(params.NUM_PROCESSES) if config else None
+    return int(num_processes) if num_processes is not None else 1
+
+
+def write_table(table, file_name):
+    """
+    Write a table to a tab-separated values file, with a provenance
+    header.
+
+    :param table: Table
+    :type table: pandas.core.frame.DataFrame
+    :param file_name: File name
+    :type file_name: str or unicode
+    """
+    provenance.write_provenance_header(__file__, file_name)
+    table.to_csv(file_name, mode='a', sep="\t", index=False)
+
+
+def analyse_trace(trace_file,
+                  output_dir,
+                  num_processes=1,
+                  baseline_file=None,
+                  threshold=THRESHOLD):
+    """
+    Analyse a Nextflow trace file and write tab-separated values
+    files to ``output_dir``:
+
+    * :py:const:`PROCESS_SUMMARY_FILE`: summary by process (see
+      :py:func:`summarise_trace`).
+    * :py:const:`SAMPLE_SUMMARY_FILE`: summary by sample.
+    * :py:const:`CRITICAL_PATH_FILE`: critical path (see
+      :py:func:`get_critical_path`).
+    * :py:const:`PROCESS_COMPARISON_FILE`,
+      :py:const:`SAMPLE_COMPARISON_FILE`: if ``baseline_file`` is
+      provided, comparisons of the summaries with those of the
+      baseline trace (see :py:func:`compare_summaries`).
+
+    :param trace_file: Trace file
+    :type trace_file: str or unicode
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param num_processes: Number of processes to parallelize over
+    :type num_processes: int
+    :param baseline_file: Baseline trace file
+    :type baseline_file: str or unicode
+    :param threshold: Fractional increase in run time or peak RSS \
+    flagged as a regression
+    :type threshold: float
+    :return: Process summary, sample summary, critical path, total \
+    run time of tasks on critical path (seconds), time from first \
+    submission to last completion (seconds), process comparison and \
+    sample comparison (``None`` if ``baseline_file`` is ``None``)
+    :rtype: tuple(pandas.core.frame.DataFrame, \
+    pandas.core.frame.DataFrame, pandas.core.frame.DataFrame, float, \
+    float, pandas.core.frame.DataFrame, pandas.core.frame.DataFrame)
+    :raise FileNotFoundError: If a trace file cannot be found
+    :raise ValueError: If a trace file is invalid
+    """
+    tasks = load_trace(trace_file)
+    baseline = load_trace(baseline_file) if baseline_file else None
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    processes = summarise_trace(tasks, PROCESS, num_processes)
+    samples = summarise_trace(tasks, SAMPLE, num_processes)
+    critical_path, path_seconds, elapsed_seconds = get_critical_path(tasks)
+    write_table(processes, os.path.join(output_dir, PROCESS_SUMMARY_FILE))
+    write_table(samples, os.path.join(output_dir, SAMPLE_SUMMARY_FILE))
+    write_table(critical_path, os.path.join(output_dir, CRITICAL_PATH_FILE))
+    process_comparison = None
+    sample_comparison = None
+    if baseline is not None:
+        process_comparison = compare_summaries(
+            processes, summarise_trace(baseline, PROCESS, num_processes),
+            threshold)
+        sample_comparison = compare_summaries(
+            samples, summarise_trace(baseline, SAMPLE, num_processes),
+            threshold)
+        write_table(process_comparison,
+                    os.path.join(output_dir, PROCESS_COMPARISON_FILE))
+        write_table(sample_comparison,
+                    os.path.join(output_dir, SAMPLE_COMPARISON_FILE))
+    return (processes, samples, critical_path, path_seconds,
+            elapsed_seconds, process_comparison, sample_comparison)
@@ -0,0 +1,236 @@
+"""
+Pack a riboviz H5 file, and its complementary data files, into a
+single packed H5 file.
+
+A packed H5 file has the following structure::
+
+    GROUP "/" {
+      ATTRIBUTE "riboviz_format" ("packed")
+      ATTRIBUTE "riboviz_format_version" (1)
+      ATTRIBUTE "dataset" (<dataset>)
+      GROUP "packed" {
+        DATASET "data"             int32 (<num_lengths>, <num_positions>)
+        DATASET "gene"             string (<num_genes>)
+        DATASET "offset"           int64 (<num_genes>)
+        DATASET "width"            int32 (<num_genes>)
+        DATASET "lengths"          int32 (<num_lengths>)
+        DATASET "buffer_left"      int32 (<num_genes>)
+        DATASET "buffer_right"     int32 (<num_genes>)
+        DATASET "reads_total"      int32 (<num_genes>)
+        DATASET "reads_by_len"     int32 (<num_genes>, <num_lengths>)
+        DATASET "start_codon_pos"  int32 (<num_genes>, 3)
+        DATASET "stop_codon_pos"   int32 (<num_genes>, 3)
+        DATASET "alias"            string (<num_aliases>)
+        DATASET "alias_gene"       string (<num_aliases>)
+      }
+    }
+
+where:
+
+* ``data`` holds the matrices of read counts by read length (rows)
+  and position (columns) for every gene, concatenated by column in
+  ``gene`` order. The matrix for gene ``i`` is
+  ``data[:, offset[i]:offset[i] + width[i]]``.
+* ``num_positions`` is the sum of ``width``.
+* ``alias`` and ``alias_gene`` hold alternative gene names (e.g. from
+  a secondary ID) and the genes to which these refer.
+* The remaining datasets hold the per-gene attributes of the original
+  H5 file, one row per gene.
+
+Packed H5 files can be read using the gene data functions in
+:py:mod:`riboviz.h5`.
+"""
+import h5py
+import numpy as np
+from riboviz import h5 as h5_utils
+
+CHUNK_SIZE = 8192
+""" Default number of positions per chunk of packed read counts. """
+
+
+class _BlockWriter:
+    """
+    Write columns of read counts to a dataset, buffering the columns
+    so that only whole chunks are written.
+    """
+
+    def __init__(self, dataset, block_size):
+        """
+        Constructor.
+
+        :param self: Object reference
+        :type self: _BlockWriter
+        :param dataset: Dataset
+        :type dataset: h5py.Dataset
+        :param block_size: Number of columns to buffer
+        :type block_size: int
+        """
+        self.dataset = dataset
+        self.buffer = np.zeros((dataset.shape[0], block_size),
+                               dtype=dataset.dtype)
+        self.offset = 0
+        self.used = 0
+
+    def write(self, matrix):
+        """
+        Write columns.
+
+        :param self: Object reference
+        :type self: _BlockWriter
+        :param matrix: Columns
+        :type matrix: numpy.ndarray
+        """
+        start = 0
+        while start < matrix.shape[1]:
+            count = min(matrix.shape[1] - start,
+                        self.buffer.shape[1] - self.used)
+            self.buffer[:, self.used:self.used + count] = \
+                matrix[:, start:start + count]
+            self.used += count
+            start += count
+            if self.used == self.buffer.shape[1]:
+                self.flush()
+
+    def flush(self):
+        """
+        Write any buffered columns.
+
+        :param self: Object reference
+        :type self: _BlockWriter
+        """
+        if self.used > 0:
+            self.dataset[:, self.offset:self.offset + self.used] = \
+                self.buffer[:, :self.used]
+            self.offset += self.used
+            self.used = 0
+
+
+def _get_empty_shape(attribute, num_lengths):
+    """
+    Get the shape of a per-gene attribute dataset for a packed H5
+    file with no genes.
+
+    :param attribute: Attribute name
+    :type attribute: str or unicode
+    :param num_lengths: Number of read lengths
+    :type num_lengths: int
+    :return: Shape
+    :rtype: tuple(int)
+    """
+    if attribute in [h5_utils.START_CODON_POS, h5_utils.STOP_CODON_POS]:
+        return (0, 3)
+    if attribute == h5_utils.READS_BY_LEN:
+        return (0, num_lengths)
+    return (0,)
+
+
+def pack_h5(h5_file,
+            packed_file,
+            dataset=None,
+            codec=h5_utils.GZIP,
+            level=None,
+            shuffle=False,
+            chunk_size=CHUNK_SIZE):
+    """
+    Pack a riboviz H5 file, and its complementary data files, into a
+    single packed H5 file.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    the first gene, which must have a single dataset)
+    :type dataset: str or unicode
+    :param codec: Compression codec, one of \
+    :py:const:`riboviz.h5.CODECS`
+    :type codec: str or unicode
+    :param level: Compression level (``gzip`` only)
+    :type level: int
+    :param shuffle: Apply the HDF5 byte shuffle filter?
+    :type shuffle: bool
+    :param chunk_size: Number of positions per chunk of read counts
+    :type chunk_size: int
+    :raise ValueError: If the H5 file has no genes and ``dataset`` \
+    is ``None``, if ``codec`` or ``level`` are invalid or if genes \
+    have differing read lengths
+    :raise Exception: If problems arise when reading or writing the \
+    files
+    """
+    compression = h5_utils.get_compression_options(codec, level, shuffle)
+    with h5py.File(h5_file, "r") as h5:
+        aliases = h5_utils.get_aliases(h5)
+        genes = [gene for gene in h5_utils.get_genes(h5)
+                 if gene not in aliases]
+        if dataset is None:
+            if not genes:
+                raise ValueError("No genes found in {}".format(h5_file))
+            dataset = h5_utils.get_gene_dataset_name(h5, genes[0])
+        # Collect attributes and widths then write data.
+        columns = {attribute: [] for attribute in h5_utils.GENE_ATTRIBUTES}
+        widths = []
+        for gene in genes:
+            reads = h5[h5_utils.READS_PATH_FORMAT.format(gene=gene,
+                                                         dataset=dataset)]
+            for attribute in h5_utils.GENE_ATTRIBUTES:
+                columns[attribute].append(np.ravel(reads.attrs[attribute]))
+            widths.append(reads[h5_utils.DATA].shape[0])
+        lengths = columns.pop(h5_utils.LENGTHS)
+        read_lengths = lengths[0] if lengths else np.zeros(0)
+        for gene, gene_lengths in zip(genes, lengths):
+            if not np.array_equal(gene_lengths, read_lengths):
+                raise ValueError(
+                    "Gene {} has read lengths {} but expected {}".format(
+                        gene, gene_lengths, read_lengths))
+        widths = np.array(widths, dtype=np.int32)
+        offsets = np.zeros(len(genes), dtype=np.int64)
+        offsets[1:] = np.cumsum(widths[:-1], dtype=np.int64)
+        num_lengths = len(read_lengths)
+        num_positions = int(np.sum(widths, dtype=np.int64))
+        with h5py.File(packed_file, "w") as packed_h5:
+            packed_h5.attrs[h5_utils.FORMAT_ATTR] = h5_utils.PACKED_FORMAT
+            packed_h5.attrs[h5_utils.FORMAT_VERSION_ATTR] = \
+                h5_utils.PACKED_FORMAT_VERSION
+            packed_h5.attrs[h5_utils.DATASET_ATTR] = dataset
+            packed = packed_h5.create_group(h5_utils.PACKED)
+            string_type = h5py.string_dtype()
+            packed.create_dataset(h5_utils.GENE, data=genes,
+                                  dtype=string_type)
+            packed.create_dataset(h5_utils.OFFSET, data=offsets)
+            packed.create_dataset(h5_utils.WIDTH, data=widths)
+            packed.create_dataset(h5_utils.LENGTHS,
+                                  data=np.array(read_lengths,
+                                                dtype=np.int32))
+            for attribute, values in columns.items():
+                if genes:
+                    values = np.array(values, dtype=np.int32)
+                    if values.shape[1] == 1:
+                        values = values[:, 0]
+                else:
+                    values = np.zeros(
+                        _get_empty_shape(attribute, num_lengths),
+                        dtype=np.int32)
+                packed.create_dataset(attribute, data=values)
+            packed.create_dataset(h5_utils.ALIAS,
+                                  data=list(aliases.keys()),
+                                  dtype=string_type)
+            packed.create_dataset(h5_utils.ALIAS_GENE,
+                                  data=list(aliases.values()),
+                                  dtype=string_type)
+            if num_lengths == 0 or num_positions == 0:
+                # Chunks cannot be larger than, or be created for, an
+                # empty dataset.
+                packed.create_dataset(h5_utils.DATA,
+                                      (num_lengths, num_positions),
+                                      dtype=np.int32)
+                return
+            chunk_size = max(1, min(chunk_size, num_positions))
+            data = packed.create_dataset(h5_utils.DATA,
+                                         (num_lengths, num_positions),
+                                         dtype=np.int32,
+                                         chunks=(num_lengths, chunk_size),
+                                         **compression)
+            writer = _BlockWriter(data, chunk_size)
+            for gene in genes:
+                writer.write(h5_utils.get_gene_datamatrix(h5, gene, dataset))
+            writer.flush()
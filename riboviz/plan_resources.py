@@ -0,0 +1,529 @@
+"""
+Plan resources for a workflow run: predict the memory and run time of
+each of the main workflow stages from the sizes of a configuration's
+input FASTQ files, FASTA files and HISAT2 indices, and recommend
+values for the job submission parameters
+:py:const:`riboviz.params.JOB_MEMORY`,
+:py:const:`riboviz.params.JOB_NUM_CPUS` and
+:py:const:`riboviz.params.JOB_RUNTIME` (see
+:py:mod:`riboviz.create_job_script`) and
+:py:const:`riboviz.params.SAMSORT_MEMORY`.
+
+Each stage is modelled by a linear function of the size of its input
+(see :py:const:`STAGE_MODELS`). The model's coefficients are rough
+and conservative. They can be calibrated using Nextflow trace files
+from past runs (see :py:mod:`riboviz.nextflow_trace` and
+:py:func:`calibrate_models`). For each process in the traces, the
+predicted memory is replaced by a base memory plus memory per MB of
+input fitted to the tasks' peak RSS, where a task's tag is a sample,
+or multiplexed file, in the configuration. The predicted memory is
+never less than the model's unless the traces include a task with
+an input at least as large. The largest run time per MB of input
+replaces the predicted run time per MB. Past runs should be on
+comparable data and hardware.
+
+FASTQ files that do not exist are skipped, as they are by the
+workflow. Gzipped FASTQ files are assumed to be
+:py:const:`GZIP_RATIO` times smaller than their uncompressed size.
+"""
+import glob
+import math
+import os
+import os.path
+import numpy as np
+import pandas as pd
+import yaml
+from riboviz import nextflow_trace
+from riboviz import params
+from riboviz import provenance
+
+FASTQ = "fastq"
+""" Stage input, a sample's, or multiplexed, FASTQ file. """
+RRNA_FASTA = "rrna_fasta"
+""" Stage input, rRNA FASTA file. """
+ORF_FASTA = "orf_fasta"
+""" Stage input, ORF FASTA file. """
+RRNA_INDEX = "rrna_index"
+""" Stage index, rRNA HISAT2 index. """
+ORF_INDEX = "orf_index"
+""" Stage index, ORF HISAT2 index. """
+STAGE_MODELS = {
+    "buildIndicesrRNA": (RRNA_FASTA, None, 200, 8, 10, 2),
+    "buildIndicesORF": (ORF_FASTA, None, 200, 8, 10, 2),
+    "cutAdaptersMultiplex": (FASTQ, None, 100, 0, 5, 2),
+    "extractUmisMultiplex": (FASTQ, None, 200, 0, 10, 10),
+    "demultiplex": (FASTQ, None, 200, 0, 10, 4),
+    "cutAdapters": (FASTQ, None, 100, 0, 5, 2),
+    "extractUmis": (FASTQ, None, 200, 0, 10, 10),
+    "hisat2rRNA": (FASTQ, RRNA_INDEX, 200, 0, 10, 2),
+    "hisat2ORF": (FASTQ, ORF_INDEX, 200, 0, 10, 2),
+    "trim5pMismatches": (FASTQ, None, 150, 0, 5, 2),
+    "samViewSort": (FASTQ, None, 100, 0, 5, 1),
+    "dedupUmis": (FASTQ, None, 500, 2, 10, 5),
+    "bamToH5": (FASTQ, None, 1000, 1, 30, 2),
+    "generateStatsFigs": (FASTQ, None, 2000, 0, 60, 1)
+}
+"""
+Stage models. Each process in ``prep_riboviz.nf`` maps to its input,
+the index it loads (or ``None``), base memory (MB), memory per MB of
+input, base run time (seconds) and run time per MB of input
+(seconds, when run on 1 CPU). Memory also includes the size of the
+index. Run time per MB of input is divided by ``num_processes`` for
+:py:const:`riboviz.nextflow_trace.MULTI_PROCESS_PROCESSES`.
+"""
+INDEX_STAGES = ["buildIndicesrRNA", "buildIndicesORF"]
+""" Stages run once, if :py:const:`riboviz.params.BUILD_INDICES`. """
+MULTIPLEX_STAGES = ["cutAdaptersMultiplex", "extractUmisMultiplex",
+                    "demultiplex"]
+""" Stages run for each multiplexed FASTQ file. """
+SAMPLE_STAGES = ["cutAdapters", "extractUmis", "hisat2rRNA", "hisat2ORF",
+                 "trim5pMismatches", "samViewSort", "dedupUmis", "bamToH5",
+                 "generateStatsFigs"]
+"""
+Stages run for each sample. For multiplexed FASTQ files, the
+samples are unknown until demultiplexing, so each multiplexed file
+is planned as if it were one sample.
+"""
+STAGE_CONDITIONS = {
+    "extractUmis": params.EXTRACT_UMIS,
+    "dedupUmis": params.DEDUP_UMIS,
+    "trim5pMismatches": params.TRIM_5P_MISMATCHES
+}
+""" Configuration parameters that must be true for a stage to run. """
+
+GZIP_RATIO = 4
+""" Ratio of uncompressed to gzipped FASTQ file size. """
+INDEX_FASTA_RATIO = 1.5
+""" Ratio of HISAT2 index size to FASTA file size, if not built. """
+HISAT2_INDEX_PATTERN = "{}.*.ht2"
+""" HISAT2 index file pattern, given an index prefix. """
+MEMORY_HEADROOM = 1.25
+""" Factor by which predicted memory is increased. """
+RUNTIME_HEADROOM = 1.5
+""" Factor by which predicted run time is increased. """
+MIN_RUNTIME_SECONDS = 3600
+""" Minimum recommended run time (seconds). """
+SAMSORT_MEMORY_MB = 768
+""" ``samtools sort`` default memory per thread (MB). """
+MAX_SAMSORT_MEMORY_MB = 4096
+""" Largest recommended ``samtools sort`` memory per thread (MB). """
+
+PROCESS = nextflow_trace.PROCESS
+""" Stage column (process name). """
+SAMPLE = nextflow_trace.SAMPLE
+""" Stage column (sample, multiplexed file or index prefix). """
+INPUT_MB = "InputMB"
+""" Stage column (input size, MB). """
+CPUS = "Cpus"
+""" Stage column (CPUs used). """
+MEMORY_MB = "MemoryMB"
+""" Stage column (predicted memory, MB). """
+SECONDS = "Seconds"
+""" Stage column (predicted run time, seconds). """
+SOURCE = "Source"
+""" Stage column (:py:const:`SOURCE_MODEL` or :py:const:`SOURCE_TRACE`). """
+STAGE_COLUMNS = [PROCESS, SAMPLE, INPUT_MB, CPUS, MEMORY_MB, SECONDS,
+                 SOURCE]
+""" Stage columns. """
+SOURCE_MODEL = "model"
+""" Prediction source, :py:const:`STAGE_MODELS`. """
+SOURCE_TRACE = "trace"
+""" Prediction source, calibrated by trace files. """
+MB = 1000000
+""" Bytes per MB. """
+
+
+def get_file_mb(file_name):
+    """
+    Get the size of a file in MB, or the estimated uncompressed size
+    if the file is gzipped.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: Size (MB)
+    :rtype: float
+    :raise FileNotFoundError: If the file cannot be found
+    """
+    size = os.path.getsize(file_name) / MB
+    if file_name.endswith(".gz"):
+        size *= GZIP_RATIO
+    return size
+
+
+def get_multiplex_id(file_name):
+    """
+    Get the ID given by the workflow to a multiplexed FASTQ file, its
+    name without ``.gz``, ``.fastq`` or ``.fq`` extensions.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: ID
+    :rtype: str or unicode
+    """
+    multiplex_id = os.path.basename(file_name)
+    for extension in [".gz", ".fastq", ".fq"]:
+        if multiplex_id.endswith(extension):
+            multiplex_id = multiplex_id[:-len(extension)]
+    return multiplex_id
+
+
+def get_fastq_sizes(config):
+    """
+    Get the sizes of the sample and multiplexed FASTQ files in a
+    configuration. Files that do not exist are skipped.
+
+    :param config: Workflow configuration
+    :type config: dict
+    :return: Sample sizes (sample ID to MB), multiplexed file sizes \
+    (multiplexed ID to MB) and missing files
+    :rtype: tuple(dict, dict, list(str or unicode))
+    """
+    input_dir = config.get(params.INPUT_DIR) or ""
+    samples = {}
+    multiplexes = {}
+    missing = []
+    fq_files = config.get(params.FQ_FILES) or {}
+    for sample_id, file_name in fq_files.items():
+        file_name = os.path.join(input_dir, file_name)
+        if os.path.isfile(file_name):
+            samples[sample_id] = get_file_mb(file_name)
+        else:
+            missing.append(file_name)
+    multiplex_files = config.get(params.MULTIPLEX_FQ_FILES) or []
+    for file_name in multiplex_files:
+        file_name = os.path.join(input_dir, file_name)
+        if os.path.isfile(file_name):
+            multiplexes[get_multiplex_id(file_name)] = get_file_mb(file_name)
+        else:
+            missing.append(file_name)
+    return samples, multiplexes, missing
+
+
+def get_index_mb(config, prefix_param, fasta_param):
+    """
+    Get the size of a HISAT2 index, from the index files, if present,
+    or estimated from the size of the FASTA file from which it is
+    built.
+
+    :param config: Workflow configuration
+    :type config: dict
+    :param prefix_param: Index prefix configuration parameter
+    :type prefix_param: str or unicode
+    :param fasta_param: FASTA file configuration parameter
+    :type fasta_param: str or unicode
+    :return: Index size (MB) and FASTA file size (MB, or ``None`` \
+    if the FASTA file does not exist)
+    :rtype: tuple(float, float)
+    :raise FileNotFoundError: If neither the index nor FASTA file \
+    can be found
+    """
+    fasta_file = config.get(fasta_param)
+    fasta_mb = None
+    if fasta_file and os.path.isfile(fasta_file):
+        fasta_mb = get_file_mb(fasta_file)
+    index_files = []
+    if config.get(params.INDEX_DIR) and config.get(prefix_param):
+        index_files = glob.glob(os.path.join(
+            config[params.INDEX_DIR],
+            HISAT2_INDEX_PATTERN.format(config[prefix_param])))
+    if index_files and not config.get(params.BUILD_INDICES):
+        return sum(get_file_mb(f) for f in index_files), fasta_mb
+    if fasta_mb is None:
+        raise FileNotFoundError(
+            "No such index or FASTA file for {}: {}".format(
+                prefix_param, fasta_file))
+    return fasta_mb * INDEX_FASTA_RATIO, fasta_mb
+
+
+def calibrate_memory(process, input_mb, peak_mb):
+    """
+    Fit a process's memory, as a base memory plus memory per MB of
+    input, to the peak RSS of its tasks. If the tasks have at least
+    two different input sizes then the memory per MB is the slope of
+    a least squares fit, or 0 if this is negative. Otherwise it is
+    that of the process's model in :py:const:`STAGE_MODELS`, or 0 if
+    it has no model. The base memory is the smallest for which the
+    fit is at least the peak RSS of every task.
+
+    If no task has a known input size then the base memory is the
+    largest peak RSS, the memory per MB is 0 and the largest input
+    size is ``None``.
+
+    :param process: Process
+    :type process: str or unicode
+    :param input_mb: Input size of each task (MB), ``NaN`` if unknown
+    :type input_mb: pandas.core.series.Series
+    :param peak_mb: Peak RSS of each task (MB), ``NaN`` if unknown
+    :type peak_mb: pandas.core.series.Series
+    :return: Base memory (MB), memory per MB of input and largest \
+    input size (MB) of the tasks, or ``None`` if no task has a peak \
+    RSS
+    :rtype: tuple(float, float, float)
+    """
+    if peak_mb.isna().all():
+        return None
+    known = pd.DataFrame({"input_mb": input_mb.values,
+                          "peak_mb": peak_mb.values}).dropna()
+    if known.empty:
+        return peak_mb.max(), 0, None
+    if known["input_mb"].nunique() > 1:
+        mb_per_mb = max(0, np.polyfit(known["input_mb"],
+                                      known["peak_mb"], 1)[0])
+    elif process in STAGE_MODELS:
+        mb_per_mb = STAGE_MODELS[process][3]
+    else:
+        mb_per_mb = 0
+    base_mb = (known["peak_mb"] - mb_per_mb * known["input_mb"]).max()
+    return base_mb, mb_per_mb, known["input_mb"].max()
+
+
+def calibrate_models(trace_files, input_sizes):
+    """
+    Calibrate stage models using Nextflow trace files. For each
+    process with completed tasks, fit the memory to the tasks' peak
+    RSS and input sizes, where their tags are in ``input_sizes``
+    (see :py:func:`calibrate_memory`) and get the largest run time
+    per MB of input.
+
+    :param trace_files: Nextflow trace files
+    :type trace_files: list(str or unicode)
+    :param input_sizes: Input sizes, keyed by task tag (MB)
+    :type input_sizes: dict
+    :return: Process to memory calibration (see \
+    :py:func:`calibrate_memory`) or ``None`` and run time per MB \
+    (seconds) or ``None``
+    :rtype: dict(str or unicode => tuple(tuple(float, float, float), \
+    float))
+    :raise FileNotFoundError: If a file cannot be found
+    :raise ValueError: If a file is invalid
+    """
+    tasks = pd.concat([nextflow_trace.load_trace(trace_file)
+                       for trace_file in trace_files])
+    tasks = tasks[tasks[nextflow_trace.STATUS].isin(
+        nextflow_trace.COMPLETED_STATUSES)]
+    calibration = {}
+    for process, process_tasks in tasks.groupby(nextflow_trace.PROCESS):
+        input_mb = process_tasks[nextflow_trace.TAG].map(input_sizes)
+        memory = calibrate_memory(
+            process, input_mb, process_tasks[nextflow_trace.PEAK_RSS] / MB)
+        rates = (process_tasks[nextflow_trace.REALTIME] /
+                 input_mb).dropna()
+        calibration[process] = (
+            memory, rates.max() if not rates.empty else None)
+    return calibration
+
+
+def predict_stage(process, sample, input_mb, index_mb, num_processes,
+                  samsort_mb, calibration):
+    """
+    Predict a stage's memory and run time.
+
+    If the process's memory is calibrated (see
+    :py:func:`calibrate_models`) then the calibrated memory is used.
+    If the calibration's tasks do not include an input at least as
+    large as ``input_mb`` then the memory predicted by the model is
+    used if it is larger.
+
+    :param process: Process
+    :type process: str or unicode
+    :param sample: Sample, multiplexed file or index prefix
+    :type sample: str or unicode
+    :param input_mb: Input size (MB)
+    :type input_mb: float
+    :param index_mb: Size of index loaded by process (MB)
+    :type index_mb: float
+    :param num_processes: Number of processes to parallelize over
+    :type num_processes: int
+    :param samsort_mb: ``samtools sort`` memory per thread (MB)
+    :type samsort_mb: int
+    :param calibration: Calibration (see :py:func:`calibrate_models`)
+    :type calibration: dict
+    :return: Stage, with values for :py:const:`STAGE_COLUMNS`
+    :rtype: list
+    """
+    _, _, base_mb, mb_per_mb, base_seconds, seconds_per_mb = \
+        STAGE_MODELS[process]
+    cpus = 1
+    if process in nextflow_trace.MULTI_PROCESS_PROCESSES:
+        cpus = num_processes
+    memory_mb = base_mb + mb_per_mb * input_mb + index_mb
+    if process == "samViewSort":
+        memory_mb += samsort_mb * num_processes
+    seconds = base_seconds + seconds_per_mb * input_mb / cpus
+    source = SOURCE_MODEL
+    memory, trace_seconds_per_mb = calibration.get(process, (None, None))
+    if memory is not None:
+        trace_base_mb, trace_mb_per_mb, trace_input_mb = memory
+        trace_memory_mb = trace_base_mb + trace_mb_per_mb * input_mb
+        if trace_input_mb is not None and trace_input_mb >= input_mb:
+            memory_mb = trace_memory_mb
+        else:
+            memory_mb = max(memory_mb, trace_memory_mb)
+        source = SOURCE_TRACE
+    if trace_seconds_per_mb is not None:
+        seconds = trace_seconds_per_mb * input_mb
+        source = SOURCE_TRACE
+    return [process, sample, input_mb, cpus, memory_mb, seconds, source]
+
+
+def format_memory(megabytes, unit):
+    """
+    Format memory, rounded up, for Grid Engine or ``samtools sort``.
+
+    :param megabytes: Memory (MB)
+    :type megabytes: float
+    :param unit: ``G`` or ``M``
+    :type unit: str or unicode
+    :return: Memory e.g. ``8G``
+    :rtype: str or unicode
+    """
+    divisor = 1000 if unit == "G" else 1
+    return "{}{}".format(max(1, math.ceil(megabytes / divisor)), unit)
+
+
+def format_runtime(seconds):
+    """
+    Format run time, rounded up to the hour, as ``HH:MM:SS``.
+
+    :param seconds: Run time (seconds)
+    :type seconds: float
+    :return: Run time
+    :rtype: str or unicode
+    """
+    hours = max(1, math.ceil(seconds / 3600))
+    return "{:02d}:00:00".format(hours)
+
+
+def plan_resources(config, trace_files=None):
+    """
+    Predict the memory and run time of each stage of a workflow run
+    and recommend job submission parameters.
+
+    :py:const:`riboviz.params.JOB_NUM_CPUS` is ``num_processes``.
+    :py:const:`riboviz.params.SAMSORT_MEMORY` is enough memory per
+    thread to sort the largest sample in memory, between
+    :py:const:`SAMSORT_MEMORY_MB` and
+    :py:const:`MAX_SAMSORT_MEMORY_MB`.
+    :py:const:`riboviz.params.JOB_MEMORY` is per CPU (as for Grid
+    Engine ``h_vmem``) and allows for the largest stage, or for
+    single-threaded stages running on every CPU at once.
+    :py:const:`riboviz.params.JOB_RUNTIME` allows for every stage
+    running one after another. Both are increased by
+    :py:const:`MEMORY_HEADROOM` and :py:const:`RUNTIME_HEADROOM`.
+
+    :param config: Workflow configuration
+    :type config: dict
+    :param trace_files: Nextflow trace files from past runs
+    :type trace_files: list(str or unicode)
+    :return: Stages, with columns :py:const:`STAGE_COLUMNS`, \
+    recommended configuration and missing FASTQ files
+    :rtype: tuple(pandas.core.frame.DataFrame, dict, \
+    list(str or unicode))
+    :raise FileNotFoundError: If an index, FASTA or trace file cannot \
+    be found
+    :raise ValueError: If there are no FASTQ files or a trace file \
+    is invalid
+    """
+    samples, multiplexes, missing = get_fastq_sizes(config)
+    if not samples and not multiplexes:
+        raise ValueError("No FASTQ files found for {} or {}".format(
+            params.FQ_FILES, params.MULTIPLEX_FQ_FILES))
+    num_processes = int(config.get(params.NUM_PROCESSES) or 1)
+    rrna_index_mb, rrna_fasta_mb = get_index_mb(
+        config, params.RRNA_INDEX_PREFIX, params.RRNA_FASTA_FILE)
+    orf_index_mb, orf_fasta_mb = get_index_mb(
+        config, params.ORF_INDEX_PREFIX, params.ORF_FASTA_FILE)
+    input_sizes = dict(samples)
+    input_sizes.update(multiplexes)
+    calibration = {}
+    if trace_files:
+        calibration = calibrate_models(trace_files, input_sizes)
+    largest_mb = max(input_sizes.values())
+    samsort_mb = min(max(math.ceil(largest_mb / num_processes),
+                         SAMSORT_MEMORY_MB),
+                     MAX_SAMSORT_MEMORY_MB)
+    sizes = {RRNA_FASTA: rrna_fasta_mb, ORF_FASTA: orf_fasta_mb,
+             RRNA_INDEX: rrna_index_mb, ORF_INDEX: orf_index_mb}
+    prefixes = {RRNA_FASTA: config.get(params.RRNA_INDEX_PREFIX),
+                ORF_FASTA: config.get(params.ORF_INDEX_PREFIX)}
+    stages = []
+    if config.get(params.BUILD_INDICES):
+        for process in INDEX_STAGES:
+            fasta = STAGE_MODELS[process][0]
+            stages.append(predict_stage(
+                process, prefixes[fasta], sizes[fasta], 0, num_processes,
+                samsort_mb, calibration))
+    for process in MULTIPLEX_STAGES:
+        for multiplex_id, input_mb in multiplexes.items():
+            stages.append(predict_stage(
+                process, multiplex_id, input_mb, 0, num_processes,
+                samsort_mb, calibration))
+    for process in SAMPLE_STAGES:
+        condition = STAGE_CONDITIONS.get(process)
+        if condition is not None and not config.get(condition):
+            continue
+        stage_inputs = input_sizes
+        if process in ["cutAdapters", "extractUmis"]:
+            stage_inputs = samples
+        index = STAGE_MODELS[process][1]
+        index_mb = sizes[index] if index else 0
+        for sample, input_mb in stage_inputs.items():
+            stages.append(predict_stage(
+                process, sample, input_mb, index_mb, num_processes,
+                samsort_mb, calibration))
+    stages = pd.DataFrame(stages, columns=STAGE_COLUMNS)
+    multi_process = stages[PROCESS].isin(
+        nextflow_trace.MULTI_PROCESS_PROCESSES)
+    peak_mb = max(stages[MEMORY_MB][multi_process].max(),
+                  stages[MEMORY_MB][~multi_process].max() * num_processes)
+    peak_mb *= MEMORY_HEADROOM
+    runtime = stages[SECONDS].sum() * RUNTIME_HEADROOM
+    recommendations = {
+        params.JOB_NUM_CPUS: num_processes,
+        params.JOB_MEMORY: format_memory(peak_mb / num_processes, "G"),
+        params.JOB_RUNTIME: format_runtime(max(runtime,
+                                               MIN_RUNTIME_SECONDS)),
+        params.SAMSORT_MEMORY: format_memory(samsort_mb, "M")
+    }
+    return stages, recommendations, missing
+
+
+def plan_resources_file(config_file,
+                        trace_files=None,
+                        output_config_file=None,
+                        stages_file=None):
+    """
+    Plan resources for a workflow configuration file (see
+    :py:func:`plan_resources`).
+
+    If ``output_config_file`` is provided, the configuration, updated
+    with the recommendations, is written to it. This can then be used
+    with :py:mod:`riboviz.create_job_script`. Comments in the
+    configuration file are not preserved.
+
+    :param config_file: Workflow configuration file
+    :type config_file: str or unicode
+    :param trace_files: Nextflow trace files from past runs
+    :type trace_files: list(str or unicode)
+    :param output_config_file: Updated configuration file
+    :type output_config_file: str or unicode
+    :param stages_file: Stages file (tab-separated values)
+    :type stages_file: str or unicode
+    :return: Stages, recommended configuration and missing FASTQ files
+    :rtype: tuple(pandas.core.frame.DataFrame, dict, \
+    list(str or unicode))
+    :raise FileNotFoundError: If a file cannot be found
+    :raise ValueError: If there are no FASTQ files or a trace file \
+    is invalid
+    """
+    with open(config_file, 'r') as f:
+        config = yaml.load(f, yaml.SafeLoader)
+    stages, recommendations, missing = plan_resources(config, trace_files)
+    if output_config_file is not None:
+        config.update(recommendations)
+        with open(output_config_file, 'w') as f:
+            yaml.dump(config, f, sort_keys=False)
+    if stages_file is not None:
+        provenance.write_provenance_header(__file__, stages_file)
+        stages.to_csv(stages_file, mode='a', sep="\t", index=False)
+    return stages, recommendations, missing
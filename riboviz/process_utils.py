@@ -1,32 +1,350 @@
 """
 Python ``subprocess``-related functions.
+
+Commands can be run one at a time, chained into a pipeline (see
+:py:func:`run_pipeline`) or run concurrently, limited by a number of
+CPU slots (see :py:func:`run_logged_commands`).
+
+The resources used by each command run by these functions can be
+recorded. If a resource log file is given, or the
+:py:const:`RESOURCE_LOG_ENV` environment variable names one, then a
+JSON record is appended to the file for each command, with the
+command, an optional label (for example, a sample name), its exit
+code, wall time, user and system CPU time, peak resident set size
+(RSS) and the number of bytes written to standard output and standard
+error (see :py:func:`create_resource_record`). The log can be
+summarised with :py:func:`summarise_resource_log`. On Linux, a
+command's peak RSS is at least that of the Python process that ran
+it, as the peak is preserved when the command is started.
 """
+import collections
+import json
+import os
+import signal
+import stat
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from riboviz import utils
 
+RESOURCE_LOG_ENV = "RIBOVIZ_RESOURCE_LOG"
+""" Environment variable with resource log file. """
+RESOURCE_LABEL_ENV = "RIBOVIZ_RESOURCE_LABEL"
+""" Environment variable with default resource record label. """
+COMMAND = "command"
+""" Resource record key (command). """
+PROGRAM = "program"
+""" Resource record key (program name(s)). """
+LABEL = "label"
+""" Resource record key (label). """
+START = "start"
+""" Resource record key (start time, seconds since the epoch). """
+EXIT_CODE = "exit_code"
+""" Resource record key (exit code). """
+WALL_SECONDS = "wall_seconds"
+""" Resource record key (wall time, seconds). """
+USER_SECONDS = "user_seconds"
+""" Resource record key (user CPU time, seconds). """
+SYSTEM_SECONDS = "system_seconds"
+""" Resource record key (system CPU time, seconds). """
+PEAK_RSS_MB = "peak_rss_mb"
+""" Resource record key (peak resident set size, MB). """
+STDIN_BYTES = "stdin_bytes"
+""" Resource record key (bytes read from standard input). """
+STDOUT_BYTES = "stdout_bytes"
+""" Resource record key (bytes written to standard output). """
+STDERR_BYTES = "stderr_bytes"
+""" Resource record key (bytes written to standard error). """
+RESOURCE_KEYS = [COMMAND, PROGRAM, LABEL, START, EXIT_CODE, WALL_SECONDS,
+                 USER_SECONDS, SYSTEM_SECONDS, PEAK_RSS_MB, STDIN_BYTES,
+                 STDOUT_BYTES, STDERR_BYTES]
+""" Resource record keys. """
+NUM_COMMANDS = "num_commands"
+""" Resource summary column (number of commands). """
+WALL_FRACTION = "wall_fraction"
+""" Resource summary column (fraction of the label's wall time). """
+SUMMARY_COLUMNS = [LABEL, PROGRAM, NUM_COMMANDS, WALL_SECONDS,
+                   USER_SECONDS, SYSTEM_SECONDS, PEAK_RSS_MB, STDIN_BYTES,
+                   STDOUT_BYTES, STDERR_BYTES, WALL_FRACTION]
+""" Resource summary columns. """
+JOB_CMD = "cmd"
+""" Job key (command and arguments). """
+JOB_LOG_FILE = "log_file"
+""" Job key (log file). """
+JOB_CPUS = "cpus"
+""" Job key (number of CPU slots). """
+CPU_OPTIONS = ["-p", "--threads", "-@"]
+"""
+Command-line options for number of threads, as used by ``hisat2``
+(``-p``, ``--threads``) and ``samtools`` (``-@``, ``--threads``).
+"""
+JOB_LABEL = "label"
+""" Job key (resource record label). """
+PIPELINE_BUFFER_SIZE = 1024 * 1024
+"""
+Number of bytes read at a time between pipeline stages (see
+:py:func:`run_pipeline`).
+"""
+
+
+def maxrss_to_mb(maxrss):
+    """
+    Convert a ``ru_maxrss`` value, which is in bytes on macOS and
+    kilobytes on Linux, to MB.
+
+    :param maxrss: ``ru_maxrss`` value
+    :type maxrss: int
+    :return: MB
+    :rtype: float
+    """
+    if sys.platform == "darwin":
+        return maxrss / 1e6
+    return maxrss * 1024 / 1e6
+
+
+def get_file_size(f):
+    """
+    Get the size of a file after flushing it, if it is a regular
+    file.
+
+    :param f: File
+    :type f: _io.TextIOWrapper
+    :return: Size in bytes, or ``None`` if ``f`` is not a regular \
+    file (for example, a terminal or pipe)
+    :rtype: int
+    """
+    try:
+        f.flush()
+        status = os.fstat(f.fileno())
+    except (AttributeError, OSError, ValueError):
+        return None
+    if not stat.S_ISREG(status.st_mode):
+        return None
+    return status.st_size
+
+
+def get_size_increase(f, start_size):
+    """
+    Get the increase in size of a file since
+    :py:func:`get_file_size` was called.
+
+    :param f: File
+    :type f: _io.TextIOWrapper
+    :param start_size: Size returned by :py:func:`get_file_size`
+    :type start_size: int
+    :return: Increase in bytes, or ``None`` if the size is unknown
+    :rtype: int
+    """
+    end_size = get_file_size(f)
+    if start_size is None or end_size is None:
+        return None
+    return end_size - start_size
+
+
+def wait_for_process(process):
+    """
+    Wait for a process to terminate, set its return code and get its
+    resource usage. ``os.wait4`` is used, if available, so the
+    resource usage is that of the process alone.
+
+    :param process: Process
+    :type process: subprocess.Popen
+    :return: Resource usage, or ``None`` if ``os.wait4`` is not \
+    available
+    :rtype: resource.struct_rusage
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+    _, status, rusage = os.wait4(process.pid, 0)
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    return rusage
+
+
+def create_resource_record(cmds, label, start, wall_seconds, exit_code,
+                           rusages, stdout_bytes, stderr_bytes,
+                           stdin_bytes=None):
+    """
+    Create a resource record for a command, or a pipeline of
+    commands. For a pipeline, CPU times are summed and the peak RSS
+    is the sum of the commands' peak RSS, as the commands run
+    concurrently.
+
+    :param cmds: Commands and arguments
+    :type cmds: list(list(str or unicode))
+    :param label: Label or ``None``
+    :type label: str or unicode
+    :param start: Start time (seconds since the epoch)
+    :type start: float
+    :param wall_seconds: Wall time (seconds)
+    :type wall_seconds: float
+    :param exit_code: Exit code
+    :type exit_code: int
+    :param rusages: Resource usage of each command, or ``None`` if \
+    unavailable
+    :type rusages: list(resource.struct_rusage)
+    :param stdout_bytes: Bytes written to standard output, or \
+    ``None`` if unknown
+    :type stdout_bytes: int
+    :param stderr_bytes: Bytes written to standard error, or \
+    ``None`` if unknown
+    :type stderr_bytes: int
+    :param stdin_bytes: Bytes read from standard input, or ``None`` \
+    if unknown
+    :type stdin_bytes: int
+    :return: Resource record, with keys :py:const:`RESOURCE_KEYS`
+    :rtype: dict
+    """
+    record = dict.fromkeys(RESOURCE_KEYS)
+    record.update({
+        COMMAND: " | ".join(utils.list_to_str(cmd) for cmd in cmds),
+        PROGRAM: " | ".join(os.path.basename(cmd[0]) for cmd in cmds),
+        LABEL: label,
+        START: start,
+        EXIT_CODE: exit_code,
+        WALL_SECONDS: wall_seconds,
+        STDIN_BYTES: stdin_bytes,
+        STDOUT_BYTES: stdout_bytes,
+        STDERR_BYTES: stderr_bytes
+    })
+    if None not in rusages:
+        record[USER_SECONDS] = sum(rusage.ru_utime for rusage in rusages)
+        record[SYSTEM_SECONDS] = sum(rusage.ru_stime for rusage in rusages)
+        record[PEAK_RSS_MB] = sum(maxrss_to_mb(rusage.ru_maxrss)
+                                  for rusage in rusages)
+    return record
+
+
+def write_resource_record(record, resource_log=None):
+    """
+    Append a resource record, as a line of JSON, to a resource log
+    file. If ``resource_log`` is ``None`` then the file named by the
+    :py:const:`RESOURCE_LOG_ENV` environment variable, if any, is
+    used. If there is no file then the record is not written.
+
+    :param record: Resource record (see \
+    :py:func:`create_resource_record`)
+    :type record: dict
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    """
+    resource_log = resource_log or os.environ.get(RESOURCE_LOG_ENV)
+    if not resource_log:
+        return
+    if record[LABEL] is None:
+        record[LABEL] = os.environ.get(RESOURCE_LABEL_ENV)
+    # A single write in append mode so records from concurrent
+    # processes are not interleaved.
+    with open(resource_log, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_resource_log(resource_log):
+    """
+    Load resource records from a resource log file.
+
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    :return: Resource records
+    :rtype: list(dict)
+    :raise FileNotFoundError: If the file cannot be found
+    :raise ValueError: If a line is not valid JSON
+    """
+    with open(resource_log) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarise_resource_log(resource_log):
+    """
+    Summarise the resources used by each program for each label in
+    a resource log file. Times and bytes are summed, peak RSS is the
+    maximum, and ``wall_fraction`` is the fraction of the label's
+    total wall time taken by the program. Rows are sorted by label
+    and decreasing wall time, so the program that dominates each
+    label is listed first.
 
-def run_command(cmd, out=sys.stdout, err=sys.stderr):
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    :return: Summary with columns :py:const:`SUMMARY_COLUMNS`
+    :rtype: pandas.core.frame.DataFrame
+    :raise FileNotFoundError: If the file cannot be found
+    :raise ValueError: If a line is not valid JSON
+    """
+    import pandas as pd
+    records = pd.DataFrame(load_resource_log(resource_log),
+                           columns=RESOURCE_KEYS)
+    if records.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    records[LABEL] = records[LABEL].fillna("")
+    summary = records.groupby([LABEL, PROGRAM], as_index=False).agg(
+        **{NUM_COMMANDS: (COMMAND, "size"),
+           WALL_SECONDS: (WALL_SECONDS, "sum"),
+           USER_SECONDS: (USER_SECONDS, "sum"),
+           SYSTEM_SECONDS: (SYSTEM_SECONDS, "sum"),
+           PEAK_RSS_MB: (PEAK_RSS_MB, "max"),
+           STDIN_BYTES: (STDIN_BYTES, "sum"),
+           STDOUT_BYTES: (STDOUT_BYTES, "sum"),
+           STDERR_BYTES: (STDERR_BYTES, "sum")})
+    totals = summary.groupby(LABEL)[WALL_SECONDS].transform("sum")
+    summary[WALL_FRACTION] = summary[WALL_SECONDS] / totals
+    summary = summary.sort_values([LABEL, WALL_SECONDS],
+                                  ascending=[True, False])
+    return summary[SUMMARY_COLUMNS].reset_index(drop=True)
+
+
+def run_command(cmd, out=sys.stdout, err=sys.stderr, resource_log=None,
+                label=None):
     """
     Run operating system command via Python ``subprocess``.
 
+    Bytes written to standard output and standard error are only
+    recorded if they are regular files. If they are the same file
+    then the bytes written to both are recorded as standard output.
+
     :param cmd: Commnand and arguments
     :type cmd: list(str or unicode)
     :param out: Standard output desination (``sys.stdout`` or file)
     :type out: _io.TextIOWrapper
     :param err: Standard error desination (``sys.stderr`` or file)
     :type err: _io.TextIOWrapper
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise AssertionError: If the command returns a non-zero exit code
     """
-    exit_code = subprocess.call(cmd, stdout=out, stderr=err)
+    out_size = get_file_size(out)
+    err_size = get_file_size(err) if err is not out else None
+    start = time.time()
+    wall_start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=out, stderr=err)
+    rusage = wait_for_process(process)
+    wall_seconds = time.perf_counter() - wall_start
+    exit_code = process.returncode
+    stderr_bytes = 0 if err is out else get_size_increase(err, err_size)
+    write_resource_record(
+        create_resource_record([cmd], label, start, wall_seconds,
+                               exit_code, [rusage],
+                               get_size_increase(out, out_size),
+                               stderr_bytes),
+        resource_log)
     assert exit_code == 0, "%s failed with exit code %d" % (cmd, exit_code)
 
 
-def run_redirect_command(cmd, out, err=sys.stderr):
+def run_redirect_command(cmd, out, err=sys.stderr, resource_log=None,
+                         label=None):
     """
     Run operating system command via Python ``subprocess`` and
-    redirect output to a file. Uses a pattern suggested by:
-    https://www.saltycrane.com/blog/2008/09/how-get-stdout-and-stderr-using-python-subprocess-module/
+    redirect output to a file. Standard output is written directly to
+    the file. Standard error is captured in a temporary file, rather
+    than a pipe, so the process's resource usage can be collected
+    when it terminates.
 
     :param cmd: Commnand and arguments
     :type cmd: list(str or unicode)
@@ -34,27 +352,46 @@ def run_redirect_command(cmd, out, err=sys.stderr):
     :type out: str or unicode
     :param err: Standard error desination (``sys.stderr`` or file)
     :type err: _io.TextIOWrapper
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise FileNotFoundError: if the command to run cannot be found
     :raise AssertionError: If the command returns a non-zero exit code
     """
-    p = subprocess.Popen(cmd,
-                         stdout=subprocess.PIPE,
-                         stderr=subprocess.PIPE)
-    p_out, p_err = p.communicate()
+    with open(out, "wb") as f, tempfile.TemporaryFile() as tmp_err:
+        start = time.time()
+        wall_start = time.perf_counter()
+        p = subprocess.Popen(cmd, stdout=f, stderr=tmp_err)
+        rusage = wait_for_process(p)
+        wall_seconds = time.perf_counter() - wall_start
+        stdout_bytes = os.fstat(f.fileno()).st_size
+        tmp_err.seek(0)
+        p_err = tmp_err.read()
     exit_code = p.returncode
-    with open(out, "wb") as f:
-        f.write(p_out)
-    # communicate() returns bytes, so convert to string.
     err.write(p_err.decode('utf-8'))
+    write_resource_record(
+        create_resource_record([cmd], label, start, wall_seconds,
+                               exit_code, [rusage], stdout_bytes,
+                               len(p_err)),
+        resource_log)
     assert exit_code == 0, "%s failed with exit code %d" % (cmd, exit_code)
 
 
-def run_pipe_command(cmd1, cmd2, out=sys.stdout, err=sys.stderr):
+def run_pipe_command(cmd1, cmd2, out=sys.stdout, err=sys.stderr,
+                     resource_log=None, label=None):
     """
     Run operating system command via Python ``subprocess`` and pipe
     output into another command. Uses pattern suggested by:
     https://docs.python.org/2/library/subprocess.html#replacing-shell-pipeline
 
+    The second command's standard output and standard error are
+    captured in temporary files, rather than pipes, so the
+    processes' resource usage can be collected when they terminate.
+    Bytes written to standard error by the first command are only
+    recorded if ``err`` is a regular file.
+
     :param cmd1: Commnand and arguments
     :type cmd1: list(str or unicode)
     :param cmd2: Commnand and arguments
@@ -63,30 +400,321 @@ def run_pipe_command(cmd1, cmd2, out=sys.stdout, err=sys.stderr):
     :type out: _io.TextIOWrapper
     :param err: Standard error desination (``sys.stderr`` or file)
     :type err: _io.TextIOWrapper
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise FileNotFoundError: if the commands to run cannot be found
     :raise AssertionError: If the commands return a non-zero exit code
     """
-    process1 = subprocess.Popen(cmd1,
-                                stdout=subprocess.PIPE,
-                                stderr=err)
-    process2 = subprocess.Popen(cmd2,
-                                stdin=process1.stdout,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE)
-    process1.stdout.close()
-    p_out, p_err = process2.communicate()
+    err_size = get_file_size(err)
+    with tempfile.TemporaryFile() as tmp_out, \
+            tempfile.TemporaryFile() as tmp_err:
+        start = time.time()
+        wall_start = time.perf_counter()
+        process1 = subprocess.Popen(cmd1,
+                                    stdout=subprocess.PIPE,
+                                    stderr=err)
+        process2 = subprocess.Popen(cmd2,
+                                    stdin=process1.stdout,
+                                    stdout=tmp_out,
+                                    stderr=tmp_err)
+        process1.stdout.close()
+        rusage2 = wait_for_process(process2)
+        rusage1 = wait_for_process(process1)
+        wall_seconds = time.perf_counter() - wall_start
+        tmp_out.seek(0)
+        p_out = tmp_out.read()
+        tmp_err.seek(0)
+        p_err = tmp_err.read()
+    stderr_bytes = get_size_increase(err, err_size)
     out.write(p_out.decode('utf-8'))
     err.write(p_err.decode('utf-8'))
     exit_code = process2.returncode
+    if stderr_bytes is not None:
+        stderr_bytes += len(p_err)
+    write_resource_record(
+        create_resource_record([cmd1, cmd2], label, start, wall_seconds,
+                               exit_code, [rusage1, rusage2], len(p_out),
+                               stderr_bytes),
+        resource_log)
     assert exit_code == 0, ("%s | %s failed with exit code %d"
                             % (cmd1, cmd2, exit_code))
 
 
+def get_stage_name(stage):
+    """
+    Get the name of a pipeline stage (see :py:func:`run_pipeline`).
+
+    :param stage: Command and arguments, or Python stage
+    :type stage: list(str or unicode) or callable
+    :return: Command, or Python stage name
+    :rtype: str or unicode
+    """
+    if callable(stage):
+        return getattr(stage, "__name__", type(stage).__name__)
+    return utils.list_to_str(stage)
+
+
+def count_bytes(chunks, counts, index):
+    """
+    Iterate over chunks of bytes, adding their lengths to a count.
+
+    :param chunks: Chunks
+    :type chunks: iterable(bytes)
+    :param counts: Counts
+    :type counts: list(int)
+    :param index: Index of count to update
+    :type index: int
+    :return: Chunks
+    :rtype: iterable(bytes)
+    """
+    for chunk in chunks:
+        counts[index] += len(chunk)
+        yield chunk
+
+
+def run_pipeline_link(link, buffer_size):
+    """
+    Copy data from a process's standard output through zero or more
+    Python stages to another process's standard input or an output
+    file (see :py:func:`run_pipeline`). Runs in its own thread.
+
+    ``link`` is updated with the bytes read from the source and
+    output by each Python stage (``counts``), the time the link
+    finished (``end``) and any exception raised by a Python stage
+    (``error``). If the sink is closed by its process then the link
+    stops without error and closes its source, so the source process
+    is sent ``SIGPIPE``.
+
+    :param link: Link, with ``source`` (file or ``None``), \\
+    ``stages`` (Python stages), ``sink`` (file), ``close_sink`` \\
+    (close sink when done?) and ``counts``
+    :type link: dict
+    :param buffer_size: Bytes to read at a time, if there are no \\
+    Python stages
+    :type buffer_size: int
+    """
+    source = link["source"]
+    sink = link["sink"]
+    try:
+        if source is None:
+            data = iter(())
+        elif link["stages"]:
+            data = iter(source)
+        else:
+            data = iter(lambda: source.read1(buffer_size), b"")
+        data = count_bytes(data, link["counts"], 0)
+        for index, stage in enumerate(link["stages"]):
+            data = count_bytes(stage(data), link["counts"], index + 1)
+        for chunk in data:
+            sink.write(chunk)
+        sink.flush()
+    except BrokenPipeError:
+        pass
+    except Exception as e:
+        link["error"] = e
+    finally:
+        if source is not None:
+            source.close()
+        if link["close_sink"]:
+            try:
+                sink.close()
+            except BrokenPipeError:
+                pass
+        link["end"] = time.perf_counter()
+
+
+def wait_for_pipeline_process(stage):
+    """
+    Wait for a pipeline process to terminate and record its resource
+    usage (``rusage``) and the time it finished (``end``) (see
+    :py:func:`run_pipeline`). Runs in its own thread.
+
+    :param stage: Stage, with ``process`` (``subprocess.Popen``)
+    :type stage: dict
+    """
+    stage["rusage"] = wait_for_process(stage["process"])
+    stage["end"] = time.perf_counter()
+
+
+def run_pipeline(stages,
+                 out=sys.stdout,
+                 err=sys.stderr,
+                 resource_log=None,
+                 label=None,
+                 buffer_size=PIPELINE_BUFFER_SIZE):
+    """
+    Run a pipeline of operating system commands and Python stages,
+    like a shell pipeline, without writing intermediate data to
+    files.
+
+    Each stage is either a command and arguments or a Python stage.
+    A Python stage is a callable, typically a generator function,
+    which is given an iterable of lines (``bytes``) and returns an
+    iterable of ``bytes``. If the first stage is a Python stage then
+    it is given an empty iterable.
+
+    Each process's standard output is connected to the next process's
+    standard input by an OS pipe and a thread which copies
+    ``buffer_size`` bytes at a time, or lines if there are Python
+    stages in between, which it passes through these stages. As
+    pipes are bounded, a stage which cannot keep up blocks those
+    before it, so memory use is bounded. The last stage's output is
+    written to ``out``. Each process's standard error is captured and
+    written to ``err``, in stage order, once the pipeline completes.
+
+    A resource record is created for each stage (see
+    :py:func:`create_resource_record`) with the bytes it read and
+    wrote, so each stage's throughput can be calculated. For Python
+    stages, wall time is that of the thread running the stage, and
+    CPU time and peak RSS are not recorded. The records are written
+    to the resource log (see :py:func:`write_resource_record`).
+
+    A stage fails if it is a process that exits with a non-zero exit
+    code or a Python stage that raises an exception. A process
+    terminated by ``SIGPIPE`` is not regarded as failing, as it was
+    writing to a stage that exited, either by completing early or by
+    failing itself.
+
+    :param stages: Commands and arguments, and Python stages
+    :type stages: list(list(str or unicode) or callable)
+    :param out: Standard output desination (``sys.stdout`` or file)
+    :type out: _io.TextIOWrapper or _io.BufferedWriter
+    :param err: Standard error desination (``sys.stderr`` or file)
+    :type err: _io.TextIOWrapper
+    :param resource_log: Resource log file (see \\
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
+    :param buffer_size: Bytes to read at a time between processes
+    :type buffer_size: int
+    :return: Resource record for each stage
+    :rtype: list(dict)
+    :raise ValueError: If there are no stages, a stage is neither a \\
+    command nor callable, or ``buffer_size`` is less than 1
+    :raise FileNotFoundError: if a command to run cannot be found
+    :raise AssertionError: If any stage fails
+    """
+    if not stages:
+        raise ValueError("There must be at least one stage")
+    if buffer_size < 1:
+        raise ValueError("buffer_size must be at least 1")
+    for stage in stages:
+        if not callable(stage) and not (isinstance(stage, (list, tuple))
+                                        and stage):
+            raise ValueError("Stage {} is neither a command nor "
+                             "callable".format(stage))
+    out.flush()
+    out_buffer = getattr(out, "buffer", out)
+    # Group Python stages into the links before, between and after
+    # processes.
+    processes = []
+    links = [{"stages": []}]
+    for stage in stages:
+        if callable(stage):
+            links[-1]["stages"].append(stage)
+        else:
+            processes.append({"cmd": stage})
+            links.append({"stages": []})
+    start = time.time()
+    wall_start = time.perf_counter()
+    try:
+        for index, process in enumerate(processes):
+            process["stderr"] = tempfile.TemporaryFile()
+            stdin = None
+            if index > 0 or links[0]["stages"]:
+                stdin = subprocess.PIPE
+            process["process"] = subprocess.Popen(
+                process["cmd"],
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=process["stderr"],
+                bufsize=buffer_size)
+    except Exception:
+        for process in processes:
+            if "process" in process:
+                process["process"].kill()
+                process["process"].communicate()
+            if "stderr" in process:
+                process["stderr"].close()
+        raise
+    for index, link in enumerate(links):
+        link["source"] = None
+        link["sink"] = out_buffer
+        link["close_sink"] = False
+        if index > 0:
+            link["source"] = processes[index - 1]["process"].stdout
+        if index < len(processes):
+            link["sink"] = processes[index]["process"].stdin
+            link["close_sink"] = True
+        link["counts"] = [0] * (len(link["stages"]) + 1)
+        link["error"] = None
+        if link["sink"] is None:
+            # First process reads from this process's standard input.
+            link["end"] = wall_start
+            continue
+        link["thread"] = threading.Thread(
+            target=run_pipeline_link, args=(link, buffer_size))
+        link["thread"].start()
+    for process in processes:
+        process["thread"] = threading.Thread(
+            target=wait_for_pipeline_process, args=(process,))
+        process["thread"].start()
+    for stage in links + processes:
+        if "thread" in stage:
+            stage["thread"].join()
+    records = []
+    failures = []
+    for index, link in enumerate(links):
+        if index > 0:
+            process = processes[index - 1]
+            process["stderr"].seek(0)
+            p_err = process["stderr"].read()
+            process["stderr"].close()
+            err.write(p_err.decode('utf-8'))
+            exit_code = process["process"].returncode
+            stdin_bytes = None
+            if index > 1 or links[0]["stages"]:
+                stdin_bytes = links[index - 1]["counts"][-1]
+            records.append(create_resource_record(
+                [process["cmd"]], label, start,
+                process["end"] - wall_start, exit_code,
+                [process["rusage"]], link["counts"][0], len(p_err),
+                stdin_bytes))
+            if exit_code not in (0, -signal.SIGPIPE):
+                failures.append("{} failed with exit code {}".format(
+                    process["cmd"], exit_code))
+        for stage_index, stage in enumerate(link["stages"]):
+            records.append(create_resource_record(
+                [[get_stage_name(stage)]], label, start,
+                link["end"] - wall_start,
+                1 if link["error"] is not None else 0, [None],
+                link["counts"][stage_index + 1], None,
+                link["counts"][stage_index]))
+        if link["error"] is not None:
+            failures.append("{} failed with {}: {}".format(
+                [get_stage_name(stage) for stage in link["stages"]],
+                type(link["error"]).__name__, link["error"]))
+    for record in records:
+        write_resource_record(record, resource_log)
+    if failures:
+        errors = [link["error"] for link in links
+                  if link["error"] is not None]
+        raise AssertionError("Pipeline failed: " + "; ".join(failures)) \
+            from (errors[0] if errors else None)
+    return records
+
+
 def run_logged_command(cmd,
                        log_file,
                        cmd_file=None,
                        dry_run=False,
-                       cmd_to_log=None):
+                       cmd_to_log=None,
+                       resource_log=None,
+                       label=None):
     """
     Run operating system command via Python ``subprocess`` and capture
     standard output and standard error into a log file. Uses
@@ -114,6 +742,11 @@ def run_logged_command(cmd,
     :type dry_run: bool
     :param cmd_to_log: Command to log
     :type cmd_to_log: list(str or unicode)
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise FileNotFoundError: if the command to run cannot be found
     :raise AssertionError: If the command returns a non-zero exit code
     """
@@ -127,14 +760,16 @@ def run_logged_command(cmd,
     if dry_run:
         return
     with open(log_file, "a") as f:
-        run_command(cmd, f, f)
+        run_command(cmd, f, f, resource_log, label)
 
 
 def run_logged_redirect_command(cmd,
                                 out,
                                 log_file,
                                 cmd_file=None,
-                                dry_run=False):
+                                dry_run=False,
+                                resource_log=None,
+                                label=None):
     """
     Run operating system command via Python ``subprocess`` and
     redirect output to a file and capture standard error into a log
@@ -157,6 +792,11 @@ def run_logged_redirect_command(cmd,
     :type cmd_file: str or unicode
     :param dry_run: Do not submit command to operating system?
     :type dry_run: bool
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise FileNotFoundError: if the command to run cannot be found
     :raise AssertionError: If the command returns a non-zero exit code
     """
@@ -166,14 +806,16 @@ def run_logged_redirect_command(cmd,
     if dry_run:
         return
     with open(log_file, "a") as f:
-        run_redirect_command(cmd, out, f)
+        run_redirect_command(cmd, out, f, resource_log, label)
 
 
 def run_logged_pipe_command(cmd1,
                             cmd2,
                             log_file,
                             cmd_file=None,
-                            dry_run=False):
+                            dry_run=False,
+                            resource_log=None,
+                            label=None):
     """
     Run operating system command via Python ``subprocess`` and pipe
     output into another command and capture standard output and
@@ -196,6 +838,11 @@ def run_logged_pipe_command(cmd1,
     :type cmd_file: str or unicode
     :param dry_run: Do not submit command to operating system?
     :type dry_run: bool
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
     :raise FileNotFoundError: if the commands to run cannot be found
     :raise AssertionError: If the commands return a non-zero exit code
     """
@@ -206,4 +853,363 @@ def run_logged_pipe_command(cmd1,
     if dry_run:
         return
     with open(log_file, "a") as f:
-        run_pipe_command(cmd1, cmd2, f, f)
+        run_pipe_command(cmd1, cmd2, f, f, resource_log, label)
+
+
+def run_logged_pipeline(stages,
+                        out,
+                        log_file,
+                        cmd_file=None,
+                        dry_run=False,
+                        resource_log=None,
+                        label=None):
+    """
+    Run a pipeline of operating system commands and Python stages,
+    write the output to a file and capture standard error into a log
+    file. Uses :py:func:`run_pipeline`.
+
+    If ``cmd_file`` is not ``None`` then the pipeline is recorded into
+    ``cmd_file``, with each Python stage represented by its name.
+
+    If ``dry_run`` is ``True`` then the pipeline will not be run.
+    Using this with ``cmd_file`` allows a record of the pipeline that
+    *would* be run to be made.
+
+    :param stages: Commands and arguments, and Python stages
+    :type stages: list(list(str or unicode) or callable)
+    :param out: Output file name
+    :type out: str or unicode
+    :param log_file: Log file
+    :type log_file: str or unicode
+    :param cmd_file: Bash commands file
+    :type cmd_file: str or unicode
+    :param dry_run: Do not run the pipeline?
+    :type dry_run: bool
+    :param resource_log: Resource log file (see \
+    :py:func:`write_resource_record`)
+    :type resource_log: str or unicode
+    :param label: Resource record label
+    :type label: str or unicode
+    :return: Resource record for each stage, or ``None`` if \
+    ``dry_run`` is ``True``
+    :rtype: list(dict)
+    :raise ValueError: If there are no stages or a stage is neither \
+    a command nor callable
+    :raise FileNotFoundError: if a command to run cannot be found
+    :raise AssertionError: If any stage fails
+    """
+    if cmd_file is not None:
+        with open(cmd_file, "a") as f:
+            f.write("%s > %s\n" % (" | ".join(
+                get_stage_name(stage) for stage in stages), out))
+    if dry_run:
+        return None
+    with open(log_file, "a") as f, open(out, "wb") as out_f:
+        return run_pipeline(stages, out_f, f, resource_log, label)
+
+
+def get_command_cpus(cmd, default=1):
+    """
+    Get the number of threads a command uses from its
+    :py:const:`CPU_OPTIONS` option, given either as ``<OPTION>
+    <VALUE>`` or ``<OPTION>=<VALUE>``. Options whose values are not
+    integers are ignored.
+
+    :param cmd: Command and arguments
+    :type cmd: list(str or unicode)
+    :param default: Number of threads if no option is found
+    :type default: int
+    :return: Number of threads
+    :rtype: int
+    """
+    for index, arg in enumerate(cmd):
+        option, _, value = arg.partition("=")
+        if option not in CPU_OPTIONS:
+            continue
+        if not value and index + 1 < len(cmd):
+            value = cmd[index + 1]
+        try:
+            return int(value)
+        except ValueError:
+            continue
+    return default
+
+
+class CpuSlots:
+    """
+    CPU slots shared by concurrent jobs (see
+    :py:func:`run_logged_commands_async`). A job requesting ``n``
+    slots waits until ``n`` are free. Jobs take slots in the order
+    they request them, so once the job at the head of the queue is
+    waiting, later jobs wait too, even if enough slots are free for
+    them, and jobs requesting many slots are not starved. Once
+    stopped, jobs waiting for slots are cancelled.
+    """
+
+    def __init__(self, total):
+        """
+        :param total: Number of slots
+        :type total: int
+        :raise ValueError: If ``total`` is less than 1
+        """
+        import asyncio
+        if total < 1:
+            raise ValueError("Number of CPU slots must be at least 1")
+        self.total = total
+        self.free = total
+        self.stopped = False
+        self.waiting = collections.deque()
+        self.condition = asyncio.Condition()
+
+    async def acquire(self, num_slots):
+        """
+        Wait until all earlier requests have taken their slots and
+        enough slots are free then take them. Requests for more than
+        the total number of slots take all the slots.
+
+        :param num_slots: Number of slots
+        :type num_slots: int
+        :return: Number of slots taken
+        :rtype: int
+        :raise asyncio.CancelledError: If the slots are stopped
+        """
+        import asyncio
+        num_slots = max(1, min(num_slots, self.total))
+        request = object()
+        async with self.condition:
+            self.waiting.append(request)
+            try:
+                await self.condition.wait_for(
+                    lambda: self.stopped or
+                    (self.waiting[0] is request and
+                     self.free >= num_slots))
+                if self.stopped:
+                    raise asyncio.CancelledError()
+                self.free -= num_slots
+            finally:
+                # Let the next request, if any, take slots.
+                self.waiting.remove(request)
+                self.condition.notify_all()
+        return num_slots
+
+    def stop(self):
+        """
+        Stop the slots, so no more are taken.
+        """
+        self.stopped = True
+
+    async def release(self, num_slots):
+        """
+        Return slots taken by :py:meth:`acquire`, and wake jobs
+        waiting for slots.
+
+        :param num_slots: Number of slots
+        :type num_slots: int
+        """
+        async with self.condition:
+            self.free += num_slots
+            self.condition.notify_all()
+
+
+async def stream_to_file(stream, f, buffer_size=PIPELINE_BUFFER_SIZE):
+    """
+    Copy data from an ``asyncio`` stream to a file as it arrives.
+
+    :param stream: Stream
+    :type stream: asyncio.StreamReader
+    :param f: File
+    :type f: _io.BufferedWriter
+    :param buffer_size: Bytes to read at a time
+    :type buffer_size: int
+    :return: Number of bytes copied
+    :rtype: int
+    """
+    num_bytes = 0
+    while True:
+        chunk = await stream.read(buffer_size)
+        if not chunk:
+            return num_bytes
+        f.write(chunk)
+        f.flush()
+        num_bytes += len(chunk)
+
+
+async def run_logged_command_async(job, slots, resource_log=None,
+                                   fail_fast=False):
+    """
+    Run a job's operating system command, once it has CPU slots, via
+    ``asyncio`` and stream its standard output and standard error
+    into its log file. If cancelled, the command is terminated.
+
+    A job is a dictionary with keys :py:const:`JOB_CMD` (command and
+    arguments), :py:const:`JOB_LOG_FILE` (log file) and, optionally,
+    :py:const:`JOB_CPUS` (number of CPU slots, default the number of
+    threads given by the command's :py:const:`CPU_OPTIONS` option, if
+    any, or 1, see :py:func:`get_command_cpus`) and
+    :py:const:`JOB_LABEL` (resource record label).
+
+    A resource record is created for the command (see
+    :py:func:`create_resource_record`) and written to the resource log
+    (see :py:func:`write_resource_record`). Its start time is when the
+    command started, after any wait for CPU slots. CPU time and peak
+    RSS are not recorded, as ``asyncio`` reaps the process.
+
+    If ``fail_fast`` is ``True`` and the command fails, or is
+    cancelled, then ``slots`` are stopped before the job's slots are
+    released, so no waiting jobs start.
+
+    :param job: Job
+    :type job: dict
+    :param slots: CPU slots
+    :type slots: CpuSlots
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    :param fail_fast: Stop ``slots`` if the command fails?
+    :type fail_fast: bool
+    :return: Resource record
+    :rtype: dict
+    :raise FileNotFoundError: if the command to run cannot be found
+    :raise AssertionError: If the command returns a non-zero exit code
+    """
+    import asyncio
+    cmd = job[JOB_CMD]
+    if JOB_CPUS in job:
+        num_cpus = job[JOB_CPUS]
+    else:
+        num_cpus = get_command_cpus(cmd)
+    num_slots = await slots.acquire(num_cpus)
+    failed = True
+    try:
+        with open(job[JOB_LOG_FILE], "ab") as log:
+            start = time.time()
+            wall_start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE)
+            streams = asyncio.gather(stream_to_file(process.stdout, log),
+                                     stream_to_file(process.stderr, log))
+            try:
+                stdout_bytes, stderr_bytes = await streams
+                exit_code = await process.wait()
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.terminate()
+                exit_code = await process.wait()
+                streams.cancel()
+                write_resource_record(create_resource_record(
+                    [cmd], job.get(JOB_LABEL), start,
+                    time.perf_counter() - wall_start, exit_code, [None],
+                    None, None), resource_log)
+                raise
+        failed = exit_code != 0
+    finally:
+        if failed and fail_fast:
+            slots.stop()
+        await slots.release(num_slots)
+    record = create_resource_record(
+        [cmd], job.get(JOB_LABEL), start, time.perf_counter() - wall_start,
+        exit_code, [None], stdout_bytes, stderr_bytes)
+    write_resource_record(record, resource_log)
+    assert exit_code == 0, "%s failed with exit code %d" % (cmd, exit_code)
+    return record
+
+
+async def run_logged_commands_async(jobs,
+                                    cpus=None,
+                                    fail_fast=True,
+                                    cmd_file=None,
+                                    dry_run=False,
+                                    resource_log=None):
+    """
+    Run jobs' operating system commands concurrently via ``asyncio``,
+    each capturing standard output and standard error into its log
+    file (see :py:func:`run_logged_command_async`). Jobs are started
+    in order as CPU slots become free. A job waiting for several
+    slots stops later jobs from starting, even if they need fewer
+    slots (see :py:class:`CpuSlots`).
+
+    If ``fail_fast`` is ``True`` then, as soon as a command fails,
+    running commands are terminated and jobs not yet started are not
+    run. Otherwise all the jobs are run.
+
+    If ``cmd_file`` is not ``None`` then the commands are recorded
+    into ``cmd_file``, in job order.
+
+    If ``dry_run`` is ``True`` then the commands will not be submitted
+    to the operating system.
+
+    :param jobs: Jobs
+    :type jobs: list(dict)
+    :param cpus: Number of CPU slots (default ``os.cpu_count()``)
+    :type cpus: int
+    :param fail_fast: Cancel other jobs on first failure?
+    :type fail_fast: bool
+    :param cmd_file: Bash commands file
+    :type cmd_file: str or unicode
+    :param dry_run: Do not submit commands to operating system?
+    :type dry_run: bool
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    :return: Resource record of each job, in job order
+    :rtype: list(dict)
+    :raise ValueError: If ``cpus`` is less than 1
+    :raise FileNotFoundError: if a command to run cannot be found
+    :raise AssertionError: If a command returns a non-zero exit code
+    """
+    import asyncio
+    slots = CpuSlots(cpus or os.cpu_count() or 1)
+    if cmd_file is not None:
+        with open(cmd_file, "a") as f:
+            for job in jobs:
+                f.write(utils.list_to_str(job[JOB_CMD]) + "\n")
+    if dry_run:
+        return []
+    tasks = [asyncio.ensure_future(run_logged_command_async(
+        job, slots, resource_log, fail_fast)) for job in jobs]
+    if not tasks:
+        return []
+    if fail_fast:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    errors = [result for result in results
+              if isinstance(result, BaseException) and
+              not isinstance(result, asyncio.CancelledError)]
+    if errors:
+        raise errors[0]
+    return results
+
+
+def run_logged_commands(jobs,
+                        cpus=None,
+                        fail_fast=True,
+                        cmd_file=None,
+                        dry_run=False,
+                        resource_log=None):
+    """
+    Run jobs' operating system commands concurrently. Uses
+    :py:func:`run_logged_commands_async`.
+
+    :param jobs: Jobs (see :py:func:`run_logged_command_async`)
+    :type jobs: list(dict)
+    :param cpus: Number of CPU slots (default ``os.cpu_count()``)
+    :type cpus: int
+    :param fail_fast: Cancel other jobs on first failure?
+    :type fail_fast: bool
+    :param cmd_file: Bash commands file
+    :type cmd_file: str or unicode
+    :param dry_run: Do not submit commands to operating system?
+    :type dry_run: bool
+    :param resource_log: Resource log file
+    :type resource_log: str or unicode
+    :return: Resource record of each job, in job order
+    :rtype: list(dict)
+    :raise ValueError: If ``cpus`` is less than 1
+    :raise FileNotFoundError: if a command to run cannot be found
+    :raise AssertionError: If a command returns a non-zero exit code
+    """
+    import asyncio
+    return asyncio.run(run_logged_commands_async(
+        jobs, cpus, fail_fast, cmd_file, dry_run, resource_log))
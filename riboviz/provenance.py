@@ -1,11 +1,55 @@
 """
 Provenance-related functions.
+
+Version information is computed at most once per process for each
+directory (see :py:func:`get_version`), as is run provenance (see
+:py:func:`get_run_provenance`).
 """
 from datetime import datetime
+from functools import lru_cache
+import os
 import os.path
+import time
+import uuid
 from io import StringIO
-import git
-import git.exc
+
+RUN_ID = "run_id"
+""" Run provenance key (run ID). """
+VERSION = "version"
+""" Run provenance key (version information). """
+DATE = "date"
+""" Run provenance key (date run provenance was created). """
+START_TIME = time.time()
+"""
+Time at which this module was imported, an approximation of the time
+at which the current tool started.
+"""
+
+
+@lru_cache(maxsize=None)
+def get_directory_version(location):
+    """
+    Get version information about a directory using the ``git``
+    package. The result is cached so the Git repository is accessed
+    at most once per process for each directory.
+
+    See :py:func:`get_version`.
+
+    :param location: Directory
+    :type location: str or unicode
+    :return: Version information
+    :rtype: str or unicode
+    """
+    import git
+    try:
+        repository = git.Repo(location,
+                              search_parent_directories=True)
+        sha = repository.head.object.hexsha
+        time = repository.head.commit.authored_datetime
+        version = "commit {} date {}".format(sha, str(time))
+    except git.exc.InvalidGitRepositoryError:  # pylint: disable=E1101
+        version = "unknown"
+    return version
 
 
 def get_version(file_path=__file__):
@@ -20,28 +64,88 @@ def get_version(file_path=__file__):
     If ``file_path`` is not within the scope of a Git repository then
     the string ``unknown`` is returned.
 
+    See :py:func:`get_directory_version`.
+
     :param file_path: File path
     :type file_path: str or unicode
     :return: Version information
     :rtype: str or unicode
     """
-    location = os.path.dirname(os.path.abspath(file_path))
-    try:
-        repository = git.Repo(location,
-                              search_parent_directories=True)
-        sha = repository.head.object.hexsha
-        time = repository.head.commit.authored_datetime
-        version = "commit {} date {}".format(sha, str(time))
-    except git.exc.InvalidGitRepositoryError:  # pylint: disable=E1101
-        version = "unknown"
-    return version
+    return get_directory_version(
+        os.path.dirname(os.path.abspath(file_path)))
+
+
+def create_run_provenance(file_path=__file__):
+    """
+    Create run provenance, with a new run ID, version information
+    about ``file_path`` (see :py:func:`get_version`) and the current
+    date.
+
+    :param file_path: File path
+    :type file_path: str or unicode
+    :return: Run provenance, with keys :py:const:`RUN_ID`, \
+    :py:const:`VERSION` and :py:const:`DATE`
+    :rtype: dict(str or unicode => str or unicode)
+    """
+    return {RUN_ID: uuid.uuid4().hex,
+            VERSION: get_version(file_path),
+            DATE: str(datetime.today())}
+
+
+@lru_cache(maxsize=None)
+def get_run_provenance():
+    """
+    Get run provenance for the current process (see
+    :py:func:`create_run_provenance`). The result is cached so it is
+    created once per process.
+
+    :return: Run provenance (see :py:func:`create_run_provenance`)
+    :rtype: dict(str or unicode => str or unicode)
+    """
+    return create_run_provenance()
+
+
+def get_elapsed_time():
+    """
+    Get time elapsed since the current tool started (see
+    :py:const:`START_TIME`).
+
+    :return: Elapsed time (seconds)
+    :rtype: float
+    """
+    return time.time() - START_TIME
+
 
+def get_provenance(file_path):
+    """
+    Get provenance information about ``file_path``, including version
+    information (see :py:func:`get_version`) and the run ID (see
+    :py:func:`get_run_provenance`).
 
-def write_provenance(file_handle, file_path, prefix="# ", eol="\n"):
+    :param file_path: File path
+    :type file_path: str or unicode
+    :return: Provenance with keys ``date``, ``tool`` (the Python \
+    module defined as ``__main__``, or ``None``), ``file``, \
+    ``version``, ``run_id`` and ``elapsed`` (seconds since the tool \
+    started)
+    :rtype: dict
+    """
+    import __main__
+    return {"date": str(datetime.today()),
+            "tool": getattr(__main__, "__file__", None),
+            "file": file_path,
+            "version": get_version(file_path),
+            "run_id": get_run_provenance()[RUN_ID],
+            "elapsed": get_elapsed_time()}
+
+
+def write_provenance(file_handle, file_path, prefix="# ", eol="\n",
+                     run=False):
     """
     Write a provenance header to a file including version information
-    about ``file_path`` obtained using the ``git`` package. See also
-    :py:func:`get_version`.
+    about ``file_path`` obtained using the ``git`` package and,
+    optionally, the run ID and the time elapsed since the current
+    tool started. See also :py:func:`get_provenance`.
 
     The header has form::
 
@@ -55,6 +159,11 @@ def write_provenance(file_handle, file_path, prefix="# ", eol="\n"):
     ``__main__`` (i.e. the identify of the currently running
     program).
 
+    If ``run`` is ``True``, the header also has lines::
+
+        <prefix> Run ID: <RUN_ID>
+        <prefix> Elapsed: <SECONDS>s
+
     :param file_handle: File handle to which content is to be written
     :type file_handle: _io.TextIOWrapper
     :param file_path: File path
@@ -63,16 +172,27 @@ def write_provenance(file_handle, file_path, prefix="# ", eol="\n"):
     :type prefix: str or unicode
     :param eol: End of line character
     :type eol: str or unicode
+    :param run: Include run ID and elapsed time? These change on \
+    every run so should not be written to output files, which are \
+    expected to be the same for the same inputs and which some \
+    readers assume have a fixed number of header lines
+    :type run: bool
     """
+    provenance = get_provenance(file_path)
     file_handle.write("{}Created by: riboviz{}".format(prefix, eol))
-    file_handle.write("{}Date: {}{}".format(prefix, datetime.today(), eol))
-    import __main__
-    if hasattr(__main__, "__file__"):
+    file_handle.write("{}Date: {}{}".format(
+        prefix, provenance["date"], eol))
+    if provenance["tool"] is not None:
         file_handle.write("{}Command-line tool: {}{}".format(
-            prefix, __main__.__file__, eol))
+            prefix, provenance["tool"], eol))
     file_handle.write("{}File: {}{}".format(prefix, file_path, eol))
     file_handle.write("{}Version: {}{}".format(
-        prefix, get_version(file_path), eol))
+        prefix, provenance["version"], eol))
+    if run:
+        file_handle.write("{}Run ID: {}{}".format(
+            prefix, provenance["run_id"], eol))
+        file_handle.write("{}Elapsed: {:.3f}s{}".format(
+            prefix, provenance["elapsed"], eol))
 
 
 def write_provenance_header(file_path, provenance_file, prefix="# "):
@@ -96,7 +216,8 @@ def write_provenance_to_str(file_path, eol="\n"):
     """
     Write a provenance header to a string including version
     information about ``file_path`` obtained using the ``git``
-    package. See :py:func:`write_provenance`.
+    package, the run ID and elapsed time. See
+    :py:func:`write_provenance`.
 
     :param file_path: File path
     :type file_path: str or unicode
@@ -106,6 +227,6 @@ def write_provenance_to_str(file_path, eol="\n"):
     :rtype: str or unicode
     """
     with StringIO() as s:
-        write_provenance(s, file_path, "", eol)
+        write_provenance(s, file_path, "", eol, run=True)
         provenance = s.getvalue()
     return provenance
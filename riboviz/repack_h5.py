@@ -0,0 +1,457 @@
+"""
+Repack riboviz H5 files, and their complementary data files, with
+different chunk shapes and compression filters, and benchmark the
+size and read throughput of H5 files.
+
+``rscripts/bam_to_h5.R`` writes each gene's read counts with one
+chunk per read length, compressed with ``gzip`` level 7. Reading a
+whole matrix therefore decompresses one chunk per read length.
+Repacking allows alternative chunk shapes (see
+:py:const:`CHUNK_LAYOUTS`) and filters (see
+:py:func:`riboviz.h5.get_compression_options`) to be used. The
+layout, attributes and values of the H5 files are unchanged.
+
+Read throughput is benchmarked for access patterns used by
+``rscripts/generate_stats_figs.R`` (see :py:const:`PATTERNS`).
+"""
+import itertools
+import os
+import re
+import shutil
+import tempfile
+import time
+import h5py
+import numpy as np
+from riboviz import h5
+from riboviz import provenance
+
+CHUNK_MATRIX = "matrix"
+""" Chunk layout with one chunk per gene matrix. """
+CHUNK_LENGTH = "length"
+"""
+Chunk layout with one chunk per read length, as used by
+``rscripts/bam_to_h5.R``.
+"""
+CHUNK_LAYOUTS = [CHUNK_MATRIX, CHUNK_LENGTH]
+""" Chunk layouts. """
+ORIGINAL = "original"
+""" Benchmark settings value for the original H5 file. """
+
+PATTERN_MATRIX = "matrix"
+"""
+Access pattern: read every gene's matrix (e.g. ``GetGeneDatamatrix``
+in ``rscripts/read_count_functions.R``).
+"""
+PATTERN_START_WINDOW = "start_window"
+"""
+Access pattern: read every gene's read counts, for all read lengths,
+in a window around the start codon (e.g.
+``GetGeneDatamatrix5start`` in ``rscripts/read_count_functions.R``).
+"""
+PATTERN_READ_LENGTH = "read_length"
+""" Access pattern: read every gene's read counts for one read length. """
+PATTERN_ATTRIBUTES = "attributes"
+"""
+Access pattern: read every gene's attributes (e.g.
+``CalculateGeneTranscriptsPerMillion`` in
+``rscripts/stats_figs_block_functions.R``).
+"""
+PATTERNS = [PATTERN_MATRIX, PATTERN_START_WINDOW, PATTERN_READ_LENGTH,
+            PATTERN_ATTRIBUTES]
+""" Access patterns. """
+START_WINDOW_LEFT = 25
+""" Positions upstream of start codon for :py:const:`PATTERN_START_WINDOW`. """
+START_WINDOW_RIGHT = 50
+"""
+Positions downstream of start codon for
+:py:const:`PATTERN_START_WINDOW`.
+"""
+
+CHUNK_LAYOUT = "chunk_layout"
+""" Benchmark column name. """
+CODEC = "codec"
+""" Benchmark column name. """
+LEVEL = "level"
+""" Benchmark column name. """
+SHUFFLE = "shuffle"
+""" Benchmark column name. """
+SIZE = "size"
+""" Benchmark column name (bytes). """
+PATTERN = "pattern"
+""" Benchmark column name. """
+SECONDS = "seconds"
+""" Benchmark column name (fastest of repeats). """
+GENES_PER_SECOND = "genes_per_second"
+""" Benchmark column name. """
+MB_PER_SECOND = "mb_per_second"
+""" Benchmark column name (uncompressed megabytes read per second). """
+BENCHMARK_COLUMNS = [CHUNK_LAYOUT, CODEC, LEVEL, SHUFFLE, SIZE, PATTERN,
+                     SECONDS, GENES_PER_SECOND, MB_PER_SECOND]
+""" Benchmark column names. """
+
+
+def get_chunks(shape, chunk_layout):
+    """
+    Get chunk shape for a dataset of read counts by position (rows)
+    and read length (columns), as stored by
+    ``rscripts/bam_to_h5.R``.
+
+    :param shape: Dataset shape
+    :type shape: tuple(int, int)
+    :param chunk_layout: Chunk layout, one of \
+    :py:const:`CHUNK_LAYOUTS`
+    :type chunk_layout: str or unicode
+    :return: Chunk shape or ``None`` if the dataset is empty
+    :rtype: tuple(int, int)
+    :raise ValueError: If ``chunk_layout`` is invalid
+    """
+    if chunk_layout not in CHUNK_LAYOUTS:
+        raise ValueError("Invalid chunk layout {}, expected one of {}".format(
+            chunk_layout, CHUNK_LAYOUTS))
+    if 0 in shape:
+        return None
+    if chunk_layout == CHUNK_MATRIX:
+        return tuple(shape)
+    return (shape[0], 1)
+
+
+def _copy_group(source, target, chunk_layout, compression):
+    """
+    Recursively copy a group, its attributes, subgroups and datasets,
+    rewriting datasets with a new chunk layout and compression
+    options.
+
+    :param source: Source group
+    :type source: h5py.Group
+    :param target: Target group
+    :type target: h5py.Group
+    :param chunk_layout: Chunk layout, one of \
+    :py:const:`CHUNK_LAYOUTS`
+    :type chunk_layout: str or unicode
+    :param compression: ``h5py`` dataset compression keyword arguments
+    :type compression: dict
+    """
+    for name, value in source.attrs.items():
+        target.attrs[name] = value
+    for name, item in source.items():
+        if isinstance(item, h5py.Group):
+            _copy_group(item, target.create_group(name), chunk_layout,
+                        compression)
+            continue
+        chunks = get_chunks(item.shape, chunk_layout) \
+            if len(item.shape) == 2 else None
+        if chunks is None:
+            dataset = target.create_dataset(name, data=item[()])
+        else:
+            dataset = target.create_dataset(name, data=item[()],
+                                            chunks=chunks, **compression)
+        for attr_name, value in item.attrs.items():
+            dataset.attrs[attr_name] = value
+
+
+def _get_data_file_indices(data_files, h5_name):
+    """
+    Get the index of each complementary data file of an H5 file, for
+    naming its repacked data file.
+
+    A data file named ``<h5_name>.<i>`` keeps index ``<i>`` unless
+    another data file already has that index. Other data files are
+    given indices after the largest index in use, so that no two
+    data files share an index.
+
+    :param data_files: Data file names, in order of first use
+    :type data_files: list(str or unicode)
+    :param h5_name: H5 file name, excluding directory
+    :type h5_name: str or unicode
+    :return: Map from data file names to indices
+    :rtype: dict(str or unicode => int)
+    """
+    data_file_re = re.compile(re.escape(h5_name) + r"\.(\d+)$")
+    indices = {}
+    for data_file in data_files:
+        match = data_file_re.match(os.path.basename(data_file))
+        if data_file not in indices and match:
+            index = int(match.group(1))
+            if index not in indices.values():
+                indices[data_file] = index
+    for data_file in data_files:
+        if data_file not in indices:
+            indices[data_file] = max(indices.values(), default=0) + 1
+    return indices
+
+
+def repack_h5(h5_file,
+              repacked_file,
+              chunk_layout=CHUNK_MATRIX,
+              codec=h5.GZIP,
+              level=None,
+              shuffle=False):
+    """
+    Repack an H5 file, and its complementary data files, with a new
+    chunk layout and compression options.
+
+    Data file ``<h5_file>.<i>`` is repacked into
+    ``<repacked_file>.<i>``. Other data files are given unused indices
+    (see :py:func:`_get_data_file_indices`). Alternative gene names
+    and any summary dataset (see :py:func:`riboviz.h5.add_summary`)
+    are preserved.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param repacked_file: Repacked H5 file
+    :type repacked_file: str or unicode
+    :param chunk_layout: Chunk layout, one of \
+    :py:const:`CHUNK_LAYOUTS`
+    :type chunk_layout: str or unicode
+    :param codec: Compression codec, one of \
+    :py:const:`riboviz.h5.CODECS`
+    :type codec: str or unicode
+    :param level: Compression level (``gzip`` only)
+    :type level: int
+    :param shuffle: Apply the HDF5 byte shuffle filter?
+    :type shuffle: bool
+    :raise ValueError: If the H5 file is a packed H5 file, or if \
+    ``chunk_layout``, ``codec`` or ``level`` are invalid
+    :raise Exception: If problems arise when reading or writing the \
+    files
+    """
+    compression = h5.get_compression_options(codec, level, shuffle)
+    get_chunks((1, 1), chunk_layout)
+    h5_dir = os.path.dirname(os.path.abspath(h5_file))
+    repacked_dir = os.path.dirname(os.path.abspath(repacked_file))
+    h5_name = os.path.basename(h5_file)
+    repacked_name = os.path.basename(repacked_file)
+    with h5py.File(h5_file, "r") as source, \
+            h5py.File(repacked_file, "w") as target:
+        if h5.is_packed(source):
+            raise ValueError(
+                "{} is a packed H5 file, which cannot be repacked".format(
+                    h5_file))
+        aliases = h5.get_aliases(source)
+        links = {}
+        for name in source:
+            link = source.get(name, getlink=True)
+            if (name == h5.SUMMARY and h5.is_summary(source)) or \
+                    name in aliases:
+                continue
+            if not isinstance(link, h5py.ExternalLink):
+                raise ValueError("{} in {} is not an external link".format(
+                    name, h5_file))
+            links[name] = link
+        indices = _get_data_file_indices(
+            [link.filename for link in links.values()], h5_name)
+        data_files = {data_file: h5.H5_DATA_FILE_FORMAT.format(
+            repacked_name, index) for data_file, index in indices.items()}
+        for name, link in links.items():
+            target[name] = h5py.ExternalLink(data_files[link.filename],
+                                             link.path)
+        for alias, gene in aliases.items():
+            target[alias] = h5py.ExternalLink(repacked_name, gene)
+        if h5.is_summary(source):
+            source.copy(source[h5.SUMMARY], target)
+    for data_file, repacked_data_file in data_files.items():
+        with h5py.File(os.path.join(h5_dir, data_file), "r") as source, \
+                h5py.File(os.path.join(repacked_dir, repacked_data_file),
+                          "w") as target:
+            _copy_group(source, target, chunk_layout, compression)
+
+
+def get_h5_size(h5_file):
+    """
+    Get the total size of an H5 file and its complementary data files.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :return: Size in bytes
+    :rtype: int
+    """
+    h5_dir = os.path.dirname(os.path.abspath(h5_file))
+    files = {os.path.abspath(h5_file)}
+    with h5py.File(h5_file, "r") as f:
+        for name in f:
+            link = f.get(name, getlink=True)
+            if isinstance(link, h5py.ExternalLink):
+                files.add(os.path.join(h5_dir, link.filename))
+    return sum(os.path.getsize(file_name) for file_name in files)
+
+
+def _read_pattern(f, genes, dataset, pattern):
+    """
+    Read every gene in an H5 file using an access pattern.
+
+    :param f: H5 file
+    :type f: h5py.File
+    :param genes: Gene names
+    :type genes: list(str or unicode)
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param pattern: Access pattern, one of :py:const:`PATTERNS`
+    :type pattern: str or unicode
+    :return: Number of bytes of read counts read
+    :rtype: int
+    :raise ValueError: If ``pattern`` is invalid
+    """
+    if pattern == PATTERN_ATTRIBUTES:
+        summary = h5.get_summary(f, dataset)
+        return sum(np.asarray(value).nbytes for value in summary.values()
+                   if isinstance(value, np.ndarray))
+    if pattern not in PATTERNS:
+        raise ValueError("Invalid pattern {}, expected one of {}".format(
+            pattern, PATTERNS))
+    num_bytes = 0
+    for gene in genes:
+        data = f[h5.DATA_PATH_FORMAT.format(gene=gene, dataset=dataset)]
+        if pattern == PATTERN_MATRIX:
+            values = data[()]
+        elif pattern == PATTERN_READ_LENGTH:
+            values = data[:, data.shape[1] // 2]
+        else:
+            start = h5.get_gene_attribute(f, gene, dataset,
+                                          h5.START_CODON_POS)[0] - 1
+            values = data[max(0, start - START_WINDOW_LEFT):
+                          start + START_WINDOW_RIGHT, :]
+        num_bytes += values.nbytes
+    return num_bytes
+
+
+def benchmark_h5(h5_file, dataset=None, patterns=PATTERNS, repeats=3):
+    """
+    Benchmark the read throughput of an H5 file for each access
+    pattern.
+
+    Each access pattern is timed ``repeats`` times and the fastest
+    time is reported. As the files will be in the operating system's
+    file cache after the first repeat, this measures decompression
+    and HDF5 overheads rather than disk throughput.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    the first gene, which must have a single dataset)
+    :type dataset: str or unicode
+    :param patterns: Access patterns, from :py:const:`PATTERNS`
+    :type patterns: list(str or unicode)
+    :param repeats: Number of times to repeat each access pattern
+    :type repeats: int
+    :return: Benchmark results with columns :py:const:`SIZE`, \
+    :py:const:`PATTERN`, :py:const:`SECONDS`, \
+    :py:const:`GENES_PER_SECOND`, :py:const:`MB_PER_SECOND`
+    :rtype: pandas.core.frame.DataFrame
+    :raise ValueError: If the H5 file has no genes or a pattern is \
+    invalid
+    """
+    import pandas as pd
+    size = get_h5_size(h5_file)
+    results = []
+    with h5py.File(h5_file, "r") as f:
+        aliases = h5.get_aliases(f)
+        genes = [gene for gene in h5.get_genes(f) if gene not in aliases]
+        if not genes:
+            raise ValueError("No genes found in {}".format(h5_file))
+        if dataset is None:
+            dataset = h5.get_gene_dataset_name(f, genes[0])
+        for pattern in patterns:
+            seconds = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                num_bytes = _read_pattern(f, genes, dataset, pattern)
+                elapsed = time.perf_counter() - start
+                if seconds is None or elapsed < seconds:
+                    seconds = elapsed
+            seconds = max(seconds, 1e-9)
+            results.append({SIZE: size,
+                            PATTERN: pattern,
+                            SECONDS: seconds,
+                            GENES_PER_SECOND: len(genes) / seconds,
+                            MB_PER_SECOND: num_bytes / 1e6 / seconds})
+    return pd.DataFrame(results)
+
+
+def benchmark_repack_h5(h5_file,
+                        benchmark_file,
+                        dataset=None,
+                        chunk_layouts=CHUNK_LAYOUTS,
+                        codecs=h5.CODECS,
+                        levels=None,
+                        shuffles=None,
+                        patterns=PATTERNS,
+                        repeats=3,
+                        tmp_dir=None):
+    """
+    Repack an H5 file with every combination of chunk layout, codec,
+    level (``gzip`` only) and shuffle filter then benchmark the
+    original and each repacked H5 file using :py:func:`benchmark_h5`.
+
+    Results are saved as a tab-separated values file, with a
+    provenance header, with columns :py:const:`BENCHMARK_COLUMNS`. For
+    the original H5 file :py:const:`CHUNK_LAYOUT` and
+    :py:const:`CODEC` are :py:const:`ORIGINAL`.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param benchmark_file: Benchmark results file output
+    :type benchmark_file: str or unicode
+    :param dataset: Dataset name (if ``None`` then this is taken from \
+    the first gene, which must have a single dataset)
+    :type dataset: str or unicode
+    :param chunk_layouts: Chunk layouts, from \
+    :py:const:`CHUNK_LAYOUTS`
+    :type chunk_layouts: list(str or unicode)
+    :param codecs: Codecs, from :py:const:`riboviz.h5.CODECS`
+    :type codecs: list(str or unicode)
+    :param levels: Compression levels (``gzip`` only) (if ``None`` \
+    then ``[riboviz.h5.GZIP_LEVEL]``)
+    :type levels: list(int)
+    :param shuffles: Shuffle filter values (if ``None`` then \
+    ``[False]``)
+    :type shuffles: list(bool)
+    :param patterns: Access patterns, from :py:const:`PATTERNS`
+    :type patterns: list(str or unicode)
+    :param repeats: Number of times to repeat each access pattern
+    :type repeats: int
+    :param tmp_dir: Directory in which to create a temporary \
+    directory for repacked files (if ``None`` then the system default \
+    is used)
+    :type tmp_dir: str or unicode
+    :return: Benchmark results
+    :rtype: pandas.core.frame.DataFrame
+    :raise ValueError: If the H5 file has no genes or is packed or \
+    any setting is invalid
+    """
+    import pandas as pd
+    if levels is None:
+        levels = [h5.GZIP_LEVEL]
+    if shuffles is None:
+        shuffles = [False]
+    settings = []
+    for chunk_layout, codec, shuffle in itertools.product(
+            chunk_layouts, codecs, shuffles):
+        for level in (levels if codec == h5.GZIP else [None]):
+            settings.append((chunk_layout, codec, level, shuffle))
+    results = []
+    result = benchmark_h5(h5_file, dataset, patterns, repeats)
+    result[CHUNK_LAYOUT] = ORIGINAL
+    result[CODEC] = ORIGINAL
+    result[LEVEL] = None
+    result[SHUFFLE] = None
+    results.append(result)
+    repack_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        for index, (chunk_layout, codec, level, shuffle) in \
+                enumerate(settings):
+            repacked_file = os.path.join(
+                repack_dir, h5.H5_FORMAT.format("repacked{}".format(index)))
+            repack_h5(h5_file, repacked_file, chunk_layout, codec, level,
+                      shuffle)
+            result = benchmark_h5(repacked_file, dataset, patterns, repeats)
+            result[CHUNK_LAYOUT] = chunk_layout
+            result[CODEC] = codec
+            result[LEVEL] = level
+            result[SHUFFLE] = shuffle
+            results.append(result)
+    finally:
+        shutil.rmtree(repack_dir)
+    results = pd.concat(results, ignore_index=True)[BENCHMARK_COLUMNS]
+    provenance.write_provenance_header(__file__, benchmark_file)
+    results.to_csv(benchmark_file, mode='a', sep="\t", index=False)
+    return results
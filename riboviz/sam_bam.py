@@ -1,7 +1,6 @@
 """
 SAM and BAM-related constants and functions.
 """
-import pysam
 from riboviz import utils
 
 PG_TAG = "PG"
@@ -56,6 +55,7 @@ def count_sequences(file_name):
     :return: (number of sequences, number of mapped sequences)
     :rtype: tuple(int, int)
     """
+    import pysam
     if is_bam(file_name):
         mode = "rb"
     else:
@@ -98,6 +98,7 @@ def equal_bam(file1, file2):
     :raise Exception: if problems arise when loading the files or, \
     if applicable, their complementary BAI files
     """
+    import pysam
     with pysam.AlignmentFile(file1, mode="rb") as bam_file1,\
             pysam.AlignmentFile(file2, mode="rb") as bam_file2:
         assert bam_file1.is_bam, "Non-BAM file: %s" % file1
@@ -143,6 +144,7 @@ def equal_sam(file1, file2):
     :raise AssertionError: if files differ in their content
     :raise Exception: if problems arise when loading the files
     """
+    import pysam
     with pysam.AlignmentFile(file1) as sam_file1,\
             pysam.AlignmentFile(file2) as sam_file2:
         assert sam_file1.is_sam, "Non-SAM file: %s" % file1
@@ -256,6 +258,7 @@ def equal_bam_sam_reads(file1, file2):
     :type file2: pysam.AlignmentFile
     :raise AssertionError: if files differ in their reads
     """
+    import pysam
     # Get total number of reads in each file.
     with pysam.AlignmentFile(file1.filename) as f1:
         num_reads1 = f1.count()
@@ -112,13 +112,13 @@ def save_deplexed_sample_sheet(sample_sheet,
                                     UNASSIGNED_READ,
                                     num_unassigned_reads]],
                                   columns=deplexed_sample_sheet.columns)
-    deplexed_sample_sheet = deplexed_sample_sheet.append(unassigned_row,
-                                                         ignore_index=True)
+    deplexed_sample_sheet = pd.concat(
+        [deplexed_sample_sheet, unassigned_row], ignore_index=True)
     total_reads = deplexed_sample_sheet[NUM_READS].sum()
     total_row = pd.DataFrame([[TOTAL_READS, "", total_reads]],
                              columns=deplexed_sample_sheet.columns)
-    deplexed_sample_sheet = deplexed_sample_sheet.append(total_row,
-                                                         ignore_index=True)
+    deplexed_sample_sheet = pd.concat(
+        [deplexed_sample_sheet, total_row], ignore_index=True)
     provenance.write_provenance_header(__file__, file_name)
     deplexed_sample_sheet[list(deplexed_sample_sheet.columns)].to_csv(
         file_name, mode='a', sep=delimiter, index=False)
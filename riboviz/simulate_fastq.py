@@ -0,0 +1,582 @@
+"""
+Simulate large multiplexed FASTQ files to test the throughput of
+demultiplexing, adaptor trimming, UMI extraction and deduplication.
+
+Reads are simulated in batches using NumPy and streamed to (optionally
+gzipped) FASTQ files, so any number of reads can be simulated in
+constant memory. Each read has a 5' UMI, an insert, a 3' UMI, a
+barcode and an adaptor. Reads are simulated from molecules: each
+molecule has a sample, an insert and UMIs, and is sequenced a
+geometrically-distributed number of times. Each read of a molecule
+may have a number of mismatches in its barcode.
+
+The following files are created (see :py:func:`simulate_multiplex`).
+
+* ``multiplex_barcodes.tsv``: sample sheet with ``SampleID`` and
+  ``TagRead`` columns, consistent with the sample sheet format
+  expected by :py:mod:`riboviz.demultiplex_fastq`.
+* ``multiplex_umi_barcode_adaptor.fastq[.gz]``: reads with UMIs,
+  barcode and adaptor in the sequence.
+* ``multiplex.fastq[.gz]``: the same reads with the barcode and UMIs
+  extracted into the header, of form ``@SIM<ID>_<BARCODE>_<UMIs>``,
+  and the adaptor trimmed.
+* ``deplex/num_reads.tsv``: the number of reads expected for each
+  sample when ``multiplex.fastq[.gz]`` is demultiplexed using
+  :py:mod:`riboviz.demultiplex_fastq` with the sample sheet and the
+  given number of allowed mismatches.
+* ``deplex/dedup_groups.tsv``: the number of reads and the number of
+  UMI groups expected for each demultiplexed sample. Reads in a group
+  come from the same molecule, so have the same insert and UMIs, and
+  deduplication of a sample leaves one read per group.
+
+For a given seed and batch size, the same files are always created.
+"""
+import gzip
+import os
+import numpy as np
+import pandas as pd
+from riboviz import barcodes_umis
+from riboviz import demultiplex_fastq
+from riboviz import fastq
+from riboviz import provenance
+from riboviz import sample_sheets
+
+NUCLEOTIDE_BYTES = np.frombuffer(barcodes_umis.NUCLEOTIDES.encode(),
+                                 dtype=np.uint8)
+""" Nucleotide byte values, indexed by nucleotide code (0-3). """
+PHRED_OFFSET = 33
+""" Offset of Phred quality scores in FASTQ files. """
+QUALITY_MIN = 30
+""" Minimum simulated quality score. """
+QUALITY_MAX = 40
+""" Maximum simulated quality score. """
+ADAPTOR = "CTGTAGGCACC"
+""" Default adaptor sequence, as used in vignette data. """
+READ_PREFIX = "SIM"
+""" Prefix of simulated read names. """
+BATCH_SIZE = 100000
+""" Default number of molecules simulated in each batch. """
+BARCODES_FILE = "multiplex_barcodes.tsv"
+""" Sample sheet file name. """
+MULTIPLEX_ADAPTOR_FORMAT = "multiplex_umi_barcode_adaptor.{}"
+""" Reads with UMIs, barcode and adaptor file name format. """
+MULTIPLEX_FORMAT = "multiplex.{}"
+""" Reads with barcode and UMIs extracted file name format. """
+DEPLEX_DIR = "deplex"
+""" Expected demultiplexing results directory name. """
+DEDUP_GROUPS_FILE = "dedup_groups.tsv"
+""" Expected deduplication groups file name. """
+NUM_GROUPS = "NumGroups"
+""" Column name (number of deduplication groups). """
+SAMPLE_FORMAT = "Tag{:01d}"
+""" Sample ID format. """
+
+
+def join_segments(segments, num_records):
+    """
+    Join segments of records into a single byte buffer. Each segment
+    is one of:
+
+    * ``bytes``: a constant, the same for every record.
+    * ``numpy.ndarray``: a ``uint8`` array of shape ``(num_records,
+      width)``, with ``width`` bytes for every record.
+    * ``tuple(numpy.ndarray, numpy.ndarray)``: a ``uint8`` array of
+      shape ``(num_records, width)`` and the number of bytes to take
+      from each row.
+
+    Segments are copied, column-wise, into a padded array, with
+    variable-length segments padded with zero bytes, which are then
+    removed. Segments must not contain zero bytes.
+
+    :param segments: Segments
+    :type segments: list(bytes or numpy.ndarray or \
+    tuple(numpy.ndarray, numpy.ndarray))
+    :param num_records: Number of records
+    :type num_records: int
+    :return: Buffer
+    :rtype: numpy.ndarray
+    """
+    arrays = []
+    padded = False
+    for segment in segments:
+        if isinstance(segment, bytes):
+            array = np.frombuffer(segment, dtype=np.uint8)[np.newaxis, :]
+        elif isinstance(segment, tuple):
+            array, lengths = segment
+            if not np.all(lengths == array.shape[1]):
+                array = np.where(
+                    np.arange(array.shape[1]) < lengths[:, np.newaxis],
+                    array, 0).astype(np.uint8)
+                padded = True
+        else:
+            array = segment
+        arrays.append(array)
+    widths = [array.shape[1] for array in arrays]
+    buffer = np.empty((num_records, sum(widths)), dtype=np.uint8)
+    start = 0
+    for array, width in zip(arrays, widths):
+        buffer[:, start:start + width] = array
+        start += width
+    buffer = buffer.reshape(-1)
+    if padded:
+        buffer = buffer[buffer != 0]
+    return buffer
+
+
+def encode_ids(ids, width):
+    """
+    Encode integer IDs as zero-padded decimal digits.
+
+    :param ids: IDs
+    :type ids: numpy.ndarray
+    :param width: Number of digits
+    :type width: int
+    :return: ``uint8`` array of shape ``(len(ids), width)``
+    :rtype: numpy.ndarray
+    """
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = (ids[:, np.newaxis] // powers) % 10
+    return (digits + ord("0")).astype(np.uint8)
+
+
+def random_codes(rng, shape):
+    """
+    Simulate nucleotide codes (0-3, see :py:const:`NUCLEOTIDE_BYTES`).
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param shape: Shape
+    :type shape: tuple(int)
+    :return: Codes
+    :rtype: numpy.ndarray
+    """
+    return rng.integers(0, 4, size=shape, dtype=np.uint8)
+
+
+def random_qualities(rng, shape, quality_min=QUALITY_MIN,
+                     quality_max=QUALITY_MAX):
+    """
+    Simulate FASTQ quality characters, with quality scores drawn
+    uniformly from ``[quality_min, quality_max]``.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param shape: Shape
+    :type shape: tuple(int)
+    :param quality_min: Minimum quality score
+    :type quality_min: int
+    :param quality_max: Maximum quality score
+    :type quality_max: int
+    :return: ``uint8`` quality characters
+    :rtype: numpy.ndarray
+    """
+    return rng.integers(quality_min + PHRED_OFFSET,
+                        quality_max + PHRED_OFFSET + 1,
+                        size=shape, dtype=np.uint8)
+
+
+def add_mismatches(rng, codes, num_mismatches):
+    """
+    Add mismatches to nucleotide codes. Each row gets its number of
+    mismatches at distinct positions, each replaced by a different
+    nucleotide.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param codes: Nucleotide codes of shape ``(n, width)``
+    :type codes: numpy.ndarray
+    :param num_mismatches: Number of mismatches for each row, at \
+    most ``width``
+    :type num_mismatches: numpy.ndarray
+    :return: Nucleotide codes with mismatches
+    :rtype: numpy.ndarray
+    """
+    # Rank random keys so each row gets a random permutation of
+    # positions, then mutate the first num_mismatches positions.
+    ranks = np.argsort(rng.random(codes.shape), axis=1).argsort(axis=1)
+    mutate = ranks < num_mismatches[:, np.newaxis]
+    shifts = rng.integers(1, 4, size=codes.shape, dtype=np.uint8)
+    return np.where(mutate, (codes + shifts) % 4, codes).astype(np.uint8)
+
+
+def hamming_distances(codes, barcodes):
+    """
+    Get Hamming distances between nucleotide codes and barcodes.
+
+    :param codes: Nucleotide codes of shape ``(n, width)``
+    :type codes: numpy.ndarray
+    :param barcodes: Barcode nucleotide codes of shape \
+    ``(num_barcodes, width)``
+    :type barcodes: numpy.ndarray
+    :return: Distances of shape ``(n, num_barcodes)``
+    :rtype: numpy.ndarray
+    """
+    return (codes[:, np.newaxis, :] != barcodes[np.newaxis, :, :]).sum(
+        axis=2)
+
+
+def assign_barcodes(codes, barcodes, mismatches):
+    """
+    Assign nucleotide codes to the first barcode within a number of
+    mismatches, consistent with
+    :py:func:`riboviz.demultiplex_fastq.assign_sample`.
+
+    :param codes: Nucleotide codes of shape ``(n, width)``
+    :type codes: numpy.ndarray
+    :param barcodes: Barcode nucleotide codes of shape \
+    ``(num_barcodes, width)``
+    :type barcodes: numpy.ndarray
+    :param mismatches: Number of allowed mismatches
+    :type mismatches: int
+    :return: Index of assigned barcode, or -1 if unassigned
+    :rtype: numpy.ndarray
+    """
+    matches = hamming_distances(codes, barcodes) <= mismatches
+    return np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+
+
+def create_barcodes(rng, num_barcodes, length, min_distance,
+                    max_attempts=10000):
+    """
+    Create distinct random barcodes with a minimum pairwise Hamming
+    distance.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param num_barcodes: Number of barcodes
+    :type num_barcodes: int
+    :param length: Barcode length
+    :type length: int
+    :param min_distance: Minimum Hamming distance between barcodes
+    :type min_distance: int
+    :param max_attempts: Maximum number of random barcodes to try
+    :type max_attempts: int
+    :return: Barcode nucleotide codes of shape \
+    ``(num_barcodes, length)``
+    :rtype: numpy.ndarray
+    :raise ValueError: If the barcodes cannot be created
+    """
+    min_distance = max(1, min_distance)
+    barcodes = np.empty((0, length), dtype=np.uint8)
+    for _ in range(max_attempts):
+        if len(barcodes) == num_barcodes:
+            break
+        candidate = random_codes(rng, (1, length))
+        if np.all(hamming_distances(candidate, barcodes) >= min_distance):
+            barcodes = np.vstack([barcodes, candidate])
+    if len(barcodes) == num_barcodes:
+        return barcodes
+    raise ValueError("Could not create {} barcodes of length {} with "
+                     "minimum Hamming distance {}".format(
+                         num_barcodes, length, min_distance))
+
+
+def codes_to_str(codes):
+    """
+    Convert nucleotide codes to a string.
+
+    :param codes: Nucleotide codes
+    :type codes: numpy.ndarray
+    :return: Nucleotides
+    :rtype: str or unicode
+    """
+    return NUCLEOTIDE_BYTES[codes].tobytes().decode()
+
+
+def open_fastq(file_name, compresslevel=1):
+    """
+    Open a FASTQ file for writing in binary mode, gzipped if the file
+    name ends with ``.gz``.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :param compresslevel: gzip compression level
+    :type compresslevel: int
+    :return: File handle
+    :rtype: gzip.GzipFile or io.BufferedWriter
+    """
+    if file_name.lower().endswith(".gz"):
+        return gzip.open(file_name, "wb", compresslevel=compresslevel)
+    return open(file_name, "wb")
+
+
+def simulate_batch(rng, first_id, num_molecules, barcodes, umi5_length,
+                   umi3_length, min_length, max_length, adaptor_length,
+                   duplication, sample_weights, mismatch_weights):
+    """
+    Simulate a batch of reads from a batch of molecules. Reads of the
+    same molecule are shuffled within the batch.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param first_id: ID of the first read
+    :type first_id: int
+    :param num_molecules: Number of molecules
+    :type num_molecules: int
+    :param barcodes: Barcode nucleotide codes of shape \
+    ``(num_samples, length)``
+    :type barcodes: numpy.ndarray
+    :param umi5_length: 5' UMI length
+    :type umi5_length: int
+    :param umi3_length: 3' UMI length
+    :type umi3_length: int
+    :param min_length: Minimum insert length
+    :type min_length: int
+    :param max_length: Maximum insert length
+    :type max_length: int
+    :param adaptor_length: Adaptor length
+    :type adaptor_length: int
+    :param duplication: Mean number of reads per molecule
+    :type duplication: float
+    :param sample_weights: Probability of each sample
+    :type sample_weights: numpy.ndarray
+    :param mismatch_weights: Probability of a barcode having 0, 1, \
+    ... mismatches
+    :type mismatch_weights: numpy.ndarray
+    :return: dict with read ``ids``, ``molecules`` (index within \
+    batch), ``samples``, ``barcodes``, ``umi5``, ``umi3``, \
+    ``inserts``, ``lengths`` (insert lengths) and ``qualities`` (for \
+    the read with UMIs, barcode and adaptor)
+    :rtype: dict
+    """
+    copies = rng.geometric(1.0 / duplication, size=num_molecules)
+    samples = rng.choice(len(barcodes), size=num_molecules,
+                         p=sample_weights)
+    umi5 = random_codes(rng, (num_molecules, umi5_length))
+    umi3 = random_codes(rng, (num_molecules, umi3_length))
+    inserts = random_codes(rng, (num_molecules, max_length))
+    lengths = rng.integers(min_length, max_length + 1, size=num_molecules)
+    molecules = rng.permutation(np.repeat(np.arange(num_molecules), copies))
+    num_reads = len(molecules)
+    num_mismatches = rng.choice(len(mismatch_weights), size=num_reads,
+                                p=mismatch_weights)
+    read_barcodes = add_mismatches(rng, barcodes[samples[molecules]],
+                                   num_mismatches)
+    qualities = random_qualities(
+        rng,
+        (num_reads, umi5_length + max_length + umi3_length +
+         barcodes.shape[1] + adaptor_length))
+    return {"ids": np.arange(first_id, first_id + num_reads, dtype=np.int64),
+            "molecules": molecules,
+            "samples": samples[molecules],
+            "barcodes": read_barcodes,
+            "umi5": umi5[molecules],
+            "umi3": umi3[molecules],
+            "inserts": inserts[molecules],
+            "lengths": lengths[molecules],
+            "qualities": qualities}
+
+
+def truncate_batch(batch, num_reads):
+    """
+    Truncate a batch of reads (see :py:func:`simulate_batch`).
+
+    :param batch: Batch
+    :type batch: dict
+    :param num_reads: Number of reads to keep
+    :type num_reads: int
+    :return: Batch
+    :rtype: dict
+    """
+    return {key: value[:num_reads] for key, value in batch.items()}
+
+
+def format_batch(batch, id_width, adaptor):
+    """
+    Format a batch of reads (see :py:func:`simulate_batch`) as FASTQ
+    records with UMIs, barcode and adaptor in the sequence, and as
+    FASTQ records with the barcode and UMIs extracted into the header
+    and the adaptor trimmed.
+
+    :param batch: Batch
+    :type batch: dict
+    :param id_width: Number of digits in read IDs
+    :type id_width: int
+    :param adaptor: Adaptor
+    :type adaptor: str or unicode
+    :return: FASTQ records with UMIs, barcode and adaptor, and FASTQ \
+    records with barcode and UMIs extracted
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+    num_reads = len(batch["ids"])
+    name = ("@" + READ_PREFIX).encode()
+    ids = encode_ids(batch["ids"], id_width)
+    barcodes = NUCLEOTIDE_BYTES[batch["barcodes"]]
+    umi5 = NUCLEOTIDE_BYTES[batch["umi5"]]
+    umi3 = NUCLEOTIDE_BYTES[batch["umi3"]]
+    inserts = (NUCLEOTIDE_BYTES[batch["inserts"]], batch["lengths"])
+    qualities = batch["qualities"]
+    umi5_length = umi5.shape[1]
+    raw_lengths = batch["lengths"] + (qualities.shape[1] -
+                                      inserts[0].shape[1])
+    raw = join_segments(
+        [name, ids, b"\n", umi5, inserts, umi3, barcodes, adaptor.encode(),
+         b"\n+\n", (qualities, raw_lengths), b"\n"],
+        num_reads)
+    extracted = join_segments(
+        [name, ids, barcodes_umis.BARCODE_DELIMITER.encode(), barcodes,
+         barcodes_umis.UMI_DELIMITER.encode(), umi5, umi3, b"\n",
+         inserts, b"\n+\n",
+         (qualities[:, umi5_length:umi5_length + inserts[0].shape[1]],
+          batch["lengths"]),
+         b"\n"],
+        num_reads)
+    return raw, extracted
+
+
+def simulate_multiplex(output_dir,
+                       num_reads,
+                       num_samples=4,
+                       barcode_length=6,
+                       mismatches=1,
+                       mismatch_weights=(0.9, 0.06, 0.02, 0.02),
+                       sample_weights=None,
+                       umi5_length=4,
+                       umi3_length=4,
+                       min_length=28,
+                       max_length=32,
+                       adaptor=ADAPTOR,
+                       duplication=2.0,
+                       gzipped=False,
+                       compresslevel=1,
+                       seed=42,
+                       batch_size=BATCH_SIZE):
+    """
+    Simulate multiplexed FASTQ files, a sample sheet and the expected
+    demultiplexing and deduplication results. See the module
+    documentation for the files created.
+
+    Sample barcodes are created with a minimum Hamming distance of
+    ``2 * mismatches + 1``, so a read whose barcode has at most
+    ``mismatches`` mismatches is assigned to its own sample. Reads
+    with more mismatches may be assigned to another sample or be
+    unassigned. Expected counts are calculated by assigning each read
+    in the same way as :py:func:`riboviz.demultiplex_fastq.demultiplex`.
+
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param num_reads: Number of reads
+    :type num_reads: int
+    :param num_samples: Number of samples
+    :type num_samples: int
+    :param barcode_length: Barcode length
+    :type barcode_length: int
+    :param mismatches: Number of mismatches allowed when \
+    demultiplexing
+    :type mismatches: int
+    :param mismatch_weights: Probability of a read's barcode having \
+    0, 1, ... mismatches
+    :type mismatch_weights: list(float)
+    :param sample_weights: Probability of a molecule coming from each \
+    sample (if ``None`` then all samples are equally likely)
+    :type sample_weights: list(float)
+    :param umi5_length: 5' UMI length
+    :type umi5_length: int
+    :param umi3_length: 3' UMI length
+    :type umi3_length: int
+    :param min_length: Minimum insert length
+    :type min_length: int
+    :param max_length: Maximum insert length
+    :type max_length: int
+    :param adaptor: 3' adaptor
+    :type adaptor: str or unicode
+    :param duplication: Mean number of reads per molecule (at least 1)
+    :type duplication: float
+    :param gzipped: Write gzipped FASTQ files?
+    :type gzipped: bool
+    :param compresslevel: gzip compression level
+    :type compresslevel: int
+    :param seed: Random seed value
+    :type seed: int
+    :param batch_size: Number of molecules simulated in each batch
+    :type batch_size: int
+    :return: Expected deduplication groups, with columns \
+    ``SampleID``, ``NumReads`` and :py:const:`NUM_GROUPS`
+    :rtype: pandas.core.frame.DataFrame
+    :raise ValueError: If any parameter is invalid or the barcodes \
+    cannot be created
+    """
+    if num_reads < 0:
+        raise ValueError("Number of reads must be at least 0")
+    if duplication < 1:
+        raise ValueError("Duplication must be at least 1")
+    if not 0 < min_length <= max_length:
+        raise ValueError("Invalid insert lengths: {}-{}".format(
+            min_length, max_length))
+    if len(mismatch_weights) > barcode_length + 1:
+        raise ValueError("Barcodes of length {} cannot have {} "
+                         "mismatches".format(barcode_length,
+                                             len(mismatch_weights) - 1))
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    mismatch_weights = np.asarray(mismatch_weights, dtype=float)
+    mismatch_weights /= mismatch_weights.sum()
+    if sample_weights is None:
+        sample_weights = np.ones(num_samples)
+    sample_weights = np.asarray(sample_weights, dtype=float)
+    if len(sample_weights) != num_samples:
+        raise ValueError("Expected {} sample weights but found {}".format(
+            num_samples, len(sample_weights)))
+    sample_weights /= sample_weights.sum()
+
+    rng = np.random.default_rng(seed)
+    barcodes = create_barcodes(rng, num_samples, barcode_length,
+                               2 * mismatches + 1)
+    deplex_dir = os.path.join(output_dir, DEPLEX_DIR)
+    os.makedirs(deplex_dir, exist_ok=True)
+    sample_sheet = pd.DataFrame(
+        {sample_sheets.SAMPLE_ID: [SAMPLE_FORMAT.format(index)
+                                   for index in range(num_samples)],
+         sample_sheets.TAG_READ: [codes_to_str(barcode)
+                                  for barcode in barcodes]})
+    sample_sheet.to_csv(os.path.join(output_dir, BARCODES_FILE),
+                        sep="\t", index=False)
+
+    ext = fastq.FASTQ_GZ_EXT if gzipped else fastq.FASTQ_EXT
+    # Counts indexed by assigned sample + 1, so index 0 is
+    # unassigned.
+    read_counts = np.zeros(num_samples + 1, dtype=np.int64)
+    group_counts = np.zeros(num_samples + 1, dtype=np.int64)
+    id_width = len(str(max(num_reads - 1, 0)))
+    num_molecules = max(1, int(np.ceil(batch_size / duplication)))
+    num_written = 0
+    with open_fastq(os.path.join(output_dir,
+                                 MULTIPLEX_ADAPTOR_FORMAT.format(ext)),
+                    compresslevel) as raw_file, \
+            open_fastq(os.path.join(output_dir,
+                                    MULTIPLEX_FORMAT.format(ext)),
+                       compresslevel) as extracted_file:
+        while num_written < num_reads:
+            batch = simulate_batch(rng, num_written, num_molecules,
+                                   barcodes, umi5_length, umi3_length,
+                                   min_length, max_length, len(adaptor),
+                                   duplication, sample_weights,
+                                   mismatch_weights)
+            batch = truncate_batch(batch, num_reads - num_written)
+            assigned = assign_barcodes(batch["barcodes"], barcodes,
+                                       mismatches) + 1
+            read_counts += np.bincount(assigned, minlength=num_samples + 1)
+            # A group is a molecule's reads assigned to the same sample.
+            groups = np.unique(batch["molecules"] * (num_samples + 1) +
+                               assigned)
+            group_counts += np.bincount(groups % (num_samples + 1),
+                                        minlength=num_samples + 1)
+            raw, extracted = format_batch(batch, id_width, adaptor)
+            raw_file.write(raw.data)
+            extracted_file.write(extracted.data)
+            num_written += len(batch["ids"])
+
+    sample_sheet[sample_sheets.NUM_READS] = read_counts[1:]
+    sample_sheets.save_deplexed_sample_sheet(
+        sample_sheet,
+        int(read_counts[0]),
+        os.path.join(deplex_dir, demultiplex_fastq.NUM_READS_FILE))
+    dedup_groups = pd.DataFrame(
+        {sample_sheets.SAMPLE_ID: sample_sheet[sample_sheets.SAMPLE_ID],
+         sample_sheets.NUM_READS: read_counts[1:],
+         NUM_GROUPS: group_counts[1:]})
+    dedup_groups_file = os.path.join(deplex_dir, DEDUP_GROUPS_FILE)
+    provenance.write_provenance_header(__file__, dedup_groups_file)
+    dedup_groups[list(dedup_groups.columns)].to_csv(
+        dedup_groups_file, mode='a', sep="\t", index=False)
+    return dedup_groups
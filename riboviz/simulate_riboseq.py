@@ -0,0 +1,585 @@
+"""
+Simulate ribosome profiling reads from ORF FASTA and GFF files, to
+test the workflow at scale and check the correctness of its H5, TPM
+and periodicity outputs.
+
+Each read is a ribosome footprint sampled from a coding sequence
+(CDS) or, optionally, an rRNA contaminant, followed by an adaptor.
+For footprints:
+
+* The gene is chosen with probability proportional to its abundance
+  (TPM) times its CDS length, so that the TPMs calculated from the
+  reads estimate the abundances.
+* The read length is chosen from a read length distribution.
+* The codon in the ribosome A-site is chosen uniformly from the
+  codons of the CDS and the A-site nucleotide is offset from the
+  codon's first nucleotide by a frame chosen from a frame
+  distribution, giving 3-nt periodicity.
+* The footprint's 5' end is the A-site nucleotide minus the A-site
+  displacement for the read length, as in an
+  ``asite_disp_length_file`` (see
+  :py:const:`riboviz.params.ASITE_DISP_LENGTH_FILE`).
+
+Codons are only chosen if the whole footprint lies within the
+sequence. rRNA reads are sampled uniformly from the rRNA sequences.
+
+Reads are simulated in batches using NumPy and streamed to an
+(optionally gzipped) FASTQ file, so any number of reads can be
+simulated in constant memory. The following files are created (see
+:py:func:`simulate_riboseq`):
+
+* ``riboseq.fastq[.gz]``: reads, with adaptors.
+* ``gene_counts.tsv``: truth table with each gene's abundance
+  (``TPM``), CDS length in nucleotides (``CDSLength``), number of
+  reads (``NumReads``) and number of reads with an A-site in each
+  frame (``Frame0``, ``Frame1``, ``Frame2``).
+* ``read_length_counts.tsv``: number of footprint
+  (``NumORFReads``) and rRNA (``NumRRNAReads``) reads of each read
+  length (``ReadLength``).
+
+For a given seed and batch size, the same files are always created.
+"""
+import os
+import numpy as np
+import pandas as pd
+from riboviz import fastq
+from riboviz import params
+from riboviz import provenance
+from riboviz import simulate_fastq
+from riboviz.fasta_gff import FastaSequences
+from riboviz.fasta_gff import read_gff
+
+CDS_FEATURE = "CDS"
+""" Default GFF feature type. """
+READ_LENGTHS = [26, 27, 28, 29, 30, 31, 32]
+""" Default read lengths. """
+READ_LENGTH_WEIGHTS = [0.05, 0.1, 0.3, 0.25, 0.15, 0.1, 0.05]
+""" Default read length weights. """
+ASITE_DISPLACEMENT = 15
+""" Default displacement from 5' end to A-site. """
+FRAME_WEIGHTS = [0.7, 0.2, 0.1]
+""" Default weights of A-site frames 0, 1 and 2. """
+ABUNDANCE_SIGMA = 1.5
+""" Default standard deviation of log-normal gene abundances. """
+TPM_TOTAL = 1e6
+""" Sum of abundances, in transcripts per million. """
+BATCH_SIZE = 1000000
+""" Default number of reads simulated in each batch. """
+RIBOSEQ_FORMAT = "riboseq.{}"
+""" Reads file name format. """
+GENE_COUNTS_FILE = "gene_counts.tsv"
+""" Per-gene truth table file name. """
+READ_LENGTH_COUNTS_FILE = "read_length_counts.tsv"
+""" Per-read length truth table file name. """
+READ_LENGTH = "read_length"
+""" A-site displacement file column name (read length). """
+ASITE_DISP = "asite_displacement"
+""" A-site displacement file column name (A-site displacement). """
+GENE = "Gene"
+""" Truth table column name (gene). """
+TPM = "TPM"
+""" Truth table column name (abundance). """
+CDS_LENGTH = "CDSLength"
+""" Truth table column name (CDS length). """
+NUM_READS = "NumReads"
+""" Truth table column name (number of reads). """
+FRAME_FORMAT = "Frame{}"
+""" Truth table column name format (reads with A-site in frame). """
+READ_LENGTH_COLUMN = "ReadLength"
+""" Truth table column name (read length). """
+NUM_ORF_READS = "NumORFReads"
+""" Truth table column name (number of footprint reads). """
+NUM_RRNA_READS = "NumRRNAReads"
+""" Truth table column name (number of rRNA reads). """
+NUM_FRAMES = 3
+""" Number of frames. """
+CONFIG_PARAMS = [params.ORF_FASTA_FILE, params.ORF_GFF_FILE,
+                 params.RRNA_FASTA_FILE, params.ADAPTERS,
+                 params.ASITE_DISP_LENGTH_FILE, params.FEATURE]
+""" Workflow configuration parameters used by the simulator. """
+
+
+def load_asite_displacements(file_name):
+    """
+    Load A-site displacements from an ``asite_disp_length_file``,
+    with columns :py:const:`READ_LENGTH` and :py:const:`ASITE_DISP`.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: Map from read lengths to A-site displacements
+    :rtype: dict(int => int)
+    :raise FileNotFoundError: If the file cannot be found
+    """
+    data = pd.read_csv(file_name, sep="\t", comment="#")
+    return dict(zip(data[READ_LENGTH].astype(int),
+                    data[ASITE_DISP].astype(int)))
+
+
+def load_config(config_file):
+    """
+    Load the parameters in :py:const:`CONFIG_PARAMS` from a workflow
+    configuration file. Parameters not in the file are ``None``.
+
+    :param config_file: Configuration file
+    :type config_file: str or unicode
+    :return: Map from parameters to values
+    :rtype: dict(str or unicode => str or unicode)
+    :raise FileNotFoundError: If the configuration file cannot be \
+    found
+    """
+    import yaml
+    with open(config_file, 'r') as f:
+        config = yaml.load(f, yaml.SafeLoader)
+    return {param: config.get(param) for param in CONFIG_PARAMS}
+
+
+def load_abundances(file_name):
+    """
+    Load gene abundances from a file with columns :py:const:`GENE`
+    and :py:const:`TPM`, for example a
+    :py:const:`GENE_COUNTS_FILE`.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: Map from genes to abundances
+    :rtype: dict(str or unicode => float)
+    :raise FileNotFoundError: If the file cannot be found
+    """
+    data = pd.read_csv(file_name, sep="\t", comment="#")
+    return dict(zip(data[GENE].astype(str), data[TPM].astype(float)))
+
+
+def load_sequences(fasta, seqids=None):
+    """
+    Load sequences from a FASTA file into a single buffer.
+
+    :param fasta: FASTA file
+    :type fasta: str or unicode
+    :param seqids: Sequence IDs (if ``None`` then all)
+    :type seqids: list(str or unicode)
+    :return: Buffer, and offset in the buffer and length of each \
+    sequence
+    :rtype: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    :raise FileNotFoundError: If the FASTA file cannot be found
+    :raise KeyError: If a sequence is not in the FASTA file
+    """
+    with FastaSequences(fasta) as sequences:
+        if seqids is None:
+            seqids = list(sequences.index)
+        buffer = b"".join(
+            bytes(sequences.fetch(seqid, 1, sequences.index[seqid][0]))
+            for seqid in seqids)
+        lengths = np.array([sequences.index[seqid][0] for seqid in seqids],
+                           dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    return np.frombuffer(buffer, dtype=np.uint8), offsets, lengths
+
+
+def load_orfs(fasta, gff, feature=CDS_FEATURE):
+    """
+    Load ORF sequences and the location of the first ``feature``
+    feature on each. Genes are named by their sequence ID, as in
+    the ORF FASTA file and BAM files aligned to it.
+
+    :param fasta: FASTA file
+    :type fasta: str or unicode
+    :param gff: GFF file
+    :type gff: str or unicode
+    :param feature: Feature type
+    :type feature: str or unicode
+    :return: dict with ``genes``, sequence ``buffer``, ``offsets`` \
+    and ``lengths`` (see :py:func:`load_sequences`) and, for each \
+    gene, 0-based ``cds_starts`` and number of complete codons, \
+    ``num_codons``
+    :rtype: dict
+    :raise FileNotFoundError: If the FASTA or GFF file cannot be found
+    :raise ValueError: If there are no ``feature`` features, or any \
+    are not on the ``+`` strand
+    :raise KeyError: If a feature's sequence is not in the FASTA file
+    """
+    features = read_gff(gff, [feature])
+    locations = {}
+    for cds in features.features_of_type(feature):
+        if cds.strand == "-":
+            raise ValueError("{} feature on {} is on the - strand".format(
+                feature, cds.seqid))
+        if cds.seqid not in locations:
+            locations[cds.seqid] = (cds.start - 1, len(cds) // 3)
+    if not locations:
+        raise ValueError("No {} features found ({})".format(feature, gff))
+    genes = list(locations)
+    buffer, offsets, lengths = load_sequences(fasta, genes)
+    cds_starts, num_codons = np.array(
+        [locations[gene] for gene in genes], dtype=np.int64).T
+    return {"genes": genes,
+            "buffer": buffer,
+            "offsets": offsets,
+            "lengths": lengths,
+            "cds_starts": cds_starts,
+            "num_codons": num_codons}
+
+
+def get_abundances(rng, genes, abundances=None, sigma=ABUNDANCE_SIGMA):
+    """
+    Get gene abundances, scaled to sum to :py:const:`TPM_TOTAL`.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param genes: Genes
+    :type genes: list(str or unicode)
+    :param abundances: Map from genes to abundances (genes not in \
+    the map have abundance 0) or ``None``, in which case abundances \
+    are drawn from a log-normal distribution
+    :type abundances: dict(str or unicode => float)
+    :param sigma: Standard deviation of log-normal distribution
+    :type sigma: float
+    :return: Abundances
+    :rtype: numpy.ndarray
+    :raise ValueError: If abundances are negative or all 0
+    """
+    if abundances is None:
+        values = rng.lognormal(0.0, sigma, size=len(genes))
+    else:
+        values = np.array([abundances.get(gene, 0.0) for gene in genes],
+                          dtype=float)
+    if np.any(values < 0) or values.sum() == 0:
+        raise ValueError("Abundances must be non-negative and not all 0")
+    return values * TPM_TOTAL / values.sum()
+
+
+def get_codon_ranges(orfs, read_lengths, displacements):
+    """
+    Get, for each gene, read length and A-site frame, the range of
+    A-site codons for which the footprint lies within the sequence.
+
+    :param orfs: ORFs (see :py:func:`load_orfs`)
+    :type orfs: dict
+    :param read_lengths: Read lengths
+    :type read_lengths: numpy.ndarray
+    :param displacements: A-site displacement for each read length
+    :type displacements: numpy.ndarray
+    :return: First and last codon, each of shape \
+    ``(num_genes, num_lengths, 3)``
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+    cds_starts = orfs["cds_starts"][:, np.newaxis, np.newaxis]
+    lengths = orfs["lengths"][:, np.newaxis, np.newaxis]
+    frames = np.arange(NUM_FRAMES)[np.newaxis, np.newaxis, :]
+    displacements = displacements[np.newaxis, :, np.newaxis]
+    read_lengths = read_lengths[np.newaxis, :, np.newaxis]
+    # 5' end is cds_start + 3 * codon + frame - displacement.
+    first = -((cds_starts + frames - displacements) // 3)
+    last = (lengths - read_lengths + displacements - cds_starts -
+            frames) // 3
+    first = np.maximum(first, 0)
+    last = np.minimum(last, orfs["num_codons"][:, np.newaxis, np.newaxis]
+                      - 1)
+    return first, last
+
+
+def get_segments(buffer, starts, width):
+    """
+    Get fixed-width segments of a buffer. Segments are truncated at
+    the end of the buffer by repeating its last byte.
+
+    :param buffer: Buffer
+    :type buffer: numpy.ndarray
+    :param starts: Start of each segment in the buffer
+    :type starts: numpy.ndarray
+    :param width: Segment width
+    :type width: int
+    :return: ``uint8`` array of shape ``(len(starts), width)``
+    :rtype: numpy.ndarray
+    """
+    indices = starts[:, np.newaxis] + np.arange(width)
+    return buffer[np.minimum(indices, len(buffer) - 1)]
+
+
+def simulate_batch(rng, first_id, num_reads, orfs, gene_weights,
+                   read_lengths, length_weights, displacements,
+                   frame_weights, codon_ranges, rrna=None,
+                   rrna_fraction=0.0):
+    """
+    Simulate a batch of reads.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param first_id: ID of the first read
+    :type first_id: int
+    :param num_reads: Number of reads
+    :type num_reads: int
+    :param orfs: ORFs (see :py:func:`load_orfs`)
+    :type orfs: dict
+    :param gene_weights: Probability of a footprint coming from \
+    each gene
+    :type gene_weights: numpy.ndarray
+    :param read_lengths: Read lengths
+    :type read_lengths: numpy.ndarray
+    :param length_weights: Probability of each read length
+    :type length_weights: numpy.ndarray
+    :param displacements: A-site displacement for each read length
+    :type displacements: numpy.ndarray
+    :param frame_weights: Probability of each A-site frame
+    :type frame_weights: numpy.ndarray
+    :param codon_ranges: Codon ranges (see \
+    :py:func:`get_codon_ranges`)
+    :type codon_ranges: tuple(numpy.ndarray, numpy.ndarray)
+    :param rrna: rRNA sequences (see :py:func:`load_sequences`) or \
+    ``None``
+    :type rrna: tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    :param rrna_fraction: Probability of a read coming from rRNA
+    :type rrna_fraction: float
+    :return: dict with read ``ids``, read length index \
+    (``length_indices``), read ``lengths``, ``genes`` (index of \
+    gene, or -1 for rRNA reads), ``frames`` (A-site frame, or -1 \
+    for rRNA reads) and ``sequences`` (``uint8`` array, each row \
+    padded to the longest read length)
+    :rtype: dict
+    """
+    ids = np.arange(first_id, first_id + num_reads, dtype=np.int64)
+    length_indices = rng.choice(len(read_lengths), size=num_reads,
+                                p=length_weights)
+    lengths = read_lengths[length_indices]
+    is_rrna = np.zeros(num_reads, dtype=bool)
+    if rrna is not None and rrna_fraction > 0:
+        is_rrna = rng.random(num_reads) < rrna_fraction
+    genes = np.full(num_reads, -1, dtype=np.int64)
+    frames = np.full(num_reads, -1, dtype=np.int64)
+    starts = np.zeros(num_reads, dtype=np.int64)
+
+    is_orf = ~is_rrna
+    num_orf = int(is_orf.sum())
+    orf_genes = rng.choice(len(gene_weights), size=num_orf, p=gene_weights)
+    orf_frames = rng.choice(NUM_FRAMES, size=num_orf, p=frame_weights)
+    orf_lengths = length_indices[is_orf]
+    first, last = codon_ranges
+    first = first[orf_genes, orf_lengths, orf_frames]
+    last = last[orf_genes, orf_lengths, orf_frames]
+    codons = first + np.floor(
+        rng.random(num_orf) * (last - first + 1)).astype(np.int64)
+    genes[is_orf] = orf_genes
+    frames[is_orf] = orf_frames
+    starts[is_orf] = orfs["offsets"][orf_genes] + \
+        orfs["cds_starts"][orf_genes] + 3 * codons + orf_frames - \
+        displacements[orf_lengths]
+    width = int(read_lengths.max())
+    sequences = get_segments(orfs["buffer"], starts, width)
+
+    if is_rrna.any():
+        rrna_buffer, rrna_offsets, rrna_lengths = rrna
+        num_rrna = int(is_rrna.sum())
+        rrna_ids = rng.choice(len(rrna_lengths), size=num_rrna,
+                              p=rrna_lengths / rrna_lengths.sum())
+        rrna_read_lengths = lengths[is_rrna]
+        rrna_starts = rrna_offsets[rrna_ids] + np.floor(
+            rng.random(num_rrna) *
+            (rrna_lengths[rrna_ids] - rrna_read_lengths + 1)).astype(
+                np.int64)
+        sequences[is_rrna] = get_segments(rrna_buffer, rrna_starts, width)
+    return {"ids": ids,
+            "length_indices": length_indices,
+            "lengths": lengths,
+            "genes": genes,
+            "frames": frames,
+            "sequences": sequences}
+
+
+def format_batch(rng, batch, id_width, adaptor):
+    """
+    Format a batch of reads (see :py:func:`simulate_batch`) as FASTQ
+    records with adaptors.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param batch: Batch
+    :type batch: dict
+    :param id_width: Number of digits in read IDs
+    :type id_width: int
+    :param adaptor: Adaptor
+    :type adaptor: str or unicode
+    :return: FASTQ records
+    :rtype: numpy.ndarray
+    """
+    num_reads = len(batch["ids"])
+    sequences = batch["sequences"]
+    qualities = simulate_fastq.random_qualities(
+        rng, (num_reads, sequences.shape[1] + len(adaptor)))
+    return simulate_fastq.join_segments(
+        [("@" + simulate_fastq.READ_PREFIX).encode(),
+         simulate_fastq.encode_ids(batch["ids"], id_width), b"\n",
+         (sequences, batch["lengths"]), adaptor.encode(), b"\n+\n",
+         (qualities, batch["lengths"] + len(adaptor)), b"\n"],
+        num_reads)
+
+
+def simulate_riboseq(orf_fasta,
+                     orf_gff,
+                     output_dir,
+                     num_reads,
+                     rrna_fasta=None,
+                     rrna_fraction=0.0,
+                     read_lengths=READ_LENGTHS,
+                     read_length_weights=READ_LENGTH_WEIGHTS,
+                     asite_displacements=None,
+                     frame_weights=FRAME_WEIGHTS,
+                     abundances=None,
+                     abundance_sigma=ABUNDANCE_SIGMA,
+                     feature=CDS_FEATURE,
+                     adaptor=simulate_fastq.ADAPTOR,
+                     gzipped=False,
+                     compresslevel=1,
+                     seed=42,
+                     batch_size=BATCH_SIZE):
+    """
+    Simulate ribosome profiling reads and truth tables. See the
+    module documentation for the model and files created.
+
+    :param orf_fasta: ORF FASTA file
+    :type orf_fasta: str or unicode
+    :param orf_gff: ORF GFF file
+    :type orf_gff: str or unicode
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param num_reads: Number of reads
+    :type num_reads: int
+    :param rrna_fasta: rRNA FASTA file or ``None``
+    :type rrna_fasta: str or unicode
+    :param rrna_fraction: Probability of a read coming from rRNA
+    :type rrna_fraction: float
+    :param read_lengths: Read lengths
+    :type read_lengths: list(int)
+    :param read_length_weights: Probability of each read length
+    :type read_length_weights: list(float)
+    :param asite_displacements: Map from read lengths to A-site \
+    displacements, or ``None``. Read lengths not in the map have \
+    displacement :py:const:`ASITE_DISPLACEMENT`
+    :type asite_displacements: dict(int => int)
+    :param frame_weights: Probability of each A-site frame
+    :type frame_weights: list(float)
+    :param abundances: Map from genes to abundances or ``None`` (see \
+    :py:func:`get_abundances`)
+    :type abundances: dict(str or unicode => float)
+    :param abundance_sigma: Standard deviation of log-normal gene \
+    abundances, used if ``abundances`` is ``None``
+    :type abundance_sigma: float
+    :param feature: Feature type
+    :type feature: str or unicode
+    :param adaptor: 3' adaptor
+    :type adaptor: str or unicode
+    :param gzipped: Write gzipped FASTQ file?
+    :type gzipped: bool
+    :param compresslevel: gzip compression level
+    :type compresslevel: int
+    :param seed: Random seed value
+    :type seed: int
+    :param batch_size: Number of reads simulated in each batch
+    :type batch_size: int
+    :return: Per-gene truth table, with columns :py:const:`GENE`, \
+    :py:const:`TPM`, :py:const:`CDS_LENGTH`, :py:const:`NUM_READS` \
+    and ``Frame0``, ``Frame1``, ``Frame2``
+    :rtype: pandas.core.frame.DataFrame
+    :raise FileNotFoundError: If a FASTA or GFF file cannot be found
+    :raise ValueError: If any parameter is invalid, or reads of a \
+    given length cannot be placed on a gene or rRNA sequence
+    :raise KeyError: If a feature's sequence is not in the FASTA file
+    """
+    if num_reads < 0:
+        raise ValueError("Number of reads must be at least 0")
+    if not 0 <= rrna_fraction <= 1:
+        raise ValueError("rRNA fraction must be in [0, 1]")
+    if rrna_fraction > 0 and rrna_fasta is None:
+        raise ValueError("rRNA fraction is {} but no rRNA FASTA file "
+                         "was provided".format(rrna_fraction))
+    if len(read_lengths) != len(read_length_weights):
+        raise ValueError("Expected {} read length weights but found "
+                         "{}".format(len(read_lengths),
+                                     len(read_length_weights)))
+    if len(frame_weights) != NUM_FRAMES:
+        raise ValueError("Expected {} frame weights but found {}".format(
+            NUM_FRAMES, len(frame_weights)))
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    read_lengths = np.asarray(read_lengths, dtype=np.int64)
+    if np.any(read_lengths < 1):
+        raise ValueError("Read lengths must be at least 1")
+    length_weights = np.asarray(read_length_weights, dtype=float)
+    length_weights /= length_weights.sum()
+    frame_weights = np.asarray(frame_weights, dtype=float)
+    frame_weights /= frame_weights.sum()
+    asite_displacements = asite_displacements or {}
+    displacements = np.array(
+        [asite_displacements.get(int(length), ASITE_DISPLACEMENT)
+         for length in read_lengths], dtype=np.int64)
+
+    orfs = load_orfs(orf_fasta, orf_gff, feature)
+    genes = orfs["genes"]
+    rrna = None
+    if rrna_fraction > 0:
+        rrna_buffer, rrna_offsets, rrna_lengths = load_sequences(rrna_fasta)
+        # Exclude rRNA sequences shorter than the longest read.
+        keep = rrna_lengths >= read_lengths.max()
+        if not keep.any():
+            raise ValueError("No rRNA sequence is at least {} nt".format(
+                read_lengths.max()))
+        rrna = (rrna_buffer, rrna_offsets[keep], rrna_lengths[keep])
+    rng = np.random.default_rng(seed)
+    tpms = get_abundances(rng, genes, abundances, abundance_sigma)
+    codon_ranges = get_codon_ranges(orfs, read_lengths, displacements)
+    # Check every gene with reads can have footprints of every
+    # length with A-sites in every frame.
+    invalid = np.any((codon_ranges[1] < codon_ranges[0]) &
+                     (tpms > 0)[:, np.newaxis, np.newaxis], axis=(1, 2))
+    if invalid.any():
+        raise ValueError("Reads cannot be placed on {} gene(s), for "
+                         "example {}".format(
+                             int(invalid.sum()),
+                             genes[int(np.flatnonzero(invalid)[0])]))
+    gene_weights = tpms * orfs["num_codons"]
+    gene_weights /= gene_weights.sum()
+
+    os.makedirs(output_dir, exist_ok=True)
+    ext = fastq.FASTQ_GZ_EXT if gzipped else fastq.FASTQ_EXT
+    gene_counts = np.zeros(len(genes) * NUM_FRAMES, dtype=np.int64)
+    orf_length_counts = np.zeros(len(read_lengths), dtype=np.int64)
+    rrna_length_counts = np.zeros(len(read_lengths), dtype=np.int64)
+    id_width = len(str(max(num_reads - 1, 0)))
+    num_written = 0
+    with simulate_fastq.open_fastq(
+            os.path.join(output_dir, RIBOSEQ_FORMAT.format(ext)),
+            compresslevel) as f:
+        while num_written < num_reads:
+            batch = simulate_batch(
+                rng, num_written, min(batch_size, num_reads - num_written),
+                orfs, gene_weights, read_lengths, length_weights,
+                displacements, frame_weights, codon_ranges, rrna,
+                rrna_fraction)
+            is_orf = batch["genes"] >= 0
+            gene_counts += np.bincount(
+                batch["genes"][is_orf] * NUM_FRAMES +
+                batch["frames"][is_orf],
+                minlength=len(gene_counts))
+            orf_length_counts += np.bincount(
+                batch["length_indices"][is_orf],
+                minlength=len(read_lengths))
+            rrna_length_counts += np.bincount(
+                batch["length_indices"][~is_orf],
+                minlength=len(read_lengths))
+            f.write(format_batch(rng, batch, id_width, adaptor).data)
+            num_written += len(batch["ids"])
+
+    gene_counts = gene_counts.reshape(len(genes), NUM_FRAMES)
+    truth = pd.DataFrame({GENE: genes,
+                          TPM: tpms,
+                          CDS_LENGTH: orfs["num_codons"] * 3,
+                          NUM_READS: gene_counts.sum(axis=1)})
+    for frame in range(NUM_FRAMES):
+        truth[FRAME_FORMAT.format(frame)] = gene_counts[:, frame]
+    length_counts = pd.DataFrame({READ_LENGTH_COLUMN: read_lengths,
+                                  NUM_ORF_READS: orf_length_counts,
+                                  NUM_RRNA_READS: rrna_length_counts})
+    for data, file_name in [(truth, GENE_COUNTS_FILE),
+                            (length_counts, READ_LENGTH_COUNTS_FILE)]:
+        file_name = os.path.join(output_dir, file_name)
+        provenance.write_provenance_header(__file__, file_name)
+        data.to_csv(file_name, mode='a', sep="\t", index=False)
+    return truth
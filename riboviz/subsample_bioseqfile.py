@@ -1,26 +1,560 @@
 """
 Subsample .fastq, .fastq.gz or other sequence file.
+
+Three subsampling modes are supported:
+
+* :py:const:`BERNOULLI`: each record is parsed using ``Bio.SeqIO``
+  and is selected with a fixed probability. Any ``Bio.SeqIO`` file
+  type is supported.
+* :py:const:`SKIP`: each record is selected with a fixed probability,
+  as for :py:const:`BERNOULLI`, but the number of records to skip
+  before the next selected record is drawn from a geometric
+  distribution. Skipped records are scanned only for record
+  boundaries, they are not parsed.
+* :py:const:`RESERVOIR`: an exact number of records is selected using
+  reservoir sampling (Li's "Algorithm L"), which also uses geometric
+  skips. Selected records are held in memory until the input has been
+  read.
+
+For :py:const:`SKIP` and :py:const:`RESERVOIR`, only FASTQ and FASTA
+files are supported, selected records are copied from the input file
+as raw bytes, records are output in the order in which they occur in
+the input, and the same seed always selects the same records. Paired
+files can be subsampled in lockstep, so that pairing is preserved
+(see :py:func:`subsample_lockstep`), and many files, or pairs of
+files, can be subsampled in parallel (see
+:py:func:`subsample_bioseqfiles`).
 """
+from collections import deque
+from contextlib import ExitStack
+import csv
 import gzip
+import hashlib
+from itertools import islice
+import math
+import multiprocessing
 import os
 import random
-from Bio import SeqIO
+from riboviz import params
+from riboviz import provenance
+
+BERNOULLI = "bernoulli"
+""" Subsampling mode (parse every record, select with probability). """
+SKIP = "skip"
+""" Subsampling mode (geometric skips, select with probability). """
+RESERVOIR = "reservoir"
+""" Subsampling mode (geometric skips, select exact number). """
+MODES = [BERNOULLI, SKIP, RESERVOIR]
+""" Subsampling modes. """
+GZ_EXTS = [".gz", ".gzip"]
+""" Extensions of gzipped files. """
+FASTQ_LINES = 4
+""" Number of lines in a FASTQ record. """
+INPUT_FILE = "InputFile"
+""" Summary column name (input file). """
+OUTPUT_FILE = "OutputFile"
+""" Summary column name (output file). """
+NUM_READS_IN = "NumReadsIn"
+""" Summary column name (number of reads read). """
+NUM_READS_OUT = "NumReadsOut"
+""" Summary column name (number of reads written). """
+SUMMARY_COLUMNS = [INPUT_FILE, OUTPUT_FILE, NUM_READS_IN, NUM_READS_OUT]
+""" Summary column names. """
+SUMMARY_FILE = "subsample_summary.tsv"
+""" Default summary file name. """
+
+
+def open_file(file_name, mode="rb"):
+    """
+    Open a file, which may be gzipped, determined by its extension
+    (see :py:const:`GZ_EXTS`).
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :param mode: Mode e.g. ``rb``, ``wb``, ``rt``, ``wt``
+    :type mode: str or unicode
+    :return: File handle
+    :rtype: gzip.GzipFile or io.IOBase
+    """
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext in GZ_EXTS:
+        return gzip.open(file_name, mode)
+    return open(file_name, mode)
+
+
+def read_fastq_record(handle):
+    """
+    Read the raw bytes of the next FASTQ record. Each record is
+    assumed to have four lines.
+
+    :param handle: File handle, opened in binary mode
+    :type handle: gzip.GzipFile or io.BufferedIOBase
+    :return: Record, or ``b""`` if there are no more records
+    :rtype: bytes
+    :raise ValueError: If the record is not a FASTQ record
+    """
+    lines = list(islice(handle, FASTQ_LINES))
+    if not lines:
+        return b""
+    if len(lines) < FASTQ_LINES or not lines[0].startswith(b"@") \
+       or not lines[2].startswith(b"+"):
+        raise ValueError("Invalid FASTQ record: {}".format(lines))
+    return b"".join(lines)
+
+
+def skip_fastq_records(handle, num_records):
+    """
+    Skip FASTQ records. Each record is assumed to have four lines.
+    Lines are counted without the records being parsed.
+
+    :param handle: File handle, opened in binary mode
+    :type handle: gzip.GzipFile or io.BufferedIOBase
+    :param num_records: Number of records to skip
+    :type num_records: int
+    :return: Number of records skipped, which is less than \
+    ``num_records`` if the end of the file was reached
+    :rtype: int
+    """
+    # Consume lines and keep only the last (count, line) pair, all
+    # at C speed.
+    last = deque(enumerate(islice(handle, num_records * FASTQ_LINES), 1),
+                 maxlen=1)
+    if not last:
+        return 0
+    return last[0][0] // FASTQ_LINES
+
+
+def read_fasta_record(handle):
+    """
+    Read the raw bytes of the next FASTA record.
+
+    :param handle: File handle, opened in binary mode, which \
+    supports ``peek``
+    :type handle: gzip.GzipFile or io.BufferedReader
+    :return: Record, or ``b""`` if there are no more records
+    :rtype: bytes
+    :raise ValueError: If the record is not a FASTA record
+    """
+    header = handle.readline()
+    if not header:
+        return b""
+    if not header.startswith(b">"):
+        raise ValueError("Invalid FASTA record: {}".format(header))
+    lines = [header]
+    while handle.peek(1)[:1] not in (b">", b""):
+        lines.append(handle.readline())
+    return b"".join(lines)
+
+
+def skip_fasta_records(handle, num_records):
+    """
+    Skip FASTA records.
+
+    :param handle: File handle, opened in binary mode, which \
+    supports ``peek``
+    :type handle: gzip.GzipFile or io.BufferedReader
+    :param num_records: Number of records to skip
+    :type num_records: int
+    :return: Number of records skipped, which is less than \
+    ``num_records`` if the end of the file was reached
+    :rtype: int
+    :raise ValueError: If a record is not a FASTA record
+    """
+    for num_skipped in range(num_records):
+        if not read_fasta_record(handle):
+            return num_skipped
+    return num_records
+
+
+RECORD_FUNCTIONS = {
+    "fastq": (read_fastq_record, skip_fastq_records),
+    "fasta": (read_fasta_record, skip_fasta_records)
+}
+"""
+Map from file types to functions to read a raw record and to skip
+records.
+"""
+
+
+def get_record_functions(filetype):
+    """
+    Get functions to read a raw record and to skip records from a
+    file of the given type (see :py:const:`RECORD_FUNCTIONS`).
+
+    :param filetype: File type
+    :type filetype: str or unicode
+    :return: Read record function and skip records function
+    :rtype: tuple(function, function)
+    :raise ValueError: If the file type is not supported
+    """
+    if filetype not in RECORD_FUNCTIONS:
+        raise ValueError(
+            "file type {} is not supported, supported types are {}".format(
+                filetype, list(RECORD_FUNCTIONS)))
+    return RECORD_FUNCTIONS[filetype]
+
+
+def get_geometric_skip(rng, log_q):
+    """
+    Get the number of records to skip before the next selected
+    record, where each record is selected independently with
+    probability ``p``.
+
+    :param rng: Random number generator
+    :type rng: random.Random
+    :param log_q: ``log(1 - p)``
+    :type log_q: float
+    :return: Number of records to skip
+    :rtype: int
+    """
+    # 1 - random() is in (0, 1] so its log is defined.
+    return int(math.log(1.0 - rng.random()) / log_q)
+
+
+def skip_lockstep(skip_records, in_handles, num_records):
+    """
+    Skip the same number of records in each input file.
+
+    :param skip_records: Function to skip records in a file (see \
+    :py:const:`RECORD_FUNCTIONS`)
+    :type skip_records: function
+    :param in_handles: Input file handles, opened in binary mode
+    :type in_handles: list(gzip.GzipFile or io.BufferedReader)
+    :param num_records: Number of records to skip
+    :type num_records: int
+    :return: Number of records skipped, which is less than \
+    ``num_records`` if the end of the files was reached
+    :rtype: int
+    :raise ValueError: If the files have different numbers of records
+    """
+    num_skipped = {skip_records(in_handle, num_records)
+                   for in_handle in in_handles}
+    if len(num_skipped) > 1:
+        raise ValueError("Input files have different numbers of records: "
+                         "{}".format([in_handle.name
+                                      for in_handle in in_handles]))
+    return num_skipped.pop()
+
+
+def read_lockstep(read_record, in_handles):
+    """
+    Read the next record from each input file.
+
+    :param read_record: Function to read a record from a file (see \
+    :py:const:`RECORD_FUNCTIONS`)
+    :type read_record: function
+    :param in_handles: Input file handles, opened in binary mode
+    :type in_handles: list(gzip.GzipFile or io.BufferedReader)
+    :return: Records, one per file, or ``None`` if there are no more \
+    records
+    :rtype: list(bytes)
+    :raise ValueError: If the files have different numbers of records \
+    or a record is invalid
+    """
+    records = [read_record(in_handle) for in_handle in in_handles]
+    if all(records):
+        return records
+    if any(records):
+        raise ValueError("Input files have different numbers of records: "
+                         "{}".format([in_handle.name
+                                      for in_handle in in_handles]))
+    return None
+
+
+def write_lockstep(out_handles, records, verbose=False):
+    """
+    Write one record to each output file.
+
+    :param out_handles: Output file handles, opened in binary mode
+    :type out_handles: list(gzip.GzipFile or io.BufferedWriter)
+    :param records: Records, one per file
+    :type records: list(bytes)
+    :param verbose: Print ID of the record in the first file?
+    :type verbose: bool
+    """
+    if verbose:
+        print(get_record_id(records[0]))
+    for out_handle, record in zip(out_handles, records):
+        out_handle.write(record)
+
+
+def subsample_skip(in_handles, out_handles, filetype, prob, seedvalue,
+                   verbose=False):
+    """
+    Subsample records, selecting each record with a fixed
+    probability, by skipping a geometrically-distributed number of
+    records between selected records. Selected records are copied
+    as raw bytes.
+
+    If there is more than one input file, for example for paired-end
+    reads, then the files are sampled in lockstep: the records with
+    the same index in each file are selected.
+
+    :param in_handles: Input file handles, opened in binary mode
+    :type in_handles: list(gzip.GzipFile or io.BufferedReader)
+    :param out_handles: Output file handles, opened in binary mode, \
+    one per input file
+    :type out_handles: list(gzip.GzipFile or io.BufferedWriter)
+    :param filetype: File type (see :py:const:`RECORD_FUNCTIONS`)
+    :type filetype: str or unicode
+    :param prob: Probability / proportion to sample
+    :type prob: float
+    :param seedvalue: Random seed value
+    :type seedvalue: int
+    :param verbose: Print ID of each selected record?
+    :type verbose: bool
+    :return: Number of records read and number of records written, \
+    per file
+    :rtype: tuple(int, int)
+    :raise ValueError: If the file type is not supported, ``prob`` \
+    is not in ``(0, 1]``, a record is invalid or the input files \
+    have different numbers of records
+    """
+    read_record, skip_records = get_record_functions(filetype)
+    if not 0 < prob <= 1:
+        raise ValueError("probability {} is not in (0, 1]".format(prob))
+    log_q = math.log(1.0 - prob) if prob < 1 else -math.inf
+    rng = random.Random(seedvalue)
+    row_count = 0
+    row_count_out = 0
+    while True:
+        num_skip = get_geometric_skip(rng, log_q)
+        num_skipped = skip_lockstep(skip_records, in_handles, num_skip)
+        row_count += num_skipped
+        if num_skipped < num_skip:
+            break
+        records = read_lockstep(read_record, in_handles)
+        if records is None:
+            break
+        row_count += 1
+        row_count_out += 1
+        write_lockstep(out_handles, records, verbose)
+    return row_count, row_count_out
+
+
+def subsample_reservoir(in_handles, out_handles, filetype, num_records,
+                        seedvalue, verbose=False):
+    """
+    Subsample an exact number of records, using reservoir sampling
+    with geometrically-distributed skips between candidate records
+    (Li's "Algorithm L"). Selected records are held in memory then
+    copied as raw bytes, in input order, once the input has been
+    read. If the input has fewer than ``num_records`` records then
+    all records are selected.
+
+    If there is more than one input file, for example for paired-end
+    reads, then the files are sampled in lockstep: the records with
+    the same index in each file are selected.
+
+    :param in_handles: Input file handles, opened in binary mode
+    :type in_handles: list(gzip.GzipFile or io.BufferedReader)
+    :param out_handles: Output file handles, opened in binary mode, \
+    one per input file
+    :type out_handles: list(gzip.GzipFile or io.BufferedWriter)
+    :param filetype: File type (see :py:const:`RECORD_FUNCTIONS`)
+    :type filetype: str or unicode
+    :param num_records: Number of records to sample
+    :type num_records: int
+    :param seedvalue: Random seed value
+    :type seedvalue: int
+    :param verbose: Print ID of each selected record?
+    :type verbose: bool
+    :return: Number of records read and number of records written, \
+    per file
+    :rtype: tuple(int, int)
+    :raise ValueError: If the file type is not supported, \
+    ``num_records`` is not a positive integer, a record is invalid \
+    or the input files have different numbers of records
+    """
+    read_record, skip_records = get_record_functions(filetype)
+    if num_records is None or num_records < 1:
+        raise ValueError("number of records {} is not a positive integer"
+                         .format(num_records))
+    rng = random.Random(seedvalue)
+    reservoir = []
+    for row_count in range(num_records):
+        records = read_lockstep(read_record, in_handles)
+        if records is None:
+            break
+        reservoir.append((row_count, records))
+    row_count = len(reservoir)
+    if row_count == num_records:
+        # log(w), where w is the largest of num_records uniform
+        # random keys, updated as records replace others.
+        log_w = math.log(1.0 - rng.random()) / num_records
+        while True:
+            log_q = math.log(-math.expm1(log_w)) if log_w < 0 \
+                else -math.inf
+            num_skip = get_geometric_skip(rng, log_q)
+            num_skipped = skip_lockstep(skip_records, in_handles, num_skip)
+            row_count += num_skipped
+            if num_skipped < num_skip:
+                break
+            records = read_lockstep(read_record, in_handles)
+            if records is None:
+                break
+            reservoir[rng.randrange(num_records)] = (row_count, records)
+            row_count += 1
+            log_w += math.log(1.0 - rng.random()) / num_records
+    reservoir.sort(key=lambda index_records: index_records[0])
+    for _, records in reservoir:
+        write_lockstep(out_handles, records, verbose)
+    return row_count, len(reservoir)
+
+
+def get_record_id(record):
+    """
+    Get the ID of a raw FASTQ or FASTA record.
+
+    :param record: Record
+    :type record: bytes
+    :return: ID
+    :rtype: str or unicode
+    """
+    return record.split(None, 1)[0][1:].decode()
+
+
+def subsample_bernoulli(in_handle, out_handle, filetype, prob, seedvalue,
+                        verbose=False):
+    """
+    Subsample records, parsing each record using ``Bio.SeqIO`` and
+    selecting it with a fixed probability.
+
+    See https://biopython.org/wiki/SeqIO for description of valid
+    filetypes.
+
+    :param in_handle: Input file handle, opened in text mode
+    :type in_handle: _io.TextIOWrapper
+    :param out_handle: Output file handle, opened in text mode
+    :type out_handle: _io.TextIOWrapper
+    :param filetype: SeqIO file type
+    :type filetype: str or unicode
+    :param prob: Probability / proportion to sample
+    :type prob: float
+    :param seedvalue: Random seed value (if ``None`` then the \
+    generator is seeded from the system)
+    :type seedvalue: int
+    :param verbose: Print ID of each selected record?
+    :type verbose: bool
+    :return: Number of records read and number of records written
+    :rtype: tuple(int, int)
+    """
+    from Bio import SeqIO
+    rng = random.Random(seedvalue)
+    row_count = 0
+    row_count_out = 0
+    for record in SeqIO.parse(in_handle, filetype):
+        row_count += 1
+        if row_count % 100000 == 0:
+            print(("read {rowcount}".format(rowcount=row_count)))
+        if rng.random() < prob:
+            row_count_out += 1
+            if verbose:
+                print((record.id))
+            SeqIO.write(record, out_handle, filetype)
+    return row_count, row_count_out
+
+
+def subsample_lockstep(seqfilesin, seqfilesout, filetype, prob, overwrite,
+                       seedvalue, verbose, mode=BERNOULLI, num_records=None):
+    """
+    Subsample one or more biological sequence files, which may be
+    gzipped, in lockstep, so the records with the same index in each
+    file are selected. This allows paired-end read files to be
+    subsampled without breaking pairing. See the module documentation
+    for the subsampling modes.
+
+    :param seqfilesin: File names of input sequence files
+    :type seqfilesin: list(str or unicode)
+    :param seqfilesout: File names of output sequence files, one per \
+    input file
+    :type seqfilesout: list(str or unicode)
+    :param filetype: SeqIO file type
+    :type filetype: str or unicode
+    :param prob: probability / proportion to sample, ignored if \
+    ``mode`` is :py:const:`RESERVOIR`
+    :type prob: float
+    :param overwrite: overwrite if output files exist?
+    :type overwrite: bool
+    :param seedvalue: random seed value
+    :type seedvalue: int
+    :param verbose: print progress statements
+    :type verbose: bool
+    :param mode: Subsampling mode, one of :py:const:`MODES`
+    :type mode: str or unicode
+    :param num_records: Number of records to sample, required if \
+    ``mode`` is :py:const:`RESERVOIR`
+    :type num_records: int
+    :return: Number of records read and number of records written, \
+    per file
+    :rtype: tuple(int, int)
+    :raise ValueError: If an output file exists and ``overwrite`` \
+    is ``False``, an input file does not exist, ``mode`` is not \
+    supported, the parameters are invalid for ``mode``, there is \
+    more than one input file and ``mode`` is :py:const:`BERNOULLI` \
+    or the input files have different numbers of records
+    """
+    if len(seqfilesin) != len(seqfilesout):
+        raise ValueError("Expected {} output files but found {}".format(
+            len(seqfilesin), len(seqfilesout)))
+    # files exist, overwrite output?
+    for seqfileout in seqfilesout:
+        if os.path.exists(seqfileout) and not overwrite:
+            raise ValueError(
+                "output file {} already exists, use '-overwrite' to replace"
+                .format(seqfileout))
+    for seqfilein in seqfilesin:
+        if not os.path.exists(seqfilein):
+            raise ValueError(
+                "input file {} doesn't exist".format(seqfilein))
+    if mode not in MODES:
+        raise ValueError("mode {} is not one of {}".format(mode, MODES))
+
+    if mode == BERNOULLI:
+        if len(seqfilesin) > 1:
+            raise ValueError("mode {} supports only one input file".format(
+                mode))
+        with open_file(seqfilesin[0], "rt") as in_handle, \
+                open_file(seqfilesout[0], "wt") as out_handle:
+            row_count, row_count_out = subsample_bernoulli(
+                in_handle, out_handle, filetype, prob, seedvalue, verbose)
+    else:
+        with ExitStack() as stack:
+            in_handles = [stack.enter_context(open_file(seqfilein, "rb"))
+                          for seqfilein in seqfilesin]
+            out_handles = [stack.enter_context(open_file(seqfileout, "wb"))
+                           for seqfileout in seqfilesout]
+            if mode == SKIP:
+                row_count, row_count_out = subsample_skip(
+                    in_handles, out_handles, filetype, prob, seedvalue,
+                    verbose)
+            else:
+                row_count, row_count_out = subsample_reservoir(
+                    in_handles, out_handles, filetype, num_records,
+                    seedvalue, verbose)
+    print(("subsampling complete; read {} records from {}, wrote {} records \
+to {}".format(row_count, ", ".join(seqfilesin), row_count_out,
+              ", ".join(seqfilesout))))
+    return row_count, row_count_out
 
 
 def subsample_bioseqfile(
-        seqfilein, seqfileout, filetype, prob, overwrite, seedvalue, verbose
+        seqfilein, seqfileout, filetype, prob, overwrite, seedvalue, verbose,
+        mode=BERNOULLI, num_records=None
 ):
     """
-    Subsample a *gzipped* biological sequence file using Bio.SeqIO
-    See https://biopython.org/wiki/SeqIO for description of valid filetypes
+    Subsample a biological sequence file, which may be gzipped. See
+    the module documentation for the subsampling modes and
+    :py:func:`subsample_lockstep`.
 
     :param seqfilein: File name of input sequence file
     :type seqfilein: str or unicode
-    :param seqfileout: File name of input sequence file
+    :param seqfileout: File name of output sequence file
     :type seqfileout: str or unicode
     :param filetype: SeqIO file type (default 'fastq')
     :type filetype: str or unicode
-    :param prob: probability / proportion to sample (default 0.01)
+    :param prob: probability / proportion to sample (default 0.01), \
+    ignored if ``mode`` is :py:const:`RESERVOIR`
     :type prob: float
     :param overwrite: overwrite if output file exists? (default False)
     :type overwrite: bool
@@ -28,50 +562,179 @@ def subsample_bioseqfile(
     :type seedvalue: int
     :param verbose: print progress statements (default False)
     :type verbose: bool
-    :return: Bio.SeqIO
-    :rtype:
-    :raise FileNotFoundError: If the file cannot be found or is \
-    not a file
+    :param mode: Subsampling mode, one of :py:const:`MODES`
+    :type mode: str or unicode
+    :param num_records: Number of records to sample, required if \
+    ``mode`` is :py:const:`RESERVOIR`
+    :type num_records: int
+    :return: Number of records read and number of records written
+    :rtype: tuple(int, int)
+    :raise ValueError: If the output file exists and ``overwrite`` \
+    is ``False``, the input file does not exist, ``mode`` is not \
+    supported or the parameters are invalid for ``mode``
     """
+    return subsample_lockstep([seqfilein], [seqfileout], filetype, prob,
+                              overwrite, seedvalue, verbose, mode,
+                              num_records)
 
-    ext = os.path.splitext(seqfilein)[1].lower()
 
-    # files exist, overwrite output?
-    if os.path.exists(seqfileout) and not overwrite:
-        raise ValueError(
-            "output file {} already exists, use '-overwrite' to replace"
-            .format(seqfileout))
-    if not os.path.exists(seqfilein):
-        raise ValueError(
-            "input file {} doesn't exist".format(seqfilein))
+def get_derived_seed(seedvalue, seqfilein):
+    """
+    Get a random seed value for an input file, derived from a random
+    seed value and the input file's name, excluding its directory.
+    The derived seed does not depend on the other files being
+    subsampled, or their order.
 
-    is_gz = ext in [".gz", ".gzip"]
+    :param seedvalue: Random seed value (if ``None`` then ``None`` \
+    is returned)
+    :type seedvalue: int
+    :param seqfilein: File name of input sequence file
+    :type seqfilein: str or unicode
+    :return: Random seed value
+    :rtype: int
+    """
+    if seedvalue is None:
+        return None
+    key = "{}:{}".format(seedvalue, os.path.basename(seqfilein))
+    return int(hashlib.sha256(key.encode()).hexdigest()[:16], 16)
 
-    if is_gz:
-        open_file = gzip.open
-        open_r = "rt"
-        open_w = "wt"
+
+def get_fq_files(config_file):
+    """
+    Get the FASTQ files, :py:const:`riboviz.params.FQ_FILES` and
+    :py:const:`riboviz.params.MULTIPLEX_FQ_FILES`, in a workflow
+    configuration file, prefixed by the input directory,
+    :py:const:`riboviz.params.INPUT_DIR`.
+
+    :param config_file: Configuration file
+    :type config_file: str or unicode
+    :return: FASTQ files
+    :rtype: list(str or unicode)
+    :raise FileNotFoundError: If the configuration file cannot be \
+    found
+    """
+    import yaml
+    with open(config_file, 'r') as f:
+        config = yaml.load(f, yaml.SafeLoader)
+    input_dir = config.get(params.INPUT_DIR) or ""
+    fq_files = list((config.get(params.FQ_FILES) or {}).values())
+    fq_files.extend(config.get(params.MULTIPLEX_FQ_FILES) or [])
+    return [os.path.join(input_dir, fq_file) for fq_file in fq_files]
+
+
+def get_pairs(seqfiles):
+    """
+    Group file names into consecutive pairs, for example
+    ``[R1, R2, R1, R2]`` into ``[[R1, R2], [R1, R2]]``.
+
+    :param seqfiles: File names
+    :type seqfiles: list(str or unicode)
+    :return: Pairs of file names
+    :rtype: list(list(str or unicode))
+    :raise ValueError: If there is an odd number of file names
+    """
+    if len(seqfiles) % 2 != 0:
+        raise ValueError("Expected an even number of paired files but "
+                         "found {}".format(len(seqfiles)))
+    return [list(seqfiles[i:i + 2]) for i in range(0, len(seqfiles), 2)]
+
+
+def subsample_bioseqfiles(seqfilesin, output_dir, filetype, prob, overwrite,
+                          seedvalue, verbose, mode=BERNOULLI,
+                          num_records=None, processes=1,
+                          summary_file=None):
+    """
+    Subsample biological sequence files, which may be gzipped, using
+    :py:func:`subsample_lockstep`. Each output file has the same name
+    as its input file and is written into ``output_dir``.
+
+    Each item of ``seqfilesin`` is either a file name or a list of
+    file names to be subsampled in lockstep (for example, paired-end
+    read files). Items are subsampled in parallel. Each item is
+    subsampled using a random seed value derived from ``seedvalue``
+    and the name of its first file (see :py:func:`get_derived_seed`).
+
+    If ``summary_file`` is provided then a summary is written as
+    tab-separated values with a provenance header and one row per
+    input file, with columns :py:const:`INPUT_FILE`,
+    :py:const:`OUTPUT_FILE`, :py:const:`NUM_READS_IN` and
+    :py:const:`NUM_READS_OUT`.
+
+    :param seqfilesin: File names of input sequence files, or lists \
+    of file names to be subsampled in lockstep
+    :type seqfilesin: list(str or unicode or list(str or unicode))
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param filetype: SeqIO file type
+    :type filetype: str or unicode
+    :param prob: probability / proportion to sample, ignored if \
+    ``mode`` is :py:const:`RESERVOIR`
+    :type prob: float
+    :param overwrite: overwrite if output files exist?
+    :type overwrite: bool
+    :param seedvalue: random seed value
+    :type seedvalue: int
+    :param verbose: print progress statements
+    :type verbose: bool
+    :param mode: Subsampling mode, one of :py:const:`MODES`
+    :type mode: str or unicode
+    :param num_records: Number of records to sample, required if \
+    ``mode`` is :py:const:`RESERVOIR`
+    :type num_records: int
+    :param processes: Number of processes
+    :type processes: int
+    :param summary_file: Summary file (if ``None`` then no summary \
+    is written)
+    :type summary_file: str or unicode
+    :return: Summary, one tuple per input file, with values \
+    for :py:const:`SUMMARY_COLUMNS`
+    :rtype: list(tuple(str or unicode, str or unicode, int, int))
+    :raise ValueError: If input file names, excluding directories, \
+    are not unique, or if raised by :py:func:`subsample_lockstep`
+    """
+    groups = [[seqfiles] if isinstance(seqfiles, str) else list(seqfiles)
+              for seqfiles in seqfilesin]
+    file_names = [os.path.basename(seqfile)
+                  for group in groups for seqfile in group]
+    if len(set(file_names)) != len(file_names):
+        raise ValueError("Input file names are not unique: {}".format(
+            file_names))
+    os.makedirs(output_dir, exist_ok=True)
+    arguments = [(group,
+                  [os.path.join(output_dir, os.path.basename(seqfile))
+                   for seqfile in group],
+                  filetype, prob, overwrite,
+                  get_derived_seed(seedvalue, group[0]), verbose, mode,
+                  num_records)
+                 for group in groups]
+    if processes > 1 and len(arguments) > 1:
+        with multiprocessing.Pool(min(processes, len(arguments))) as pool:
+            results = pool.starmap(subsample_lockstep, arguments)
     else:
-        open_file = open
-        open_r = "r"
-        open_w = "w"
+        results = [subsample_lockstep(*argument) for argument in arguments]
+    summary = [(seqfilein, seqfileout, row_count, row_count_out)
+               for argument, (row_count, row_count_out)
+               in zip(arguments, results)
+               for seqfilein, seqfileout in zip(argument[0], argument[1])]
+    if summary_file is not None:
+        write_summary(summary, summary_file)
+    return summary
 
-    row_count = 0
-    row_count_out = 0
 
-    if seedvalue is not None:
-        random.seed(seedvalue)
+def write_summary(summary, summary_file, delimiter="\t"):
+    """
+    Write subsampling summary with a provenance header.
 
-    with open_file(seqfilein, open_r) as in_handle, \
-            open_file(seqfileout, open_w) as out_handle:
-        for record in SeqIO.parse(in_handle, filetype):
-            row_count += 1
-            if row_count % 100000 == 0:
-                print(("read {rowcount}".format(rowcount=row_count)))
-            if random.random() < prob:
-                row_count_out += 1
-                if verbose:
-                    print((record.id))
-                SeqIO.write(record, out_handle, filetype)
-    print(("subsampling complete; read {} records from {}, wrote {} records \
-to {}".format(row_count, seqfilein, row_count_out, seqfileout)))
+    :param summary: Summary, one tuple per input file, with values \
+    for :py:const:`SUMMARY_COLUMNS`
+    :type summary: list(tuple(str or unicode, str or unicode, int, int))
+    :param summary_file: Summary file
+    :type summary_file: str or unicode
+    :param delimiter: Delimiter
+    :type delimiter: str or unicode
+    """
+    with open(summary_file, 'w', newline='') as f:
+        provenance.write_provenance(f, __file__)
+        writer = csv.writer(f, delimiter=delimiter, lineterminator=os.linesep)
+        writer.writerow(SUMMARY_COLUMNS)
+        writer.writerows(summary)
@@ -3,7 +3,10 @@ Test constants and functions.
 """
 import os
 import os.path
+import h5py
+import numpy as np
 import riboviz
+from riboviz import h5
 
 DATA_DIR = os.path.join(riboviz.BASE_PATH, "data")
 """ Path to ``data/`` directory. """
@@ -110,3 +113,59 @@ def symlink_files(directory, files):
     """
     for f in files:
         os.symlink(f, os.path.join(directory, os.path.basename(f)))
+
+
+def create_test_h5(h5_file, gene_data, dataset, num_files=2, aliases={}):
+    """
+    Create an H5 file, and complementary data files, with the
+    structure of those created by ``rscripts/bam_to_h5.R``.
+
+    The ``lengths`` attribute of each gene is ``10``, ``11``, ...
+    ``10 + <num_lengths> - 1``.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to matrices of read counts \
+    by read length (rows) and position (columns)
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param dataset: Dataset name
+    :type dataset: str or unicode
+    :param num_files: Number of complementary data files
+    :type num_files: int
+    :param aliases: Map from alternative gene names to gene names
+    :type aliases: dict(str or unicode => str or unicode)
+    """
+    data_files = [h5.H5_DATA_FILE_FORMAT.format(h5_file, index + 1)
+                  for index in range(num_files)]
+    with h5py.File(h5_file, "w") as master:
+        for index, gene in enumerate(gene_data):
+            master[gene] = h5py.ExternalLink(
+                os.path.basename(data_files[index % num_files]), gene)
+        for alias, gene in aliases.items():
+            master[alias] = h5py.ExternalLink(os.path.basename(h5_file),
+                                              gene)
+    handles = [h5py.File(data_file, "w") for data_file in data_files]
+    for index, (gene, matrix) in enumerate(gene_data.items()):
+        reads = handles[index % num_files].create_group(
+            h5.READS_PATH_FORMAT.format(gene=gene, dataset=dataset))
+        num_lengths, num_positions = matrix.shape
+        reads.attrs[h5.BUFFER_LEFT] = np.array([[5]], dtype=np.int32)
+        reads.attrs[h5.BUFFER_RIGHT] = np.array([[num_positions - 10]],
+                                                dtype=np.int32)
+        reads.attrs[h5.START_CODON_POS] = np.array([[6], [7], [8]],
+                                                   dtype=np.int32)
+        reads.attrs[h5.STOP_CODON_POS] = np.array(
+            [[num_positions - 12], [num_positions - 11],
+             [num_positions - 10]], dtype=np.int32)
+        reads.attrs[h5.LENGTHS] = np.arange(
+            10, 10 + num_lengths, dtype=np.int32).reshape(-1, 1)
+        reads.attrs[h5.READS_BY_LEN] = matrix.sum(
+            axis=1, dtype=np.int32).reshape(-1, 1)
+        reads.attrs[h5.READS_TOTAL] = np.array([[matrix.sum()]],
+                                               dtype=np.int32)
+        reads.create_dataset(h5.DATA, data=matrix.T.astype(np.int32),
+                             chunks=(num_positions, 1),
+                             compression=h5.GZIP,
+                             compression_opts=h5.GZIP_LEVEL)
+    for handle in handles:
+        handle.close()
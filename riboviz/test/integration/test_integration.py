@@ -74,6 +74,7 @@ import os
 import pytest
 import pysam
 import yaml
+from riboviz import bam_to_h5
 from riboviz import bedgraph
 from riboviz import count_reads as count_reads_module
 from riboviz import demultiplex_fastq
@@ -778,6 +779,72 @@ def test_bam_to_h5_h5(expected_fixture, dir_out, sample):
                 os.path.join(dir_out, sample, file_name))
 
 
+@pytest.mark.usefixtures("prep_riboviz_fixture")
+def test_bam_to_h5_py_h5(expected_fixture, dir_out, scratch_directory,
+                         sample, orf_gff_file, feature, min_read_length,
+                         max_read_length, buffer, primary_id,
+                         secondary_id, dataset, stop_in_feature,
+                         is_riboviz_gff, num_processes):
+    """
+    Test that H5 files created by :py:func:`riboviz.bam_to_h5.bam_to_h5`
+    from the workflow's BAM files equal those created by
+    :py:const:`riboviz.workflow_r.BAM_TO_H5_R`. See
+    :py:func:`riboviz.h5.equal_h5`.
+
+    :param expected_fixture: Expected data directory
+    :type expected_fixture: str or unicode
+    :param dir_out: Output directory
+    :type dir_out: str or unicode
+    :param scratch_directory: scratch files directory
+    :type scratch_directory: str or unicode
+    :param sample: Sample name
+    :type sample: str or unicode
+    :param orf_gff_file: Configuration parameter
+    :type orf_gff_file: str or unicode
+    :param feature: Configuration parameter
+    :type feature: str or unicode
+    :param min_read_length: Configuration parameter
+    :type min_read_length: int
+    :param max_read_length: Configuration parameter
+    :type max_read_length: int
+    :param buffer: Configuration parameter
+    :type buffer: int
+    :param primary_id: Configuration parameter
+    :type primary_id: str or unicode
+    :param secondary_id: Configuration parameter
+    :type secondary_id: str or unicode
+    :param dataset: Configuration parameter
+    :type dataset: str or unicode
+    :param stop_in_feature: Configuration parameter
+    :type stop_in_feature: bool
+    :param is_riboviz_gff: Configuration parameter
+    :type is_riboviz_gff: bool
+    :param num_processes: Configuration parameter
+    :type num_processes: int
+    """
+    file_name = h5.H5_FORMAT.format(sample)
+    dir_out_name = os.path.basename(os.path.normpath(dir_out))
+    expected_file = os.path.join(expected_fixture, dir_out_name,
+                                 sample, file_name)
+    bam_file = os.path.join(dir_out, sample,
+                            sam_bam.BAM_FORMAT.format(sample))
+    actual_file = os.path.join(str(scratch_directory), file_name)
+    bam_to_h5.bam_to_h5(bam_file,
+                        orf_gff_file,
+                        actual_file,
+                        feature,
+                        min_read_length,
+                        max_read_length,
+                        buffer,
+                        primary_id,
+                        secondary_id,
+                        dataset,
+                        stop_in_feature,
+                        is_riboviz_gff,
+                        num_processes)
+    h5.equal_h5(expected_file, actual_file)
+
+
 @pytest.mark.usefixtures("prep_riboviz_fixture")
 @pytest.mark.parametrize(
     "file_name",
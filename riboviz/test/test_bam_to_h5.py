@@ -0,0 +1,307 @@
+"""
+:py:mod:`riboviz.bam_to_h5` tests.
+"""
+import h5py
+import numpy as np
+import pysam
+import pytest
+from riboviz import bam_to_h5
+from riboviz import h5
+
+TEST_DATASET = "test"
+""" Test dataset name. """
+MIN_READ_LENGTH = 10
+""" Test minimum read length. """
+MAX_READ_LENGTH = 12
+""" Test maximum read length. """
+RIBOVIZ_GFF = """##gff-version 3
+G1\ttest\tUTR5\t1\t10\t.\t+\t.\tName=G1;ID=ALT1
+G1\ttest\tCDS\t11\t40\t.\t+\t.\tName=G1;ID=ALT1
+G1\ttest\tUTR3\t41\t60\t.\t+\t.\tName=G1;ID=ALT1
+G2\ttest\tUTR5\t1\t5\t.\t+\t.\tName=G2;ID=G2
+G2\ttest\tCDS\t6\t35\t.\t+\t.\tName=G2;ID=G2
+G2\ttest\tUTR3\t36\t50\t.\t+\t.\tName=G2;ID=G2
+"""
+""" Test GFF file with UTR5, CDS and UTR3 features for each gene. """
+RIBOVIZ_GENES = {"G1": ("G1", "+", 11, 40, 10, 20),
+                 "G2": ("G2", "+", 6, 35, 5, 15)}
+"""
+Test genes in :py:const:`RIBOVIZ_GFF`, mapped to sequence ID, strand,
+CDS start and end and UTR5 and UTR3 lengths.
+"""
+GENOME_GFF = """##gff-version 3
+chr\ttest\tCDS\t50\t79\t.\t+\t.\tName=A
+chr\ttest\tCDS\t120\t149\t.\t-\t.\tName=B
+"""
+""" Test GFF file with only CDS features on both strands. """
+GENOME_BUFFER = 10
+""" Flank length for :py:const:`GENOME_GFF`. """
+GENOME_GENES = {"A": ("chr", "+", 50, 79, GENOME_BUFFER, GENOME_BUFFER),
+                "B": ("chr", "-", 120, 149, GENOME_BUFFER, GENOME_BUFFER)}
+"""
+Test genes in :py:const:`GENOME_GFF`, mapped to sequence ID, strand,
+CDS start and end and left and right flank lengths.
+"""
+REFERENCES = {"G1": 60, "G2": 50, "chr": 200}
+""" Test BAM file reference sequences and lengths. """
+
+
+@pytest.fixture(scope="function")
+def reads():
+    """
+    Create random reads, as tuples of reference, leftmost 1-indexed
+    position, length, negative strand flag and number of soft-clipped
+    bases.
+
+    :return: Reads
+    :rtype: list(tuple(str or unicode, int, int, bool, int))
+    """
+    rng = np.random.default_rng(42)
+    references = list(REFERENCES)
+    reads = []
+    for _ in range(2000):
+        reference = references[rng.integers(len(references))]
+        length = int(rng.integers(MIN_READ_LENGTH - 1, MAX_READ_LENGTH + 2))
+        position = int(rng.integers(1, REFERENCES[reference] - length + 2))
+        reads.append((reference, position, length, bool(rng.integers(2)),
+                      int(rng.integers(2)) * 2))
+    return reads
+
+
+@pytest.fixture(scope="function")
+def bam_file(tmpdir, reads):
+    """
+    Create test BAM file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param reads: Reads
+    :type reads: list(tuple(str or unicode, int, int, bool, int))
+    :return: BAM file
+    :rtype: str or unicode
+    """
+    bam_file = str(tmpdir.join("test.bam"))
+    header = {"HD": {"VN": "1.0"},
+              "SQ": [{"SN": name, "LN": length}
+                     for name, length in REFERENCES.items()]}
+    with pysam.AlignmentFile(bam_file, "wb", header=header) as bam:
+        for index, (reference, position, length, is_reverse, clip) \
+                in enumerate(reads):
+            read = pysam.AlignedSegment(bam.header)
+            read.query_name = "read{}".format(index)
+            read.reference_name = reference
+            read.reference_start = position - 1
+            read.query_sequence = "A" * length
+            if clip:
+                read.cigarstring = "{}S{}M".format(clip, length - clip)
+            else:
+                read.cigarstring = "{}M".format(length)
+            read.is_reverse = is_reverse
+            read.mapping_quality = 255
+            bam.write(read)
+    return bam_file
+
+
+def get_expected_counts(reads, seqid, strand, start, end, left, right):
+    """
+    Count reads for a gene, consistent with ``ReadsToCountMatrix`` in
+    ``rscripts/bam_to_h5_functions.R``.
+
+    :param reads: Reads
+    :type reads: list(tuple(str or unicode, int, int, bool, int))
+    :param seqid: Sequence ID
+    :type seqid: str or unicode
+    :param strand: Strand
+    :type strand: str or unicode
+    :param start: Feature start
+    :type start: int
+    :param end: Feature end
+    :type end: int
+    :param left: UTR5 length or buffer
+    :type left: int
+    :param right: UTR3 length or buffer
+    :type right: int
+    :return: Read counts by read length (rows) and position (columns)
+    :rtype: numpy.ndarray
+    """
+    if strand == "-":
+        left, right = right, left
+    first = start - left
+    counts = np.zeros((MAX_READ_LENGTH - MIN_READ_LENGTH + 1,
+                       end - start + 1 + left + right), dtype=np.int32)
+    for reference, position, length, is_reverse, _ in reads:
+        if reference != seqid or is_reverse != (strand == "-") or \
+                not MIN_READ_LENGTH <= length <= MAX_READ_LENGTH:
+            continue
+        if is_reverse:
+            position = position + length - 1
+        column = position - first
+        if 0 <= column < counts.shape[1]:
+            counts[length - MIN_READ_LENGTH, column] += 1
+    if strand == "-":
+        counts = counts[:, ::-1]
+    return counts
+
+
+@pytest.mark.parametrize("num_data_files", [1, 2])
+@pytest.mark.parametrize("batch_size", [7, bam_to_h5.BATCH_SIZE])
+def test_bam_to_h5_riboviz_gff(tmpdir, bam_file, reads, num_data_files,
+                               batch_size):
+    """
+    Test :py:func:`riboviz.bam_to_h5.bam_to_h5` with a GFF file with
+    UTR5, CDS and UTR3 features and validate the read counts,
+    attributes and alternative gene names.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    :param reads: Reads
+    :type reads: list(tuple(str or unicode, int, int, bool, int))
+    :param num_data_files: Number of complementary data files
+    :type num_data_files: int
+    :param batch_size: Number of alignments to count at a time
+    :type batch_size: int
+    """
+    gff_file = tmpdir.join("test.gff3")
+    gff_file.write(RIBOVIZ_GFF)
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    bam_to_h5.bam_to_h5(bam_file, str(gff_file), h5_file,
+                        min_read_length=MIN_READ_LENGTH,
+                        max_read_length=MAX_READ_LENGTH,
+                        secondary_id="ID",
+                        dataset=TEST_DATASET,
+                        num_data_files=num_data_files,
+                        batch_size=batch_size)
+    for index in range(num_data_files):
+        assert tmpdir.join(h5.H5_DATA_FILE_FORMAT.format(
+            h5.H5_FORMAT.format("test"), index + 1)).check()
+    with h5py.File(h5_file, "r") as f:
+        assert h5.get_aliases(f) == {"ALT1": "G1"}
+        for gene, (seqid, strand, start, end, left, right) in \
+                RIBOVIZ_GENES.items():
+            expected = get_expected_counts(reads, seqid, strand, start,
+                                           end, left, right)
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(f, gene, TEST_DATASET), expected)
+            reads_group = f[h5.READS_PATH_FORMAT.format(
+                gene=gene, dataset=TEST_DATASET)]
+            assert reads_group[h5.DATA].dtype == np.int32
+            attrs = reads_group.attrs
+            np.testing.assert_array_equal(attrs[h5.BUFFER_LEFT],
+                                          [[start - 1]])
+            np.testing.assert_array_equal(attrs[h5.BUFFER_RIGHT], [[right]])
+            np.testing.assert_array_equal(
+                attrs[h5.START_CODON_POS],
+                [[start], [start + 1], [start + 2]])
+            np.testing.assert_array_equal(
+                attrs[h5.STOP_CODON_POS],
+                [[end - 2], [end - 1], [end]])
+            np.testing.assert_array_equal(
+                attrs[h5.LENGTHS],
+                np.arange(MIN_READ_LENGTH, MAX_READ_LENGTH + 1).reshape(
+                    -1, 1))
+            np.testing.assert_array_equal(
+                attrs[h5.READS_BY_LEN], expected.sum(axis=1).reshape(-1, 1))
+            np.testing.assert_array_equal(attrs[h5.READS_TOTAL],
+                                          [[expected.sum()]])
+
+
+@pytest.mark.parametrize("stop_in_feature", [True, False])
+def test_bam_to_h5_genome_gff(tmpdir, bam_file, reads, stop_in_feature):
+    """
+    Test :py:func:`riboviz.bam_to_h5.bam_to_h5` with a GFF file with
+    only CDS features, on both strands, and validate the read counts
+    and stop codon positions.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    :param reads: Reads
+    :type reads: list(tuple(str or unicode, int, int, bool, int))
+    :param stop_in_feature: Are stop codons part of the feature \
+    annotations?
+    :type stop_in_feature: bool
+    """
+    gff_file = tmpdir.join("test.gff3")
+    gff_file.write(GENOME_GFF)
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    bam_to_h5.bam_to_h5(bam_file, str(gff_file), h5_file,
+                        min_read_length=MIN_READ_LENGTH,
+                        max_read_length=MAX_READ_LENGTH,
+                        buffer=GENOME_BUFFER,
+                        dataset=TEST_DATASET,
+                        stop_in_feature=stop_in_feature,
+                        is_riboviz_gff=False)
+    offset = 2 if stop_in_feature else -1
+    with h5py.File(h5_file, "r") as f:
+        for gene, (seqid, strand, start, end, left, right) in \
+                GENOME_GENES.items():
+            expected = get_expected_counts(reads, seqid, strand, start,
+                                           end, left, right)
+            assert expected.sum() > 0
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(f, gene, TEST_DATASET), expected)
+            np.testing.assert_array_equal(
+                h5.get_gene_attribute(f, gene, TEST_DATASET,
+                                      h5.STOP_CODON_POS),
+                np.arange(end - offset, end - offset + 3))
+
+
+def test_bam_to_h5_no_features(tmpdir, bam_file):
+    """
+    Test :py:func:`riboviz.bam_to_h5.bam_to_h5` with a feature type
+    not in the GFF file raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    """
+    gff_file = tmpdir.join("test.gff3")
+    gff_file.write(RIBOVIZ_GFF)
+    with pytest.raises(ValueError):
+        bam_to_h5.bam_to_h5(bam_file, str(gff_file),
+                            str(tmpdir.join("test.h5")),
+                            feature="uORF")
+
+
+def test_bam_to_h5_no_primary_id(tmpdir, bam_file):
+    """
+    Test :py:func:`riboviz.bam_to_h5.bam_to_h5` with a primary ID
+    attribute not in the GFF file raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param bam_file: BAM file
+    :type bam_file: str or unicode
+    """
+    gff_file = tmpdir.join("test.gff3")
+    gff_file.write(RIBOVIZ_GFF)
+    with pytest.raises(ValueError):
+        bam_to_h5.bam_to_h5(bam_file, str(gff_file),
+                            str(tmpdir.join("test.h5")),
+                            primary_id="gene_id")
+
+
+@pytest.mark.parametrize("strand", ["+", "-"])
+def test_gene_add(strand):
+    """
+    Test :py:meth:`riboviz.bam_to_h5._Gene.add` counts reads, in
+    32-bit counts, by read length and position, including repeated
+    reads, and ignores reads at positions outside the gene.
+
+    :param strand: Strand
+    :type strand: str or unicode
+    """
+    positions = np.array([3, 4, 5, 8, 9])
+    gene = bam_to_h5._Gene("G", "chr", strand, positions, 3, 9, 2)
+    gene.add(np.array([3, 5, 5, 6, 9]), np.array([0, 1, 1, 0, 1]))
+    gene.add(np.array([3]), np.array([0]))
+    expected = np.array([[2, 0, 0, 0, 0],
+                         [0, 0, 2, 0, 1]])
+    if strand == "-":
+        expected = expected[:, ::-1]
+    assert gene.counts.dtype == np.int32
+    np.testing.assert_array_equal(gene.counts, expected)
@@ -0,0 +1,232 @@
+"""
+:py:mod:`riboviz.benchmark` tests.
+"""
+import json
+import multiprocessing
+import os
+import pandas as pd
+import pytest
+from riboviz import benchmark
+from riboviz import fastq
+from riboviz import get_cds_codons
+from riboviz import sam_bam
+
+
+SCALE = 200
+""" Test scale. """
+
+
+def make_run(results):
+    """
+    Create a run with results for the given benchmarks, times and
+    peak RSS.
+
+    :param results: Benchmark names, times and peak RSS
+    :type results: list(tuple(str or unicode, float, float))
+    :return: Run
+    :rtype: dict
+    """
+    run_results = []
+    for name, seconds, peak_rss in results:
+        result = dict.fromkeys(benchmark.RESULT_KEYS)
+        result.update({benchmark.BENCHMARK: name,
+                       benchmark.SCALE: SCALE,
+                       benchmark.SECONDS: seconds,
+                       benchmark.PEAK_RSS_MB: peak_rss})
+        run_results.append(result)
+    return {benchmark.RESULTS: run_results}
+
+
+def test_generate_data(tmpdir):
+    """
+    Test :py:func:`riboviz.benchmark.generate_data` creates FASTQ,
+    SAM, BAM, bedGraph and ORF files with the expected numbers of
+    items, and reuses existing data.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    data = benchmark.generate_data(str(tmpdir), SCALE)
+    assert data[benchmark.NUM_READS] == SCALE
+    assert data[benchmark.NUM_GENES] == SCALE // benchmark.READS_PER_GENE
+    assert fastq.count_sequences(data[benchmark.FASTQ]) == SCALE
+    assert sam_bam.count_sequences(data[benchmark.SAM]) == (SCALE, SCALE)
+    assert sam_bam.count_sequences(data[benchmark.BAM]) == (SCALE, SCALE)
+    with open(data[benchmark.BEDGRAPH]) as f:
+        rows = f.read().splitlines()[1:]
+    assert len(rows) == data[benchmark.NUM_ROWS]
+    assert sum(int(row.split("\t")[3]) for row in rows) == SCALE
+    codons = get_cds_codons.get_cds_codons_from_fasta(
+        data[benchmark.ORF_FASTA], data[benchmark.ORF_GFF])
+    assert len(codons) == data[benchmark.NUM_GENES]
+    for gene_codons in codons.values():
+        assert len(gene_codons) == benchmark.NUM_CODONS
+    assert benchmark.generate_data(str(tmpdir), SCALE) == data
+
+
+@pytest.mark.parametrize("name", list(benchmark.BENCHMARKS))
+def test_run_benchmark(tmpdir, name):
+    """
+    Test :py:func:`riboviz.benchmark.run_benchmark` times each
+    benchmark, or skips :py:const:`riboviz.benchmark.EQUAL_H5` if
+    ``h5diff`` is unavailable.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param name: Benchmark name
+    :type name: str or unicode
+    """
+    data = benchmark.generate_data(str(tmpdir), SCALE)
+    result = benchmark.run_benchmark(name, SCALE, data, repeats=1)
+    assert sorted(result) == sorted(benchmark.RESULT_KEYS)
+    assert result[benchmark.BENCHMARK] == name
+    assert result[benchmark.ITEMS] == data[benchmark.BENCHMARKS[name][0]]
+    if result[benchmark.SKIPPED] is not None:
+        assert name == benchmark.EQUAL_H5
+        return
+    assert result[benchmark.SECONDS] > 0
+    assert result[benchmark.ITEMS_PER_SECOND] > 0
+    assert result[benchmark.MB_PER_SECOND] > 0
+    assert result[benchmark.PEAK_RSS_MB] > 0
+
+
+def test_run_benchmark_error(tmpdir):
+    """
+    Test :py:func:`riboviz.benchmark.run_benchmark` with an invalid
+    benchmark name or number of repeats raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(ValueError):
+        benchmark.run_benchmark("nosuchbenchmark", SCALE, {})
+    with pytest.raises(ValueError):
+        benchmark.run_benchmark(benchmark.EQUAL_FASTQ, SCALE, {}, 0)
+
+
+def test_wait_for_outcome():
+    """
+    Test :py:func:`riboviz.benchmark.wait_for_outcome` returns the
+    outcome a process puts on a queue.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=queue.put, args=((1.0, 2.0),))
+    process.start()
+    assert benchmark.wait_for_outcome(process, queue) == (1.0, 2.0)
+    assert process.exitcode == 0
+
+
+def test_wait_for_outcome_no_outcome():
+    """
+    Test :py:func:`riboviz.benchmark.wait_for_outcome` raises
+    ``RuntimeError`` if a process exits without putting an outcome
+    on a queue.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=os._exit, args=(3,))
+    process.start()
+    with pytest.raises(RuntimeError) as e:
+        benchmark.wait_for_outcome(process, queue)
+    assert "code 3" in str(e.value)
+
+
+def test_compare_runs():
+    """
+    Test :py:func:`riboviz.benchmark.compare_runs` flags time and
+    peak RSS regressions, improvements, new and skipped results.
+    """
+    baseline = make_run([("slower", 1.0, 100.0),
+                         ("larger", 1.0, 100.0),
+                         ("faster", 1.0, 100.0),
+                         ("same", 1.0, 100.0)])
+    run = make_run([("slower", 1.5, 100.0),
+                    ("larger", 1.0, 150.0),
+                    ("faster", 0.5, 100.0),
+                    ("same", 1.1, 110.0),
+                    ("new", 1.0, 100.0),
+                    ("skipped", None, None)])
+    run[benchmark.RESULTS][-1][benchmark.SKIPPED] = "Not available"
+    comparison = benchmark.compare_runs(run, baseline, 0.2)
+    assert list(comparison.columns) == benchmark.COMPARISON_COLUMNS
+    assert list(comparison[benchmark.STATUS]) == [
+        benchmark.STATUS_REGRESSION, benchmark.STATUS_REGRESSION,
+        benchmark.STATUS_IMPROVEMENT, benchmark.STATUS_OK,
+        benchmark.STATUS_NEW, benchmark.STATUS_SKIPPED]
+    assert comparison[benchmark.TIME_RATIO].iloc[0] == 1.5
+    assert comparison[benchmark.RSS_RATIO].iloc[1] == 1.5
+    comparison = benchmark.compare_runs(run)
+    assert set(comparison[benchmark.STATUS]) == \
+        {benchmark.STATUS_NEW, benchmark.STATUS_SKIPPED}
+
+
+def test_save_run_load_baseline(tmpdir):
+    """
+    Test :py:func:`riboviz.benchmark.save_run` appends runs to a
+    history file and :py:func:`riboviz.benchmark.load_baseline`
+    loads the last run from a history file or a saved baseline.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    history_file = str(tmpdir.join("history.json"))
+    first = make_run([("first", 1.0, 100.0)])
+    second = make_run([("second", 2.0, 200.0)])
+    benchmark.save_run(history_file, first)
+    benchmark.save_run(history_file, second)
+    assert benchmark.load_history(history_file) == \
+        {benchmark.RUNS: [first, second]}
+    assert benchmark.load_baseline(history_file) == second
+    baseline_file = str(tmpdir.join("baseline.json"))
+    benchmark.save_baseline(baseline_file, first)
+    assert benchmark.load_baseline(baseline_file) == first
+
+
+@pytest.mark.parametrize("content", [[], {"runs": []}, {"results": 1}])
+def test_load_baseline_error(tmpdir, content):
+    """
+    Test :py:func:`riboviz.benchmark.load_baseline` with an invalid
+    file raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param content: File content
+    :type content: list or dict
+    """
+    baseline_file = tmpdir.join("baseline.json")
+    baseline_file.write(json.dumps(content))
+    with pytest.raises(ValueError):
+        benchmark.load_baseline(str(baseline_file))
+
+
+def test_benchmark(tmpdir):
+    """
+    Test :py:func:`riboviz.benchmark.benchmark` appends each run to
+    the history file and writes a report comparing it to the
+    baseline.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    data_dir = str(tmpdir.join("data"))
+    history_file = str(tmpdir.join("history.json"))
+    report_file = str(tmpdir.join("report.tsv"))
+    names = [benchmark.FASTQ_COUNT_SEQUENCES, benchmark.EQUAL_SAM]
+    first, comparison = benchmark.benchmark(
+        data_dir, names, [SCALE], 1, history_file, None, report_file)
+    assert list(comparison[benchmark.STATUS]) == [benchmark.STATUS_NEW] * 2
+    second, comparison = benchmark.benchmark(
+        data_dir, names, [SCALE], 1, history_file, history_file,
+        report_file, threshold=100)
+    assert list(comparison[benchmark.STATUS]) == [benchmark.STATUS_OK] * 2
+    assert benchmark.load_history(history_file)[benchmark.RUNS] == \
+        [first, second]
+    for run in [first, second]:
+        assert run[benchmark.HOST]["python"]
+        assert [result[benchmark.BENCHMARK]
+                for result in run[benchmark.RESULTS]] == names
+    report = pd.read_csv(report_file, sep="\t", comment="#")
+    assert list(report.columns) == benchmark.COMPARISON_COLUMNS
+    assert list(report[benchmark.BENCHMARK]) == names
+    assert os.path.exists(os.path.join(data_dir, str(SCALE)))
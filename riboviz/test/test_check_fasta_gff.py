@@ -1,6 +1,7 @@
 """
 :py:mod:`riboviz.check_fasta_gff` tests.
 """
+import functools
 import os
 import pytest
 import pandas as pd
@@ -9,8 +10,10 @@ from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from pyfaidx import FastaIndexingError
 from riboviz import check_fasta_gff
+from riboviz import fasta_gff
 from riboviz.fasta_gff import START_CODON
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
+from riboviz.fasta_gff import read_gff
 from riboviz.test import data
 
 
@@ -117,6 +120,31 @@ All expected issues (sequence ID, feature ID, issue) for checking
 FASTA file (:py:const:`TEST_FASTA_CHECK_FILE`) and GFF file
 (:py:const:`TEST_GFF_CHECK_FILE`).
 """
+TEST_ORDER_FASTA = ">A\nAAAAAATAAAAGAAATAA\n>AA\nATGAAATAA\n" \
+    ">B\nATGAAAAAA\n>C\nATGAAATAA\n"
+""" Test FASTA file content for checking the order of issues. """
+TEST_ORDER_GFF = "\n".join([
+    "A\tt\tCDS\t1\t9\t.\t+\t0\tID=A_1",
+    "A\tt\tCDS\t10\t18\t.\t+\t0\tID=A_2",
+    "B\tt\tCDS\t1\t9\t.\t+\t0\tID=dup",
+    "C\tt\tCDS\t1\t9\t.\t+\t0\tID=dup"]) + "\n"
+""" Test GFF file content for checking the order of issues. """
+TEST_ORDER_ISSUES = [
+    ("A", check_fasta_gff.WILDCARD, check_fasta_gff.MULTIPLE_CDS, 2),
+    ("A", "A_1", check_fasta_gff.NO_START_CODON, "AAA"),
+    ("A", "A_2", check_fasta_gff.NO_START_CODON, "AAG"),
+    ("B", "dup", check_fasta_gff.DUPLICATE_FEATURE_ID, None),
+    ("B", "dup", check_fasta_gff.NO_STOP_CODON, "AAA"),
+    ("C", "dup", check_fasta_gff.DUPLICATE_FEATURE_ID, None),
+    (check_fasta_gff.WILDCARD, "dup", check_fasta_gff.DUPLICATE_FEATURE_IDS,
+     2),
+    ("AA", check_fasta_gff.NOT_APPLICABLE,
+     check_fasta_gff.SEQUENCE_NOT_IN_GFF, None)
+]
+"""
+Expected issues, in order, for :py:const:`TEST_ORDER_FASTA` and
+:py:const:`TEST_ORDER_GFF`.
+"""
 
 
 def test_get_fasta_sequence_ids(tmpdir):
@@ -218,16 +246,23 @@ def test_get_issues_empty_gff_file(tmpdir):
         check_fasta_gff.get_issues(TEST_FASTA_CHECK_FILE, gff_file)
 
 
-def test_get_issues():
+@pytest.mark.parametrize("use_gffutils", [False, True])
+def test_get_issues(use_gffutils):
     """
     Test :py:func:`riboviz.check_fasta_gff.get_issues`
     with FASTA file (:py:const:`TEST_FASTA_CHECK_FILE`) and GFF file
     (:py:const:`TEST_GFF_CHECK_FILE`) and check all issues match
-    expected issues in :py:const:`TEST_CHECK_ISSUES`).
+    expected issues in :py:const:`TEST_CHECK_ISSUES`), both with the
+    GFF file read into memory and loaded into a ``gffutils``
+    database.
+
+    :param use_gffutils: Load GFF file into a ``gffutils`` database?
+    :type use_gffutils: bool
     """
     num_sequences, num_features, num_cds_features, issues = \
         check_fasta_gff.get_issues(TEST_FASTA_CHECK_FILE,
-                                   TEST_GFF_CHECK_FILE)
+                                   TEST_GFF_CHECK_FILE,
+                                   use_gffutils=use_gffutils)
     assert num_sequences == TEST_NUM_SEQUENCES, \
         "Unexpected number of sequences"
     assert num_features == TEST_NUM_FEATURES, \
@@ -238,6 +273,208 @@ def test_get_issues():
         assert issue in TEST_CHECK_ISSUES
 
 
+def test_get_issues_order(tmpdir):
+    """
+    Test :py:func:`riboviz.check_fasta_gff.get_issues` returns
+    issues in order: :py:const:`riboviz.check_fasta_gff.MULTIPLE_CDS`
+    and :py:const:`riboviz.check_fasta_gff.DUPLICATE_FEATURE_ID`
+    issues merged with feature issues, then
+    :py:const:`riboviz.check_fasta_gff.DUPLICATE_FEATURE_IDS` issues
+    then :py:const:`riboviz.check_fasta_gff.SEQUENCE_NOT_IN_GFF`
+    issues. Also test that
+    :py:func:`riboviz.check_fasta_gff.get_issue_lists` counts the
+    issues.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta_file = tmpdir.join("test.fasta")
+    fasta_file.write(TEST_ORDER_FASTA)
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write(TEST_ORDER_GFF)
+    _, _, _, issues = check_fasta_gff.get_issues(str(fasta_file),
+                                                 str(gff_file))
+    assert issues == TEST_ORDER_ISSUES
+    _, _, _, issue_lists, issue_counts = \
+        check_fasta_gff.get_issue_lists(str(fasta_file), str(gff_file))
+    assert list(check_fasta_gff.merge_issues(issue_lists)) == \
+        TEST_ORDER_ISSUES
+    assert issue_counts == check_fasta_gff.count_issues(TEST_ORDER_ISSUES)
+
+
+@pytest.mark.parametrize("processes", [2, 4])
+def test_get_issues_processes(processes):
+    """
+    Test :py:func:`riboviz.check_fasta_gff.get_issues`
+    with FASTA file (:py:const:`TEST_FASTA_CHECK_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CHECK_FILE`) and multiple processes and
+    check the results are identical to those for one process.
+
+    :param processes: Number of processes
+    :type processes: int
+    """
+    expected = check_fasta_gff.get_issues(TEST_FASTA_CHECK_FILE,
+                                          TEST_GFF_CHECK_FILE)
+    actual = check_fasta_gff.get_issues(TEST_FASTA_CHECK_FILE,
+                                        TEST_GFF_CHECK_FILE,
+                                        processes=processes)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_get_issues_fasta_index(tmpdir, monkeypatch, processes):
+    """
+    Test :py:func:`riboviz.check_fasta_gff.get_issues`
+    with a FASTA file with no ``.fai`` index creates the index once,
+    and that the processes checking features use that index rather
+    than reading it themselves.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    :param processes: Number of processes
+    :type processes: int
+    """
+    fasta_file = str(tmpdir.join("test.fasta"))
+    with open(TEST_FASTA_CHECK_FILE) as f:
+        fasta = f.read()
+    with open(fasta_file, "w") as f:
+        f.write(fasta)
+    expected = check_fasta_gff.get_issues(TEST_FASTA_CHECK_FILE,
+                                          TEST_GFF_CHECK_FILE)
+    get_fasta_index = check_fasta_gff.get_fasta_index
+    indexed = []
+
+    def get_fasta_index_recorded(fasta):
+        """
+        Record the FASTA file then get its index.
+
+        :param fasta: FASTA file
+        :type fasta: str or unicode
+        :return: FASTA file index
+        :rtype: dict(str or unicode => tuple(int, int, int, int))
+        """
+        indexed.append(fasta)
+        return get_fasta_index(fasta)
+
+    def get_fasta_index_error(fasta):
+        """
+        Fail if a process checking features reads the FASTA index.
+
+        :param fasta: FASTA file
+        :type fasta: str or unicode
+        :raises AssertionError: Always
+        """
+        raise AssertionError("Index read for {}".format(fasta))
+
+    monkeypatch.setattr(check_fasta_gff, "get_fasta_index",
+                        get_fasta_index_recorded)
+    monkeypatch.setattr(fasta_gff, "get_fasta_index",
+                        get_fasta_index_error)
+    actual = check_fasta_gff.get_issues(fasta_file, TEST_GFF_CHECK_FILE,
+                                        processes=processes)
+    assert actual == expected
+    assert indexed == [fasta_file]
+    assert os.path.exists(fasta_file + ".fai")
+
+
+def check_feature_recorded(check_feature, checked, feature, *args):
+    """
+    Record the sequence ID of a feature then check the feature.
+
+    :param check_feature: Function to check feature
+    :type check_feature: function
+    :param checked: Sequence IDs of checked features, to update
+    :type checked: list(str or unicode)
+    :param feature: Feature
+    :type feature: gffutils.feature.Feature
+    :param args: Additional arguments for ``check_feature``
+    :type args: list
+    :return: Result of ``check_feature``
+    :rtype: list(tuple) or None
+    """
+    checked.append(feature.seqid)
+    return check_feature(feature, *args)
+
+
+def test_get_issues_feature_cache(tmpdir, monkeypatch):
+    """
+    Test :py:func:`riboviz.check_fasta_gff.get_issues`
+    with FASTA file (:py:const:`TEST_FASTA_CHECK_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CHECK_FILE`) and a feature cache file and
+    check that the results are identical to those with no cache, that
+    unchanged features are neither rechecked nor hashed, and that
+    changed features are rechecked.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    fasta_file = str(tmpdir.join("test.fasta"))
+    with open(TEST_FASTA_CHECK_FILE) as f:
+        fasta = f.read()
+    with open(fasta_file, "w") as f:
+        f.write(fasta)
+    # Modification time earlier than that of the cache.
+    mtime = os.stat(fasta_file).st_mtime - 10
+    os.utime(fasta_file, (mtime, mtime))
+    cache_file = str(tmpdir.join("features.json"))
+    expected = check_fasta_gff.get_issues(fasta_file, TEST_GFF_CHECK_FILE)
+    actual = check_fasta_gff.get_issues(fasta_file, TEST_GFF_CHECK_FILE,
+                                        feature_cache_file=cache_file)
+    assert actual == expected
+    assert os.path.exists(cache_file)
+
+    checked = []
+    monkeypatch.setattr(check_fasta_gff, "check_feature",
+                        functools.partial(check_feature_recorded,
+                                          check_fasta_gff.check_feature,
+                                          checked))
+    with monkeypatch.context() as m:
+        # Sequences of unchanged features are not hashed.
+        m.setattr(fasta_gff, "get_feature_hash",
+                  functools.partial(check_feature_recorded,
+                                    fasta_gff.get_feature_hash, checked))
+        actual = check_fasta_gff.get_issues(
+            fasta_file, TEST_GFF_CHECK_FILE, feature_cache_file=cache_file)
+    assert actual == expected
+    assert checked == []
+    # Add a start codon to YAL009CNoATGStart_mRNA.
+    lines = fasta.split("\n")
+    index = lines.index(">YAL009CNoATGStart_mRNA") + 1
+    lines[index] = lines[index][:9] + "ATG" + lines[index][12:]
+    with open(fasta_file, "w") as f:
+        f.write("\n".join(lines))
+    expected = check_fasta_gff.get_issues(fasta_file, TEST_GFF_CHECK_FILE)
+    checked.clear()
+    actual = check_fasta_gff.get_issues(fasta_file, TEST_GFF_CHECK_FILE,
+                                        feature_cache_file=cache_file)
+    assert actual == expected
+    assert checked == ["YAL009CNoATGStart_mRNA"]
+
+
+def test_partition_features():
+    """
+    Test :py:func:`riboviz.check_fasta_gff.partition_features`
+    keeps features for each sequence in the same partition and
+    balances partitions.
+    """
+    features = list(read_gff(TEST_GFF_CHECK_FILE).features_of_type("CDS"))
+    partitions = check_fasta_gff.partition_features(features, 2)
+    assert len(partitions) == 2
+    assert sorted(index for partition in partitions
+                  for index in partition) == list(range(len(features)))
+    partition_seq_ids = [set(features[index].seqid for index in partition)
+                         for partition in partitions]
+    assert not partition_seq_ids[0] & partition_seq_ids[1]
+    assert abs(len(partitions[0]) - len(partitions[1])) <= 1
+    assert check_fasta_gff.partition_features(features, 1) == \
+        [list(range(len(features)))]
+    assert check_fasta_gff.partition_features([], 2) == []
+
+
 def test_get_issues_use_feature_name_true():
     """
     Test :py:func:`riboviz.check_fasta_gff.get_issues`
@@ -382,6 +619,21 @@ def test_write_issues_to_csv(tmpdir):
     check_fasta_gff_issues_csv(TEST_CHECK_ISSUES, issues_file)
 
 
+def test_write_issues_to_csv_generator(tmpdir):
+    """
+    Test :py:func:`riboviz.check_fasta_gff.write_issues_to_csv`
+    with issues from a generator produces a CSV file with the
+    expected columns, rows and values.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    issues_file = tmpdir.join("issues.tsv")
+    check_fasta_gff.write_issues_to_csv(
+        (issue for issue in TEST_CHECK_ISSUES), issues_file)
+    check_fasta_gff_issues_csv(TEST_CHECK_ISSUES, issues_file)
+
+
 def test_write_issues_to_csv_empty(tmpdir):
     """
     Test :py:func:`riboviz.check_fasta_gff.write_issues_to_csv`
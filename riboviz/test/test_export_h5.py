@@ -0,0 +1,252 @@
+"""
+:py:mod:`riboviz.export_h5` tests.
+"""
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from riboviz import export_h5
+from riboviz import h5
+from riboviz import pack_h5
+from riboviz.test import create_test_h5
+
+TEST_DATASET = "test"
+""" Test dataset name. """
+TEST_SAMPLES = ["WT3AT", "WTnone"]
+""" Test sample names. """
+TEST_ALIASES = {"ALT2": "YAL002W"}
+""" Test alternative gene names. """
+
+
+@pytest.fixture(scope="function")
+def sample_data():
+    """
+    Create sparse matrices of read counts for test genes for each
+    sample.
+
+    :return: Map from sample names to maps from gene names to read \
+    counts
+    :rtype: dict(str or unicode => dict(str or unicode => \
+    numpy.ndarray))
+    """
+    rng = np.random.default_rng(42)
+    sample_data = {}
+    for sample in TEST_SAMPLES:
+        sample_data[sample] = {}
+        for gene, width in [("YAL001C", 30), ("YAL002W", 45),
+                            ("YAL003W", 21)]:
+            matrix = rng.integers(0, 5, size=(4, width), dtype=np.int32)
+            matrix[rng.random(matrix.shape) < 0.7] = 0
+            sample_data[sample][gene] = matrix
+    return sample_data
+
+
+@pytest.fixture(scope="function")
+def h5_files(tmpdir, sample_data):
+    """
+    Create test H5 files, one per sample.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param sample_data: Map from sample names to maps from gene \
+    names to read counts
+    :type sample_data: dict(str or unicode => dict(str or unicode => \
+    numpy.ndarray))
+    :return: H5 files
+    :rtype: list(str or unicode)
+    """
+    h5_files = []
+    for sample, gene_data in sample_data.items():
+        h5_file = str(tmpdir.join(h5.H5_FORMAT.format(sample)))
+        create_test_h5(h5_file, gene_data, TEST_DATASET,
+                       aliases=TEST_ALIASES)
+        h5_files.append(h5_file)
+    return h5_files
+
+
+def get_expected_records(gene_data, genes=None, min_read_length=None,
+                         max_read_length=None, min_position=None,
+                         max_position=None):
+    """
+    Get expected records for a sample.
+
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param genes: Genes (if ``None`` then all)
+    :type genes: list(str or unicode)
+    :param min_read_length: Minimum read length
+    :type min_read_length: int
+    :param max_read_length: Maximum read length
+    :type max_read_length: int
+    :param min_position: Minimum position
+    :type min_position: int
+    :param max_position: Maximum position
+    :type max_position: int
+    :return: Records
+    :rtype: pandas.core.frame.DataFrame
+    """
+    records = []
+    for gene, matrix in gene_data.items():
+        if genes is not None and gene not in genes:
+            continue
+        for row, column in zip(*np.nonzero(matrix)):
+            read_length = 10 + row
+            position = column + 1
+            if (min_read_length is not None and
+                    read_length < min_read_length) or \
+                    (max_read_length is not None and
+                     read_length > max_read_length) or \
+                    (min_position is not None and position < min_position) or \
+                    (max_position is not None and position > max_position):
+                continue
+            records.append((gene, read_length, position, matrix[row, column]))
+    return pd.DataFrame(records, columns=export_h5.COLUMNS)
+
+
+def read_partition(output_dir, sample):
+    """
+    Read all part files for a sample.
+
+    :param output_dir: Output directory
+    :type output_dir: str or unicode
+    :param sample: Sample name
+    :type sample: str or unicode
+    :return: Records
+    :rtype: pandas.core.frame.DataFrame
+    """
+    part_files = sorted(glob.glob(os.path.join(
+        output_dir, export_h5.PARTITION_FORMAT.format(sample), "part-*")))
+    return pd.concat([export_h5.read_part(part_file)
+                      for part_file in part_files], ignore_index=True)
+
+
+def assert_records_equal(actual, expected):
+    """
+    Check records are equal.
+
+    :param actual: Actual records
+    :type actual: pandas.core.frame.DataFrame
+    :param expected: Expected records
+    :type expected: pandas.core.frame.DataFrame
+    """
+    assert list(actual.columns) == export_h5.COLUMNS
+    assert len(actual) == len(expected)
+    for column in export_h5.COLUMNS:
+        assert list(actual[column]) == list(expected[column])
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+@pytest.mark.parametrize("batch_size", [7, export_h5.BATCH_SIZE])
+def test_export_h5(tmpdir, h5_files, sample_data, processes, batch_size):
+    """
+    Test :py:func:`riboviz.export_h5.export_h5` exports all non-zero
+    read counts for each sample, in part files of at most
+    ``batch_size`` records.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_files: H5 files
+    :type h5_files: list(str or unicode)
+    :param sample_data: Map from sample names to maps from gene \
+    names to read counts
+    :type sample_data: dict(str or unicode => dict(str or unicode => \
+    numpy.ndarray))
+    :param processes: Number of processes
+    :type processes: int
+    :param batch_size: Maximum number of records per part file
+    :type batch_size: int
+    """
+    output_dir = str(tmpdir.join("export"))
+    summary = export_h5.export_h5(h5_files, output_dir,
+                                  output_format=export_h5.H5,
+                                  batch_size=batch_size,
+                                  processes=processes)
+    assert list(summary[export_h5.SAMPLE]) == TEST_SAMPLES
+    for sample, gene_data in sample_data.items():
+        expected = get_expected_records(gene_data)
+        actual = read_partition(output_dir, sample)
+        assert_records_equal(actual, expected)
+        row = summary[summary[export_h5.SAMPLE] == sample].iloc[0]
+        assert row[export_h5.NUM_RECORDS] == len(expected)
+        assert row[export_h5.NUM_FILES] == -(-len(expected) // batch_size)
+
+
+def test_export_h5_filters(tmpdir, h5_files, sample_data):
+    """
+    Test :py:func:`riboviz.export_h5.export_h5` with gene, read
+    length and position filters, including an alternative gene name.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_files: H5 files
+    :type h5_files: list(str or unicode)
+    :param sample_data: Map from sample names to maps from gene \
+    names to read counts
+    :type sample_data: dict(str or unicode => dict(str or unicode => \
+    numpy.ndarray))
+    """
+    output_dir = str(tmpdir.join("export"))
+    export_h5.export_h5(h5_files, output_dir,
+                        genes=["YAL001C", "ALT2"],
+                        min_read_length=11,
+                        max_read_length=12,
+                        min_position=5,
+                        max_position=25,
+                        output_format=export_h5.H5)
+    for sample, gene_data in sample_data.items():
+        expected = get_expected_records(gene_data, ["YAL001C", "YAL002W"],
+                                        11, 12, 5, 25)
+        assert_records_equal(read_partition(output_dir, sample), expected)
+
+
+def test_export_h5_packed(tmpdir, h5_files, sample_data):
+    """
+    Test :py:func:`riboviz.export_h5.export_h5` with a packed H5 file
+    and a position filter beyond the end of some genes.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_files: H5 files
+    :type h5_files: list(str or unicode)
+    :param sample_data: Map from sample names to maps from gene \
+    names to read counts
+    :type sample_data: dict(str or unicode => dict(str or unicode => \
+    numpy.ndarray))
+    """
+    packed_file = str(tmpdir.join("packed.h5"))
+    pack_h5.pack_h5(h5_files[0], packed_file)
+    output_dir = str(tmpdir.join("export"))
+    export_h5.export_h5([packed_file], output_dir,
+                        samples=[TEST_SAMPLES[0]],
+                        min_position=25,
+                        output_format=export_h5.H5)
+    expected = get_expected_records(sample_data[TEST_SAMPLES[0]],
+                                    min_position=25)
+    assert_records_equal(read_partition(output_dir, TEST_SAMPLES[0]),
+                         expected)
+
+
+def test_export_h5_invalid(tmpdir, h5_files):
+    """
+    Test :py:func:`riboviz.export_h5.export_h5` with an invalid
+    format, mismatched or duplicate sample names or a missing file
+    raises the expected exceptions.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_files: H5 files
+    :type h5_files: list(str or unicode)
+    """
+    output_dir = str(tmpdir.join("export"))
+    with pytest.raises(ValueError):
+        export_h5.export_h5(h5_files, output_dir, output_format="csv")
+    with pytest.raises(ValueError):
+        export_h5.export_h5(h5_files, output_dir, samples=["A"],
+                            output_format=export_h5.H5)
+    with pytest.raises(ValueError):
+        export_h5.export_h5(h5_files, output_dir, samples=["A", "A"],
+                            output_format=export_h5.H5)
+    with pytest.raises(FileNotFoundError):
+        export_h5.export_h5([str(tmpdir.join("nosuchfile.h5"))],
+                            output_dir, output_format=export_h5.H5)
@@ -0,0 +1,646 @@
+"""
+:py:mod:`riboviz.fasta_gff` tests.
+"""
+import glob
+import json
+import os
+import pytest
+from pyfaidx import Fasta
+from pyfaidx import FastaIndexingError
+from riboviz import fasta_gff
+from riboviz.test import data
+
+TEST_GFF_FILE = os.path.join(os.path.dirname(data.__file__),
+                             "test_check_fasta_gff.gff")
+""" Test GFF file in :py:mod:`riboviz.test.data`. """
+TEST_FASTA = ">chr1\nAAATGAAAT\nAATTTgca\n>chr2 description\r\nGGGGCCA\r\n"
+""" Test FASTA file content with multi-line sequences. """
+
+
+def get_cached_db_files(cache_dir):
+    """
+    Get database files in a cache directory.
+
+    :param cache_dir: Cache directory
+    :type cache_dir: str or unicode
+    :return: Database files
+    :rtype: list(str or unicode)
+    """
+    return glob.glob(os.path.join(cache_dir, "*." + fasta_gff.GFF_DB_EXT))
+
+
+def get_feature_ids(gffdb):
+    """
+    Get IDs of features in a database.
+
+    :param gffdb: Database
+    :type gffdb: gffutils.interface.FeatureDB
+    :return: Feature IDs
+    :rtype: list(str or unicode)
+    """
+    return [feature.id for feature in gffdb.all_features()]
+
+
+def test_create_gff_db_no_cache(tmpdir, monkeypatch):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` with no cache
+    directory creates an in-memory database and no files.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    monkeypatch.delenv(fasta_gff.GFF_CACHE_DIR_ENV, raising=False)
+    monkeypatch.chdir(tmpdir)
+    gffdb = fasta_gff.create_gff_db(TEST_GFF_FILE)
+    assert len(get_feature_ids(gffdb)) > 0
+    assert tmpdir.listdir() == []
+
+
+def test_create_gff_db_cache(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` with a cache
+    directory caches the database and reuses it.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    expected = get_feature_ids(fasta_gff.create_gff_db(TEST_GFF_FILE))
+    gffdb = fasta_gff.create_gff_db(TEST_GFF_FILE, cache_dir)
+    assert get_feature_ids(gffdb) == expected
+    db_files = get_cached_db_files(cache_dir)
+    assert len(db_files) == 1
+    key = fasta_gff.get_gff_db_key(TEST_GFF_FILE,
+                                   fasta_gff.GFF_DB_OPTIONS)
+    assert os.path.basename(db_files[0]) == "{}.{}".format(
+        key, fasta_gff.GFF_DB_EXT)
+    mtime = os.stat(db_files[0]).st_mtime_ns
+    os.utime(db_files[0], (0, 0))
+    gffdb = fasta_gff.create_gff_db(TEST_GFF_FILE, cache_dir)
+    assert get_feature_ids(gffdb) == expected
+    assert get_cached_db_files(cache_dir) == db_files
+    # Reuse updates modification time but does not rebuild.
+    assert os.stat(db_files[0]).st_mtime_ns >= mtime
+    assert [f for f in os.listdir(cache_dir)
+            if not f.endswith(fasta_gff.GFF_DB_EXT)] == []
+
+
+def test_create_gff_db_cache_env(tmpdir, monkeypatch):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` uses the cache
+    directory in :py:const:`riboviz.fasta_gff.GFF_CACHE_DIR_ENV`.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    monkeypatch.setenv(fasta_gff.GFF_CACHE_DIR_ENV, cache_dir)
+    fasta_gff.create_gff_db(TEST_GFF_FILE)
+    assert len(get_cached_db_files(cache_dir)) == 1
+
+
+def test_get_gff_db_key(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.get_gff_db_key` depends on the
+    GFF file content and options but not the file name.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with open(TEST_GFF_FILE) as f:
+        content = f.read()
+    copy_file = tmpdir.join("copy.gff")
+    copy_file.write(content)
+    changed_file = tmpdir.join("changed.gff")
+    changed_file.write(content + "\n")
+    options = fasta_gff.GFF_DB_OPTIONS
+    key = fasta_gff.get_gff_db_key(TEST_GFF_FILE, options)
+    assert fasta_gff.get_gff_db_key(str(copy_file), options) == key
+    assert fasta_gff.get_gff_db_key(str(changed_file), options) != key
+    assert fasta_gff.get_gff_db_key(
+        TEST_GFF_FILE, dict(options, keep_order=False)) != key
+
+
+def test_create_gff_db_cache_eviction(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` deletes least
+    recently used databases when the cache exceeds its maximum size,
+    but never the database just created.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    with open(TEST_GFF_FILE) as f:
+        content = f.read()
+    gff_files = []
+    for index in range(3):
+        gff_file = tmpdir.join("test{}.gff".format(index))
+        gff_file.write(content + "#{}\n".format(index))
+        gff_files.append(str(gff_file))
+    fasta_gff.create_gff_db(gff_files[0], cache_dir)
+    db_size = os.path.getsize(get_cached_db_files(cache_dir)[0])
+    fasta_gff.create_gff_db(gff_files[1], cache_dir,
+                            max_cache_size=2 * db_size)
+    assert len(get_cached_db_files(cache_dir)) == 2
+    # Make first database most recently used.
+    fasta_gff.create_gff_db(gff_files[0], cache_dir)
+    fasta_gff.create_gff_db(gff_files[2], cache_dir,
+                            max_cache_size=2 * db_size)
+    db_files = [os.path.basename(f) for f in get_cached_db_files(cache_dir)]
+    expected = ["{}.{}".format(
+        fasta_gff.get_gff_db_key(gff_files[index],
+                                 fasta_gff.GFF_DB_OPTIONS),
+        fasta_gff.GFF_DB_EXT) for index in [0, 2]]
+    assert sorted(db_files) == sorted(expected)
+    fasta_gff.create_gff_db(gff_files[1], cache_dir, max_cache_size=0)
+    assert len(get_cached_db_files(cache_dir)) == 1
+
+
+def test_create_gff_db_cache_evicted(tmpdir, monkeypatch):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` rebuilds a cached
+    database deleted by another process between recording its use
+    and opening it.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    expected = get_feature_ids(fasta_gff.create_gff_db(TEST_GFF_FILE,
+                                                       cache_dir))
+    utime = os.utime
+    evicted = []
+
+    def utime_then_evict(path):
+        """
+        Update a file's access and modification times then, on first
+        call, delete it, to simulate eviction by another process.
+
+        :param path: File
+        :type path: str or unicode
+        """
+        utime(path)
+        if not evicted:
+            os.remove(path)
+            evicted.append(path)
+
+    monkeypatch.setattr(fasta_gff.os, "utime", utime_then_evict)
+    gffdb = fasta_gff.create_gff_db(TEST_GFF_FILE, cache_dir)
+    assert len(evicted) == 1
+    assert get_feature_ids(gffdb) == expected
+    assert get_cached_db_files(cache_dir) == evicted
+
+
+def test_open_gff_db_no_such_file(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.open_gff_db` with a missing
+    database file raises ``FileNotFoundError`` and does not create
+    the file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    db_file = str(tmpdir.join("nosuchfile.db"))
+    with pytest.raises(FileNotFoundError):
+        fasta_gff.open_gff_db(db_file, fasta_gff.GFF_DB_OPTIONS)
+    assert not os.path.exists(db_file)
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_create_gff_db_empty(tmpdir, use_cache):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` with an empty
+    GFF file raises ``ValueError`` and caches nothing.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param use_cache: Use a cache directory?
+    :type use_cache: bool
+    """
+    gff_file = tmpdir.join("empty.gff")
+    gff_file.write("")
+    cache_dir = str(tmpdir.join("cache")) if use_cache else None
+    with pytest.raises(ValueError):
+        fasta_gff.create_gff_db(str(gff_file), cache_dir)
+    if use_cache:
+        assert os.listdir(cache_dir) == []
+
+
+def test_create_gff_db_no_such_file(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.create_gff_db` with a missing
+    GFF file raises ``FileNotFoundError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(FileNotFoundError):
+        fasta_gff.create_gff_db(str(tmpdir.join("nosuchfile.gff")))
+
+
+def get_feature_values(features):
+    """
+    Get tuples of the values of features.
+
+    :param features: Features
+    :type features: iterator(gffutils.feature.Feature)
+    :return: Tuples of ID, sequence ID, feature type, source, start, \
+    end, score, strand, frame and attributes
+    :rtype: list(tuple)
+    """
+    return [(feature.id, feature.seqid, feature.featuretype,
+             feature.source, feature.start, feature.end, feature.score,
+             feature.strand, feature.frame, dict(feature.attributes))
+            for feature in features]
+
+
+def test_read_gff():
+    """
+    Test :py:func:`riboviz.fasta_gff.read_gff` features match those
+    of a ``gffutils`` database.
+    """
+    features = fasta_gff.read_gff(TEST_GFF_FILE)
+    gffdb = fasta_gff.create_gff_db(TEST_GFF_FILE)
+    assert get_feature_values(features.all_features()) == \
+        get_feature_values(gffdb.all_features())
+    assert get_feature_values(features.features_of_type("CDS")) == \
+        get_feature_values(gffdb.features_of_type("CDS"))
+    assert len(features) == gffdb.count_features_of_type()
+    assert features.count_features_of_type() == len(features)
+    assert features.count_features_of_type("CDS") == \
+        gffdb.count_features_of_type("CDS")
+    assert list(features.features_of_type("gene")) == []
+    assert features.count_features_of_type("gene") == 0
+
+
+def test_read_gff_feature_types(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.read_gff` with multiple feature
+    types, strands and sequences, URL-encoded attributes, comments
+    and embedded FASTA sequences, and with feature types to read.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write("\n".join([
+        "##gff-version 3",
+        "chr1\tsrc\tgene\t1\t90\t.\t-\t.\tID=gene1;Name=A%3BB,C",
+        "chr2\tsrc\tCDS\t5\t25\t0.5\t+\t0\tID=cds2",
+        "# Comment",
+        "chr1\tsrc\tCDS\t1\t90\t.\t-\t2\tParent=gene1",
+        "##FASTA",
+        ">chr1",
+        "ATG"]) + "\n")
+    features = fasta_gff.read_gff(str(gff_file))
+    assert get_feature_values(features.all_features()) == [
+        ("gene1", "chr1", "gene", "src", 1, 90, ".", "-", ".",
+         {"ID": ["gene1"], "Name": ["A;B", "C"]}),
+        ("cds2", "chr2", "CDS", "src", 5, 25, "0.5", "+", "0",
+         {"ID": ["cds2"]}),
+        ("CDS_1", "chr1", "CDS", "src", 1, 90, ".", "-", "2",
+         {"Parent": ["gene1"]})]
+    features = fasta_gff.read_gff(str(gff_file), ["CDS"])
+    assert len(features) == 2
+    assert [feature.id for feature in features.features_of_type("CDS")] \
+        == ["cds2", "CDS_1"]
+
+
+def test_read_gff_bad_line(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.read_gff` with a badly
+    formatted line raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    gff_file = tmpdir.join("test.gff")
+    for line in ["chr1\tsrc\tCDS\t1\t90",
+                 "chr1\tsrc\tCDS\tstart\t90\t.\t+\t0\tID=cds1",
+                 "chr1\tsrc\tCDS\t1\t90\t.\tx\t0\tID=cds1"]:
+        gff_file.write(line + "\n")
+        with pytest.raises(ValueError):
+            fasta_gff.read_gff(str(gff_file))
+
+
+def test_read_gff_empty(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.read_gff` with an empty GFF
+    file raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    gff_file = tmpdir.join("empty.gff")
+    gff_file.write("##gff-version 3\n")
+    with pytest.raises(ValueError):
+        fasta_gff.read_gff(str(gff_file))
+
+
+def test_read_gff_no_such_file(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.read_gff` with a missing GFF
+    file raises ``FileNotFoundError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(FileNotFoundError):
+        fasta_gff.read_gff(str(tmpdir.join("nosuchfile.gff")))
+
+
+def test_load_gff(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.load_gff` reads the GFF file
+    into memory by default and otherwise creates a ``gffutils``
+    database in the cache directory.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    features = fasta_gff.load_gff(TEST_GFF_FILE, cache_dir=cache_dir)
+    assert isinstance(features, fasta_gff.GffFeatures)
+    assert not os.path.exists(cache_dir)
+    gffdb = fasta_gff.load_gff(TEST_GFF_FILE, True, cache_dir)
+    assert get_feature_values(gffdb.all_features()) == \
+        get_feature_values(features.all_features())
+    assert len(get_cached_db_files(cache_dir)) == 1
+
+
+@pytest.fixture(scope="function")
+def fasta_file(tmpdir):
+    """
+    Create a FASTA file with content :py:const:`TEST_FASTA`.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :return: FASTA file
+    :rtype: str or unicode
+    """
+    fasta_file = str(tmpdir.join("test.fasta"))
+    with open(fasta_file, "wb") as f:
+        f.write(TEST_FASTA.encode())
+    return fasta_file
+
+
+def test_fasta_sequences_fetch(tmpdir, fasta_file):
+    """
+    Test :py:meth:`riboviz.fasta_gff.FastaSequences.get_feature_sequence`
+    returns the same sequences as ``gffutils.feature.Feature.sequence``,
+    for features within a line or spanning lines, on either strand and
+    at or beyond the ends of sequences.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param fasta_file: FASTA file
+    :type fasta_file: str or unicode
+    """
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write("\n".join([
+        "{}\tsrc\tCDS\t{}\t{}\t.\t{}\t0\tID=cds".format(
+            seqid, start, end, strand)
+        for seqid, start, end in [("chr1", 1, 9), ("chr1", 3, 11),
+                                  ("chr1", 10, 17), ("chr1", 9, 10),
+                                  ("chr1", 12, 30), ("chr2", 1, 7),
+                                  ("chr2", 2, 4)]
+        for strand in ["+", "-"]]) + "\n")
+    features = list(fasta_gff.read_gff(str(gff_file)).all_features())
+    fasta_genes = Fasta(fasta_file)
+    with fasta_gff.FastaSequences(fasta_file) as fasta_sequences:
+        assert len(fasta_sequences) == 2
+        assert "chr2" in fasta_sequences
+        for feature in features:
+            sequence = fasta_sequences.get_feature_sequence(feature)
+            assert bytes(sequence).decode() == \
+                feature.sequence(fasta_genes)
+        sequence = fasta_sequences.fetch("chr1", 1, 9)
+        assert isinstance(sequence, memoryview)
+        assert sequence == b"AAATGAAAT"
+        assert fasta_sequences.fetch("chr1", 8, 12) == b"ATAAT"
+        assert fasta_sequences.get_raw("chr1", 7, 12) == b"AT\nAAT"
+    fasta_genes.close()
+
+
+def test_fasta_sequences_errors(tmpdir, fasta_file):
+    """
+    Test :py:class:`riboviz.fasta_gff.FastaSequences` with a missing
+    sequence, a non-base character on the reverse strand, an empty
+    FASTA file or a non-existent FASTA file raises the expected
+    exceptions.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param fasta_file: FASTA file
+    :type fasta_file: str or unicode
+    """
+    with fasta_gff.FastaSequences(fasta_file) as fasta_sequences:
+        with pytest.raises(KeyError):
+            fasta_sequences.fetch("chr3", 1, 3)
+        with open(fasta_file, "wb") as f:
+            f.write(b">chr1\nATG*AA\n")
+    with fasta_gff.FastaSequences(fasta_file) as fasta_sequences:
+        assert fasta_sequences.fetch("chr1", 1, 6) == b"ATG*AA"
+        with pytest.raises(ValueError):
+            fasta_sequences.fetch("chr1", 1, 6, "-")
+    empty_file = tmpdir.join("empty.fasta")
+    empty_file.write("")
+    with pytest.raises(FastaIndexingError):
+        fasta_gff.FastaSequences(str(empty_file))
+    with pytest.raises(FileNotFoundError):
+        fasta_gff.FastaSequences(str(tmpdir.join("nosuchfile.fasta")))
+
+
+def get_feature_hashes(features, fasta_file, fasta, options=None):
+    """
+    Write a FASTA file and get hashes of features using
+    :py:func:`riboviz.fasta_gff.get_feature_hash`.
+
+    :param features: Features
+    :type features: list(gffutils.feature.Feature)
+    :param fasta_file: FASTA file
+    :type fasta_file: str or unicode
+    :param fasta: FASTA file content
+    :type fasta: str or unicode
+    :param options: Options
+    :type options: dict
+    :return: Hashes
+    :rtype: list(str or unicode)
+    """
+    with open(fasta_file, "w") as f:
+        f.write(fasta)
+    with fasta_gff.FastaSequences(fasta_file) as fasta_sequences:
+        return [fasta_gff.get_feature_hash(feature, fasta_sequences,
+                                           options)
+                for feature in features]
+
+
+def test_get_feature_hash(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.get_feature_hash` depends on
+    the feature, the bytes of its sequence and options but not on
+    other sequences.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write("\n".join([
+        "chr1\tsrc\tCDS\t3\t11\t.\t+\t0\tID=cds1",
+        "chr1\tsrc\tCDS\t3\t11\t.\t-\t0\tID=cds1",
+        "chr3\tsrc\tCDS\t3\t11\t.\t+\t0\tID=cds3"]) + "\n")
+    features = list(fasta_gff.read_gff(str(gff_file)).all_features())
+    fasta_file = str(tmpdir.join("test.fasta"))
+    fasta = ">chr1\nAAATGAAAT\nAATTT\n>chr2\nGGGG\n"
+    hashes = get_feature_hashes(features, fasta_file, fasta)
+    assert len(set(hashes)) == 3
+    # Different line length, same sequence.
+    assert get_feature_hashes(
+        features, fasta_file,
+        ">chr1\nAAATGAA\nATAATTT\n>chr2\nGGGG\n") != hashes
+    # Change to sequence outside feature.
+    assert get_feature_hashes(
+        features, fasta_file,
+        ">chr1\nCAATGAAAT\nAATTT\n>chr2\nGGGG\n") == hashes
+    # Change to other sequence.
+    assert get_feature_hashes(
+        features, fasta_file,
+        ">chr1\nAAATGAAAT\nAATTT\n>chr2\nCCCC\n") == hashes
+    # Change to sequence inside feature.
+    changed = get_feature_hashes(
+        features, fasta_file,
+        ">chr1\nAAATGCAAT\nAATTT\n>chr2\nGGGG\n")
+    assert changed[0] != hashes[0] and changed[2] == hashes[2]
+    assert get_feature_hashes(features, fasta_file, fasta,
+                              {"option": 1}) != hashes
+
+
+def test_feature_cache(tmpdir):
+    """
+    Test :py:func:`riboviz.fasta_gff.save_feature_cache` and
+    :py:func:`riboviz.fasta_gff.load_feature_cache`, including a
+    missing cache file and a cache with an unknown version.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cache_file = str(tmpdir.join("cache", "features.json"))
+    assert fasta_gff.load_feature_cache(cache_file) == {}
+    entries = {"a": [["chr1", "cds1", "Issue", None]], "b": "ATGTAA"}
+    fasta_gff.save_feature_cache(
+        cache_file, {fasta_gff.FEATURE_CACHE_ENTRIES_KEY: entries})
+    assert fasta_gff.load_feature_cache(cache_file) == {
+        fasta_gff.FEATURE_CACHE_VERSION_KEY: fasta_gff.FEATURE_CACHE_VERSION,
+        fasta_gff.FEATURE_CACHE_ENTRIES_KEY: entries}
+    assert os.listdir(os.path.dirname(cache_file)) == ["features.json"]
+    with open(cache_file, "w") as f:
+        json.dump({fasta_gff.FEATURE_CACHE_VERSION_KEY: -1,
+                   fasta_gff.FEATURE_CACHE_ENTRIES_KEY: entries}, f)
+    assert fasta_gff.load_feature_cache(cache_file) == {}
+    with open(cache_file, "w") as f:
+        f.write("{")
+    with pytest.raises(ValueError):
+        fasta_gff.load_feature_cache(cache_file)
+
+
+def use_feature_cache(cache_file, fasta_file, features, options=None):
+    """
+    Get hashes and cached results of features using
+    :py:class:`riboviz.fasta_gff.FeatureCache`, add the index of each
+    feature as its result and save the cache.
+
+    :param cache_file: Cache file
+    :type cache_file: str or unicode
+    :param fasta_file: FASTA file
+    :type fasta_file: str or unicode
+    :param features: Features
+    :type features: list(gffutils.feature.Feature)
+    :param options: Options
+    :type options: dict
+    :return: Cached result of each feature (``None`` if none)
+    :rtype: list(int)
+    """
+    feature_cache = fasta_gff.FeatureCache(cache_file, fasta_file, options)
+    results = []
+    with fasta_gff.FastaSequences(fasta_file) as fasta_sequences:
+        for index, feature in enumerate(features):
+            feature_hash = feature_cache.get_feature_hash(
+                feature, fasta_sequences)
+            results.append(feature_cache.get(feature_hash))
+            feature_cache.add(feature, feature_hash, index)
+    feature_cache.save()
+    return results
+
+
+def test_feature_cache_hit(tmpdir, monkeypatch):
+    """
+    Test :py:class:`riboviz.fasta_gff.FeatureCache` looks up hashes
+    of features by their GFF records, without reading their
+    sequences, and does not rewrite the cache file, if the FASTA file
+    has not changed since the cache was saved.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: MonkeyPatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write("\n".join([
+        "chr1\tsrc\tCDS\t1\t6\t.\t+\t0\tID=cds1",
+        "chr2\tsrc\tCDS\t1\t6\t.\t+\t0\tID=cds2"]) + "\n")
+    features = list(fasta_gff.read_gff(str(gff_file)).all_features())
+    fasta_file = tmpdir.join("test.fasta")
+    fasta_file.write(">chr1\nATGTAA\n>chr2\nATGTGA\n")
+    # Modification time earlier than that of the cache.
+    fasta_file.setmtime(fasta_file.mtime() - 10)
+    cache_file = str(tmpdir.join("features.json"))
+    assert use_feature_cache(cache_file, str(fasta_file), features) == \
+        [None, None]
+    cache_mtime = os.stat(cache_file).st_mtime_ns
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Cache miss")
+    with monkeypatch.context() as m:
+        m.setattr(fasta_gff, "get_feature_hash", fail)
+        m.setattr(fasta_gff, "save_feature_cache", fail)
+        assert use_feature_cache(cache_file, str(fasta_file),
+                                 features) == [0, 1]
+    assert os.stat(cache_file).st_mtime_ns == cache_mtime
+    # Different options.
+    assert use_feature_cache(cache_file, str(fasta_file), features,
+                             {"option": 1}) == [None, None]
+
+
+def test_feature_cache_fasta_changed(tmpdir):
+    """
+    Test :py:class:`riboviz.fasta_gff.FeatureCache` reuses results
+    for features whose sequences are unchanged if the FASTA file has
+    changed, including a change with the same size and modification
+    time, made no later than the cache was saved.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    gff_file = tmpdir.join("test.gff")
+    gff_file.write("\n".join([
+        "chr1\tsrc\tCDS\t1\t6\t.\t+\t0\tID=cds1",
+        "chr2\tsrc\tCDS\t1\t6\t.\t+\t0\tID=cds2"]) + "\n")
+    features = list(fasta_gff.read_gff(str(gff_file)).all_features())
+    fasta_file = tmpdir.join("test.fasta")
+    fasta_file.write(">chr1\nATGTAA\n>chr2\nATGTGA\n")
+    mtime = os.stat(str(fasta_file)).st_mtime_ns
+    cache_file = tmpdir.join("features.json")
+    use_feature_cache(str(cache_file), str(fasta_file), features)
+    # Cache saved within the resolution of the file system's clock.
+    os.utime(str(cache_file), ns=(mtime, mtime))
+    fasta_file.write(">chr1\nATGTAA\n>chr2\nATGTAG\n")
+    os.utime(str(fasta_file), ns=(mtime, mtime))
+    assert use_feature_cache(str(cache_file), str(fasta_file),
+                             features) == [0, None]
@@ -3,9 +3,11 @@
 """
 import os
 import tempfile
+import numpy as np
 import pandas as pd
 import pytest
 from pyfaidx import FastaIndexingError
+from riboviz import fasta_gff
 from riboviz import get_cds_codons
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
 from riboviz.test import data
@@ -68,7 +70,7 @@ class MockFeature:
         :param seqid: Sequence ID
         :type seqid: str or unicode
         :param seq: Sequence
-        :type seq: str or unicode
+        :type seq: bytes
         :param attributes: Attributes
         :type attributes: dict
         """
@@ -76,19 +78,26 @@ class MockFeature:
         self.seq = seq
         self.attributes = attributes
 
-    def sequence(self, _):
+
+class MockFastaSequences:
+    """
+    Mock of :py:class:`riboviz.fasta_gff.FastaSequences` class
+    supporting ``get_feature_sequence``.
+    """
+
+    def get_feature_sequence(self, feature):
         """
-        Mock of.Feature.sequence function, which returns the value of
-        the ``seq`` attribute.
+        Mock of ``FastaSequences.get_feature_sequence`` function,
+        which returns the value of the feature's ``seq`` attribute.
 
         :param self: Object reference
-        :type self: MockFeature
-        :param fasta: FASTA file (ignored)
-        :type fasta: str or unicode
+        :type self: MockFastaSequences
+        :param feature: Feature
+        :type feature: MockFeature
         :return: Sequence
-        :rtype: str or unicode
+        :rtype: bytes
         """
-        return self.seq
+        return feature.seq
 
 
 @pytest.fixture(scope="function")
@@ -126,6 +135,25 @@ def test_sequence_to_codons(seq_codons):
         "Unexpected codons"
 
 
+@pytest.mark.parametrize("seq_codons", [
+    ("", []),
+    ("GA", []),
+    ("GATT", [b"GAT"]),
+    ("ATGGGGCCCTAG", [b"ATG", b"GGG", b"CCC", b"TAG"])])
+def test_sequence_to_codon_array(seq_codons):
+    """
+    Test :py:func:`riboviz.get_cds_codons.sequence_to_codon_array`
+    with valid sequences.
+
+    :param seq_codons: sequence and expected codons
+    :type seq_codons: tuple(str or unicode, list(bytes))
+    """
+    sequence, codons = seq_codons
+    codon_array = get_cds_codons.sequence_to_codon_array(sequence)
+    assert isinstance(codon_array, np.ndarray)
+    assert codon_array.tolist() == codons, "Unexpected codons"
+
+
 @pytest.mark.parametrize("feature", [
     ("SeqID_mRNA", {}, False, None),
     ("SeqID_mRNA", {"Name": []}, False, None),
@@ -160,15 +188,15 @@ def test_get_cds_from_fasta():
     Test :py:func:`riboviz.get_cds_codons.get_cds_from_fasta` returns
     a sequence.
 
-    :py:class:`MockFeature` is used to mock
-    ``gffutils.feature.Feature`` to avoid the need to use a FASTA
-    file for this test.
+    :py:class:`MockFeature` and :py:class:`MockFastaSequences` are
+    used to mock ``gffutils.feature.Feature`` and
+    :py:class:`riboviz.fasta_gff.FastaSequences` to avoid the need to
+    use a FASTA file for this test.
     """
-    expected_sequence = "ATGAAATAA"
+    expected_sequence = b"ATGAAATAA"
     feature = MockFeature("SeqID", expected_sequence)
-    # Any file name can be used as MockFeature ignores it and returns
-    # instead the sequence given above.
-    sequence = get_cds_codons.get_cds_from_fasta(feature, "test.fasta")
+    sequence = get_cds_codons.get_cds_from_fasta(feature,
+                                                 MockFastaSequences())
     assert sequence == expected_sequence
 
 
@@ -177,15 +205,14 @@ def test_get_cds_from_fasta_bad_length():
     Test :py:func:`riboviz.get_cds_codons.get_cds_from_fasta` raises an
     error if given a sequence whose length is not divisible by 3.
 
-    :py:class:`MockFeature` is used to mock
-    ``gffutils.feature.Feature`` to avoid the need to use a FASTA
-    file for this test.
+    :py:class:`MockFeature` and :py:class:`MockFastaSequences` are
+    used to mock ``gffutils.feature.Feature`` and
+    :py:class:`riboviz.fasta_gff.FastaSequences` to avoid the need to
+    use a FASTA file for this test.
     """
-    feature = MockFeature("SeqID", "ATGATAA")
+    feature = MockFeature("SeqID", b"ATGATAA")
     with pytest.raises(AssertionError):
-        # Any file name can be used as MockFeature ignores it and
-        # returns instead the sequence given above.
-        get_cds_codons.get_cds_from_fasta(feature, "test.fasta")
+        get_cds_codons.get_cds_from_fasta(feature, MockFastaSequences())
 
 
 def test_get_cds_codons_from_fasta_no_such_fasta_file(tmp_file):
@@ -276,6 +303,111 @@ def test_get_cds_codons_from_fasta():
     assert cds_codons == TEST_CDS_CODONS
 
 
+def test_get_cds_codons_from_fasta_as_arrays():
+    """
+    Test :py:func:`riboviz.get_cds_codons.get_cds_codons_from_fasta`
+    with FASTA file (:py:const:`TEST_FASTA_CODONS_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CODONS_FILE`) and ``as_arrays=True``.
+    """
+    cds_codons = get_cds_codons.get_cds_codons_from_fasta(
+        TEST_FASTA_CODONS_FILE,
+        TEST_GFF_CODONS_FILE,
+        as_arrays=True)
+    assert list(cds_codons.keys()) == list(TEST_CDS_CODONS.keys())
+    for feature_id, codons in cds_codons.items():
+        assert isinstance(codons, np.ndarray)
+        assert codons.astype(str).tolist() == TEST_CDS_CODONS[feature_id]
+
+
+def test_get_cds_codons_from_fasta_gff_cache_dir(tmpdir):
+    """
+    Test :py:func:`riboviz.get_cds_codons.get_cds_codons_from_fasta`
+    with FASTA file (:py:const:`TEST_FASTA_CODONS_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CODONS_FILE`) using a ``gffutils``
+    database and a GFF database cache directory, both when the
+    database is created and when it is reused.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cache_dir = str(tmpdir.join("cache"))
+    for _ in range(2):
+        cds_codons = get_cds_codons.get_cds_codons_from_fasta(
+            TEST_FASTA_CODONS_FILE,
+            TEST_GFF_CODONS_FILE,
+            gff_cache_dir=cache_dir,
+            use_gffutils=True)
+        assert cds_codons == TEST_CDS_CODONS
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def get_cds_from_fasta_unexpected(feature, fasta, *args):
+    """
+    Fail if called, for use in place of
+    :py:func:`riboviz.get_cds_codons.get_cds_from_fasta` or
+    :py:func:`riboviz.fasta_gff.get_feature_hash` when all
+    sequences are expected to come from a feature cache.
+
+    :param feature: GFF feature
+    :type feature: gffutils.feature.Feature
+    :param fasta: FASTA genes
+    :type fasta: riboviz.fasta_gff.FastaSequences
+    :param args: Additional arguments
+    :type args: list
+    """
+    pytest.fail("Unexpected sequence fetch for {}".format(feature.id))
+
+
+def test_get_cds_codons_from_fasta_feature_cache(tmpdir, monkeypatch):
+    """
+    Test :py:func:`riboviz.get_cds_codons.get_cds_codons_from_fasta`
+    with FASTA file (:py:const:`TEST_FASTA_CODONS_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CODONS_FILE`) and a feature cache file, both
+    when the cache is created and when it is reused. When it is
+    reused, check that sequences are neither fetched nor hashed and
+    that the cache is not rewritten, and that the cache is not reused
+    with different options.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    fasta_file = tmpdir.join("test.fasta")
+    with open(TEST_FASTA_CODONS_FILE) as f:
+        fasta_file.write(f.read())
+    # Modification time earlier than that of the cache.
+    fasta_file.setmtime(fasta_file.mtime() - 10)
+    cache_file = str(tmpdir.join("features.json"))
+    cds_codons = get_cds_codons.get_cds_codons_from_fasta(
+        str(fasta_file),
+        TEST_GFF_CODONS_FILE,
+        feature_cache_file=cache_file)
+    assert cds_codons == TEST_CDS_CODONS
+    assert os.path.exists(cache_file)
+    cache_mtime = os.stat(cache_file).st_mtime_ns
+    with monkeypatch.context() as m:
+        m.setattr(get_cds_codons, "get_cds_from_fasta",
+                  get_cds_from_fasta_unexpected)
+        m.setattr(fasta_gff, "get_feature_hash",
+                  get_cds_from_fasta_unexpected)
+        cds_codons = get_cds_codons.get_cds_codons_from_fasta(
+            str(fasta_file),
+            TEST_GFF_CODONS_FILE,
+            feature_cache_file=cache_file)
+    assert cds_codons == TEST_CDS_CODONS
+    assert os.stat(cache_file).st_mtime_ns == cache_mtime
+    cds_codons = get_cds_codons.get_cds_codons_from_fasta(
+        str(fasta_file),
+        TEST_GFF_CODONS_FILE,
+        exclude_stop_codons=True,
+        feature_cache_file=cache_file)
+    assert cds_codons == get_cds_codons.get_cds_codons_from_fasta(
+        str(fasta_file),
+        TEST_GFF_CODONS_FILE,
+        exclude_stop_codons=True)
+
+
 def test_get_cds_codons_from_fasta_use_feature_name_true():
     """
     Test :py:func:`riboviz.get_cds_codons.get_cds_codons_from_fasta`
@@ -474,6 +606,25 @@ def test_get_cds_codons_file(tmp_file):
     check_feature_codons_csv(TEST_CDS_CODONS, tmp_file)
 
 
+def test_get_cds_codons_file_gz(tmpdir):
+    """
+    Test :py:func:`riboviz.get_cds_codons.get_cds_codons_file` with
+    FASTA file (:py:const:`TEST_FASTA_CODONS_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CODONS_FILE`) and a ``.gz`` output file and
+    validate the compressed TSV file output.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cds_codons_file = str(tmpdir.join("codon_positions.tsv.gz"))
+    get_cds_codons.get_cds_codons_file(TEST_FASTA_CODONS_FILE,
+                                       TEST_GFF_CODONS_FILE,
+                                       cds_codons_file)
+    with open(cds_codons_file, "rb") as f:
+        assert f.read(2) == b"\x1f\x8b", "Expected gzip file"
+    check_feature_codons_csv(TEST_CDS_CODONS, cds_codons_file)
+
+
 def test_get_cds_codons_file_use_feature_name_true(tmp_file):
     """
     Test :py:func:`riboviz.get_cds_codons.get_cds_codons_file` with
@@ -540,3 +691,102 @@ def test_get_cds_codons_file_exclude_stop_codons(tmp_file):
         name: codons[:-1] for name, codons in TEST_CDS_CODONS.items()
     }
     check_feature_codons_csv(cds_codons_minus_stops, tmp_file)
+
+
+def check_codon_index(feature_codons, codon_index):
+    """
+    Check a codon index against the expected codons for features.
+
+    :param feature_codons: Codons for each feature, keyed by feature \
+    name
+    :type feature_codons: dict(str or unicode -> list(str or unicode))
+    :param codon_index: Codon index
+    :type codon_index: riboviz.get_cds_codons.CodonIndex
+    """
+    assert list(codon_index.genes) == list(feature_codons.keys())
+    for gene, codons in feature_codons.items():
+        assert codon_index.get_gene_codons(gene).tolist() == codons
+    all_codons = {codon for codons in feature_codons.values()
+                  for codon in codons}
+    for codon in all_codons | {"NNN"}:
+        expected = [(gene, pos + 1)
+                    for gene, codons in feature_codons.items()
+                    for pos, gene_codon in enumerate(codons)
+                    if gene_codon == codon]
+        genes, positions = codon_index.get_codon_positions(codon)
+        assert list(zip(genes.tolist(), positions.tolist())) == expected
+
+
+def test_create_codon_index():
+    """
+    Test :py:func:`riboviz.get_cds_codons.create_codon_index` with
+    codons including non-canonical and incomplete codons.
+    """
+    feature_codons = dict(TEST_CDS_CODONS)
+    feature_codons["Ambiguous_CDS"] = ["ATG", "NNA", "ATG", "TG"]
+    feature_codons["Empty_CDS"] = []
+    codon_index = get_cds_codons.create_codon_index(feature_codons)
+    check_codon_index(feature_codons, codon_index)
+    assert codon_index.codons.tolist() == \
+        get_cds_codons.CODONS + ["NNA", "TG"]
+    assert codon_index.arrays[get_cds_codons.CODON_INDEX_CODES].dtype == \
+        np.uint8
+    with pytest.raises(KeyError):
+        codon_index.get_gene_codons("NoSuchGene")
+
+
+def test_create_codon_index_too_many_codons():
+    """
+    Test :py:func:`riboviz.get_cds_codons.create_codon_index` with
+    more than :py:const:`riboviz.get_cds_codons.MAX_CODON_CODES`
+    distinct codons raises ``ValueError``.
+    """
+    codons = ["{:03d}".format(value) for value in range(200)]
+    with pytest.raises(ValueError):
+        get_cds_codons.create_codon_index({"Gene": codons})
+
+
+def test_get_cds_codons_file_codon_index(tmpdir):
+    """
+    Test :py:func:`riboviz.get_cds_codons.get_cds_codons_file` with
+    FASTA file (:py:const:`TEST_FASTA_CODONS_FILE`) and GFF file
+    (:py:const:`TEST_GFF_CODONS_FILE`) and a codon index file, and
+    validate the codon index file output and a codon index file
+    created from the TSV file output.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    cds_codons_file = str(tmpdir.join("codons.tsv.gz"))
+    index_file = str(tmpdir.join("codons.npz"))
+    get_cds_codons.get_cds_codons_file(TEST_FASTA_CODONS_FILE,
+                                       TEST_GFF_CODONS_FILE,
+                                       cds_codons_file,
+                                       codon_index_file=index_file)
+    check_codon_index(TEST_CDS_CODONS,
+                      get_cds_codons.load_codon_index(index_file))
+    tsv_index_file = str(tmpdir.join("codons_tsv.npz"))
+    get_cds_codons.create_codon_index_file(cds_codons_file, tsv_index_file)
+    check_codon_index(TEST_CDS_CODONS,
+                      get_cds_codons.load_codon_index(tsv_index_file))
+
+
+def test_load_codon_index_invalid(tmpdir):
+    """
+    Test :py:func:`riboviz.get_cds_codons.load_codon_index` with a
+    non-existent file or a file that is not a codon index raises the
+    expected exceptions.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(FileNotFoundError):
+        get_cds_codons.load_codon_index(str(tmpdir.join("nosuchfile.npz")))
+    not_index_file = str(tmpdir.join("codons.npz"))
+    np.savez(not_index_file, values=np.arange(3))
+    with pytest.raises(ValueError):
+        get_cds_codons.load_codon_index(not_index_file)
+    text_file = tmpdir.join("codons.txt")
+    text_file.write("Gene\tPosCodon\tCodon\n")
+    with pytest.raises(ValueError):
+        get_cds_codons.load_codon_index(str(text_file))
@@ -0,0 +1,467 @@
+"""
+:py:mod:`riboviz.h5` and :py:mod:`riboviz.pack_h5` tests.
+"""
+import h5py
+import numpy as np
+import pytest
+from riboviz import h5
+from riboviz import pack_h5
+from riboviz.test import create_test_h5
+
+TEST_DATASET = "test"
+""" Test dataset name. """
+TEST_ALIASES = {"ALT2": "YAL002W"}
+""" Test alternative gene names. """
+
+
+@pytest.fixture(scope="function")
+def gene_data():
+    """
+    Create matrices of read counts for test genes.
+
+    :return: Map from gene names to read counts
+    :rtype: dict(str or unicode => numpy.ndarray)
+    """
+    rng = np.random.default_rng(42)
+    return {
+        "YAL001C": rng.integers(0, 5, size=(4, 30), dtype=np.int32),
+        "YAL002W": rng.integers(0, 5, size=(4, 45), dtype=np.int32),
+        "YAL003W": rng.integers(0, 5, size=(4, 21), dtype=np.int32)
+    }
+
+
+@pytest.fixture(scope="function")
+def h5_file(tmpdir, gene_data):
+    """
+    Create test H5 file with complementary data files.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :return: H5 file
+    :rtype: str or unicode
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET, aliases=TEST_ALIASES)
+    return h5_file
+
+
+@pytest.fixture(scope="function")
+def packed_file(tmpdir, h5_file):
+    """
+    Create packed test H5 file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :return: Packed H5 file
+    :rtype: str or unicode
+    """
+    packed_file = str(tmpdir.join(h5.H5_FORMAT.format("packed")))
+    pack_h5.pack_h5(h5_file, packed_file, chunk_size=16)
+    return packed_file
+
+
+@pytest.mark.parametrize("codec", h5.CODECS)
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_get_compression_options(codec, shuffle):
+    """
+    Test :py:func:`riboviz.h5.get_compression_options` with each
+    codec.
+
+    :param codec: Codec
+    :type codec: str or unicode
+    :param shuffle: Shuffle?
+    :type shuffle: bool
+    """
+    options = h5.get_compression_options(codec, shuffle=shuffle)
+    if codec == h5.NO_CODEC:
+        assert "compression" not in options
+    else:
+        assert options["compression"] == codec
+    if codec == h5.GZIP:
+        assert options["compression_opts"] == h5.GZIP_LEVEL
+    assert options.get("shuffle", False) == shuffle
+
+
+@pytest.mark.parametrize("codec_level", [("bzip2", None), (h5.GZIP, 10)])
+def test_get_compression_options_invalid(codec_level):
+    """
+    Test :py:func:`riboviz.h5.get_compression_options` with an
+    invalid codec or level raises ``ValueError``.
+
+    :param codec_level: Codec and level
+    :type codec_level: tuple(str or unicode, int)
+    """
+    codec, level = codec_level
+    with pytest.raises(ValueError):
+        h5.get_compression_options(codec, level)
+
+
+def test_get_genes_aliases(h5_file, gene_data):
+    """
+    Test :py:func:`riboviz.h5.get_genes` and
+    :py:func:`riboviz.h5.get_aliases` with a standard H5 file.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    with h5py.File(h5_file, "r") as f:
+        assert not h5.is_packed(f)
+        assert set(h5.get_genes(f)) == set(gene_data) | set(TEST_ALIASES)
+        assert h5.get_aliases(f) == TEST_ALIASES
+
+
+def test_get_gene_datamatrix(h5_file, gene_data):
+    """
+    Test :py:func:`riboviz.h5.get_gene_datamatrix` with a standard
+    H5 file.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    with h5py.File(h5_file, "r") as f:
+        for gene, matrix in gene_data.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(f, gene, TEST_DATASET), matrix)
+        np.testing.assert_array_equal(
+            h5.get_gene_datamatrix(f, "ALT2", TEST_DATASET),
+            gene_data["YAL002W"])
+
+
+def test_pack_h5_genes_aliases(packed_file, gene_data):
+    """
+    Test :py:func:`riboviz.pack_h5.pack_h5` and check genes and
+    aliases are preserved.
+
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    with h5py.File(packed_file, "r") as f:
+        assert h5.is_packed(f)
+        assert h5.get_packed_dataset_name(f) == TEST_DATASET
+        assert h5.get_genes(f) == list(gene_data) + list(TEST_ALIASES)
+        assert h5.get_aliases(f) == TEST_ALIASES
+
+
+@pytest.mark.parametrize("codec", h5.CODECS)
+def test_pack_h5_gene_datamatrix(tmpdir, h5_file, gene_data, codec):
+    """
+    Test :py:func:`riboviz.pack_h5.pack_h5` with each codec and
+    check :py:func:`riboviz.h5.get_gene_datamatrix` returns the same
+    read counts as for the original file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param codec: Codec
+    :type codec: str or unicode
+    """
+    packed_file = str(tmpdir.join(h5.H5_FORMAT.format("packed")))
+    pack_h5.pack_h5(h5_file, packed_file, codec=codec, chunk_size=16)
+    with h5py.File(packed_file, "r") as f:
+        for gene, matrix in gene_data.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(f, gene, TEST_DATASET), matrix)
+        np.testing.assert_array_equal(
+            h5.get_gene_datamatrix(f, "ALT2", TEST_DATASET),
+            gene_data["YAL002W"])
+
+
+@pytest.mark.parametrize("attribute", h5.GENE_ATTRIBUTES)
+def test_pack_h5_gene_attribute(h5_file, packed_file, gene_data,
+                                attribute):
+    """
+    Test :py:func:`riboviz.h5.get_gene_attribute` returns the same
+    values for a packed H5 file as for the original file.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param attribute: Attribute name
+    :type attribute: str or unicode
+    """
+    with h5py.File(h5_file, "r") as f, \
+            h5py.File(packed_file, "r") as packed_f:
+        for gene in gene_data:
+            expected = h5.get_gene_attribute(f, gene, TEST_DATASET,
+                                             attribute)
+            actual = h5.get_gene_attribute(packed_f, gene, TEST_DATASET,
+                                           attribute)
+            np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("block_size", [1, 50, 2**22])
+def test_iterate_gene_datamatrices(h5_file, packed_file, gene_data,
+                                   block_size):
+    """
+    Test :py:func:`riboviz.h5.iterate_gene_datamatrices` with standard
+    and packed H5 files.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param block_size: Minimum number of positions to read at a time
+    :type block_size: int
+    """
+    for file_name in [h5_file, packed_file]:
+        with h5py.File(file_name, "r") as f:
+            matrices = dict(h5.iterate_gene_datamatrices(
+                f, TEST_DATASET, block_size))
+        assert list(matrices) == list(gene_data)
+        for gene, matrix in gene_data.items():
+            np.testing.assert_array_equal(matrices[gene], matrix)
+
+
+def test_packed_no_such_gene_dataset(packed_file):
+    """
+    Test :py:func:`riboviz.h5.get_gene_datamatrix` with a packed H5
+    file raises ``KeyError`` for a missing gene or dataset.
+
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    """
+    with h5py.File(packed_file, "r") as f:
+        with pytest.raises(KeyError):
+            h5.get_gene_datamatrix(f, "NoSuchGene", TEST_DATASET)
+        with pytest.raises(KeyError):
+            h5.get_gene_datamatrix(f, "YAL001C", "NoSuchDataset")
+
+
+def test_packed_gene_index_cache(tmpdir, gene_data):
+    """
+    Test :py:func:`riboviz.h5.get_gene_datamatrix` with a packed H5
+    file builds its gene index once per open file, and not for a
+    later file opened with the same name.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    packed_file = str(tmpdir.join(h5.H5_FORMAT.format("packed")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET, aliases=TEST_ALIASES)
+    pack_h5.pack_h5(h5_file, packed_file)
+    with h5py.File(packed_file, "r") as f:
+        for gene in list(gene_data) + list(TEST_ALIASES):
+            h5.get_gene_datamatrix(f, gene, TEST_DATASET)
+        assert set(h5._INDEX_CACHE[f.id][h5.PACKED]) == \
+            set(gene_data) | set(TEST_ALIASES)
+    reversed_data = dict(reversed(list(gene_data.items())))
+    create_test_h5(h5_file, reversed_data, TEST_DATASET)
+    pack_h5.pack_h5(h5_file, packed_file)
+    with h5py.File(packed_file, "r") as f:
+        for gene, matrix in reversed_data.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(f, gene, TEST_DATASET), matrix)
+
+
+def test_pack_h5_no_genes(tmpdir):
+    """
+    Test :py:func:`riboviz.pack_h5.pack_h5` with an H5 file with no
+    genes creates a packed H5 file with empty datasets, or raises
+    ``ValueError`` if no dataset name is given.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    packed_file = str(tmpdir.join(h5.H5_FORMAT.format("packed")))
+    create_test_h5(h5_file, {}, TEST_DATASET)
+    with pytest.raises(ValueError):
+        pack_h5.pack_h5(h5_file, packed_file)
+    pack_h5.pack_h5(h5_file, packed_file, TEST_DATASET)
+    with h5py.File(packed_file, "r") as f:
+        assert h5.get_genes(f) == []
+        assert f[h5.PACKED][h5.DATA].shape == (0, 0)
+        assert f[h5.PACKED][h5.START_CODON_POS].shape == (0, 3)
+        assert list(h5.iterate_gene_datamatrices(f, TEST_DATASET)) == []
+        summary = h5.get_summary(f, TEST_DATASET)
+        assert summary[h5.GENE] == []
+
+
+@pytest.mark.parametrize("attribute", h5.GENE_ATTRIBUTES)
+def test_add_summary_gene_attribute(tmpdir, gene_data, attribute):
+    """
+    Test :py:func:`riboviz.h5.add_summary` and check
+    :py:func:`riboviz.h5.get_gene_attribute` returns the same values
+    as for the file without a summary, with the summary being used.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param attribute: Attribute name
+    :type attribute: str or unicode
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET, aliases=TEST_ALIASES)
+    with h5py.File(h5_file, "r") as f:
+        expected = {gene: h5.get_gene_attribute(f, gene, TEST_DATASET,
+                                                attribute)
+                    for gene in gene_data}
+    h5.add_summary(h5_file)
+    # Remove the complementary data files so that only the summary
+    # can provide the attributes.
+    for i in range(2):
+        tmpdir.join(h5.H5_DATA_FILE_FORMAT.format(
+            h5.H5_FORMAT.format("test"), i + 1)).remove()
+    with h5py.File(h5_file, "r") as f:
+        assert h5.has_summary(f, TEST_DATASET)
+        assert not h5.has_summary(f, "NoSuchDataset")
+        for gene, value in expected.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_attribute(f, gene, TEST_DATASET, attribute),
+                value)
+
+
+def test_add_summary_genes(h5_file, gene_data):
+    """
+    Test :py:func:`riboviz.h5.add_summary` and check
+    :py:func:`riboviz.h5.get_genes`,
+    :py:func:`riboviz.h5.get_aliases` and
+    :py:func:`riboviz.pack_h5.pack_h5` ignore the summary, and that
+    adding a summary twice replaces the existing summary.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    h5.add_summary(h5_file, TEST_DATASET)
+    h5.add_summary(h5_file, TEST_DATASET)
+    with h5py.File(h5_file, "r") as f:
+        assert set(h5.get_genes(f)) == set(gene_data) | set(TEST_ALIASES)
+        assert h5.get_aliases(f) == TEST_ALIASES
+        assert h5.get_summary(f, TEST_DATASET)[h5.GENE] == list(gene_data)
+    pack_h5.pack_h5(h5_file, h5_file + ".packed")
+    with h5py.File(h5_file + ".packed", "r") as f:
+        assert h5.get_genes(f) == list(gene_data) + list(TEST_ALIASES)
+
+
+def test_add_summary_gene_index_cache(h5_file, gene_data):
+    """
+    Test :py:func:`riboviz.h5.get_gene_attribute` with a summary
+    builds the summary's gene index once per open file.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    h5.add_summary(h5_file, TEST_DATASET)
+    with h5py.File(h5_file, "r") as f:
+        for gene, matrix in gene_data.items():
+            assert h5.get_gene_attribute(f, gene, TEST_DATASET,
+                                         h5.READS_TOTAL) == matrix.sum()
+        assert h5._INDEX_CACHE[f.id][h5.SUMMARY] == \
+            {gene: i for i, gene in enumerate(gene_data)}
+
+
+def test_add_summary_gene_called_summary(tmpdir, gene_data):
+    """
+    Test :py:func:`riboviz.h5.get_genes` includes a gene called
+    :py:const:`riboviz.h5.SUMMARY` and
+    :py:func:`riboviz.h5.add_summary` raises ``ValueError`` for a
+    file with such a gene.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    gene_data[h5.SUMMARY] = gene_data.pop("YAL003W")
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET)
+    with h5py.File(h5_file, "r") as f:
+        assert not h5.is_summary(f)
+        assert set(h5.get_genes(f)) == set(gene_data)
+    with pytest.raises(ValueError):
+        h5.add_summary(h5_file, TEST_DATASET)
+
+
+def test_add_summary_packed(packed_file):
+    """
+    Test :py:func:`riboviz.h5.add_summary` with a packed H5 file
+    raises ``ValueError``.
+
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    """
+    with pytest.raises(ValueError):
+        h5.add_summary(packed_file)
+
+
+@pytest.mark.parametrize("summary", [True, False])
+def test_calculate_gene_tpms(h5_file, packed_file, gene_data, summary):
+    """
+    Test :py:func:`riboviz.h5.calculate_gene_tpms` with standard H5
+    files, with or without a summary, and packed H5 files.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param summary: Add summary to H5 file?
+    :type summary: bool
+    """
+    if summary:
+        h5.add_summary(h5_file)
+    reads_total = np.array([np.sum(matrix) for matrix in gene_data.values()])
+    # Gene lengths are as set by create_test_h5.
+    gene_lengths = np.array([matrix.shape[1] - 18
+                             for matrix in gene_data.values()])
+    rpb = reads_total / (gene_lengths + 50)
+    for file_name in [h5_file, packed_file]:
+        with h5py.File(file_name, "r") as f:
+            tpms = h5.calculate_gene_tpms(f, TEST_DATASET)
+        assert list(tpms["ORF"]) == list(gene_data)
+        np.testing.assert_array_equal(tpms["readcount"], reads_total)
+        np.testing.assert_allclose(tpms["rpb"], rpb)
+        np.testing.assert_allclose(tpms["tpm"], rpb * 1e6 / np.sum(rpb))
+
+
+@pytest.mark.parametrize("summary", [True, False])
+def test_calculate_read_lengths(h5_file, packed_file, gene_data, summary):
+    """
+    Test :py:func:`riboviz.h5.calculate_read_lengths` with standard
+    H5 files, with or without a summary, and packed H5 files.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param packed_file: Packed H5 file
+    :type packed_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param summary: Add summary to H5 file?
+    :type summary: bool
+    """
+    if summary:
+        h5.add_summary(h5_file)
+    counts = np.sum([np.sum(matrix, axis=1)
+                     for matrix in gene_data.values()], axis=0)
+    for file_name in [h5_file, packed_file]:
+        with h5py.File(file_name, "r") as f:
+            read_lengths = h5.calculate_read_lengths(f, TEST_DATASET)
+        np.testing.assert_array_equal(read_lengths["Counts"], counts)
+        assert len(read_lengths["Length"]) == len(counts)
@@ -0,0 +1,202 @@
+"""
+:py:mod:`riboviz.__main__` tests and command-line tool import tests.
+
+The import tests check that importing each command-line tool does
+not import third-party packages that the tool defers until they are
+needed. The import time of each tool is recorded as a test property,
+``import_seconds``, which is included in JUnit XML reports (for
+example, ``pytest --junitxml=report.xml``).
+"""
+import os
+import subprocess
+import sys
+import pytest
+import riboviz
+from riboviz import __main__ as riboviz_main
+
+HEAVY_PACKAGES = ["Bio", "git", "gffutils", "h5py", "numpy", "pandas",
+                  "pyfaidx", "pysam", "yaml"]
+""" Third-party packages whose import noticeably slows startup. """
+TOOL_PACKAGES = {
+    "add_h5_summary": ["h5py", "numpy"],
+    "analyse_nextflow_trace": ["numpy", "pandas", "yaml"],
+    "bam_to_h5": ["gffutils", "h5py", "numpy", "pyfaidx", "pysam"],
+    "benchmark": [],
+    "benchmark_h5": ["h5py", "numpy"],
+    "check_fasta_gff": ["gffutils", "numpy", "pyfaidx"],
+    "count_reads": ["numpy", "pandas", "pysam", "yaml"],
+    "create_barcode_pairs": [],
+    "create_codon_index": ["gffutils", "numpy", "pyfaidx"],
+    "create_fastq_simdata": ["Bio", "numpy", "pandas"],
+    "create_job_script": ["yaml"],
+    "demultiplex_fastq": ["numpy", "pandas"],
+    "export_h5": ["h5py", "numpy", "pandas"],
+    "get_cds_codons": ["gffutils", "numpy", "pyfaidx"],
+    "pack_h5": ["h5py", "numpy"],
+    "plan_resources": ["numpy", "pandas", "yaml"],
+    "repack_h5": ["h5py", "numpy"],
+    "simulate_riboseq": ["gffutils", "numpy", "pandas", "pyfaidx"],
+    "subsample_bioseqfile": [],
+    "trim_5p_mismatch": ["pysam"],
+    "upgrade_config_file": ["yaml"]
+}
+"""
+Heavy packages (:py:const:`HEAVY_PACKAGES`) that each tool is
+allowed to import when it is imported.
+"""
+LIBRARY_MODULES = ["riboviz.benchmark", "riboviz.fastq",
+                   "riboviz.process_utils", "riboviz.provenance",
+                   "riboviz.sam_bam", "riboviz.subsample_bioseqfile",
+                   "riboviz.utils"]
+"""
+Modules which import no heavy packages (:py:const:`HEAVY_PACKAGES`)
+when they are imported.
+"""
+IMPORT_SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import {}
+print(time.perf_counter() - start)
+print(",".join(sorted(sys.modules)))
+"""
+""" Script to import a module and print import time and modules. """
+
+
+def get_imports(module):
+    """
+    Import a module in a new Python interpreter and get the import
+    time and the heavy packages (:py:const:`HEAVY_PACKAGES`) that are
+    imported.
+
+    :param module: Module
+    :type module: str or unicode
+    :return: Import time (seconds) and heavy packages imported
+    :rtype: tuple(float, list(str or unicode))
+    """
+    output = subprocess.run([sys.executable, "-c",
+                             IMPORT_SCRIPT.format(module)],
+                            cwd=riboviz.BASE_PATH,
+                            stdout=subprocess.PIPE,
+                            check=True,
+                            universal_newlines=True).stdout
+    seconds, modules = output.strip().split("\n")
+    modules = set(modules.split(","))
+    return float(seconds), [package for package in HEAVY_PACKAGES
+                            if package in modules]
+
+
+def test_get_tool_names():
+    """
+    Test :py:func:`riboviz.__main__.get_tool_names` returns all the
+    tools in :py:mod:`riboviz.tools` and each has a description.
+    """
+    tools = riboviz_main.get_tool_names()
+    assert tools == sorted(TOOL_PACKAGES.keys())
+    for tool in tools:
+        assert riboviz_main.get_tool_description(tool)
+
+
+@pytest.mark.parametrize("args,exit_code", [([], 2), (["-h"], 0)])
+def test_main_usage(args, exit_code, capsys):
+    """
+    Test :py:func:`riboviz.__main__.main` prints usage including the
+    tools, with no arguments or a help flag.
+
+    :param args: Command-line arguments
+    :type args: list(str or unicode)
+    :param exit_code: Expected exit code
+    :type exit_code: int
+    :param capsys: Capture standard output (pytest built-in fixture)
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    assert riboviz_main.main(args) == exit_code
+    output = capsys.readouterr().out
+    for tool in TOOL_PACKAGES:
+        assert tool in output
+
+
+def test_main_no_such_tool(capsys):
+    """
+    Test :py:func:`riboviz.__main__.main` with a non-existent tool
+    returns exit code 2 and prints an error.
+
+    :param capsys: Capture standard output (pytest built-in fixture)
+    :type capsys: _pytest.capture.CaptureFixture
+    """
+    assert riboviz_main.main(["nosuchtool"]) == 2
+    assert "nosuchtool" in capsys.readouterr().err
+
+
+def test_main_tool_error(monkeypatch):
+    """
+    Test :py:func:`riboviz.__main__.main` does not catch a
+    ``ValueError`` raised by a tool.
+
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    def run_module(*args, **kwargs):
+        """
+        Raise a ``ValueError``.
+
+        :param args: Positional arguments
+        :type args: list
+        :param kwargs: Keyword arguments
+        :type kwargs: dict
+        :raise ValueError: Always
+        """
+        raise ValueError("Tool error")
+    monkeypatch.setattr(riboviz_main.runpy, "run_module", run_module)
+    monkeypatch.setattr(sys, "argv", list(sys.argv))
+    with pytest.raises(ValueError, match="Tool error"):
+        riboviz_main.main(["create_barcode_pairs"])
+
+
+def test_main_tool(tmpdir):
+    """
+    Test ``python -m riboviz`` runs a tool with its command-line
+    arguments.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    output_file = str(tmpdir.join("barcode_pairs.tsv"))
+    subprocess.run([sys.executable, "-m", "riboviz",
+                    "create_barcode_pairs", "-o", output_file, "-l", "2"],
+                   cwd=riboviz.BASE_PATH,
+                   check=True)
+    assert os.path.exists(output_file)
+
+
+@pytest.mark.parametrize("tool", sorted(TOOL_PACKAGES.keys()))
+def test_tool_imports(tool, record_property):
+    """
+    Test that importing a tool only imports the expected heavy
+    packages (see :py:const:`TOOL_PACKAGES`) and record its import
+    time.
+
+    :param tool: Tool name
+    :type tool: str or unicode
+    :param record_property: Record test property (pytest built-in \
+    fixture)
+    :type record_property: function
+    """
+    seconds, packages = get_imports("{}.{}".format(
+        riboviz_main.TOOLS_PACKAGE, tool))
+    record_property("import_seconds", seconds)
+    assert set(packages) <= set(TOOL_PACKAGES[tool]), \
+        "{} imports {}".format(tool, packages)
+
+
+@pytest.mark.parametrize("module", LIBRARY_MODULES)
+def test_library_imports(module):
+    """
+    Test that importing a module imports no heavy packages (see
+    :py:const:`HEAVY_PACKAGES`).
+
+    :param module: Module
+    :type module: str or unicode
+    """
+    _, packages = get_imports(module)
+    assert not packages, "{} imports {}".format(module, packages)
@@ -0,0 +1,291 @@
+"""
+:py:mod:`riboviz.nextflow_trace` tests.
+"""
+import os
+import pandas as pd
+import pytest
+from riboviz import nextflow_trace
+from riboviz import params
+
+RAW_TRACE = """task_id\thash\tnative_id\tname\tstatus\texit\tsubmit\t\
+duration\trealtime\t%cpu\tpeak_rss\tread_bytes\twrite_bytes
+1\tab/000001\t101\tbuildIndicesORF (yeast_YAL_CDS_w_250utrs)\tCOMPLETED\t\
+0\t1000000\t12000\t10000\t100.0\t104857600\t2000000\t1000000
+2\tab/000002\t102\tcutAdapters (WTnone)\tCOMPLETED\t0\t1000000\t6000\t\
+5000\t90.0\t52428800\t3000000\t2000000
+3\tab/000003\t103\thisat2ORF (WTnone)\tCOMPLETED\t0\t1012000\t21000\t\
+20000\t200.0\t209715200\t4000000\t3000000
+4\tab/000004\t104\tbamToH5 (WTnone)\tCOMPLETED\t0\t1033000\t11000\t\
+10000\t50.0\t104857600\t1000000\t500000
+5\tab/000005\t105\tcutAdapters (KO)\tFAILED\t1\t1000000\t2000\t\
+1000\t80.0\t-\t-\t-
+"""
+""" Trace with raw values (``trace.raw = true``). """
+
+HUMAN_TRACE = """task_id\thash\tnative_id\tname\tstatus\texit\tsubmit\t\
+duration\trealtime\t%cpu\tpeak_rss\trchar\twchar
+1\tab/000001\t101\tbuildIndicesORF (yeast_YAL_CDS_w_250utrs)\tCOMPLETED\t\
+0\t1970-01-01 00:16:40.000\t12s\t10s\t100.0%\t100 MB\t1.9 MB\t976.6 KB
+2\tab/000002\t102\tcutAdapters (WTnone)\tCOMPLETED\t0\t\
+1970-01-01 00:16:40.000\t6s\t5s\t90.0%\t50 MB\t2.9 MB\t1.9 MB
+3\tab/000003\t103\thisat2ORF (WTnone)\tCOMPLETED\t0\t\
+1970-01-01 00:16:52.000\t21s\t20s\t200.0%\t200 MB\t3.8 MB\t2.9 MB
+4\tab/000004\t104\tbamToH5 (WTnone)\tCOMPLETED\t0\t\
+1970-01-01 00:17:13.000\t11s\t10s\t50.0%\t100 MB\t976.6 KB\t488.3 KB
+5\tab/000005\t105\tcutAdapters (KO)\tFAILED\t1\t\
+1970-01-01 00:16:40.000\t2s\t1s\t80.0%\t-\t-\t-
+"""
+""" Trace with human-readable values, as :py:const:`RAW_TRACE`. """
+
+
+def write_trace(tmpdir, content, file_name="trace.tsv"):
+    """
+    Write a trace file.
+
+    :param tmpdir: Temporary directory
+    :type tmpdir: py._path.local.LocalPath
+    :param content: Trace
+    :type content: str or unicode
+    :param file_name: File name
+    :type file_name: str or unicode
+    :return: File path
+    :rtype: str or unicode
+    """
+    trace_file = tmpdir.join(file_name)
+    trace_file.write(content)
+    return str(trace_file)
+
+
+@pytest.mark.parametrize("value,seconds", [
+    ("1d 2h 3m 4s", 93784), ("150ms", 0.15), ("1.5s", 1.5),
+    ("2500", 2.5), ("-", None)])
+def test_parse_duration(value, seconds):
+    """
+    Test :py:func:`riboviz.nextflow_trace.parse_duration`.
+
+    :param value: Value
+    :type value: str or unicode
+    :param seconds: Expected seconds
+    :type seconds: float
+    """
+    assert nextflow_trace.parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value,num_bytes", [
+    ("1.5 GB", 1.5 * 1024 ** 3), ("512 B", 512), ("2048", 2048),
+    ("-", None)])
+def test_parse_memory(value, num_bytes):
+    """
+    Test :py:func:`riboviz.nextflow_trace.parse_memory`.
+
+    :param value: Value
+    :type value: str or unicode
+    :param num_bytes: Expected bytes
+    :type num_bytes: float
+    """
+    assert nextflow_trace.parse_memory(value) == num_bytes
+
+
+@pytest.mark.parametrize("parse,value", [
+    (nextflow_trace.parse_duration, "1x"),
+    (nextflow_trace.parse_memory, "1 XB")])
+def test_parse_error(parse, value):
+    """
+    Test parsing an invalid value raises ``ValueError``.
+
+    :param parse: Parse function
+    :type parse: function
+    :param value: Value
+    :type value: str or unicode
+    """
+    with pytest.raises(ValueError):
+        parse(value)
+
+
+@pytest.mark.parametrize("content", [RAW_TRACE, HUMAN_TRACE])
+def test_load_trace(tmpdir, content):
+    """
+    Test :py:func:`riboviz.nextflow_trace.load_trace` parses raw and
+    human-readable traces.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param content: Trace
+    :type content: str or unicode
+    """
+    tasks = nextflow_trace.load_trace(write_trace(tmpdir, content))
+    assert list(tasks.columns) == nextflow_trace.TASK_COLUMNS
+    assert list(tasks[nextflow_trace.PROCESS]) == [
+        "buildIndicesORF", "cutAdapters", "hisat2ORF", "bamToH5",
+        "cutAdapters"]
+    assert list(tasks[nextflow_trace.TAG]) == [
+        "yeast_YAL_CDS_w_250utrs", "WTnone", "WTnone", "WTnone", "KO"]
+    hisat2 = tasks.iloc[2]
+    assert hisat2[nextflow_trace.REALTIME] == 20
+    assert hisat2[nextflow_trace.CPU_PERCENT] == 200
+    assert hisat2[nextflow_trace.PEAK_RSS] == 200 * 1024 ** 2
+    assert hisat2[nextflow_trace.READ_BYTES] == \
+        pytest.approx(4000000, rel=0.01)
+    assert hisat2[nextflow_trace.COMPLETE] == 1033
+    assert hisat2[nextflow_trace.START] == 1013
+    assert pd.isna(tasks.iloc[4][nextflow_trace.PEAK_RSS])
+
+
+def test_load_trace_error(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.load_trace` with a trace
+    with no ``name`` field raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(ValueError):
+        nextflow_trace.load_trace(write_trace(tmpdir, "task_id\n1\n"))
+
+
+def test_summarise_trace_process(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.summarise_trace` by
+    process, including CPU efficiency against ``num_processes`` for
+    :py:const:`riboviz.nextflow_trace.MULTI_PROCESS_PROCESSES`.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    tasks = nextflow_trace.load_trace(write_trace(tmpdir, RAW_TRACE))
+    summary = nextflow_trace.summarise_trace(
+        tasks, nextflow_trace.PROCESS, num_processes=4)
+    assert list(summary.columns) == [nextflow_trace.PROCESS] + \
+        nextflow_trace.SUMMARY_COLUMNS
+    summary = summary.set_index(nextflow_trace.PROCESS)
+    assert list(summary.index) == ["hisat2ORF", "buildIndicesORF",
+                                   "bamToH5", "cutAdapters"]
+    assert summary.loc["hisat2ORF", nextflow_trace.CPU_EFFICIENCY] == 0.5
+    assert summary.loc["hisat2ORF", nextflow_trace.REQUESTED_CPUS] == 4
+    assert summary.loc["bamToH5", nextflow_trace.CPU_EFFICIENCY] == 0.125
+    assert summary.loc["buildIndicesORF",
+                       nextflow_trace.CPU_EFFICIENCY] == 1
+    cut_adapters = summary.loc["cutAdapters"]
+    assert cut_adapters[nextflow_trace.NUM_TASKS] == 2
+    assert cut_adapters[nextflow_trace.NUM_FAILED] == 1
+    assert cut_adapters[nextflow_trace.REALTIME_SECONDS] == 6
+    assert cut_adapters[nextflow_trace.MAX_REALTIME_SECONDS] == 5
+    assert cut_adapters[nextflow_trace.READ_MB] == 3
+    assert summary[nextflow_trace.REALTIME_FRACTION].sum() == \
+        pytest.approx(1)
+
+
+def test_summarise_trace_sample(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.summarise_trace` by
+    sample.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    tasks = nextflow_trace.load_trace(write_trace(tmpdir, RAW_TRACE))
+    summary = nextflow_trace.summarise_trace(tasks, nextflow_trace.SAMPLE)
+    summary = summary.set_index(nextflow_trace.SAMPLE)
+    assert list(summary.index) == ["WTnone", "yeast_YAL_CDS_w_250utrs",
+                                   "KO"]
+    assert summary.loc["WTnone", nextflow_trace.NUM_TASKS] == 3
+    assert summary.loc["WTnone", nextflow_trace.REALTIME_SECONDS] == 35
+    assert summary.loc["WTnone", nextflow_trace.MAX_PEAK_RSS_MB] == \
+        pytest.approx(209.7152)
+    with pytest.raises(ValueError):
+        nextflow_trace.summarise_trace(tasks, "Exit")
+
+
+def test_get_critical_path(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.get_critical_path` follows
+    the longest chain of dependent tasks.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    tasks = nextflow_trace.load_trace(write_trace(tmpdir, RAW_TRACE))
+    path, path_seconds, elapsed_seconds = \
+        nextflow_trace.get_critical_path(tasks)
+    assert list(path.columns) == nextflow_trace.CRITICAL_PATH_COLUMNS
+    assert list(path[nextflow_trace.PROCESS]) == [
+        "buildIndicesORF", "hisat2ORF", "bamToH5"]
+    assert path_seconds == 40
+    assert elapsed_seconds == 44
+
+
+def test_compare_summaries():
+    """
+    Test :py:func:`riboviz.nextflow_trace.compare_summaries` flags
+    run time and peak RSS regressions, improvements, new and removed
+    processes.
+    """
+    columns = [nextflow_trace.PROCESS, nextflow_trace.REALTIME_SECONDS,
+               nextflow_trace.MAX_PEAK_RSS_MB,
+               nextflow_trace.CPU_EFFICIENCY]
+    baseline = pd.DataFrame([["slower", 10, 100, 1],
+                             ["larger", 10, 100, 1],
+                             ["faster", 10, 100, 1],
+                             ["same", 10, 100, 1],
+                             ["removed", 10, 100, 1]], columns=columns)
+    summary = pd.DataFrame([["slower", 15, 100, 1],
+                            ["larger", 10, 150, 1],
+                            ["faster", 5, 100, 1],
+                            ["same", 11, 110, 1],
+                            ["new", 10, 100, 1]], columns=columns)
+    comparison = nextflow_trace.compare_summaries(summary, baseline, 0.2)
+    statuses = dict(zip(comparison[nextflow_trace.PROCESS],
+                        comparison[nextflow_trace.COMPARISON_STATUS]))
+    assert statuses == {
+        "slower": nextflow_trace.STATUS_REGRESSION,
+        "larger": nextflow_trace.STATUS_REGRESSION,
+        "faster": nextflow_trace.STATUS_IMPROVEMENT,
+        "same": nextflow_trace.STATUS_OK,
+        "new": nextflow_trace.STATUS_NEW,
+        "removed": nextflow_trace.STATUS_REMOVED}
+    with pytest.raises(ValueError):
+        nextflow_trace.compare_summaries(
+            summary, baseline.rename(
+                columns={nextflow_trace.PROCESS: nextflow_trace.SAMPLE}))
+
+
+def test_get_num_processes(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.get_num_processes`.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config_file = tmpdir.join("config.yaml")
+    config_file.write("{}: 4\n".format(params.NUM_PROCESSES))
+    assert nextflow_trace.get_num_processes(str(config_file)) == 4
+    config_file.write("dir_in: input\n")
+    assert nextflow_trace.get_num_processes(str(config_file)) == 1
+
+
+def test_analyse_trace(tmpdir):
+    """
+    Test :py:func:`riboviz.nextflow_trace.analyse_trace` writes
+    summaries, critical path and comparisons with a baseline.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    trace_file = write_trace(tmpdir, HUMAN_TRACE)
+    baseline_file = write_trace(tmpdir, RAW_TRACE, "baseline.tsv")
+    output_dir = str(tmpdir.join("analysis"))
+    _, _, _, _, _, process_comparison, sample_comparison = \
+        nextflow_trace.analyse_trace(trace_file, output_dir, 4,
+                                     baseline_file)
+    assert set(process_comparison[nextflow_trace.COMPARISON_STATUS]) == \
+        {nextflow_trace.STATUS_OK}
+    assert set(sample_comparison[nextflow_trace.COMPARISON_STATUS]) == \
+        {nextflow_trace.STATUS_OK}
+    for file_name in [nextflow_trace.PROCESS_SUMMARY_FILE,
+                      nextflow_trace.SAMPLE_SUMMARY_FILE,
+                      nextflow_trace.CRITICAL_PATH_FILE,
+                      nextflow_trace.PROCESS_COMPARISON_FILE,
+                      nextflow_trace.SAMPLE_COMPARISON_FILE]:
+        table = pd.read_csv(os.path.join(output_dir, file_name), sep="\t",
+                            comment="#")
+        assert not table.empty
@@ -0,0 +1,271 @@
+"""
+:py:mod:`riboviz.plan_resources` tests.
+"""
+import os
+import pandas as pd
+import pytest
+import yaml
+from riboviz import params
+from riboviz import plan_resources
+
+FASTQ_MB = 2
+""" Size of test sample FASTQ file (MB). """
+FASTA_MB = 1
+""" Size of test FASTA files (MB). """
+
+
+def write_file(file_name, megabytes):
+    """
+    Write a file of a given size.
+
+    :param file_name: File name
+    :type file_name: py._path.local.LocalPath
+    :param megabytes: Size (MB)
+    :type megabytes: float
+    """
+    file_name.write("A" * int(megabytes * plan_resources.MB), ensure=True)
+
+
+def make_config(tmpdir, **kwargs):
+    """
+    Create a workflow configuration with a sample FASTQ file, a
+    missing sample FASTQ file and rRNA and ORF FASTA files.
+
+    :param tmpdir: Temporary directory
+    :type tmpdir: py._path.local.LocalPath
+    :param kwargs: Additional configuration
+    :type kwargs: dict
+    :return: Configuration
+    :rtype: dict
+    """
+    write_file(tmpdir.join("input", "WT.fastq"), FASTQ_MB)
+    write_file(tmpdir.join("rrna.fa"), FASTA_MB)
+    write_file(tmpdir.join("orf.fa"), FASTA_MB)
+    config = {
+        params.INPUT_DIR: str(tmpdir.join("input")),
+        params.INDEX_DIR: str(tmpdir.join("index")),
+        params.FQ_FILES: {"WT": "WT.fastq", "KO": "KO.fastq"},
+        params.MULTIPLEX_FQ_FILES: None,
+        params.RRNA_FASTA_FILE: str(tmpdir.join("rrna.fa")),
+        params.ORF_FASTA_FILE: str(tmpdir.join("orf.fa")),
+        params.RRNA_INDEX_PREFIX: "rrna",
+        params.ORF_INDEX_PREFIX: "orf",
+        params.BUILD_INDICES: True,
+        params.TRIM_5P_MISMATCHES: True,
+        params.DEDUP_UMIS: False,
+        params.NUM_PROCESSES: 2
+    }
+    config.update(kwargs)
+    return config
+
+
+def test_get_file_mb(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.get_file_mb` estimates the
+    uncompressed size of gzipped files.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    for file_name in ["a.fastq", "a.fastq.gz"]:
+        write_file(tmpdir.join(file_name), 1)
+    assert plan_resources.get_file_mb(str(tmpdir.join("a.fastq"))) == 1
+    assert plan_resources.get_file_mb(str(tmpdir.join("a.fastq.gz"))) == \
+        plan_resources.GZIP_RATIO
+
+
+@pytest.mark.parametrize("file_name", ["data/M1.fastq.gz", "M1.fq",
+                                       "M1.fastq"])
+def test_get_multiplex_id(file_name):
+    """
+    Test :py:func:`riboviz.plan_resources.get_multiplex_id`.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    """
+    assert plan_resources.get_multiplex_id(file_name) == "M1"
+
+
+def test_plan_resources(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` predicts
+    stages for each sample, skipping missing files and stages not
+    configured, and recommends job parameters.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config = make_config(tmpdir)
+    stages, recommendations, missing = \
+        plan_resources.plan_resources(config)
+    assert missing == [str(tmpdir.join("input", "KO.fastq"))]
+    assert list(stages.columns) == plan_resources.STAGE_COLUMNS
+    assert list(stages[plan_resources.PROCESS]) == \
+        plan_resources.INDEX_STAGES + [
+            "cutAdapters", "hisat2rRNA", "hisat2ORF", "trim5pMismatches",
+            "samViewSort", "bamToH5", "generateStatsFigs"]
+    assert set(stages[plan_resources.SOURCE]) == \
+        {plan_resources.SOURCE_MODEL}
+    hisat2 = stages.set_index(plan_resources.PROCESS).loc["hisat2ORF"]
+    assert hisat2[plan_resources.CPUS] == 2
+    assert hisat2[plan_resources.MEMORY_MB] == \
+        200 + FASTA_MB * plan_resources.INDEX_FASTA_RATIO
+    assert hisat2[plan_resources.SECONDS] == 10 + 2 * FASTQ_MB / 2
+    assert recommendations == {
+        params.JOB_NUM_CPUS: 2,
+        params.JOB_MEMORY: "2G",
+        params.JOB_RUNTIME: "01:00:00",
+        params.SAMSORT_MEMORY: "768M"
+    }
+
+
+def test_plan_resources_index(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` uses
+    existing index files if indices are not to be built.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config = make_config(tmpdir, **{params.BUILD_INDICES: False})
+    for index in range(1, 3):
+        write_file(tmpdir.join("index", "orf.{}.ht2".format(index)), 5)
+        write_file(tmpdir.join("index", "rrna.{}.ht2".format(index)), 1)
+    stages, _, _ = plan_resources.plan_resources(config)
+    stages = stages.set_index(plan_resources.PROCESS)
+    assert "buildIndicesORF" not in stages.index
+    assert stages.loc["hisat2ORF", plan_resources.MEMORY_MB] == 210
+
+
+def test_plan_resources_multiplex(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` plans
+    multiplexed FASTQ files as single samples.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    write_file(tmpdir.join("input", "M1.fastq.gz"), 1)
+    config = make_config(tmpdir, **{
+        params.FQ_FILES: None,
+        params.MULTIPLEX_FQ_FILES: ["M1.fastq.gz"],
+        params.BUILD_INDICES: False})
+    stages, _, missing = plan_resources.plan_resources(config)
+    assert missing == []
+    assert list(stages[plan_resources.PROCESS]) == \
+        plan_resources.MULTIPLEX_STAGES + [
+            "hisat2rRNA", "hisat2ORF", "trim5pMismatches", "samViewSort",
+            "bamToH5", "generateStatsFigs"]
+    assert set(stages[plan_resources.SAMPLE]) == {"M1"}
+    assert set(stages[plan_resources.INPUT_MB]) == \
+        {plan_resources.GZIP_RATIO}
+
+
+def test_plan_resources_trace(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` calibrates
+    predictions using a Nextflow trace file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    trace_file = tmpdir.join("trace.tsv")
+    trace_file.write("\n".join([
+        "name\tstatus\trealtime\tpeak_rss",
+        "hisat2ORF (WT)\tCOMPLETED\t10m\t5 GB",
+        "bamToH5 (other)\tCOMPLETED\t1m\t2 GB",
+        "bamToH5 (WT)\tFAILED\t1m\t9 GB"]))
+    config = make_config(tmpdir)
+    stages, recommendations, _ = plan_resources.plan_resources(
+        config, [str(trace_file)])
+    stages = stages.set_index(plan_resources.PROCESS)
+    hisat2 = stages.loc["hisat2ORF"]
+    assert hisat2[plan_resources.SOURCE] == plan_resources.SOURCE_TRACE
+    assert hisat2[plan_resources.MEMORY_MB] == 5 * 1024 ** 3 / 1e6
+    assert hisat2[plan_resources.SECONDS] == 600
+    bam_to_h5 = stages.loc["bamToH5"]
+    assert bam_to_h5[plan_resources.MEMORY_MB] == 2 * 1024 ** 3 / 1e6
+    assert bam_to_h5[plan_resources.SECONDS] == 30 + 2 * FASTQ_MB / 2
+    assert stages.loc["cutAdapters", plan_resources.SOURCE] == \
+        plan_resources.SOURCE_MODEL
+    assert recommendations[params.JOB_MEMORY] == "4G"
+
+
+def test_plan_resources_trace_scaled(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` scales
+    memory calibrated using a Nextflow trace file with input size,
+    and does not predict less memory than the model for inputs larger
+    than those in the trace file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    write_file(tmpdir.join("input", "KO.fastq"), 2 * FASTQ_MB)
+    write_file(tmpdir.join("input", "BIG.fastq"), 4 * FASTQ_MB)
+    trace_file = tmpdir.join("trace.tsv")
+    trace_file.write("\n".join([
+        "name\tstatus\trealtime\tpeak_rss",
+        "bamToH5 (WT)\tCOMPLETED\t1m\t3000 MB",
+        "bamToH5 (KO)\tCOMPLETED\t1m\t5000 MB",
+        "hisat2ORF (WT)\tCOMPLETED\t1m\t100 MB"]))
+    config = make_config(tmpdir, **{
+        params.FQ_FILES: {"WT": "WT.fastq", "KO": "KO.fastq",
+                          "BIG": "BIG.fastq"}})
+    stages, _, _ = plan_resources.plan_resources(config, [str(trace_file)])
+    stages = stages.set_index([plan_resources.PROCESS,
+                               plan_resources.SAMPLE])
+    memory = stages[plan_resources.MEMORY_MB]
+    mb_per_mb = (5000 - 3000) * 1024 ** 2 / 1e6 / FASTQ_MB
+    assert memory["bamToH5", "WT"] == pytest.approx(3000 * 1024 ** 2 / 1e6)
+    assert memory["bamToH5", "KO"] == pytest.approx(5000 * 1024 ** 2 / 1e6)
+    assert memory["bamToH5", "BIG"] == \
+        pytest.approx(5000 * 1024 ** 2 / 1e6 + 2 * FASTQ_MB * mb_per_mb)
+    assert memory["hisat2ORF", "WT"] == pytest.approx(100 * 1024 ** 2 / 1e6)
+    model_mb = 200 + FASTA_MB * plan_resources.INDEX_FASTA_RATIO
+    assert memory["hisat2ORF", "KO"] == model_mb
+    assert memory["hisat2ORF", "BIG"] == model_mb
+
+
+def test_plan_resources_error(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources` raises
+    ``ValueError`` if there are no FASTQ files and
+    ``FileNotFoundError`` if there is no index or FASTA file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config = make_config(tmpdir, **{params.FQ_FILES: {"KO": "KO.fastq"}})
+    with pytest.raises(ValueError):
+        plan_resources.plan_resources(config)
+    config = make_config(tmpdir, **{
+        params.ORF_FASTA_FILE: str(tmpdir.join("nosuchfile.fa"))})
+    with pytest.raises(FileNotFoundError):
+        plan_resources.plan_resources(config)
+
+
+def test_plan_resources_file(tmpdir):
+    """
+    Test :py:func:`riboviz.plan_resources.plan_resources_file` writes
+    the configuration updated with the recommendations and the
+    stages.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config = make_config(tmpdir, **{params.JOB_MEMORY: "64G"})
+    config_file = str(tmpdir.join("config.yaml"))
+    with open(config_file, 'w') as f:
+        yaml.dump(config, f)
+    output_config_file = str(tmpdir.join("planned.yaml"))
+    stages_file = str(tmpdir.join("stages.tsv"))
+    stages, recommendations, _ = plan_resources.plan_resources_file(
+        config_file, None, output_config_file, stages_file)
+    with open(output_config_file) as f:
+        planned_config = yaml.load(f, yaml.SafeLoader)
+    config.update(recommendations)
+    assert planned_config == config
+    assert os.path.exists(stages_file)
+    pd.testing.assert_frame_equal(
+        pd.read_csv(stages_file, sep="\t", comment="#"), stages)
@@ -209,6 +209,31 @@ def test_run_redirect_command_stdout(tmp_redirect_file):
             assert line1 == line2
 
 
+def test_run_redirect_command_direct(tmp_redirect_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_redirect_command` writes
+    standard output directly to the file, while the command runs, and
+    records its size in the resource log.
+
+    :param tmp_redirect_file: File for redirected output
+    :type tmp_redirect_file: str or unicode
+    """
+    resource_log = tmp_redirect_file + ".jsonl"
+    cmd = ["sh", "-c", "echo one; wc -c < {}".format(tmp_redirect_file)]
+    try:
+        process_utils.run_redirect_command(cmd, tmp_redirect_file,
+                                           resource_log=resource_log)
+        with open(tmp_redirect_file) as f:
+            lines = [line.strip() for line in f]
+        assert lines == ["one", "4"]
+        record = process_utils.load_resource_log(resource_log)[0]
+        assert record[process_utils.STDOUT_BYTES] == \
+            os.path.getsize(tmp_redirect_file)
+    finally:
+        if os.path.exists(resource_log):
+            os.remove(resource_log)
+
+
 def test_run_redirect_command_tmp_stderr_file(tmp_redirect_file,
                                               tmp_stderr_file):
     """
@@ -698,3 +723,531 @@ def test_run_logged_pipe_command_error(tmp_stdout_file):
     assert lines[0] == "cat: no-such-file: No such file or directory"
     assert lines[1] == "wc: invalid option -- 'x'"
     assert lines[2] == "Try 'wc --help' for more information."
+
+
+def test_run_command_resource_log(tmp_stdout_file, tmp_stderr_file,
+                                  tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_command` writes a
+    resource record with the bytes written to standard output and
+    standard error files.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    :param tmp_stderr_file: Error log file
+    :type tmp_stderr_file: str or unicode
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    path = os.path.realpath(__file__)
+    cmd = ["cat", path, "no-such-file.txt"]
+    with open(tmp_stdout_file, 'w') as out, open(tmp_stderr_file, 'w') as err:
+        with pytest.raises(AssertionError):
+            process_utils.run_command(cmd, out, err, resource_log, "Sample")
+    records = process_utils.load_resource_log(resource_log)
+    assert len(records) == 1
+    record = records[0]
+    assert sorted(record) == sorted(process_utils.RESOURCE_KEYS)
+    assert record[process_utils.COMMAND] == utils.list_to_str(cmd)
+    assert record[process_utils.PROGRAM] == "cat"
+    assert record[process_utils.LABEL] == "Sample"
+    assert record[process_utils.EXIT_CODE] == 1
+    assert record[process_utils.STDOUT_BYTES] == os.path.getsize(path)
+    assert record[process_utils.STDERR_BYTES] == \
+        os.path.getsize(tmp_stderr_file)
+    assert record[process_utils.WALL_SECONDS] > 0
+    assert record[process_utils.USER_SECONDS] >= 0
+    assert record[process_utils.SYSTEM_SECONDS] >= 0
+    assert record[process_utils.PEAK_RSS_MB] > 0
+
+
+def test_run_redirect_command_resource_log(tmp_redirect_file, tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_redirect_command` writes
+    a resource record with the bytes written to standard output.
+
+    :param tmp_redirect_file: File for redirected output
+    :type tmp_redirect_file: str or unicode
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    path = os.path.realpath(__file__)
+    process_utils.run_redirect_command(["cat", path], tmp_redirect_file,
+                                       resource_log=resource_log)
+    record = process_utils.load_resource_log(resource_log)[0]
+    assert record[process_utils.EXIT_CODE] == 0
+    assert record[process_utils.LABEL] is None
+    assert record[process_utils.STDOUT_BYTES] == os.path.getsize(path)
+    assert record[process_utils.STDERR_BYTES] == 0
+
+
+def test_run_logged_pipe_command_resource_log_env(tmp_stdout_file, tmpdir,
+                                                  monkeypatch):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_pipe_command`
+    writes a resource record for the pipeline to the resource log
+    file, and with the label, given by environment variables.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param monkeypatch: Monkeypatch (pytest built-in fixture)
+    :type monkeypatch: _pytest.monkeypatch.MonkeyPatch
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    monkeypatch.setenv(process_utils.RESOURCE_LOG_ENV, resource_log)
+    monkeypatch.setenv(process_utils.RESOURCE_LABEL_ENV, "Sample")
+    path = os.path.realpath(__file__)
+    process_utils.run_logged_pipe_command(["cat", path], ["wc", "-l"],
+                                          tmp_stdout_file)
+    record = process_utils.load_resource_log(resource_log)[0]
+    assert record[process_utils.PROGRAM] == "cat | wc"
+    assert record[process_utils.LABEL] == "Sample"
+    assert record[process_utils.EXIT_CODE] == 0
+    assert record[process_utils.STDOUT_BYTES] == \
+        os.path.getsize(tmp_stdout_file)
+    assert record[process_utils.STDERR_BYTES] == 0
+
+
+def test_run_logged_command_dry_run_resource_log(tmp_stdout_file, tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_command` with the
+    ``dry_run`` parameter set to ``True`` does not write a resource
+    record.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = tmpdir.join("resources.jsonl")
+    process_utils.run_logged_command(["ls"], tmp_stdout_file, dry_run=True,
+                                     resource_log=str(resource_log))
+    assert not resource_log.exists()
+
+
+def test_summarise_resource_log(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.summarise_resource_log`
+    sums the resources used by each program for each label and
+    lists the program with the most wall time first.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    for label, cmd in [("A", ["true"]), ("A", ["sleep", "0.2"]),
+                       ("A", ["true"]), ("B", ["true"])]:
+        process_utils.run_command(cmd, resource_log=resource_log,
+                                  label=label)
+    summary = process_utils.summarise_resource_log(resource_log)
+    assert list(summary.columns) == process_utils.SUMMARY_COLUMNS
+    assert list(summary[process_utils.LABEL]) == ["A", "A", "B"]
+    assert list(summary[process_utils.PROGRAM]) == ["sleep", "true", "true"]
+    assert list(summary[process_utils.NUM_COMMANDS]) == [1, 2, 1]
+    assert summary[process_utils.WALL_FRACTION].iloc[0] > 0.5
+    assert summary[process_utils.WALL_FRACTION].iloc[2] == 1
+
+
+def test_summarise_resource_log_empty(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.summarise_resource_log`
+    with an empty resource log file returns an empty summary.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = tmpdir.join("resources.jsonl")
+    resource_log.write("")
+    summary = process_utils.summarise_resource_log(str(resource_log))
+    assert summary.empty
+    assert list(summary.columns) == process_utils.SUMMARY_COLUMNS
+
+
+def number_lines(lines):
+    """
+    Python pipeline stage which yields 1000 numbered lines, ignoring
+    its input.
+
+    :param lines: Lines
+    :type lines: iterable(bytes)
+    :return: Lines
+    :rtype: iterable(bytes)
+    """
+    for number in range(1000):
+        yield b"%d\n" % number
+
+
+def upper_case(lines):
+    """
+    Python pipeline stage which converts lines to upper case.
+
+    :param lines: Lines
+    :type lines: iterable(bytes)
+    :return: Lines
+    :rtype: iterable(bytes)
+    """
+    for line in lines:
+        yield line.upper()
+
+
+def fail_after_one(lines):
+    """
+    Python pipeline stage which yields one line then raises
+    ``ValueError``.
+
+    :param lines: Lines
+    :type lines: iterable(bytes)
+    :return: Lines
+    :rtype: iterable(bytes)
+    :raise ValueError: After the first line
+    """
+    for line in lines:
+        yield line
+        raise ValueError("Failed after one line")
+
+
+def test_run_pipeline(tmp_stdout_file, tmp_stderr_file, tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_pipeline` with Python
+    and command stages records the bytes read and written by each
+    stage.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    :param tmp_stderr_file: Error log file
+    :type tmp_stderr_file: str or unicode
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    stages = [number_lines, ["grep", "9"], ["sed", "s/9/x/g"], upper_case,
+              ["sort", "-r"]]
+    with open(tmp_stdout_file, 'w') as out, open(tmp_stderr_file, 'w') as err:
+        records = process_utils.run_pipeline(stages, out, err,
+                                             resource_log, "Sample",
+                                             buffer_size=16)
+    expected = sorted((str(number).replace("9", "X")
+                       for number in range(1000) if "9" in str(number)),
+                      reverse=True)
+    with open(tmp_stdout_file) as f:
+        assert f.read().splitlines() == expected
+    assert records == process_utils.load_resource_log(resource_log)
+    assert [record[process_utils.PROGRAM] for record in records] == \
+        ["number_lines", "grep", "sed", "upper_case", "sort"]
+    for record in records:
+        assert record[process_utils.EXIT_CODE] == 0
+        assert record[process_utils.LABEL] == "Sample"
+        assert record[process_utils.WALL_SECONDS] > 0
+    for before, after in zip(records, records[1:]):
+        assert before[process_utils.STDOUT_BYTES] == \
+            after[process_utils.STDIN_BYTES]
+    assert records[0][process_utils.STDOUT_BYTES] == \
+        sum(len(str(number)) + 1 for number in range(1000))
+    assert records[-1][process_utils.STDOUT_BYTES] == \
+        os.path.getsize(tmp_stdout_file)
+    assert records[1][process_utils.PEAK_RSS_MB] > 0
+    assert records[1][process_utils.STDERR_BYTES] == 0
+
+
+def test_run_pipeline_sigpipe(tmp_stdout_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_pipeline` does not fail
+    when a command is terminated by ``SIGPIPE`` because a later
+    command completes early.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    """
+    with open(tmp_stdout_file, 'w') as out:
+        records = process_utils.run_pipeline([["yes"], ["head", "-2"]], out)
+    with open(tmp_stdout_file) as f:
+        assert f.read() == "y\ny\n"
+    assert records[-1][process_utils.EXIT_CODE] == 0
+
+
+@pytest.mark.parametrize("stages", [
+    [["cat", "no-such-file.txt"], ["wc", "-l"]],
+    [["cat", os.path.realpath(__file__)], ["wc", "-l", "-x"]],
+    [["cat", os.path.realpath(__file__)], fail_after_one, ["wc", "-l"]]])
+def test_run_pipeline_error(tmp_stdout_file, tmp_stderr_file, stages):
+    """
+    Test :py:func:`riboviz.process_utils.run_pipeline` raises
+    ``AssertionError`` if any command exits with a non-zero exit code
+    or any Python stage raises an exception.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    :param tmp_stderr_file: Error log file
+    :type tmp_stderr_file: str or unicode
+    :param stages: Stages
+    :type stages: list(list(str or unicode) or callable)
+    """
+    with open(tmp_stdout_file, 'w') as out, open(tmp_stderr_file, 'w') as err:
+        with pytest.raises(AssertionError):
+            process_utils.run_pipeline(stages, out, err)
+
+
+@pytest.mark.parametrize("stages", [[], [["cat"], "cat"], [[]]])
+def test_run_pipeline_invalid(stages):
+    """
+    Test :py:func:`riboviz.process_utils.run_pipeline` raises
+    ``ValueError`` if there are no stages or a stage is neither a
+    command nor callable.
+
+    :param stages: Stages
+    :type stages: list
+    """
+    with pytest.raises(ValueError):
+        process_utils.run_pipeline(stages)
+
+
+def test_run_pipeline_no_such_command(tmp_stdout_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_pipeline` raises
+    ``FileNotFoundError`` if a command cannot be found.
+
+    :param tmp_stdout_file: Output log file
+    :type tmp_stdout_file: str or unicode
+    """
+    with open(tmp_stdout_file, 'w') as out:
+        with pytest.raises(FileNotFoundError):
+            process_utils.run_pipeline([["yes"], ["no-such-command"]], out)
+
+
+def test_run_logged_pipeline(tmp_stderr_file, tmp_redirect_file,
+                             tmp_cmd_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_pipeline` writes
+    output to a file, standard error to a log file and the pipeline
+    to a command file.
+
+    :param tmp_stderr_file: Error log file
+    :type tmp_stderr_file: str or unicode
+    :param tmp_redirect_file: File for redirected output
+    :type tmp_redirect_file: str or unicode
+    :param tmp_cmd_file: Command file
+    :type tmp_cmd_file: str or unicode
+    """
+    path = os.path.realpath(__file__)
+    cmd = ["cat", path, "no-such-file.txt"]
+    with pytest.raises(AssertionError):
+        process_utils.run_logged_pipeline([cmd, upper_case],
+                                          tmp_redirect_file,
+                                          tmp_stderr_file,
+                                          tmp_cmd_file)
+    with open(path) as f:
+        expected = f.read().upper()
+    with open(tmp_redirect_file) as f:
+        assert f.read() == expected
+    with open(tmp_stderr_file) as f:
+        assert f.read().rstrip('\n') == \
+            "cat: no-such-file.txt: No such file or directory"
+    with open(tmp_cmd_file) as f:
+        assert f.read().rstrip('\n') == "%s | upper_case > %s" % (
+            utils.list_to_str(cmd), tmp_redirect_file)
+
+
+def create_jobs(tmpdir, cmds, cpus=1):
+    """
+    Create jobs (see
+    :py:func:`riboviz.process_utils.run_logged_command_async`) each
+    with its own log file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param cmds: Commands and arguments
+    :type cmds: list(list(str or unicode))
+    :param cpus: Number of CPU slots for each job
+    :type cpus: int
+    :return: Jobs
+    :rtype: list(dict)
+    """
+    return [{process_utils.JOB_CMD: cmd,
+             process_utils.JOB_LOG_FILE: str(tmpdir.join("%d.log" % index)),
+             process_utils.JOB_CPUS: cpus,
+             process_utils.JOB_LABEL: "Sample%d" % index}
+            for index, cmd in enumerate(cmds)]
+
+
+def test_run_logged_commands(tmpdir, tmp_cmd_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` runs
+    jobs concurrently, captures standard output and standard error
+    into each job's log file and records each job's resources.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param tmp_cmd_file: Command file
+    :type tmp_cmd_file: str or unicode
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    cmds = [["sh", "-c", "sleep 0.5; echo out%d; echo err%d >&2" %
+             (index, index)] for index in range(4)]
+    jobs = create_jobs(tmpdir, cmds)
+    records = process_utils.run_logged_commands(jobs, 4,
+                                                cmd_file=tmp_cmd_file,
+                                                resource_log=resource_log)
+    # Records are logged as jobs complete.
+    logged = process_utils.load_resource_log(resource_log)
+    assert sorted(logged, key=lambda record: record[process_utils.LABEL]) \
+        == records
+    starts = [record[process_utils.START] for record in records]
+    # Jobs run concurrently so all start before any finishes.
+    assert max(starts) - min(starts) < 0.5
+    for index, (job, record) in enumerate(zip(jobs, records)):
+        with open(job[process_utils.JOB_LOG_FILE]) as f:
+            assert sorted(f.read().splitlines()) == \
+                ["err%d" % index, "out%d" % index]
+        assert record[process_utils.LABEL] == "Sample%d" % index
+        assert record[process_utils.EXIT_CODE] == 0
+        assert record[process_utils.STDOUT_BYTES] == 5
+        assert record[process_utils.STDERR_BYTES] == 5
+        assert record[process_utils.WALL_SECONDS] >= 0.5
+    with open(tmp_cmd_file) as f:
+        assert f.read().splitlines() == \
+            [utils.list_to_str(cmd) for cmd in cmds]
+
+
+def test_run_logged_commands_cpu_slots(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` only
+    runs jobs concurrently if there are enough CPU slots, and runs
+    jobs requesting more than the total number of slots.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    jobs = create_jobs(tmpdir, [["sleep", "0.3"]] * 2, cpus=4)
+    records = process_utils.run_logged_commands(jobs, 3)
+    first, second = sorted(record[process_utils.START]
+                           for record in records)
+    assert second - first >= 0.3
+
+
+def test_run_logged_commands_cpu_slots_fifo(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` starts
+    jobs in order, so a job waiting for several CPU slots is not
+    overtaken by a later job needing fewer slots.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    jobs = create_jobs(tmpdir, [["sleep", "0.3"]] * 3)
+    jobs[1][process_utils.JOB_CPUS] = 2
+    records = process_utils.run_logged_commands(jobs, 2)
+    starts = [record[process_utils.START] for record in records]
+    assert starts[1] - starts[0] >= 0.3
+    assert starts[2] >= starts[1]
+
+
+@pytest.mark.parametrize("cmd,cpus", [
+    (["hisat2", "-p", "4", "-x", "index"], 4),
+    (["samtools", "sort", "-@", "3"], 3),
+    (["hisat2", "--threads=2"], 2),
+    (["hisat2", "--threads", "5"], 5),
+    (["cutadapt", "-p", "paired.fq", "-j", "8"], 1),
+    (["samtools", "sort", "-@"], 1),
+    (["echo", "a"], 1)])
+def test_get_command_cpus(cmd, cpus):
+    """
+    Test :py:func:`riboviz.process_utils.get_command_cpus`.
+
+    :param cmd: Command and arguments
+    :type cmd: list(str or unicode)
+    :param cpus: Expected number of threads
+    :type cpus: int
+    """
+    assert process_utils.get_command_cpus(cmd) == cpus
+
+
+def test_run_logged_commands_command_cpus(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` takes
+    the number of CPU slots for a job with no
+    :py:const:`riboviz.process_utils.JOB_CPUS` from its command.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    jobs = create_jobs(tmpdir, [["sh", "-c", "sleep 0.3", "-p", "2"]] * 2)
+    for job in jobs:
+        del job[process_utils.JOB_CPUS]
+    records = process_utils.run_logged_commands(jobs, 2)
+    first, second = sorted(record[process_utils.START]
+                           for record in records)
+    assert second - first >= 0.3
+
+
+def test_run_logged_commands_fail_fast(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands`
+    terminates running jobs, and does not start waiting jobs, when a
+    job fails.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    resource_log = str(tmpdir.join("resources.jsonl"))
+    jobs = create_jobs(tmpdir, [["sleep", "10"],
+                                ["sh", "-c", "sleep 0.2; exit 3"],
+                                ["sleep", "10"]])
+    with pytest.raises(AssertionError) as exception:
+        process_utils.run_logged_commands(jobs, 2,
+                                          resource_log=resource_log)
+    assert "exit code 3" in str(exception.value)
+    records = process_utils.load_resource_log(resource_log)
+    assert sorted(record[process_utils.EXIT_CODE] for record in records) \
+        == [-15, 3]
+    assert not os.path.exists(jobs[2][process_utils.JOB_LOG_FILE])
+
+
+def test_run_logged_commands_no_fail_fast(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` with
+    ``fail_fast=False`` runs all the jobs before raising
+    ``AssertionError`` when a job fails.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    jobs = create_jobs(tmpdir, [["false"], ["sh", "-c", "echo done"]])
+    with pytest.raises(AssertionError):
+        process_utils.run_logged_commands(jobs, 1, fail_fast=False)
+    with open(jobs[1][process_utils.JOB_LOG_FILE]) as f:
+        assert f.read() == "done\n"
+
+
+def test_run_logged_commands_dry_run(tmpdir, tmp_cmd_file):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` with
+    ``dry_run=True`` records commands but does not run them.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param tmp_cmd_file: Command file
+    :type tmp_cmd_file: str or unicode
+    """
+    jobs = create_jobs(tmpdir, [["echo", "a"], ["echo", "b"]])
+    assert process_utils.run_logged_commands(
+        jobs, cmd_file=tmp_cmd_file, dry_run=True) == []
+    with open(tmp_cmd_file) as f:
+        assert f.read().splitlines() == ["echo a", "echo b"]
+    assert not os.path.exists(jobs[0][process_utils.JOB_LOG_FILE])
+
+
+def test_run_logged_commands_invalid_cpus(tmpdir):
+    """
+    Test :py:func:`riboviz.process_utils.run_logged_commands` with
+    fewer than 1 CPU slot raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    with pytest.raises(ValueError):
+        process_utils.run_logged_commands(
+            create_jobs(tmpdir, [["true"]]), -1)
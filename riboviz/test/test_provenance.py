@@ -0,0 +1,104 @@
+"""
+:py:mod:`riboviz.provenance` tests.
+"""
+from io import StringIO
+import pytest
+from riboviz import provenance
+
+
+@pytest.fixture(scope="function", autouse=True)
+def clear_run_provenance():
+    """
+    Clear the cached run provenance before and after each test.
+    """
+    provenance.get_run_provenance.cache_clear()
+    yield
+    provenance.get_run_provenance.cache_clear()
+
+
+def test_get_version_cached():
+    """
+    Test :py:func:`riboviz.provenance.get_version` returns version
+    information and accesses the Git repository once per directory.
+    """
+    version = provenance.get_version(__file__)
+    hits = provenance.get_directory_version.cache_info().hits
+    assert provenance.get_version(__file__) == version
+    assert provenance.get_directory_version.cache_info().hits == hits + 1
+
+
+def test_write_provenance():
+    """
+    Test :py:func:`riboviz.provenance.write_provenance` writes the
+    expected header lines, without the run ID and elapsed time.
+    """
+    with StringIO() as s:
+        provenance.write_provenance(s, __file__)
+        lines = s.getvalue().splitlines()
+    assert lines[0] == "# Created by: riboviz"
+    assert lines[-2] == "# File: {}".format(__file__)
+    assert lines[-1] == "# Version: {}".format(
+        provenance.get_version(__file__))
+
+
+def test_write_provenance_run():
+    """
+    Test :py:func:`riboviz.provenance.write_provenance` writes the
+    expected header lines, with the run ID and elapsed time, if
+    ``run`` is ``True``.
+    """
+    with StringIO() as s:
+        provenance.write_provenance(s, __file__, run=True)
+        lines = s.getvalue().splitlines()
+    assert lines[0] == "# Created by: riboviz"
+    assert lines[-3] == "# Version: {}".format(
+        provenance.get_version(__file__))
+    assert lines[-2] == "# Run ID: {}".format(
+        provenance.get_run_provenance()[provenance.RUN_ID])
+    assert lines[-1].startswith("# Elapsed: ")
+
+
+def test_write_provenance_header(tmpdir):
+    """
+    Test :py:func:`riboviz.provenance.write_provenance_header` writes
+    the same header, without the run ID and elapsed time, to the
+    file each time it is called, other than the date.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    headers = []
+    for name in ["first.tsv", "second.tsv"]:
+        header_file = tmpdir.join(name)
+        provenance.write_provenance_header(__file__, str(header_file))
+        headers.append([line for line in header_file.readlines()
+                        if not line.startswith("# Date: ")])
+    assert headers[0] == headers[1]
+    assert not any(line.startswith(("# Run ID: ", "# Elapsed: "))
+                   for line in headers[0])
+
+
+def test_write_provenance_to_str():
+    """
+    Test :py:func:`riboviz.provenance.write_provenance_to_str` writes
+    the expected header lines, with the run ID and elapsed time.
+    """
+    lines = provenance.write_provenance_to_str(__file__).splitlines()
+    assert lines[0] == "Created by: riboviz"
+    assert lines[-3] == "Version: {}".format(
+        provenance.get_version(__file__))
+    assert lines[-2] == "Run ID: {}".format(
+        provenance.get_run_provenance()[provenance.RUN_ID])
+    assert lines[-1].startswith("Elapsed: ")
+
+
+def test_get_run_provenance():
+    """
+    Test :py:func:`riboviz.provenance.get_run_provenance` returns the
+    same run provenance for every call.
+    """
+    run_provenance = provenance.get_run_provenance()
+    assert run_provenance[provenance.VERSION] == provenance.get_version()
+    assert provenance.get_run_provenance() == run_provenance
+    assert provenance.get_provenance(__file__)["run_id"] == \
+        run_provenance[provenance.RUN_ID]
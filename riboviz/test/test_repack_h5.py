@@ -0,0 +1,206 @@
+"""
+:py:mod:`riboviz.repack_h5` tests.
+"""
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+from riboviz import h5
+from riboviz import repack_h5
+from riboviz.test import create_test_h5
+
+TEST_DATASET = "test"
+""" Test dataset name. """
+TEST_ALIASES = {"ALT2": "YAL002W"}
+""" Test alternative gene names. """
+
+
+@pytest.fixture(scope="function")
+def gene_data():
+    """
+    Create matrices of read counts for test genes.
+
+    :return: Map from gene names to read counts
+    :rtype: dict(str or unicode => numpy.ndarray)
+    """
+    rng = np.random.default_rng(42)
+    return {
+        "YAL001C": rng.integers(0, 5, size=(4, 130), dtype=np.int32),
+        "YAL002W": rng.integers(0, 5, size=(4, 145), dtype=np.int32),
+        "YAL003W": rng.integers(0, 5, size=(4, 121), dtype=np.int32)
+    }
+
+
+@pytest.fixture(scope="function")
+def h5_file(tmpdir, gene_data):
+    """
+    Create test H5 file with complementary data files.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :return: H5 file
+    :rtype: str or unicode
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET, aliases=TEST_ALIASES)
+    return h5_file
+
+
+@pytest.mark.parametrize("chunk_layout", repack_h5.CHUNK_LAYOUTS)
+@pytest.mark.parametrize("codec", h5.CODECS)
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_repack_h5(tmpdir, h5_file, gene_data, chunk_layout, codec,
+                   shuffle):
+    """
+    Test :py:func:`riboviz.repack_h5.repack_h5` and check that the
+    read counts, attributes and alternative gene names are unchanged
+    and the chunk layout and compression options are applied.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    :param chunk_layout: Chunk layout
+    :type chunk_layout: str or unicode
+    :param codec: Codec
+    :type codec: str or unicode
+    :param shuffle: Shuffle?
+    :type shuffle: bool
+    """
+    h5.add_summary(h5_file)
+    repacked_file = str(tmpdir.join(h5.H5_FORMAT.format("repacked")))
+    repack_h5.repack_h5(h5_file, repacked_file, chunk_layout, codec,
+                        shuffle=shuffle)
+    for index in range(2):
+        assert tmpdir.join(h5.H5_DATA_FILE_FORMAT.format(
+            h5.H5_FORMAT.format("repacked"), index + 1)).check()
+    with h5py.File(h5_file, "r") as f, \
+            h5py.File(repacked_file, "r") as repacked_f:
+        assert h5.get_aliases(repacked_f) == TEST_ALIASES
+        assert h5.has_summary(repacked_f, TEST_DATASET)
+        for gene, matrix in gene_data.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(repacked_f, gene, TEST_DATASET),
+                matrix)
+            reads_path = h5.READS_PATH_FORMAT.format(gene=gene,
+                                                     dataset=TEST_DATASET)
+            for name, value in f[reads_path].attrs.items():
+                np.testing.assert_array_equal(
+                    repacked_f[reads_path].attrs[name], value)
+            data = repacked_f[reads_path][h5.DATA]
+            assert data.dtype == np.int32
+            assert data.chunks == repack_h5.get_chunks(data.shape,
+                                                       chunk_layout)
+            assert data.compression == \
+                (None if codec == h5.NO_CODEC else codec)
+            assert data.shuffle == shuffle
+
+
+def test_get_data_file_indices():
+    """
+    Test :py:func:`riboviz.repack_h5._get_data_file_indices` keeps
+    the indices of data files named ``<h5_file>.<i>`` and gives other
+    data files, or data files whose index is in use, unused indices.
+    """
+    indices = repack_h5._get_data_file_indices(
+        ["other.h5", "test.h5.2", "test.h5.1", "other.h5", "dir/test.h5.1"],
+        "test.h5")
+    assert indices == {"other.h5": 3, "test.h5.2": 2, "test.h5.1": 1,
+                       "dir/test.h5.1": 4}
+
+
+def test_repack_h5_data_file_names(tmpdir, gene_data):
+    """
+    Test :py:func:`riboviz.repack_h5.repack_h5` with a data file not
+    named ``<h5_file>.<i>`` does not overwrite the repacked data file
+    of another data file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    h5_file = str(tmpdir.join(h5.H5_FORMAT.format("test")))
+    create_test_h5(h5_file, gene_data, TEST_DATASET, num_files=3)
+    data_file = h5.H5_DATA_FILE_FORMAT.format(h5.H5_FORMAT.format("test"),
+                                              1)
+    tmpdir.join(data_file).rename(tmpdir.join("other.h5"))
+    tmpdir.join(h5.H5_DATA_FILE_FORMAT.format(
+        h5.H5_FORMAT.format("test"), 3)).rename(tmpdir.join(data_file))
+    with h5py.File(h5_file, "r+") as f:
+        for gene, file_name in [("YAL001C", "other.h5"),
+                                ("YAL003W", data_file)]:
+            del f[gene]
+            f[gene] = h5py.ExternalLink(file_name, gene)
+    repacked_file = str(tmpdir.join(h5.H5_FORMAT.format("repacked")))
+    repack_h5.repack_h5(h5_file, repacked_file)
+    with h5py.File(repacked_file, "r") as repacked_f:
+        for gene, matrix in gene_data.items():
+            np.testing.assert_array_equal(
+                h5.get_gene_datamatrix(repacked_f, gene, TEST_DATASET),
+                matrix)
+
+
+def test_repack_h5_invalid_chunk_layout(tmpdir, h5_file):
+    """
+    Test :py:func:`riboviz.repack_h5.repack_h5` with an invalid chunk
+    layout raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    """
+    with pytest.raises(ValueError):
+        repack_h5.repack_h5(h5_file, str(tmpdir.join("repacked.h5")),
+                            "position")
+
+
+def test_benchmark_h5(h5_file, gene_data):
+    """
+    Test :py:func:`riboviz.repack_h5.benchmark_h5` reports results
+    for each access pattern.
+
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    :param gene_data: Map from gene names to read counts
+    :type gene_data: dict(str or unicode => numpy.ndarray)
+    """
+    results = repack_h5.benchmark_h5(h5_file, repeats=1)
+    assert list(results[repack_h5.PATTERN]) == repack_h5.PATTERNS
+    assert (results[repack_h5.SIZE] ==
+            repack_h5.get_h5_size(h5_file)).all()
+    assert (results[repack_h5.SECONDS] > 0).all()
+    assert (results[repack_h5.GENES_PER_SECOND] > 0).all()
+
+
+def test_benchmark_repack_h5(tmpdir, h5_file):
+    """
+    Test :py:func:`riboviz.repack_h5.benchmark_repack_h5` benchmarks
+    the original file and each combination of settings and saves the
+    results.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param h5_file: H5 file
+    :type h5_file: str or unicode
+    """
+    benchmark_file = str(tmpdir.join("benchmark.tsv"))
+    results = repack_h5.benchmark_repack_h5(
+        h5_file, benchmark_file,
+        codecs=[h5.GZIP, h5.LZF],
+        levels=[1, 9],
+        shuffles=[False, True],
+        patterns=[repack_h5.PATTERN_MATRIX],
+        repeats=1,
+        tmp_dir=str(tmpdir))
+    # Original plus 2 layouts * (2 gzip levels + lzf) * 2 shuffles.
+    assert len(results) == 1 + 2 * 3 * 2
+    assert results[repack_h5.CHUNK_LAYOUT][0] == repack_h5.ORIGINAL
+    saved = pd.read_csv(benchmark_file, sep="\t", comment="#")
+    assert list(saved.columns) == repack_h5.BENCHMARK_COLUMNS
+    assert len(saved) == len(results)
@@ -0,0 +1,228 @@
+"""
+:py:mod:`riboviz.simulate_fastq` tests.
+"""
+import gzip
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from riboviz import demultiplex_fastq
+from riboviz import fastq
+from riboviz import sample_sheets
+from riboviz import simulate_fastq
+
+
+def load_groups(file_name):
+    """
+    Get the distinct UMI and insert pairs in a FASTQ file produced
+    by demultiplexing a :py:const:`riboviz.simulate_fastq.MULTIPLEX_FORMAT`
+    file.
+
+    :param file_name: FASTQ file name
+    :type file_name: str or unicode
+    :return: UMI and insert pairs
+    :rtype: set(tuple(str or unicode, str or unicode))
+    """
+    with open(file_name, "r") as f:
+        lines = f.read().splitlines()
+    return {(header.split("_")[-1], sequence)
+            for header, sequence in zip(lines[0::4], lines[1::4])}
+
+
+def test_join_segments():
+    """
+    Test :py:func:`riboviz.simulate_fastq.join_segments` with
+    constant, fixed-width and variable-width segments.
+    """
+    codes = np.frombuffer(b"ACGTAC", dtype=np.uint8).reshape(2, 3)
+    buffer = simulate_fastq.join_segments(
+        [b"@", codes, (codes, np.array([1, 3])), b"\n"], 2)
+    assert buffer.tobytes() == b"@ACGA\n@TACTAC\n"
+
+
+def test_join_segments_fixed():
+    """
+    Test :py:func:`riboviz.simulate_fastq.join_segments` with
+    variable-width segments whose rows are all full.
+    """
+    codes = np.frombuffer(b"ACGTAC", dtype=np.uint8).reshape(2, 3)
+    buffer = simulate_fastq.join_segments(
+        [(codes, np.array([3, 3])), b"\n"], 2)
+    assert buffer.tobytes() == b"ACG\nTAC\n"
+
+
+@pytest.mark.parametrize("num_mismatches", [0, 1, 3, 6])
+def test_add_mismatches(num_mismatches):
+    """
+    Test :py:func:`riboviz.simulate_fastq.add_mismatches` changes the
+    requested number of nucleotides in each row.
+
+    :param num_mismatches: Number of mismatches
+    :type num_mismatches: int
+    """
+    rng = np.random.default_rng(1)
+    codes = simulate_fastq.random_codes(rng, (1000, 6))
+    mismatched = simulate_fastq.add_mismatches(
+        rng, codes, np.full(1000, num_mismatches))
+    assert np.all((codes != mismatched).sum(axis=1) == num_mismatches)
+    assert np.all(mismatched < 4)
+
+
+def test_assign_barcodes():
+    """
+    Test :py:func:`riboviz.simulate_fastq.assign_barcodes` assigns
+    codes within the allowed mismatches to the first matching
+    barcode and other codes to -1.
+    """
+    barcodes = np.array([[0, 0, 0, 0], [1, 1, 1, 1]], dtype=np.uint8)
+    codes = np.array([[0, 0, 0, 0],
+                      [0, 0, 0, 1],
+                      [1, 1, 1, 1],
+                      [0, 0, 1, 1],
+                      [2, 2, 2, 2]], dtype=np.uint8)
+    assert list(simulate_fastq.assign_barcodes(codes, barcodes, 1)) == \
+        [0, 0, 1, -1, -1]
+    assert list(simulate_fastq.assign_barcodes(codes, barcodes, 2)) == \
+        [0, 0, 1, 0, -1]
+
+
+def test_create_barcodes():
+    """
+    Test :py:func:`riboviz.simulate_fastq.create_barcodes` creates
+    distinct barcodes with at least the minimum Hamming distance.
+    """
+    rng = np.random.default_rng(1)
+    barcodes = simulate_fastq.create_barcodes(rng, 8, 6, 3)
+    assert barcodes.shape == (8, 6)
+    distances = simulate_fastq.hamming_distances(barcodes, barcodes)
+    assert np.all(distances[~np.eye(8, dtype=bool)] >= 3)
+
+
+def test_create_barcodes_error():
+    """
+    Test :py:func:`riboviz.simulate_fastq.create_barcodes` raises
+    ``ValueError`` if there are more barcodes than possible.
+    """
+    rng = np.random.default_rng(1)
+    with pytest.raises(ValueError):
+        simulate_fastq.create_barcodes(rng, 5, 1, 1)
+
+
+@pytest.mark.parametrize("parameters", [
+    {"num_reads": -1},
+    {"duplication": 0.5},
+    {"min_length": 30, "max_length": 20},
+    {"barcode_length": 2, "mismatch_weights": [1, 1, 1, 1]},
+    {"num_samples": 2, "sample_weights": [1, 1, 1]},
+    {"batch_size": 0}])
+def test_simulate_multiplex_error(tmpdir, parameters):
+    """
+    Test :py:func:`riboviz.simulate_fastq.simulate_multiplex` with
+    invalid parameters raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param parameters: Parameters
+    :type parameters: dict
+    """
+    parameters = dict({"num_reads": 10}, **parameters)
+    with pytest.raises(ValueError):
+        simulate_fastq.simulate_multiplex(str(tmpdir), **parameters)
+
+
+def test_simulate_multiplex_seed(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_fastq.simulate_multiplex` creates
+    the same files given the same seed and batch size.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    for name in ["first", "second"]:
+        simulate_fastq.simulate_multiplex(
+            str(tmpdir.join(name)), 1000, seed=1, batch_size=300)
+    for file_name in [simulate_fastq.BARCODES_FILE,
+                      simulate_fastq.MULTIPLEX_ADAPTOR_FORMAT.format(
+                          fastq.FASTQ_EXT),
+                      simulate_fastq.MULTIPLEX_FORMAT.format(
+                          fastq.FASTQ_EXT)]:
+        assert tmpdir.join("first", file_name).read() == \
+            tmpdir.join("second", file_name).read()
+
+
+def test_simulate_multiplex_gzip(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_fastq.simulate_multiplex` with
+    ``gzipped=True`` creates gzipped files with the requested number
+    of reads and the expected record structure.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    simulate_fastq.simulate_multiplex(
+        str(tmpdir), 1000, gzipped=True, batch_size=300)
+    raw_file = str(tmpdir.join(simulate_fastq.MULTIPLEX_ADAPTOR_FORMAT.format(
+        fastq.FASTQ_GZ_EXT)))
+    extracted_file = str(tmpdir.join(simulate_fastq.MULTIPLEX_FORMAT.format(
+        fastq.FASTQ_GZ_EXT)))
+    assert fastq.count_sequences(raw_file) == 1000
+    assert fastq.count_sequences(extracted_file) == 1000
+    with gzip.open(raw_file, "rt") as f:
+        raw = f.read().splitlines()
+    with gzip.open(extracted_file, "rt") as f:
+        extracted = f.read().splitlines()
+    assert len(set(raw[0::4])) == 1000
+    for index in range(0, len(raw), 4):
+        read_id, barcode, umi = extracted[index].split("_")
+        assert read_id == raw[index]
+        assert raw[index + 1] == umi[:4] + extracted[index + 1] + \
+            umi[4:] + barcode + simulate_fastq.ADAPTOR
+        assert len(raw[index + 3]) == len(raw[index + 1])
+        assert len(extracted[index + 3]) == len(extracted[index + 1])
+        assert 28 <= len(extracted[index + 1]) <= 32
+
+
+@pytest.mark.parametrize("mismatches", [0, 1, 2])
+def test_simulate_multiplex_demultiplex(tmpdir, mismatches):
+    """
+    Test :py:func:`riboviz.simulate_fastq.simulate_multiplex` expected
+    read counts match those from
+    :py:func:`riboviz.demultiplex_fastq.demultiplex` and the expected
+    deduplication groups match the distinct UMI and insert pairs in
+    each demultiplexed file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mismatches: Number of mismatches allowed
+    :type mismatches: int
+    """
+    sim_dir = str(tmpdir.join("sim"))
+    out_dir = str(tmpdir.join("out"))
+    dedup_groups = simulate_fastq.simulate_multiplex(
+        sim_dir, 2000, num_samples=3, barcode_length=8,
+        mismatches=mismatches, mismatch_weights=[0.7, 0.1, 0.1, 0.1],
+        sample_weights=[3, 2, 1], batch_size=700)
+    demultiplex_fastq.demultiplex(
+        os.path.join(sim_dir, simulate_fastq.BARCODES_FILE),
+        os.path.join(sim_dir, simulate_fastq.MULTIPLEX_FORMAT.format(
+            fastq.FASTQ_EXT)),
+        mismatches=mismatches,
+        out_dir=out_dir)
+    expected = sample_sheets.load_deplexed_sample_sheet(os.path.join(
+        sim_dir, simulate_fastq.DEPLEX_DIR, demultiplex_fastq.NUM_READS_FILE))
+    actual = sample_sheets.load_deplexed_sample_sheet(os.path.join(
+        out_dir, demultiplex_fastq.NUM_READS_FILE))
+    pd.testing.assert_frame_equal(expected, actual)
+    assert expected[sample_sheets.NUM_READS].iloc[-1] == 2000
+    saved_groups = pd.read_csv(
+        os.path.join(sim_dir, simulate_fastq.DEPLEX_DIR,
+                     simulate_fastq.DEDUP_GROUPS_FILE),
+        sep="\t", comment="#")
+    pd.testing.assert_frame_equal(dedup_groups, saved_groups)
+    for _, row in dedup_groups.iterrows():
+        sample_file = os.path.join(out_dir, fastq.FASTQ_FORMAT.format(
+            row[sample_sheets.SAMPLE_ID]))
+        assert len(load_groups(sample_file)) == \
+            row[simulate_fastq.NUM_GROUPS]
+        assert fastq.count_sequences(sample_file) == \
+            row[sample_sheets.NUM_READS]
@@ -0,0 +1,288 @@
+"""
+:py:mod:`riboviz.simulate_riboseq` tests.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import riboviz
+from riboviz import fastq
+from riboviz import params
+from riboviz import simulate_fastq
+from riboviz import simulate_riboseq
+
+
+UTR_LENGTH = 20
+""" UTR length of test ORFs. """
+NUM_CODONS = 30
+""" Number of codons in test ORF CDSs. """
+GENES = ["GeneA", "GeneB", "GeneC"]
+""" Test ORF names. """
+RRNA_LENGTH = 100
+""" Length of test rRNA sequence. """
+READ_LENGTHS = [28, 30]
+""" Test read lengths. """
+ASITE_DISPLACEMENTS = {28: 15, 30: 16}
+""" Test A-site displacements. """
+
+
+def random_sequence(rng, length):
+    """
+    Create a random nucleotide sequence.
+
+    :param rng: Random number generator
+    :type rng: numpy.random.Generator
+    :param length: Length
+    :type length: int
+    :return: Sequence
+    :rtype: str or unicode
+    """
+    return simulate_fastq.codes_to_str(
+        simulate_fastq.random_codes(rng, length))
+
+
+def write_orfs(directory, strand="+", utr_length=UTR_LENGTH):
+    """
+    Write ORF FASTA and GFF files and an rRNA FASTA file, with random
+    sequences, to a directory.
+
+    :param directory: Directory
+    :type directory: py._path.local.LocalPath
+    :param strand: CDS strand
+    :type strand: str or unicode
+    :param utr_length: UTR length
+    :type utr_length: int
+    :return: ORF FASTA, ORF GFF and rRNA FASTA files, and ORF sequences
+    :rtype: tuple(str or unicode, str or unicode, str or unicode, \
+    dict(str or unicode => str or unicode))
+    """
+    rng = np.random.default_rng(1)
+    sequences = {gene: random_sequence(rng, 2 * utr_length + 3 * NUM_CODONS)
+                 for gene in GENES}
+    fasta = directory.join("orfs.fa")
+    fasta.write("".join(">{}\n{}\n".format(gene, sequence)
+                        for gene, sequence in sequences.items()))
+    gff = directory.join("orfs.gff")
+    gff.write("".join(
+        "{}\ttest\tCDS\t{}\t{}\t.\t{}\t0\tName={}\n".format(
+            gene, utr_length + 1, utr_length + 3 * NUM_CODONS, strand, gene)
+        for gene in GENES))
+    rrna_fasta = directory.join("rrna.fa")
+    rrna_fasta.write(">rRNA\n{}\n".format(random_sequence(rng,
+                                                          RRNA_LENGTH)))
+    return str(fasta), str(gff), str(rrna_fasta), sequences
+
+
+def read_sequences(file_name):
+    """
+    Read the sequences in a FASTQ file.
+
+    :param file_name: FASTQ file name
+    :type file_name: str or unicode
+    :return: Sequences
+    :rtype: list(str or unicode)
+    """
+    with open(file_name, "r") as f:
+        return f.read().splitlines()[1::4]
+
+
+def test_load_orfs(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.load_orfs` loads ORF
+    sequences and CDS locations.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta, gff, _, sequences = write_orfs(tmpdir)
+    orfs = simulate_riboseq.load_orfs(fasta, gff)
+    assert orfs["genes"] == GENES
+    assert orfs["buffer"].tobytes().decode() == "".join(sequences.values())
+    assert list(orfs["offsets"]) == [0, 130, 260]
+    assert list(orfs["lengths"]) == [130] * 3
+    assert list(orfs["cds_starts"]) == [UTR_LENGTH] * 3
+    assert list(orfs["num_codons"]) == [NUM_CODONS] * 3
+
+
+def test_load_orfs_minus_strand(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.load_orfs` with a ``-``
+    strand CDS raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta, gff, _, _ = write_orfs(tmpdir, strand="-")
+    with pytest.raises(ValueError):
+        simulate_riboseq.load_orfs(fasta, gff)
+
+
+def test_get_codon_ranges(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.get_codon_ranges` gives
+    the codons for which footprints lie within the sequence.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta, gff, _, _ = write_orfs(tmpdir, utr_length=5)
+    orfs = simulate_riboseq.load_orfs(fasta, gff)
+    first, last = simulate_riboseq.get_codon_ranges(
+        orfs, np.array([28]), np.array([15]))
+    # 5' end is 5 + 3 * codon + frame - 15 >= 0 and 5' end + 28 <= 100.
+    assert list(first[0, 0]) == [4, 3, 3]
+    assert list(last[0, 0]) == [27, 27, 26]
+    first, last = simulate_riboseq.get_codon_ranges(
+        orfs, np.array([28]), np.array([5]))
+    assert list(first[0, 0]) == [0, 0, 0]
+    assert list(last[0, 0]) == [24, 23, 23]
+
+
+def test_simulate_riboseq(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.simulate_riboseq` creates
+    reads whose footprints, A-site frames and read lengths match the
+    truth tables.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta, gff, rrna_fasta, sequences = write_orfs(tmpdir)
+    output_dir = tmpdir.join("output")
+    truth = simulate_riboseq.simulate_riboseq(
+        fasta, gff, str(output_dir), 3000,
+        rrna_fasta=rrna_fasta,
+        rrna_fraction=0.2,
+        read_lengths=READ_LENGTHS,
+        read_length_weights=[1, 1],
+        asite_displacements=ASITE_DISPLACEMENTS,
+        frame_weights=[0.6, 0.3, 0.1],
+        abundances={"GeneA": 1, "GeneB": 3},
+        batch_size=1000)
+    with open(rrna_fasta) as f:
+        rrna = f.read().splitlines()[1]
+    counts = {gene: [0] * 3 for gene in GENES}
+    length_counts = {length: [0, 0] for length in READ_LENGTHS}
+    for sequence in read_sequences(
+            str(output_dir.join(simulate_riboseq.RIBOSEQ_FORMAT.format(
+                fastq.FASTQ_EXT)))):
+        assert sequence.endswith(simulate_fastq.ADAPTOR)
+        footprint = sequence[:-len(simulate_fastq.ADAPTOR)]
+        if footprint in rrna:
+            length_counts[len(footprint)][1] += 1
+            continue
+        length_counts[len(footprint)][0] += 1
+        matches = [gene for gene, orf in sequences.items()
+                   if footprint in orf]
+        assert len(matches) == 1
+        gene = matches[0]
+        asite = sequences[gene].index(footprint) + \
+            ASITE_DISPLACEMENTS[len(footprint)] - UTR_LENGTH
+        assert 0 <= asite < 3 * NUM_CODONS
+        counts[gene][asite % 3] += 1
+    assert list(truth[simulate_riboseq.GENE]) == GENES
+    assert list(truth[simulate_riboseq.TPM]) == [250000, 750000, 0]
+    assert list(truth[simulate_riboseq.CDS_LENGTH]) == [3 * NUM_CODONS] * 3
+    for _, row in truth.iterrows():
+        assert [row[simulate_riboseq.FRAME_FORMAT.format(frame)]
+                for frame in range(3)] == counts[row[simulate_riboseq.GENE]]
+        assert row[simulate_riboseq.NUM_READS] == \
+            sum(counts[row[simulate_riboseq.GENE]])
+    assert sum(counts["GeneC"]) == 0
+    assert sum(counts["GeneB"]) > sum(counts["GeneA"])
+    frames = np.sum(list(counts.values()), axis=0)
+    assert frames[0] > frames[1] > frames[2]
+    saved_truth = pd.read_csv(
+        str(output_dir.join(simulate_riboseq.GENE_COUNTS_FILE)),
+        sep="\t", comment="#")
+    pd.testing.assert_frame_equal(truth, saved_truth)
+    saved_lengths = pd.read_csv(
+        str(output_dir.join(simulate_riboseq.READ_LENGTH_COUNTS_FILE)),
+        sep="\t", comment="#")
+    assert list(saved_lengths[simulate_riboseq.READ_LENGTH_COLUMN]) == \
+        READ_LENGTHS
+    assert [list(row) for row in saved_lengths[
+        [simulate_riboseq.NUM_ORF_READS,
+         simulate_riboseq.NUM_RRNA_READS]].values] == \
+        [length_counts[length] for length in READ_LENGTHS]
+    assert simulate_riboseq.load_abundances(
+        str(output_dir.join(simulate_riboseq.GENE_COUNTS_FILE))) == \
+        {"GeneA": 250000, "GeneB": 750000, "GeneC": 0}
+
+
+def test_simulate_riboseq_seed(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.simulate_riboseq` creates
+    the same files given the same seed and batch size, with gzip
+    compression.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    fasta, gff, _, _ = write_orfs(tmpdir)
+    for name in ["first", "second"]:
+        simulate_riboseq.simulate_riboseq(
+            fasta, gff, str(tmpdir.join(name)), 1000, gzipped=True,
+            seed=1, batch_size=300)
+    reads_file = simulate_riboseq.RIBOSEQ_FORMAT.format(fastq.FASTQ_GZ_EXT)
+    assert fastq.count_sequences(str(tmpdir.join("first", reads_file))) == \
+        1000
+    for file_name in [reads_file, simulate_riboseq.GENE_COUNTS_FILE]:
+        first = pd.read_csv(str(tmpdir.join("first", file_name)),
+                            sep="\t", comment="#", header=None)
+        second = pd.read_csv(str(tmpdir.join("second", file_name)),
+                             sep="\t", comment="#", header=None)
+        pd.testing.assert_frame_equal(first, second)
+
+
+@pytest.mark.parametrize("parameters", [
+    {"num_reads": -1},
+    {"rrna_fraction": 0.5},
+    {"read_lengths": [28], "read_length_weights": [1, 1]},
+    {"frame_weights": [1, 1]},
+    {"batch_size": 0},
+    {"read_lengths": [200], "read_length_weights": [1]},
+    {"abundances": {"GeneD": 1}}])
+def test_simulate_riboseq_error(tmpdir, parameters):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.simulate_riboseq` with
+    invalid parameters raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param parameters: Parameters
+    :type parameters: dict
+    """
+    fasta, gff, _, _ = write_orfs(tmpdir)
+    parameters = dict({"num_reads": 10}, **parameters)
+    with pytest.raises(ValueError):
+        simulate_riboseq.simulate_riboseq(
+            fasta, gff, str(tmpdir.join("output")), **parameters)
+
+
+def test_load_asite_displacements():
+    """
+    Test :py:func:`riboviz.simulate_riboseq.load_asite_displacements`
+    with the standard yeast A-site displacement file.
+    """
+    displacements = simulate_riboseq.load_asite_displacements(
+        os.path.join(riboviz.BASE_PATH, "data",
+                     "yeast_standard_asite_disp_length.txt"))
+    assert displacements[28] == 15
+
+
+def test_load_config(tmpdir):
+    """
+    Test :py:func:`riboviz.simulate_riboseq.load_config` loads the
+    simulator's parameters and sets missing parameters to ``None``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config_file = tmpdir.join("config.yaml")
+    config_file.write("{}: orfs.fa\n{}: 2\n".format(
+        params.ORF_FASTA_FILE, params.BUFFER))
+    config = simulate_riboseq.load_config(str(config_file))
+    assert sorted(config) == sorted(simulate_riboseq.CONFIG_PARAMS)
+    assert config[params.ORF_FASTA_FILE] == "orfs.fa"
+    assert config[params.ORF_GFF_FILE] is None
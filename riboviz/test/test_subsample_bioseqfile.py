@@ -0,0 +1,654 @@
+"""
+:py:mod:`riboviz.subsample_bioseqfile` tests.
+"""
+import gzip
+import subprocess
+import sys
+import pytest
+import riboviz
+from riboviz import subsample_bioseqfile
+
+NUM_RECORDS = 1000
+""" Number of records in test files. """
+
+
+def create_fastq_records(num_records):
+    """
+    Create raw FASTQ records with distinct IDs.
+
+    :param num_records: Number of records
+    :type num_records: int
+    :return: Records
+    :rtype: list(bytes)
+    """
+    return ["@read{0} sample{0}\n{1}\n+\n{2}\n".format(
+        i, "ACGT" * (i % 7 + 1), "I" * (4 * (i % 7 + 1))).encode()
+            for i in range(num_records)]
+
+
+def create_fasta_records(num_records):
+    """
+    Create raw FASTA records with distinct IDs and a variable number
+    of sequence lines.
+
+    :param num_records: Number of records
+    :type num_records: int
+    :return: Records
+    :rtype: list(bytes)
+    """
+    return [">seq{} description\n{}".format(
+        i, "ACGTACGT\n" * (i % 3 + 1)).encode()
+            for i in range(num_records)]
+
+
+def write_records(file_name, records):
+    """
+    Write raw records to a file, which is gzipped if its name ends
+    with ``.gz``.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :param records: Records
+    :type records: list(bytes)
+    """
+    with subsample_bioseqfile.open_file(file_name, "wb") as f:
+        f.write(b"".join(records))
+
+
+def read_records(file_name, filetype):
+    """
+    Read raw records from a file, which may be gzipped.
+
+    :param file_name: File name
+    :type file_name: str or unicode
+    :param filetype: File type
+    :type filetype: str or unicode
+    :return: Records
+    :rtype: list(bytes)
+    """
+    read_record, _ = subsample_bioseqfile.get_record_functions(filetype)
+    records = []
+    with subsample_bioseqfile.open_file(file_name, "rb") as f:
+        record = read_record(f)
+        while record:
+            records.append(record)
+            record = read_record(f)
+    return records
+
+
+@pytest.fixture(scope="function")
+def fastq_file(tmpdir):
+    """
+    Create a FASTQ file with :py:const:`NUM_RECORDS` records.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :return: File name and records
+    :rtype: tuple(str or unicode, list(bytes))
+    """
+    file_name = str(tmpdir.join("input.fastq"))
+    records = create_fastq_records(NUM_RECORDS)
+    write_records(file_name, records)
+    yield file_name, records
+
+
+def subsample(seqfilein, tmpdir, mode, filetype="fastq", prob=0.1,
+              seedvalue=1, num_records=None, output="output.fastq"):
+    """
+    Subsample a file using
+    :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile` and
+    return the records written.
+
+    :param seqfilein: File name of input sequence file
+    :type seqfilein: str or unicode
+    :param tmpdir: Temporary directory
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    :param filetype: File type
+    :type filetype: str or unicode
+    :param prob: Probability / proportion to sample
+    :type prob: float
+    :param seedvalue: Random seed value
+    :type seedvalue: int
+    :param num_records: Number of records to sample
+    :type num_records: int
+    :param output: Output file name, relative to ``tmpdir``
+    :type output: str or unicode
+    :return: Number of records read, number of records written and \
+    records written
+    :rtype: tuple(int, int, list(bytes))
+    """
+    seqfileout = str(tmpdir.join(output))
+    row_count, row_count_out = subsample_bioseqfile.subsample_bioseqfile(
+        seqfilein, seqfileout, filetype, prob, True, seedvalue, False,
+        mode, num_records)
+    return row_count, row_count_out, read_records(seqfileout, filetype)
+
+
+def is_ordered_subset(sample, records):
+    """
+    Are the sampled records a subset of the records, in the same
+    order?
+
+    :param sample: Sampled records
+    :type sample: list(bytes)
+    :param records: Records
+    :type records: list(bytes)
+    :return: ``True`` or ``False``
+    :rtype: bool
+    """
+    indices = [records.index(record) for record in sample]
+    return indices == sorted(set(indices))
+
+
+@pytest.mark.parametrize("num_records", [1, 10, 100, NUM_RECORDS])
+def test_subsample_reservoir(fastq_file, tmpdir, num_records):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.RESERVOIR` mode writes
+    exactly the requested number of input records, in input order.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param num_records: Number of records to sample
+    :type num_records: int
+    """
+    file_name, records = fastq_file
+    row_count, row_count_out, sample = subsample(
+        file_name, tmpdir, subsample_bioseqfile.RESERVOIR,
+        num_records=num_records)
+    assert row_count == NUM_RECORDS
+    assert row_count_out == num_records
+    assert len(sample) == num_records
+    assert is_ordered_subset(sample, records)
+
+
+def test_subsample_reservoir_too_few(fastq_file, tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.RESERVOIR` mode writes
+    all the input records if there are fewer than the number
+    requested.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    file_name, records = fastq_file
+    _, row_count_out, sample = subsample(
+        file_name, tmpdir, subsample_bioseqfile.RESERVOIR,
+        num_records=NUM_RECORDS * 2)
+    assert row_count_out == NUM_RECORDS
+    assert sample == records
+
+
+def test_subsample_reservoir_uniform(fastq_file, tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.RESERVOIR` mode selects
+    records from across the whole input.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    file_name, records = fastq_file
+    _, _, sample = subsample(
+        file_name, tmpdir, subsample_bioseqfile.RESERVOIR,
+        num_records=200)
+    indices = [records.index(record) for record in sample]
+    halves = sum(1 for index in indices if index < NUM_RECORDS // 2)
+    # Expected 100, standard deviation about 6.
+    assert 70 < halves < 130
+
+
+@pytest.mark.parametrize("prob", [0.05, 0.5])
+def test_subsample_skip(fastq_file, tmpdir, prob):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.SKIP` mode writes
+    input records, in input order, in about the expected proportion.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param prob: Probability / proportion to sample
+    :type prob: float
+    """
+    file_name, records = fastq_file
+    row_count, row_count_out, sample = subsample(
+        file_name, tmpdir, subsample_bioseqfile.SKIP, prob=prob)
+    assert row_count == NUM_RECORDS
+    assert row_count_out == len(sample)
+    assert is_ordered_subset(sample, records)
+    expected = NUM_RECORDS * prob
+    assert abs(len(sample) - expected) < 5 * (expected ** 0.5)
+
+
+def test_subsample_skip_all(fastq_file, tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.SKIP` mode with
+    probability 1 writes all the input records.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    file_name, records = fastq_file
+    _, _, sample = subsample(file_name, tmpdir,
+                             subsample_bioseqfile.SKIP, prob=1)
+    assert sample == records
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_reproducible(fastq_file, tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    writes the same records for the same seed and different records
+    for a different seed.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    file_name, _ = fastq_file
+    _, _, sample1 = subsample(file_name, tmpdir, mode, seedvalue=42,
+                              num_records=50)
+    _, _, sample2 = subsample(file_name, tmpdir, mode, seedvalue=42,
+                              num_records=50)
+    _, _, sample3 = subsample(file_name, tmpdir, mode, seedvalue=43,
+                              num_records=50)
+    assert sample1 == sample2
+    assert sample1 != sample3
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_gz(fastq_file, tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    with gzipped input and output writes the same records as for
+    uncompressed files.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    file_name, records = fastq_file
+    gz_file_name = str(tmpdir.join("input.fastq.gz"))
+    write_records(gz_file_name, records)
+    _, _, sample = subsample(file_name, tmpdir, mode, num_records=50)
+    _, _, gz_sample = subsample(gz_file_name, tmpdir, mode,
+                                num_records=50, output="output.fastq.gz")
+    assert gz_sample == sample
+    with gzip.open(str(tmpdir.join("output.fastq.gz"))) as f:
+        assert f.read() == b"".join(sample)
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_fasta(tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    with FASTA files, whose records have a variable number of lines.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    file_name = str(tmpdir.join("input.fasta"))
+    records = create_fasta_records(NUM_RECORDS)
+    write_records(file_name, records)
+    row_count, row_count_out, sample = subsample(
+        file_name, tmpdir, mode, "fasta", num_records=50,
+        output="output.fasta")
+    assert row_count == NUM_RECORDS
+    assert row_count_out == len(sample)
+    assert sample
+    assert is_ordered_subset(sample, records)
+
+
+def test_subsample_bernoulli(fastq_file, tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    in :py:const:`riboviz.subsample_bioseqfile.BERNOULLI` mode writes
+    input records and the same records for the same seed.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    file_name, records = fastq_file
+    row_count, row_count_out, sample = subsample(
+        file_name, tmpdir, subsample_bioseqfile.BERNOULLI)
+    assert row_count == NUM_RECORDS
+    assert row_count_out == len(sample)
+    assert sample
+    record_ids = [subsample_bioseqfile.get_record_id(record)
+                  for record in records]
+    for record in sample:
+        assert subsample_bioseqfile.get_record_id(record) in record_ids
+    _, _, sample2 = subsample(file_name, tmpdir,
+                              subsample_bioseqfile.BERNOULLI)
+    assert sample2 == sample
+
+
+@pytest.mark.parametrize("mode,filetype,prob,num_records",
+                         [("nosuchmode", "fastq", 0.1, 10),
+                          (subsample_bioseqfile.SKIP, "genbank", 0.1, 10),
+                          (subsample_bioseqfile.SKIP, "fastq", 0, 10),
+                          (subsample_bioseqfile.SKIP, "fastq", 1.1, 10),
+                          (subsample_bioseqfile.RESERVOIR, "fastq", 0.1,
+                           None),
+                          (subsample_bioseqfile.RESERVOIR, "fastq", 0.1,
+                           0)])
+def test_subsample_invalid(fastq_file, tmpdir, mode, filetype, prob,
+                           num_records):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    with invalid parameters raises ``ValueError``.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    :param filetype: File type
+    :type filetype: str or unicode
+    :param prob: Probability / proportion to sample
+    :type prob: float
+    :param num_records: Number of records to sample
+    :type num_records: int
+    """
+    file_name, _ = fastq_file
+    with pytest.raises(ValueError):
+        subsample(file_name, tmpdir, mode, filetype, prob,
+                  num_records=num_records)
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_invalid_fastq(tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
+    with a file whose records do not have four lines raises
+    ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    file_name = str(tmpdir.join("input.fastq"))
+    write_records(file_name, [b"@read1\nACGT\n+\nIIII\n",
+                              b"@read2\nACGT\nIIII\n"])
+    with pytest.raises(ValueError):
+        subsample(file_name, tmpdir, mode, prob=1, num_records=10)
+
+
+def create_paired_files(tmpdir, name, num_records):
+    """
+    Create a pair of FASTQ files whose records have the same IDs.
+
+    :param tmpdir: Temporary directory
+    :type tmpdir: py._path.local.LocalPath
+    :param name: File name prefix
+    :type name: str or unicode
+    :param num_records: Number of records
+    :type num_records: int
+    :return: File names
+    :rtype: list(str or unicode)
+    """
+    records = create_fastq_records(num_records)
+    file_names = []
+    for read in ["R1", "R2"]:
+        file_name = str(tmpdir.join("{}_{}.fastq".format(name, read)))
+        write_records(file_name, [record.replace(b"sample", read.encode())
+                                  for record in records])
+        file_names.append(file_name)
+    return file_names
+
+
+def read_summary(summary_file):
+    """
+    Read a subsampling summary file, skipping the provenance header.
+
+    :param summary_file: Summary file
+    :type summary_file: str or unicode
+    :return: Header and rows
+    :rtype: tuple(list(str or unicode), list(list(str or unicode)))
+    """
+    with open(summary_file) as f:
+        rows = [line.rstrip("\n").split("\t") for line in f
+                if not line.startswith("#")]
+    return rows[0], rows[1:]
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_lockstep(tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_lockstep`
+    with paired files selects records with the same indices from
+    each file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    seqfilesin = create_paired_files(tmpdir, "sample", NUM_RECORDS)
+    seqfilesout = [str(tmpdir.join("out_R1.fastq")),
+                   str(tmpdir.join("out_R2.fastq"))]
+    row_count, row_count_out = subsample_bioseqfile.subsample_lockstep(
+        seqfilesin, seqfilesout, "fastq", 0.1, True, 1, False, mode, 50)
+    assert row_count == NUM_RECORDS
+    sample1, sample2 = [read_records(seqfileout, "fastq")
+                        for seqfileout in seqfilesout]
+    assert len(sample1) == row_count_out
+    assert [subsample_bioseqfile.get_record_id(record)
+            for record in sample1] == \
+        [subsample_bioseqfile.get_record_id(record) for record in sample2]
+    for record1, record2 in zip(sample1, sample2):
+        assert b"R1" in record1
+        assert record1.replace(b"R1", b"R2") == record2
+
+
+@pytest.mark.parametrize("mode", [subsample_bioseqfile.SKIP,
+                                  subsample_bioseqfile.RESERVOIR])
+def test_subsample_lockstep_unequal(fastq_file, tmpdir, mode):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_lockstep`
+    with files with different numbers of records raises
+    ``ValueError``.
+
+    :param fastq_file: FASTQ file and records
+    :type fastq_file: tuple(str or unicode, list(bytes))
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param mode: Subsampling mode
+    :type mode: str or unicode
+    """
+    file_name, records = fastq_file
+    short_file_name = str(tmpdir.join("short.fastq"))
+    write_records(short_file_name, records[:-1])
+    with pytest.raises(ValueError):
+        subsample_bioseqfile.subsample_lockstep(
+            [file_name, short_file_name],
+            [str(tmpdir.join("out1.fastq")), str(tmpdir.join("out2.fastq"))],
+            "fastq", 0.5, True, 1, False, mode, 50)
+
+
+def test_subsample_lockstep_bernoulli(tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_lockstep`
+    with paired files in
+    :py:const:`riboviz.subsample_bioseqfile.BERNOULLI` mode raises
+    ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    seqfilesin = create_paired_files(tmpdir, "sample", 10)
+    with pytest.raises(ValueError):
+        subsample_bioseqfile.subsample_lockstep(
+            seqfilesin,
+            [str(tmpdir.join("out1.fastq")), str(tmpdir.join("out2.fastq"))],
+            "fastq", 0.5, True, 1, False, subsample_bioseqfile.BERNOULLI)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_subsample_bioseqfiles(tmpdir, processes):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfiles`
+    with single and paired files writes output files into the output
+    directory and a summary file.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param processes: Number of processes
+    :type processes: int
+    """
+    in_dir = tmpdir.mkdir("in")
+    paired = create_paired_files(in_dir, "paired", NUM_RECORDS)
+    single = str(in_dir.join("single.fastq"))
+    write_records(single, create_fastq_records(NUM_RECORDS // 2))
+    output_dir = str(tmpdir.join("out"))
+    summary_file = str(tmpdir.join("summary.tsv"))
+    summary = subsample_bioseqfile.subsample_bioseqfiles(
+        [paired, single], output_dir, "fastq", 0.1, False, 1, False,
+        subsample_bioseqfile.RESERVOIR, 20, processes, summary_file)
+    expected = [(paired[0], str(tmpdir.join("out", "paired_R1.fastq")),
+                 NUM_RECORDS, 20),
+                (paired[1], str(tmpdir.join("out", "paired_R2.fastq")),
+                 NUM_RECORDS, 20),
+                (single, str(tmpdir.join("out", "single.fastq")),
+                 NUM_RECORDS // 2, 20)]
+    assert summary == expected
+    for _, seqfileout, _, row_count_out in expected:
+        assert len(read_records(seqfileout, "fastq")) == row_count_out
+    header, rows = read_summary(summary_file)
+    assert header == subsample_bioseqfile.SUMMARY_COLUMNS
+    assert rows == [[str(value) for value in row] for row in expected]
+
+
+def test_subsample_bioseqfiles_seeds(tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfiles`
+    selects different records from files with the same content and
+    the same records from a file regardless of the other files.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    records = create_fastq_records(NUM_RECORDS)
+    seqfilesin = [str(tmpdir.join("sample{}.fastq".format(i)))
+                  for i in range(2)]
+    for seqfilein in seqfilesin:
+        write_records(seqfilein, records)
+    subsample_bioseqfile.subsample_bioseqfiles(
+        seqfilesin, str(tmpdir.join("out")), "fastq", 0.1, False, 1, False,
+        subsample_bioseqfile.SKIP)
+    subsample_bioseqfile.subsample_bioseqfiles(
+        seqfilesin[1:], str(tmpdir.join("out1")), "fastq", 0.1, False, 1,
+        False, subsample_bioseqfile.SKIP)
+    sample0, sample1 = [read_records(str(tmpdir.join("out", name)), "fastq")
+                        for name in ["sample0.fastq", "sample1.fastq"]]
+    assert sample0 != sample1
+    assert read_records(str(tmpdir.join("out1", "sample1.fastq")),
+                        "fastq") == sample1
+
+
+def test_subsample_bioseqfiles_duplicate_names(tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfiles`
+    with input files with the same name in different directories
+    raises ``ValueError``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    seqfilesin = [str(tmpdir.mkdir(name).join("sample.fastq"))
+                  for name in ["a", "b"]]
+    with pytest.raises(ValueError):
+        subsample_bioseqfile.subsample_bioseqfiles(
+            seqfilesin, str(tmpdir.join("out")), "fastq", 0.1, False, 1,
+            False, subsample_bioseqfile.SKIP)
+
+
+def test_get_pairs():
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.get_pairs`.
+    """
+    assert subsample_bioseqfile.get_pairs(["a1", "a2", "b1", "b2"]) == \
+        [["a1", "a2"], ["b1", "b2"]]
+    with pytest.raises(ValueError):
+        subsample_bioseqfile.get_pairs(["a1", "a2", "b1"])
+
+
+def test_get_fq_files(tmpdir):
+    """
+    Test :py:func:`riboviz.subsample_bioseqfile.get_fq_files` returns
+    ``fq_files`` and ``multiplex_fq_files`` prefixed by ``dir_in``.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    """
+    config_file = tmpdir.join("config.yaml")
+    config_file.write("\n".join([
+        "dir_in: input",
+        "fq_files:",
+        "  WTnone: SRR1042855_s1mi.fastq.gz",
+        "  WT3AT: SRR1042864_s1mi.fastq.gz",
+        "multiplex_fq_files:",
+        "- multiplex.fastq"]))
+    assert subsample_bioseqfile.get_fq_files(str(config_file)) == [
+        "input/SRR1042855_s1mi.fastq.gz",
+        "input/SRR1042864_s1mi.fastq.gz",
+        "input/multiplex.fastq"]
+
+
+@pytest.mark.parametrize("output_dir", [False, True])
+def test_invoke_subsample_bioseqfile_error(tmpdir, output_dir):
+    """
+    Test :py:mod:`riboviz.tools.subsample_bioseqfile` exits with a
+    non-zero exit code and prints an error to standard error if an
+    input file does not exist.
+
+    :param tmpdir: Temporary directory (pytest built-in fixture)
+    :type tmpdir: py._path.local.LocalPath
+    :param output_dir: Subsample into an output directory?
+    :type output_dir: bool
+    """
+    seqfilein = str(tmpdir.join("nosuchfile.fastq"))
+    if output_dir:
+        output = ["-d", str(tmpdir.join("output"))]
+    else:
+        output = ["-o", str(tmpdir.join("output.fastq"))]
+    result = subprocess.run([sys.executable, "-m",
+                             "riboviz.tools.subsample_bioseqfile",
+                             "-i", seqfilein, "-m", "skip"] + output,
+                            cwd=riboviz.BASE_PATH,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    assert result.returncode == 1
+    assert "nosuchfile.fastq" in result.stderr
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Add a per-gene summary dataset to a riboviz H5 file, so that gene
+attributes can be read without accessing every gene.
+
+Usage::
+
+    python -m riboviz.tools.add_h5_summary [-h] -i H5_FILE [-d DATASET]
+
+    -h, --help            show this help message and exit
+    -i H5_FILE, --input H5_FILE
+                          H5 file input and output
+    -d DATASET, --dataset DATASET
+                          Dataset name (default: the dataset of the
+                          first gene)
+
+Any existing summary dataset is replaced. See
+:py:func:`riboviz.h5.add_summary` for information on the summary
+dataset.
+"""
+import argparse
+from riboviz import h5
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Add a per-gene summary dataset to a riboviz H5 file, so that gene attributes can be read without accessing every gene")
+    parser.add_argument("-i",
+                        "--input",
+                        dest="h5_file",
+                        required=True,
+                        help="H5 file input and output")
+    parser.add_argument("-d",
+                        "--dataset",
+                        dest="dataset",
+                        default=None,
+                        help="Dataset name (default: the dataset of the first gene)")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_add_h5_summary():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.h5.add_summary`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        h5.add_summary(options.h5_file, options.dataset)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_add_h5_summary()
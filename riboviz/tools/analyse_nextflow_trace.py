@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Analyse a Nextflow trace file, summarising run time, CPU usage and
+efficiency, peak RSS and bytes read and written by process and by
+sample, inferring the critical path and, optionally, comparing the
+run with a baseline run's trace file to flag regressions.
+
+Usage::
+
+    python -m riboviz.tools.analyse_nextflow_trace [-h] -t TRACE_FILE
+        -o OUTPUT_DIR [-b BASELINE_FILE]
+        [-n NUM_PROCESSES | -c CONFIG_FILE] [--threshold THRESHOLD]
+
+    -h, --help            show this help message and exit
+    -t TRACE_FILE, --trace-file TRACE_FILE
+                          Nextflow trace file
+    -o OUTPUT_DIR, --output-dir OUTPUT_DIR
+                          Output directory
+    -b BASELINE_FILE, --baseline-file BASELINE_FILE
+                          Baseline Nextflow trace file
+    -n NUM_PROCESSES, --num-processes NUM_PROCESSES
+                          Number of processes the workflow was run
+                          with (default 1)
+    -c CONFIG_FILE, --config-file CONFIG_FILE
+                          Configuration file the workflow was run
+                          with, from which num_processes is read
+    --threshold THRESHOLD
+                          Fractional increase in run time or peak RSS
+                          over the baseline flagged as a regression
+                          (default 0.2)
+
+Example::
+
+    python -m riboviz.tools.analyse_nextflow_trace \
+        -t vignette/output/nextflow-trace.tsv \
+        -c vignette/vignette_config.yaml -o trace-analysis \
+        -b baseline-trace.tsv
+
+If any process or sample regresses the tool exits with status 1.
+
+See :py:func:`riboviz.nextflow_trace.analyse_trace` for the files
+written.
+"""
+import argparse
+import sys
+from riboviz import nextflow_trace
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Analyse a Nextflow trace file and report "
+        "regressions against a baseline trace file")
+    parser.add_argument("-t",
+                        "--trace-file",
+                        dest="trace_file",
+                        required=True,
+                        help="Nextflow trace file")
+    parser.add_argument("-o",
+                        "--output-dir",
+                        dest="output_dir",
+                        required=True,
+                        help="Output directory")
+    parser.add_argument("-b",
+                        "--baseline-file",
+                        dest="baseline_file",
+                        help="Baseline Nextflow trace file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-n",
+                       "--num-processes",
+                       dest="num_processes",
+                       type=int,
+                       default=1,
+                       help="Number of processes the workflow was run "
+                       "with (default 1)")
+    group.add_argument("-c",
+                       "--config-file",
+                       dest="config_file",
+                       help="Configuration file the workflow was run "
+                       "with, from which num_processes is read")
+    parser.add_argument("--threshold",
+                        dest="threshold",
+                        type=float,
+                        default=nextflow_trace.THRESHOLD,
+                        help="Fractional increase in run time or peak RSS "
+                        "over the baseline flagged as a regression "
+                        "(default {})".format(nextflow_trace.THRESHOLD))
+    options = parser.parse_args()
+    return options
+
+
+def invoke_analyse_nextflow_trace():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.nextflow_trace.analyse_trace`. Exits with
+    status 1 if any process or sample regresses.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        num_processes = options.num_processes
+        if options.config_file is not None:
+            num_processes = nextflow_trace.get_num_processes(
+                options.config_file)
+        processes, samples, _, path_seconds, elapsed_seconds, \
+            process_comparison, sample_comparison = \
+            nextflow_trace.analyse_trace(options.trace_file,
+                                         options.output_dir,
+                                         num_processes,
+                                         options.baseline_file,
+                                         options.threshold)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    print(processes.to_string(index=False))
+    print(samples.to_string(index=False))
+    print("Critical path: {:.1f}s of {:.1f}s elapsed".format(
+        path_seconds, elapsed_seconds))
+    if process_comparison is None:
+        return
+    print(process_comparison.to_string(index=False))
+    print(sample_comparison.to_string(index=False))
+    regressions = [
+        (comparison[nextflow_trace.COMPARISON_STATUS] ==
+         nextflow_trace.STATUS_REGRESSION).any()
+        for comparison in [process_comparison, sample_comparison]]
+    if any(regressions):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    invoke_analyse_nextflow_trace()
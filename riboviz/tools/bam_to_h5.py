@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Convert a BAM file to a riboviz H5 file, and complementary data
+files, reading the BAM file once.
+
+Usage::
+
+    python -m riboviz.tools.bam_to_h5 [-h] -b BAM_FILE -g ORF_GFF_FILE
+        -o H5_FILE [--feature FEATURE]
+        [--min-read-length MIN_READ_LENGTH]
+        [--max-read-length MAX_READ_LENGTH] [--buffer BUFFER]
+        [--primary-id PRIMARY_ID] [--secondary-id SECONDARY_ID]
+        [--dataset DATASET] [--stop-in-feature] [--not-riboviz-gff]
+        [--num-data-files NUM_DATA_FILES] [--batch-size BATCH_SIZE]
+
+    -h, --help            show this help message and exit
+    -b BAM_FILE, --bam-file BAM_FILE
+                          BAM file input
+    -g ORF_GFF_FILE, --orf-gff-file ORF_GFF_FILE
+                          GFF file input, specifying coding sequence
+                          locations within the transcripts
+    -o H5_FILE, --hd-file H5_FILE
+                          H5 file output
+    --feature FEATURE     Feature e.g. CDS, ORF, or uORF (default
+                          'CDS')
+    --min-read-length MIN_READ_LENGTH
+                          Minimum read length (default 10)
+    --max-read-length MAX_READ_LENGTH
+                          Maximum read length (default 50)
+    --buffer BUFFER       Length of flanking region around the
+                          feature, used only with --not-riboviz-gff
+                          (default 250)
+    --primary-id PRIMARY_ID
+                          GFF attribute holding gene names (default
+                          'Name')
+    --secondary-id SECONDARY_ID
+                          GFF attribute holding alternative gene names
+                          (default none)
+    --dataset DATASET     Dataset name (default 'data')
+    --stop-in-feature     Are stop codons part of the feature
+                          annotations? Used only with
+                          --not-riboviz-gff
+    --not-riboviz-gff     GFF file does not contain UTR5, feature and
+                          UTR3 elements for each gene
+    --num-data-files NUM_DATA_FILES
+                          Number of complementary data files (default
+                          1)
+    --batch-size BATCH_SIZE
+                          Number of alignments to count at a time
+                          (default 1048576)
+
+The H5 files have the same layout and attributes as those created by
+``rscripts/bam_to_h5.R``, whose ``--num-processes`` parameter
+corresponds to ``--num-data-files``.
+
+See :py:func:`riboviz.bam_to_h5.bam_to_h5`.
+"""
+import argparse
+from riboviz import bam_to_h5
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a BAM file to a riboviz H5 file, and complementary data files, reading the BAM file once")
+    parser.add_argument("-b",
+                        "--bam-file",
+                        dest="bam_file",
+                        required=True,
+                        help="BAM file input")
+    parser.add_argument("-g",
+                        "--orf-gff-file",
+                        dest="orf_gff_file",
+                        required=True,
+                        help="GFF file input, specifying coding sequence locations within the transcripts")
+    parser.add_argument("-o",
+                        "--hd-file",
+                        dest="h5_file",
+                        required=True,
+                        help="H5 file output")
+    parser.add_argument("--feature",
+                        dest="feature",
+                        default="CDS",
+                        help="Feature e.g. CDS, ORF, or uORF (default 'CDS')")
+    parser.add_argument("--min-read-length",
+                        dest="min_read_length",
+                        type=int,
+                        default=10,
+                        help="Minimum read length (default 10)")
+    parser.add_argument("--max-read-length",
+                        dest="max_read_length",
+                        type=int,
+                        default=50,
+                        help="Maximum read length (default 50)")
+    parser.add_argument("--buffer",
+                        dest="buffer",
+                        type=int,
+                        default=250,
+                        help="Length of flanking region around the feature, used only with --not-riboviz-gff (default 250)")
+    parser.add_argument("--primary-id",
+                        dest="primary_id",
+                        default="Name",
+                        help="GFF attribute holding gene names (default 'Name')")
+    parser.add_argument("--secondary-id",
+                        dest="secondary_id",
+                        default=None,
+                        help="GFF attribute holding alternative gene names (default none)")
+    parser.add_argument("--dataset",
+                        dest="dataset",
+                        default="data",
+                        help="Dataset name (default 'data')")
+    parser.add_argument("--stop-in-feature",
+                        dest="stop_in_feature",
+                        action="store_true",
+                        help="Are stop codons part of the feature annotations? Used only with --not-riboviz-gff")
+    parser.add_argument("--not-riboviz-gff",
+                        dest="is_riboviz_gff",
+                        action="store_false",
+                        help="GFF file does not contain UTR5, feature and UTR3 elements for each gene")
+    parser.add_argument("--num-data-files",
+                        dest="num_data_files",
+                        type=int,
+                        default=1,
+                        help="Number of complementary data files (default 1)")
+    parser.add_argument("--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        default=bam_to_h5.BATCH_SIZE,
+                        help="Number of alignments to count at a time (default {})".format(bam_to_h5.BATCH_SIZE))
+    options = parser.parse_args()
+    return options
+
+
+def invoke_bam_to_h5():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.bam_to_h5.bam_to_h5`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        bam_to_h5.bam_to_h5(options.bam_file,
+                            options.orf_gff_file,
+                            options.h5_file,
+                            options.feature,
+                            options.min_read_length,
+                            options.max_read_length,
+                            options.buffer,
+                            options.primary_id,
+                            options.secondary_id,
+                            options.dataset,
+                            options.stop_in_feature,
+                            options.is_riboviz_gff,
+                            options.num_data_files,
+                            options.batch_size)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_bam_to_h5()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Benchmark the throughput and peak memory use of riboviz's Python
+workflow stages and file comparators on generated data, append the
+results to a history file and report regressions against a baseline.
+
+Usage::
+
+    python -m riboviz.tools.benchmark [-h] -d DATA_DIR
+        [-b BENCHMARK [BENCHMARK ...]] [-s SCALE [SCALE ...]]
+        [-r REPEATS] [--history-file HISTORY_FILE]
+        [--baseline-file BASELINE_FILE] [--save-baseline]
+        [-t THRESHOLD] [-o REPORT_FILE] [--seed SEED]
+
+    -h, --help            show this help message and exit
+    -d DATA_DIR, --data-dir DATA_DIR
+                          Directory for generated input data, which is
+                          reused by later runs
+    -b BENCHMARK [BENCHMARK ...], --benchmark BENCHMARK [BENCHMARK ...]
+                          Benchmarks (default all)
+    -s SCALE [SCALE ...], --scale SCALE [SCALE ...]
+                          Scales, as numbers of reads (default 10000
+                          100000)
+    -r REPEATS, --repeats REPEATS
+                          Number of times each benchmark is repeated
+                          (default 3)
+    --history-file HISTORY_FILE
+                          Benchmark history file, to which this run is
+                          appended (default benchmark_history.json)
+    --baseline-file BASELINE_FILE
+                          Baseline file, a run or a history file whose
+                          last run is used
+    --save-baseline       Save this run to the baseline file
+    -t THRESHOLD, --threshold THRESHOLD
+                          Fractional increase in time or peak RSS over
+                          the baseline flagged as a regression
+                          (default 0.2)
+    -o REPORT_FILE, --report-file REPORT_FILE
+                          Report file (default benchmark_report.tsv)
+    --seed SEED           Random seed value for generating data
+                          (default 42)
+
+Example::
+
+    python -m riboviz.tools.benchmark -d benchmark-data \
+        --baseline-file benchmark_baseline.json
+
+If any benchmark regresses the tool exits with status 1.
+
+See :py:mod:`riboviz.benchmark` for the benchmarks and the data
+generated.
+"""
+import argparse
+import sys
+from riboviz import benchmark
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark riboviz Python workflow stages and "
+        "report regressions")
+    parser.add_argument("-d",
+                        "--data-dir",
+                        dest="data_dir",
+                        required=True,
+                        help="Directory for generated input data, which "
+                        "is reused by later runs")
+    parser.add_argument("-b",
+                        "--benchmark",
+                        dest="benchmarks",
+                        nargs='+',
+                        choices=list(benchmark.BENCHMARKS),
+                        default=list(benchmark.BENCHMARKS),
+                        help="Benchmarks (default all)")
+    parser.add_argument("-s",
+                        "--scale",
+                        dest="scales",
+                        type=int,
+                        nargs='+',
+                        default=benchmark.SCALES,
+                        help="Scales, as numbers of reads (default {})".format(
+                            " ".join(map(str, benchmark.SCALES))))
+    parser.add_argument("-r",
+                        "--repeats",
+                        dest="repeats",
+                        type=int,
+                        default=benchmark.REPEATS,
+                        help="Number of times each benchmark is repeated "
+                        "(default {})".format(benchmark.REPEATS))
+    parser.add_argument("--history-file",
+                        dest="history_file",
+                        default=benchmark.HISTORY_FILE,
+                        help="Benchmark history file, to which this run "
+                        "is appended (default {})".format(
+                            benchmark.HISTORY_FILE))
+    parser.add_argument("--baseline-file",
+                        dest="baseline_file",
+                        help="Baseline file, a run or a history file "
+                        "whose last run is used")
+    parser.add_argument("--save-baseline",
+                        dest="save_baseline",
+                        action="store_true",
+                        help="Save this run to the baseline file")
+    parser.add_argument("-t",
+                        "--threshold",
+                        dest="threshold",
+                        type=float,
+                        default=benchmark.THRESHOLD,
+                        help="Fractional increase in time or peak RSS over "
+                        "the baseline flagged as a regression "
+                        "(default {})".format(benchmark.THRESHOLD))
+    parser.add_argument("-o",
+                        "--report-file",
+                        dest="report_file",
+                        default=benchmark.REPORT_FILE,
+                        help="Report file (default {})".format(
+                            benchmark.REPORT_FILE))
+    parser.add_argument("--seed",
+                        dest="seed",
+                        type=int,
+                        default=42,
+                        help="Random seed value for generating data "
+                        "(default 42)")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_benchmark():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.benchmark.benchmark`. If ``--save-baseline``
+    is provided, the run is saved to the baseline file with
+    :py:func:`riboviz.benchmark.save_baseline`. Exits with status 1
+    if any benchmark regresses.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    baseline_file = options.baseline_file
+    if options.save_baseline:
+        if baseline_file is None:
+            print("ValueError: --save-baseline requires --baseline-file")
+            return
+        baseline_file = None
+    try:
+        run, comparison = benchmark.benchmark(options.data_dir,
+                                              options.benchmarks,
+                                              options.scales,
+                                              options.repeats,
+                                              options.history_file,
+                                              baseline_file,
+                                              options.report_file,
+                                              options.threshold,
+                                              options.seed)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    if options.save_baseline:
+        benchmark.save_baseline(options.baseline_file, run)
+    print(comparison.to_string(index=False))
+    if (comparison[benchmark.STATUS] == benchmark.STATUS_REGRESSION).any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    invoke_benchmark()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Benchmark the file size and read throughput of a riboviz H5 file
+repacked with different chunk layouts and compression options.
+
+Usage::
+
+    python -m riboviz.tools.benchmark_h5 [-h] -i H5_FILE
+        [-o BENCHMARK_FILE] [-d DATASET]
+        [--chunk-layout {matrix,length} [{matrix,length} ...]]
+        [--codec {gzip,lzf,none} [{gzip,lzf,none} ...]]
+        [--level LEVEL [LEVEL ...]] [--shuffle]
+        [--pattern PATTERN [PATTERN ...]] [--repeats REPEATS]
+        [--tmp-dir TMP_DIR]
+
+    -h, --help            show this help message and exit
+    -i H5_FILE, --input H5_FILE
+                          H5 file input
+    -o BENCHMARK_FILE, --output BENCHMARK_FILE
+                          Benchmark results file output (default
+                          'h5_benchmark.tsv')
+    -d DATASET, --dataset DATASET
+                          Dataset name (default: the dataset of the
+                          first gene)
+    --chunk-layout {matrix,length} [{matrix,length} ...]
+                          Chunk layouts (default all)
+    --codec {gzip,lzf,none} [{gzip,lzf,none} ...]
+                          Compression codecs (default all)
+    --level LEVEL [LEVEL ...]
+                          Compression levels, gzip only (default 7)
+    --shuffle             Benchmark both with and without the HDF5
+                          byte shuffle filter
+    --pattern {matrix,start_window,read_length,attributes} [...]
+                          Access patterns (default all)
+    --repeats REPEATS     Number of times to repeat each access
+                          pattern (default 3)
+    --tmp-dir TMP_DIR     Directory for temporary repacked files
+                          (default: system temporary directory)
+
+The results are also printed. See
+:py:func:`riboviz.repack_h5.benchmark_repack_h5`.
+"""
+import argparse
+from riboviz import h5
+from riboviz import provenance
+from riboviz import repack_h5
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the file size and read throughput of a riboviz H5 file repacked with different chunk layouts and compression options")
+    parser.add_argument("-i",
+                        "--input",
+                        dest="h5_file",
+                        required=True,
+                        help="H5 file input")
+    parser.add_argument("-o",
+                        "--output",
+                        dest="benchmark_file",
+                        default="h5_benchmark.tsv",
+                        help="Benchmark results file output (default 'h5_benchmark.tsv')")
+    parser.add_argument("-d",
+                        "--dataset",
+                        dest="dataset",
+                        default=None,
+                        help="Dataset name (default: the dataset of the first gene)")
+    parser.add_argument("--chunk-layout",
+                        dest="chunk_layouts",
+                        nargs="+",
+                        choices=repack_h5.CHUNK_LAYOUTS,
+                        default=repack_h5.CHUNK_LAYOUTS,
+                        help="Chunk layouts (default all)")
+    parser.add_argument("--codec",
+                        dest="codecs",
+                        nargs="+",
+                        choices=h5.CODECS,
+                        default=h5.CODECS,
+                        help="Compression codecs (default all)")
+    parser.add_argument("--level",
+                        dest="levels",
+                        nargs="+",
+                        type=int,
+                        default=[h5.GZIP_LEVEL],
+                        help="Compression levels, gzip only (default {})".format(h5.GZIP_LEVEL))
+    parser.add_argument("--shuffle",
+                        dest="shuffle",
+                        action="store_true",
+                        help="Benchmark both with and without the HDF5 byte shuffle filter")
+    parser.add_argument("--pattern",
+                        dest="patterns",
+                        nargs="+",
+                        choices=repack_h5.PATTERNS,
+                        default=repack_h5.PATTERNS,
+                        help="Access patterns (default all)")
+    parser.add_argument("--repeats",
+                        dest="repeats",
+                        type=int,
+                        default=3,
+                        help="Number of times to repeat each access pattern (default 3)")
+    parser.add_argument("--tmp-dir",
+                        dest="tmp_dir",
+                        default=None,
+                        help="Directory for temporary repacked files (default: system temporary directory)")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_benchmark_h5():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.repack_h5.benchmark_repack_h5`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    shuffles = [False, True] if options.shuffle else [False]
+    try:
+        results = repack_h5.benchmark_repack_h5(options.h5_file,
+                                                options.benchmark_file,
+                                                options.dataset,
+                                                options.chunk_layouts,
+                                                options.codecs,
+                                                options.levels,
+                                                shuffles,
+                                                options.patterns,
+                                                options.repeats,
+                                                options.tmp_dir)
+        print(results.to_string(index=False))
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_benchmark_h5()
@@ -8,7 +8,9 @@ Usage::
         -f FASTA -g GFF [-o FEATURES_ISSUES] \
         [--use-feature-name] \
         [--feature-format FEATURE_FORMAT]
-        [--start-codon START_CODON [START_CODON ...]] [-v]
+        [--start-codon START_CODON [START_CODON ...]]
+        [--gff-cache-dir GFF_CACHE_DIR] [--use-gffutils] \
+        [-p PROCESSES] [--feature-cache FEATURE_CACHE] [-v]
 
     -h, --help            show this help message and exit
     -f FASTA, --fasta FASTA
@@ -26,6 +28,23 @@ Usage::
                           sequence ID to create a feature name.
     --start-codon START_CODON [START_CODON ...]
                           Allowable start codons (default 'ATG')
+    --gff-cache-dir GFF_CACHE_DIR
+                          GFF database cache directory (default:
+                          value of RIBOVIZ_GFF_CACHE_DIR environment
+                          variable, if defined, else no caching),
+                          used only if --use-gffutils is provided
+    --use-gffutils        Load GFF file into a gffutils database
+                          rather than reading it into memory
+                          (default false)
+    -p PROCESSES, --processes PROCESSES
+                          Number of processes to check CDS features
+                          with, partitioned by sequence (default 1)
+    --feature-cache FEATURE_CACHE
+                          Per-feature results cache file. If
+                          provided, only features whose GFF record
+                          or sequence have changed since the last
+                          run with this file are processed (default
+                          no caching)
     -v, --verbose         Print information on each issue (if omitted
                           only issue counts are printed)
 
@@ -35,6 +54,7 @@ import argparse
 from pyfaidx import FastaIndexingError
 from riboviz import check_fasta_gff
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
+from riboviz.fasta_gff import GFF_CACHE_DIR_ENV
 from riboviz.fasta_gff import START_CODON
 from riboviz import provenance
 
@@ -77,6 +97,25 @@ def parse_command_line_options():
                         nargs="+",
                         default=[START_CODON],
                         help="Allowable start codons (default '{}')".format(START_CODON))
+    parser.add_argument("--gff-cache-dir",
+                        dest="gff_cache_dir",
+                        default=None,
+                        help="GFF database cache directory (default: value of {} environment variable, if defined, else no caching), used only if --use-gffutils is provided".format(GFF_CACHE_DIR_ENV))
+    parser.add_argument("--use-gffutils",
+                        dest="use_gffutils",
+                        action='store_true',
+                        default=False,
+                        help="Load GFF file into a gffutils database rather than reading it into memory (default false)")
+    parser.add_argument("-p",
+                        "--processes",
+                        dest="processes",
+                        type=int,
+                        default=1,
+                        help="Number of processes to check CDS features with, partitioned by sequence (default 1)")
+    parser.add_argument("--feature-cache",
+                        dest="feature_cache",
+                        default=None,
+                        help="Per-feature results cache file. If provided, only features whose GFF record or sequence have changed since the last run with this file are processed (default no caching)")
     parser.add_argument("-v",
                         "--verbose",
                         dest="is_verbose",
@@ -101,6 +140,10 @@ def invoke_check_fasta_gff():
     use_feature_name = options.use_feature_name
     start_codons = options.start_codon
     is_verbose = options.is_verbose
+    gff_cache_dir = options.gff_cache_dir
+    use_gffutils = options.use_gffutils
+    feature_cache = options.feature_cache
+    processes = options.processes
     try:
         check_fasta_gff.check_fasta_gff(fasta,
                                         gff,
@@ -108,7 +151,11 @@ def invoke_check_fasta_gff():
                                         feature_format=feature_format,
                                         use_feature_name=use_feature_name,
                                         start_codons=start_codons,
-                                        is_verbose=is_verbose)
+                                        is_verbose=is_verbose,
+                                        gff_cache_dir=gff_cache_dir,
+                                        use_gffutils=use_gffutils,
+                                        processes=processes,
+                                        feature_cache_file=feature_cache)
     except FastaIndexingError as e:
         print("{}: {}".format(type(e).__name__, e))
     except FileNotFoundError as e:
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Create a codon index file from a coding sequence codons file.
+
+Usage::
+
+    python -m riboviz.tools.create_codon_index [-h] -i CDS_CODONS
+        -o CODON_INDEX
+
+    -h, --help            show this help message and exit
+    -i CDS_CODONS, --cds-codons CDS_CODONS
+                          Coding sequence codons file input
+                          (tab-separated values file with columns
+                          Gene, PosCodon and Codon, optionally
+                          compressed)
+    -o CODON_INDEX, --codon-index CODON_INDEX
+                          Codon index file output
+
+See :py:class:`riboviz.get_cds_codons.CodonIndex` for information on
+the codon index file.
+"""
+import argparse
+from riboviz import get_cds_codons
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Create a codon index file from a coding sequence codons file")
+    parser.add_argument("-i",
+                        "--cds-codons",
+                        dest="cds_codons",
+                        required=True,
+                        help="Coding sequence codons file input (tab-separated values file with columns {}, {} and {}, optionally compressed)".format(
+                            get_cds_codons.GENE,
+                            get_cds_codons.POS,
+                            get_cds_codons.CODON))
+    parser.add_argument("-o",
+                        "--codon-index",
+                        dest="codon_index",
+                        required=True,
+                        help="Codon index file output")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_create_codon_index():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.get_cds_codons.create_codon_index_file`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        get_cds_codons.create_codon_index_file(options.cds_codons,
+                                               options.codon_index)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_create_codon_index()
@@ -6,17 +6,68 @@ trimming, and demultiplexing.
 Usage::
 
     python -m riboviz.tools.create_fastq_simdata [-h]
-        -o OUTPUT_DIR
+        -o OUTPUT_DIR [--num-reads NUM_READS] [--num-samples NUM_SAMPLES]
+        [--barcode-length BARCODE_LENGTH] [--mismatches MISMATCHES]
+        [--mismatch-weights MISMATCH_WEIGHTS [MISMATCH_WEIGHTS ...]]
+        [--sample-weights SAMPLE_WEIGHTS [SAMPLE_WEIGHTS ...]]
+        [--umi5-length UMI5_LENGTH] [--umi3-length UMI3_LENGTH]
+        [--min-length MIN_LENGTH] [--max-length MAX_LENGTH]
+        [--adaptor ADAPTOR] [--duplication DUPLICATION] [--gzip]
+        [--compress-level COMPRESS_LEVEL] [--seed SEED]
+        [--batch-size BATCH_SIZE]
 
     -h, --help            show this help message and exit
     -o OUTPUT_DIR, --output-dir OUTPUT_DIR
                           Output directory
+    --num-reads NUM_READS
+                          Number of reads. If provided then large
+                          simulated multiplexed FASTQ files are
+                          created (scale mode), otherwise small test
+                          files are created
+    --num-samples NUM_SAMPLES
+                          Number of samples (scale mode, default 4)
+    --barcode-length BARCODE_LENGTH
+                          Barcode length (scale mode, default 6)
+    --mismatches MISMATCHES
+                          Number of mismatches allowed when
+                          demultiplexing (scale mode, default 1)
+    --mismatch-weights MISMATCH_WEIGHTS [MISMATCH_WEIGHTS ...]
+                          Probability of a barcode having 0, 1, ...
+                          mismatches (scale mode, default 0.9 0.06
+                          0.02 0.02)
+    --sample-weights SAMPLE_WEIGHTS [SAMPLE_WEIGHTS ...]
+                          Probability of a molecule coming from each
+                          sample (scale mode, default equal)
+    --umi5-length UMI5_LENGTH
+                          5' UMI length (scale mode, default 4)
+    --umi3-length UMI3_LENGTH
+                          3' UMI length (scale mode, default 4)
+    --min-length MIN_LENGTH
+                          Minimum insert length (scale mode, default
+                          28)
+    --max-length MAX_LENGTH
+                          Maximum insert length (scale mode, default
+                          32)
+    --adaptor ADAPTOR     3' adaptor (scale mode, default CTGTAGGCACC)
+    --duplication DUPLICATION
+                          Mean number of reads per molecule (scale
+                          mode, default 2.0)
+    --gzip                Write gzipped FASTQ files (scale mode)
+    --compress-level COMPRESS_LEVEL
+                          gzip compression level (scale mode, default
+                          1)
+    --seed SEED           Random seed value (scale mode, default 42)
+    --batch-size BATCH_SIZE
+                          Number of molecules simulated in each batch
+                          (scale mode, default 100000)
 
 See :py:mod:`riboviz.create_fastq_simdata` for information on the
-files created.
+files created, or :py:mod:`riboviz.simulate_fastq` for the files
+created in scale mode.
 """
 import argparse
 from riboviz import create_fastq_simdata
+from riboviz import simulate_fastq
 
 
 def parse_command_line_options():
@@ -33,6 +84,98 @@ def parse_command_line_options():
                         dest="output_dir",
                         required=True,
                         help="Output directory")
+    parser.add_argument("--num-reads",
+                        dest="num_reads",
+                        type=int,
+                        help="Number of reads. If provided then large "
+                        "simulated multiplexed FASTQ files are created "
+                        "(scale mode), otherwise small test files are "
+                        "created")
+    parser.add_argument("--num-samples",
+                        dest="num_samples",
+                        type=int,
+                        default=4,
+                        help="Number of samples (scale mode, default 4)")
+    parser.add_argument("--barcode-length",
+                        dest="barcode_length",
+                        type=int,
+                        default=6,
+                        help="Barcode length (scale mode, default 6)")
+    parser.add_argument("--mismatches",
+                        dest="mismatches",
+                        type=int,
+                        default=1,
+                        help="Number of mismatches allowed when "
+                        "demultiplexing (scale mode, default 1)")
+    parser.add_argument("--mismatch-weights",
+                        dest="mismatch_weights",
+                        type=float,
+                        nargs='+',
+                        default=[0.9, 0.06, 0.02, 0.02],
+                        help="Probability of a barcode having 0, 1, ... "
+                        "mismatches (scale mode, default 0.9 0.06 0.02 "
+                        "0.02)")
+    parser.add_argument("--sample-weights",
+                        dest="sample_weights",
+                        type=float,
+                        nargs='+',
+                        help="Probability of a molecule coming from each "
+                        "sample (scale mode, default equal)")
+    parser.add_argument("--umi5-length",
+                        dest="umi5_length",
+                        type=int,
+                        default=4,
+                        help="5' UMI length (scale mode, default 4)")
+    parser.add_argument("--umi3-length",
+                        dest="umi3_length",
+                        type=int,
+                        default=4,
+                        help="3' UMI length (scale mode, default 4)")
+    parser.add_argument("--min-length",
+                        dest="min_length",
+                        type=int,
+                        default=28,
+                        help="Minimum insert length (scale mode, "
+                        "default 28)")
+    parser.add_argument("--max-length",
+                        dest="max_length",
+                        type=int,
+                        default=32,
+                        help="Maximum insert length (scale mode, "
+                        "default 32)")
+    parser.add_argument("--adaptor",
+                        dest="adaptor",
+                        default=simulate_fastq.ADAPTOR,
+                        help="3' adaptor (scale mode, default {})".format(
+                            simulate_fastq.ADAPTOR))
+    parser.add_argument("--duplication",
+                        dest="duplication",
+                        type=float,
+                        default=2.0,
+                        help="Mean number of reads per molecule (scale "
+                        "mode, default 2.0)")
+    parser.add_argument("--gzip",
+                        dest="gzipped",
+                        action="store_true",
+                        help="Write gzipped FASTQ files (scale mode)")
+    parser.add_argument("--compress-level",
+                        dest="compresslevel",
+                        type=int,
+                        default=1,
+                        help="gzip compression level (scale mode, "
+                        "default 1)")
+    parser.add_argument("--seed",
+                        dest="seed",
+                        type=int,
+                        default=42,
+                        help="Random seed value (scale mode, default 42)")
+    parser.add_argument("--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        default=simulate_fastq.BATCH_SIZE,
+                        help="Number of molecules simulated in each batch "
+                        "(scale mode, default {})".format(
+                            simulate_fastq.BATCH_SIZE))
     options = parser.parse_args()
     return options
 
@@ -40,11 +183,37 @@ def parse_command_line_options():
 def invoke_create_fastq_simdata():
     """
     Parse command-line options then invoke
-    :py:func:`riboviz.create_fastq_simdata.create_fastq_simdata`.
+    :py:func:`riboviz.create_fastq_simdata.create_fastq_simdata` or,
+    if a number of reads is provided,
+    :py:func:`riboviz.simulate_fastq.simulate_multiplex`.
     """
     options = parse_command_line_options()
     output_dir = options.output_dir
-    create_fastq_simdata.create_fastq_simdata(output_dir)
+    if options.num_reads is None:
+        create_fastq_simdata.create_fastq_simdata(output_dir)
+        return
+    try:
+        dedup_groups = simulate_fastq.simulate_multiplex(
+            output_dir,
+            options.num_reads,
+            options.num_samples,
+            options.barcode_length,
+            options.mismatches,
+            options.mismatch_weights,
+            options.sample_weights,
+            options.umi5_length,
+            options.umi3_length,
+            options.min_length,
+            options.max_length,
+            options.adaptor,
+            options.duplication,
+            options.gzipped,
+            options.compresslevel,
+            options.seed,
+            options.batch_size)
+        print(dedup_groups.to_string(index=False))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Export riboviz H5 files to partitioned, compressed, columnar files of
+non-zero read counts in long format.
+
+Usage::
+
+    python -m riboviz.tools.export_h5 [-h] -i H5_FILE [H5_FILE ...]
+        -o OUTPUT_DIR [-s SAMPLE [SAMPLE ...]] [-d DATASET]
+        [--gene GENE [GENE ...]] [--min-read-length MIN_READ_LENGTH]
+        [--max-read-length MAX_READ_LENGTH]
+        [--min-position MIN_POSITION] [--max-position MAX_POSITION]
+        [--format {parquet,h5}] [--batch-size BATCH_SIZE]
+        [-p PROCESSES]
+
+    -h, --help            show this help message and exit
+    -i H5_FILE [H5_FILE ...], --input H5_FILE [H5_FILE ...]
+                          H5 file input, one per sample
+    -o OUTPUT_DIR, --output-dir OUTPUT_DIR
+                          Output directory
+    -s SAMPLE [SAMPLE ...], --sample SAMPLE [SAMPLE ...]
+                          Sample names, one per H5 file (default:
+                          H5 file names without '.h5')
+    -d DATASET, --dataset DATASET
+                          Dataset name (default: the dataset in each
+                          file)
+    --gene GENE [GENE ...]
+                          Genes to export (default all)
+    --min-read-length MIN_READ_LENGTH
+                          Minimum read length (default none)
+    --max-read-length MAX_READ_LENGTH
+                          Maximum read length (default none)
+    --min-position MIN_POSITION
+                          Minimum 1-indexed position (default none)
+    --max-position MAX_POSITION
+                          Maximum 1-indexed position (default none)
+    --format {parquet,h5}
+                          Output format (default 'parquet', requires
+                          pyarrow)
+    --batch-size BATCH_SIZE
+                          Maximum number of records per file
+                          (default 1048576)
+    -p PROCESSES, --processes PROCESSES
+                          Number of processes (default 1)
+
+See :py:mod:`riboviz.export_h5` for information on the output files.
+"""
+import argparse
+from riboviz import export_h5
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Export riboviz H5 files to partitioned, compressed, columnar files of non-zero read counts in long format")
+    parser.add_argument("-i",
+                        "--input",
+                        dest="h5_files",
+                        nargs="+",
+                        required=True,
+                        help="H5 file input, one per sample")
+    parser.add_argument("-o",
+                        "--output-dir",
+                        dest="output_dir",
+                        required=True,
+                        help="Output directory")
+    parser.add_argument("-s",
+                        "--sample",
+                        dest="samples",
+                        nargs="+",
+                        default=None,
+                        help="Sample names, one per H5 file (default: H5 file names without '.h5')")
+    parser.add_argument("-d",
+                        "--dataset",
+                        dest="dataset",
+                        default=None,
+                        help="Dataset name (default: the dataset in each file)")
+    parser.add_argument("--gene",
+                        dest="genes",
+                        nargs="+",
+                        default=None,
+                        help="Genes to export (default all)")
+    parser.add_argument("--min-read-length",
+                        dest="min_read_length",
+                        type=int,
+                        default=None,
+                        help="Minimum read length (default none)")
+    parser.add_argument("--max-read-length",
+                        dest="max_read_length",
+                        type=int,
+                        default=None,
+                        help="Maximum read length (default none)")
+    parser.add_argument("--min-position",
+                        dest="min_position",
+                        type=int,
+                        default=None,
+                        help="Minimum 1-indexed position (default none)")
+    parser.add_argument("--max-position",
+                        dest="max_position",
+                        type=int,
+                        default=None,
+                        help="Maximum 1-indexed position (default none)")
+    parser.add_argument("--format",
+                        dest="output_format",
+                        choices=export_h5.FORMATS,
+                        default=export_h5.PARQUET,
+                        help="Output format (default '{}', requires pyarrow)".format(export_h5.PARQUET))
+    parser.add_argument("--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        default=export_h5.BATCH_SIZE,
+                        help="Maximum number of records per file (default {})".format(export_h5.BATCH_SIZE))
+    parser.add_argument("-p",
+                        "--processes",
+                        dest="processes",
+                        type=int,
+                        default=1,
+                        help="Number of processes (default 1)")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_export_h5():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.export_h5.export_h5`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        summary = export_h5.export_h5(options.h5_files,
+                                      options.output_dir,
+                                      options.samples,
+                                      options.dataset,
+                                      options.genes,
+                                      options.min_read_length,
+                                      options.max_read_length,
+                                      options.min_position,
+                                      options.max_position,
+                                      options.output_format,
+                                      options.batch_size,
+                                      options.processes)
+        print(summary.to_string(index=False))
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except KeyError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_export_h5()
@@ -8,7 +8,9 @@ Usage::
     python -m riboviz.tools.get_cds_codons [-h] \
         -f FASTA -g GFF [-c CDS_CODONS] [-e] \
         [--use-feature-name] \
-        [--cds-feature-format CDS_FEATURE_FORMAT]
+        [--cds-feature-format CDS_FEATURE_FORMAT] \
+        [--gff-cache-dir GFF_CACHE_DIR] [--use-gffutils] \
+        [--feature-cache FEATURE_CACHE] [--codon-index CODON_INDEX]
 
     -h, --help            show this help message and exit
     -f FASTA, --fasta FASTA
@@ -16,6 +18,7 @@ Usage::
     -g GFF, --gff GFF     GFF3 file input
     -c CDS_CODONS, --cds-codons CDS_CODONS
                           Coding sequence codons file output
+                          (compressed if it ends with '.gz')
     -e, --exclude-stop-codons
                           Exclude stop codons (default false)
     --use-feature-name    If a CDS feature defines both 'ID' and 'Name'
@@ -27,14 +30,34 @@ Usage::
                           'Name' attributes. This format is applied
                           to the sequence ID to create a feature
                           name.
+    --gff-cache-dir GFF_CACHE_DIR
+                          GFF database cache directory (default:
+                          value of RIBOVIZ_GFF_CACHE_DIR environment
+                          variable, if defined, else no caching),
+                          used only if --use-gffutils is provided
+    --use-gffutils        Load GFF file into a gffutils database
+                          rather than reading it into memory
+                          (default false)
+    --feature-cache FEATURE_CACHE
+                          Per-feature results cache file. If
+                          provided, only features whose GFF record
+                          or sequence have changed since the last
+                          run with this file are processed (default
+                          no caching)
+    --codon-index CODON_INDEX
+                          Codon index file output (default no codon
+                          index)
 
 See :py:func:`riboviz.get_cds_codons.get_cds_codons_file` for
-information on the tab-separated values file format.
+information on the tab-separated values file format and
+:py:class:`riboviz.get_cds_codons.CodonIndex` for information on the
+codon index file.
 """
 import argparse
 from pyfaidx import FastaIndexingError
 from riboviz import get_cds_codons
 from riboviz.fasta_gff import CDS_FEATURE_FORMAT
+from riboviz.fasta_gff import GFF_CACHE_DIR_ENV
 from riboviz import provenance
 
 
@@ -61,7 +84,7 @@ def parse_command_line_options():
                         "--cds-codons",
                         dest="cds_codons",
                         default="cds_codons.tsv",
-                        help="Coding sequence codons file output")
+                        help="Coding sequence codons file output (compressed if it ends with '.gz')")
     parser.add_argument("-e",
                         "--exclude-stop-codons",
                         dest="exclude_stop_codons",
@@ -76,6 +99,23 @@ def parse_command_line_options():
                         dest="cds_feature_format",
                         default=CDS_FEATURE_FORMAT,
                         help="CDS feature name format for CDS features which do not define 'ID'  or 'Name' attributes. This format is applied to the sequence ID to create a feature name.")
+    parser.add_argument("--gff-cache-dir",
+                        dest="gff_cache_dir",
+                        default=None,
+                        help="GFF database cache directory (default: value of {} environment variable, if defined, else no caching), used only if --use-gffutils is provided".format(GFF_CACHE_DIR_ENV))
+    parser.add_argument("--use-gffutils",
+                        dest="use_gffutils",
+                        action='store_true',
+                        default=False,
+                        help="Load GFF file into a gffutils database rather than reading it into memory (default false)")
+    parser.add_argument("--feature-cache",
+                        dest="feature_cache",
+                        default=None,
+                        help="Per-feature results cache file. If provided, only features whose GFF record or sequence have changed since the last run with this file are processed (default no caching)")
+    parser.add_argument("--codon-index",
+                        dest="codon_index",
+                        default=None,
+                        help="Codon index file output (default no codon index)")
     options = parser.parse_args()
     return options
 
@@ -93,13 +133,21 @@ def invoke_get_cds_codons():
     exclude_stop_codons = options.exclude_stop_codons
     cds_feature_format = options.cds_feature_format
     use_feature_name = options.use_feature_name
+    gff_cache_dir = options.gff_cache_dir
+    use_gffutils = options.use_gffutils
+    feature_cache = options.feature_cache
+    codon_index = options.codon_index
     try:
         get_cds_codons.get_cds_codons_file(fasta,
                                            gff,
                                            cds_codons,
                                            exclude_stop_codons,
                                            cds_feature_format,
-                                           use_feature_name)
+                                           use_feature_name,
+                                           gff_cache_dir=gff_cache_dir,
+                                           use_gffutils=use_gffutils,
+                                           feature_cache_file=feature_cache,
+                                           codon_index_file=codon_index)
     except FastaIndexingError as e:
         print("{}: {}".format(type(e).__name__, e))
     except FileNotFoundError as e:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Pack a riboviz H5 file, and its complementary data files, into a
+single packed H5 file.
+
+Usage::
+
+    python -m riboviz.tools.pack_h5 [-h] -i H5_FILE -o PACKED_FILE
+        [-d DATASET] [--codec {gzip,lzf,none}] [--level LEVEL]
+        [--shuffle] [--chunk-size CHUNK_SIZE]
+
+    -h, --help            show this help message and exit
+    -i H5_FILE, --input H5_FILE
+                          H5 file input
+    -o PACKED_FILE, --output PACKED_FILE
+                          Packed H5 file output
+    -d DATASET, --dataset DATASET
+                          Dataset name (default: the dataset of the
+                          first gene)
+    --codec {gzip,lzf,none}
+                          Compression codec (default 'gzip')
+    --level LEVEL         Compression level, gzip only (default 7)
+    --shuffle             Apply the HDF5 byte shuffle filter
+    --chunk-size CHUNK_SIZE
+                          Number of positions per chunk of read
+                          counts (default 8192)
+
+See :py:mod:`riboviz.pack_h5` for information on the packed H5 file
+format.
+"""
+import argparse
+from riboviz import h5
+from riboviz import pack_h5
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Pack a riboviz H5 file, and its complementary data files, into a single packed H5 file")
+    parser.add_argument("-i",
+                        "--input",
+                        dest="h5_file",
+                        required=True,
+                        help="H5 file input")
+    parser.add_argument("-o",
+                        "--output",
+                        dest="packed_file",
+                        required=True,
+                        help="Packed H5 file output")
+    parser.add_argument("-d",
+                        "--dataset",
+                        dest="dataset",
+                        default=None,
+                        help="Dataset name (default: the dataset of the first gene)")
+    parser.add_argument("--codec",
+                        dest="codec",
+                        choices=h5.CODECS,
+                        default=h5.GZIP,
+                        help="Compression codec (default '{}')".format(h5.GZIP))
+    parser.add_argument("--level",
+                        dest="level",
+                        type=int,
+                        default=h5.GZIP_LEVEL,
+                        help="Compression level, gzip only (default {})".format(h5.GZIP_LEVEL))
+    parser.add_argument("--shuffle",
+                        dest="shuffle",
+                        action="store_true",
+                        help="Apply the HDF5 byte shuffle filter")
+    parser.add_argument("--chunk-size",
+                        dest="chunk_size",
+                        type=int,
+                        default=pack_h5.CHUNK_SIZE,
+                        help="Number of positions per chunk of read counts (default {})".format(pack_h5.CHUNK_SIZE))
+    options = parser.parse_args()
+    return options
+
+
+def invoke_pack_h5():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.pack_h5.pack_h5`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        pack_h5.pack_h5(options.h5_file,
+                        options.packed_file,
+                        options.dataset,
+                        options.codec,
+                        options.level,
+                        options.shuffle,
+                        options.chunk_size)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_pack_h5()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Plan resources for a workflow run: predict the memory and run time
+of each workflow stage from the sizes of the input FASTQ files,
+FASTA files and HISAT2 indices in a workflow configuration file,
+optionally calibrated by Nextflow trace files from past runs, and
+recommend values for ``job_memory``, ``job_num_cpus``,
+``job_runtime`` and ``samsort_memory``.
+
+Usage::
+
+    python -m riboviz.tools.plan_resources [-h] -c CONFIG_FILE
+        [-t TRACE_FILE [TRACE_FILE ...]] [-o OUTPUT_CONFIG_FILE]
+        [-s STAGES_FILE]
+
+    -h, --help            show this help message and exit
+    -c CONFIG_FILE, --config-file CONFIG_FILE
+                          Configuration file
+    -t TRACE_FILE [TRACE_FILE ...], --trace-file TRACE_FILE [TRACE_FILE ...]
+                          Nextflow trace files from past runs
+    -o OUTPUT_CONFIG_FILE, --output-config-file OUTPUT_CONFIG_FILE
+                          Configuration file updated with the
+                          recommended values
+    -s STAGES_FILE, --stages-file STAGES_FILE
+                          Predicted memory and run time of each stage
+                          (tab-separated values)
+
+Example::
+
+    python -m riboviz.tools.plan_resources \
+        -c vignette/vignette_config.yaml \
+        -t vignette/output/nextflow-trace.tsv \
+        -o vignette_config_planned.yaml
+    python -m riboviz.tools.create_job_script \
+        -i jobs/eddie-template.sh -o job_riboviz.sh \
+        --config-file vignette_config_planned.yaml --r-libs ...
+
+See :py:mod:`riboviz.plan_resources` for the model used.
+"""
+import argparse
+from riboviz import plan_resources
+from riboviz import provenance
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Plan memory, CPUs and run time for a workflow run")
+    parser.add_argument("-c",
+                        "--config-file",
+                        dest="config_file",
+                        required=True,
+                        help="Configuration file")
+    parser.add_argument("-t",
+                        "--trace-file",
+                        dest="trace_files",
+                        nargs='+',
+                        help="Nextflow trace files from past runs")
+    parser.add_argument("-o",
+                        "--output-config-file",
+                        dest="output_config_file",
+                        help="Configuration file updated with the "
+                        "recommended values")
+    parser.add_argument("-s",
+                        "--stages-file",
+                        dest="stages_file",
+                        help="Predicted memory and run time of each stage "
+                        "(tab-separated values)")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_plan_resources():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.plan_resources.plan_resources_file`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        stages, recommendations, missing = \
+            plan_resources.plan_resources_file(options.config_file,
+                                               options.trace_files,
+                                               options.output_config_file,
+                                               options.stages_file)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+        return
+    for file_name in missing:
+        print("Skipped missing FASTQ file: {}".format(file_name))
+    print(stages.to_string(index=False))
+    for key, value in recommendations.items():
+        print("{}: {}".format(key, value))
+
+
+if __name__ == "__main__":
+    invoke_plan_resources()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Repack a riboviz H5 file, and its complementary data files, with a
+new chunk layout and compression options.
+
+Usage::
+
+    python -m riboviz.tools.repack_h5 [-h] -i H5_FILE -o REPACKED_FILE
+        [--chunk-layout {matrix,length}] [--codec {gzip,lzf,none}]
+        [--level LEVEL] [--shuffle]
+
+    -h, --help            show this help message and exit
+    -i H5_FILE, --input H5_FILE
+                          H5 file input
+    -o REPACKED_FILE, --output REPACKED_FILE
+                          Repacked H5 file output
+    --chunk-layout {matrix,length}
+                          Chunk layout, one chunk per gene matrix or
+                          one chunk per read length (default 'matrix')
+    --codec {gzip,lzf,none}
+                          Compression codec (default 'gzip')
+    --level LEVEL         Compression level, gzip only (default 7)
+    --shuffle             Apply the HDF5 byte shuffle filter
+
+See :py:func:`riboviz.repack_h5.repack_h5`.
+"""
+import argparse
+from riboviz import h5
+from riboviz import provenance
+from riboviz import repack_h5
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Repack a riboviz H5 file, and its complementary data files, with a new chunk layout and compression options")
+    parser.add_argument("-i",
+                        "--input",
+                        dest="h5_file",
+                        required=True,
+                        help="H5 file input")
+    parser.add_argument("-o",
+                        "--output",
+                        dest="repacked_file",
+                        required=True,
+                        help="Repacked H5 file output")
+    parser.add_argument("--chunk-layout",
+                        dest="chunk_layout",
+                        choices=repack_h5.CHUNK_LAYOUTS,
+                        default=repack_h5.CHUNK_MATRIX,
+                        help="Chunk layout, one chunk per gene matrix or one chunk per read length (default '{}')".format(repack_h5.CHUNK_MATRIX))
+    parser.add_argument("--codec",
+                        dest="codec",
+                        choices=h5.CODECS,
+                        default=h5.GZIP,
+                        help="Compression codec (default '{}')".format(h5.GZIP))
+    parser.add_argument("--level",
+                        dest="level",
+                        type=int,
+                        default=h5.GZIP_LEVEL,
+                        help="Compression level, gzip only (default {})".format(h5.GZIP_LEVEL))
+    parser.add_argument("--shuffle",
+                        dest="shuffle",
+                        action="store_true",
+                        help="Apply the HDF5 byte shuffle filter")
+    options = parser.parse_args()
+    return options
+
+
+def invoke_repack_h5():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.repack_h5.repack_h5`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        repack_h5.repack_h5(options.h5_file,
+                            options.repacked_file,
+                            options.chunk_layout,
+                            options.codec,
+                            options.level,
+                            options.shuffle)
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_repack_h5()
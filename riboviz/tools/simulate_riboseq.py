@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Simulate ribosome profiling reads from ORF FASTA and GFF files, with
+a read length distribution, A-site displacements, frame bias, gene
+abundances, rRNA contamination and adaptors, and write truth tables
+of the expected per-gene and per-read length counts.
+
+Usage::
+
+    python -m riboviz.tools.simulate_riboseq [-h]
+        -o OUTPUT_DIR -n NUM_READS [-c CONFIG_FILE]
+        [-f ORF_FASTA] [-g ORF_GFF] [-r RRNA_FASTA]
+        [--rrna-fraction RRNA_FRACTION]
+        [--read-lengths READ_LENGTHS [READ_LENGTHS ...]]
+        [--read-length-weights READ_LENGTH_WEIGHTS
+            [READ_LENGTH_WEIGHTS ...]]
+        [--asite-disp-length-file ASITE_DISP_LENGTH_FILE]
+        [--frame-weights FRAME_WEIGHTS FRAME_WEIGHTS FRAME_WEIGHTS]
+        [--abundance-file ABUNDANCE_FILE]
+        [--abundance-sigma ABUNDANCE_SIGMA] [--feature FEATURE]
+        [--adaptor ADAPTOR] [--gzip] [--compress-level COMPRESS_LEVEL]
+        [--seed SEED] [--batch-size BATCH_SIZE]
+
+    -h, --help            show this help message and exit
+    -o OUTPUT_DIR, --output-dir OUTPUT_DIR
+                          Output directory
+    -n NUM_READS, --num-reads NUM_READS
+                          Number of reads
+    -c CONFIG_FILE, --config-file CONFIG_FILE
+                          Workflow configuration file, whose
+                          'orf_fasta_file', 'orf_gff_file',
+                          'rrna_fasta_file', 'adapters',
+                          'asite_disp_length_file' and 'feature' are
+                          used unless overridden by other options
+    -f ORF_FASTA, --orf-fasta ORF_FASTA
+                          ORF FASTA file
+    -g ORF_GFF, --orf-gff ORF_GFF
+                          ORF GFF file
+    -r RRNA_FASTA, --rrna-fasta RRNA_FASTA
+                          rRNA FASTA file
+    --rrna-fraction RRNA_FRACTION
+                          Fraction of reads from rRNA (default 0)
+    --read-lengths READ_LENGTHS [READ_LENGTHS ...]
+                          Read lengths (default 26 to 32)
+    --read-length-weights READ_LENGTH_WEIGHTS [READ_LENGTH_WEIGHTS ...]
+                          Probability of each read length (default
+                          0.05 0.1 0.3 0.25 0.15 0.1 0.05)
+    --asite-disp-length-file ASITE_DISP_LENGTH_FILE
+                          A-site displacement file (default
+                          displacement 15 for every read length)
+    --frame-weights FRAME_WEIGHTS FRAME_WEIGHTS FRAME_WEIGHTS
+                          Probability of A-site frames 0, 1 and 2
+                          (default 0.7 0.2 0.1)
+    --abundance-file ABUNDANCE_FILE
+                          Gene abundances file, with 'Gene' and 'TPM'
+                          columns (default log-normal abundances)
+    --abundance-sigma ABUNDANCE_SIGMA
+                          Standard deviation of log-normal abundances
+                          (default 1.5)
+    --feature FEATURE     GFF feature type (default CDS)
+    --adaptor ADAPTOR     3' adaptor (default CTGTAGGCACC)
+    --gzip                Write gzipped FASTQ file
+    --compress-level COMPRESS_LEVEL
+                          gzip compression level (default 1)
+    --seed SEED           Random seed value (default 42)
+    --batch-size BATCH_SIZE
+                          Number of reads simulated in each batch
+                          (default 1000000)
+
+Example::
+
+    python -m riboviz.tools.simulate_riboseq
+        -c vignette/vignette_config.yaml
+        -o simulated/
+        -n 10000000
+        --rrna-fraction 0.3
+        --gzip
+
+See :py:mod:`riboviz.simulate_riboseq` for the model and the files
+created.
+"""
+import argparse
+from riboviz import params
+from riboviz import provenance
+from riboviz import simulate_fastq
+from riboviz import simulate_riboseq
+
+
+def parse_command_line_options():
+    """
+    Parse command-line options.
+
+    :returns: command-line options
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate ribosome profiling reads from ORF FASTA "
+        "and GFF files")
+    parser.add_argument("-o",
+                        "--output-dir",
+                        dest="output_dir",
+                        required=True,
+                        help="Output directory")
+    parser.add_argument("-n",
+                        "--num-reads",
+                        dest="num_reads",
+                        type=int,
+                        required=True,
+                        help="Number of reads")
+    parser.add_argument("-c",
+                        "--config-file",
+                        dest="config_file",
+                        help="Workflow configuration file, whose ORF, "
+                        "rRNA, adapters, A-site displacement and feature "
+                        "parameters are used unless overridden")
+    parser.add_argument("-f",
+                        "--orf-fasta",
+                        dest="orf_fasta",
+                        help="ORF FASTA file")
+    parser.add_argument("-g",
+                        "--orf-gff",
+                        dest="orf_gff",
+                        help="ORF GFF file")
+    parser.add_argument("-r",
+                        "--rrna-fasta",
+                        dest="rrna_fasta",
+                        help="rRNA FASTA file")
+    parser.add_argument("--rrna-fraction",
+                        dest="rrna_fraction",
+                        type=float,
+                        default=0.0,
+                        help="Fraction of reads from rRNA (default 0)")
+    parser.add_argument("--read-lengths",
+                        dest="read_lengths",
+                        type=int,
+                        nargs='+',
+                        default=simulate_riboseq.READ_LENGTHS,
+                        help="Read lengths (default {})".format(
+                            " ".join(map(str,
+                                         simulate_riboseq.READ_LENGTHS))))
+    parser.add_argument("--read-length-weights",
+                        dest="read_length_weights",
+                        type=float,
+                        nargs='+',
+                        default=simulate_riboseq.READ_LENGTH_WEIGHTS,
+                        help="Probability of each read length (default "
+                        "{})".format(" ".join(map(
+                            str, simulate_riboseq.READ_LENGTH_WEIGHTS))))
+    parser.add_argument("--asite-disp-length-file",
+                        dest="asite_disp_length_file",
+                        help="A-site displacement file (default "
+                        "displacement {} for every read length)".format(
+                            simulate_riboseq.ASITE_DISPLACEMENT))
+    parser.add_argument("--frame-weights",
+                        dest="frame_weights",
+                        type=float,
+                        nargs=simulate_riboseq.NUM_FRAMES,
+                        default=simulate_riboseq.FRAME_WEIGHTS,
+                        help="Probability of A-site frames 0, 1 and 2 "
+                        "(default {})".format(" ".join(map(
+                            str, simulate_riboseq.FRAME_WEIGHTS))))
+    parser.add_argument("--abundance-file",
+                        dest="abundance_file",
+                        help="Gene abundances file, with '{}' and '{}' "
+                        "columns (default log-normal abundances)".format(
+                            simulate_riboseq.GENE, simulate_riboseq.TPM))
+    parser.add_argument("--abundance-sigma",
+                        dest="abundance_sigma",
+                        type=float,
+                        default=simulate_riboseq.ABUNDANCE_SIGMA,
+                        help="Standard deviation of log-normal abundances "
+                        "(default {})".format(
+                            simulate_riboseq.ABUNDANCE_SIGMA))
+    parser.add_argument("--feature",
+                        dest="feature",
+                        help="GFF feature type (default {})".format(
+                            simulate_riboseq.CDS_FEATURE))
+    parser.add_argument("--adaptor",
+                        dest="adaptor",
+                        help="3' adaptor (default {})".format(
+                            simulate_fastq.ADAPTOR))
+    parser.add_argument("--gzip",
+                        dest="gzipped",
+                        action="store_true",
+                        help="Write gzipped FASTQ file")
+    parser.add_argument("--compress-level",
+                        dest="compresslevel",
+                        type=int,
+                        default=1,
+                        help="gzip compression level (default 1)")
+    parser.add_argument("--seed",
+                        dest="seed",
+                        type=int,
+                        default=42,
+                        help="Random seed value (default 42)")
+    parser.add_argument("--batch-size",
+                        dest="batch_size",
+                        type=int,
+                        default=simulate_riboseq.BATCH_SIZE,
+                        help="Number of reads simulated in each batch "
+                        "(default {})".format(simulate_riboseq.BATCH_SIZE))
+    options = parser.parse_args()
+    return options
+
+
+def invoke_simulate_riboseq():
+    """
+    Parse command-line options then invoke
+    :py:func:`riboviz.simulate_riboseq.simulate_riboseq`.
+    """
+    print(provenance.write_provenance_to_str(__file__))
+    options = parse_command_line_options()
+    try:
+        config = dict.fromkeys(simulate_riboseq.CONFIG_PARAMS)
+        if options.config_file is not None:
+            config = simulate_riboseq.load_config(options.config_file)
+        orf_fasta = options.orf_fasta or config[params.ORF_FASTA_FILE]
+        orf_gff = options.orf_gff or config[params.ORF_GFF_FILE]
+        if orf_fasta is None or orf_gff is None:
+            raise ValueError("ORF FASTA and GFF files must be provided "
+                             "by -f and -g or -c")
+        rrna_fasta = options.rrna_fasta or config[params.RRNA_FASTA_FILE]
+        asite_disp_length_file = options.asite_disp_length_file or \
+            config[params.ASITE_DISP_LENGTH_FILE]
+        asite_displacements = None
+        if asite_disp_length_file is not None:
+            asite_displacements = simulate_riboseq.load_asite_displacements(
+                asite_disp_length_file)
+        abundances = None
+        if options.abundance_file is not None:
+            abundances = simulate_riboseq.load_abundances(
+                options.abundance_file)
+        truth = simulate_riboseq.simulate_riboseq(
+            orf_fasta,
+            orf_gff,
+            options.output_dir,
+            options.num_reads,
+            rrna_fasta,
+            options.rrna_fraction,
+            options.read_lengths,
+            options.read_length_weights,
+            asite_displacements,
+            options.frame_weights,
+            abundances,
+            options.abundance_sigma,
+            options.feature or config[params.FEATURE] or
+            simulate_riboseq.CDS_FEATURE,
+            options.adaptor or config[params.ADAPTERS] or
+            simulate_fastq.ADAPTOR,
+            options.gzipped,
+            options.compresslevel,
+            options.seed,
+            options.batch_size)
+        print("Genes: {} Reads: {}".format(
+            len(truth), truth[simulate_riboseq.NUM_READS].sum()))
+    except FileNotFoundError as e:
+        print("{}: {}".format(type(e).__name__, e))
+    except ValueError as e:
+        print("{}: {}".format(type(e).__name__, e))
+
+
+if __name__ == "__main__":
+    invoke_simulate_riboseq()
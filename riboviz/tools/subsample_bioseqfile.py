@@ -2,21 +2,66 @@
 """
 Subsample an input FASTQ (or other sequencing) file, to produce a
 smaller file whose reads are randomly sampled from of the input with a
-fixed probability.
+fixed probability, or a fixed number of reads.
 
 Usage::
 
-    subsample_bioseqfile.py [-h] -i SEQFILEIN -o SEQFILEOUT [-t FILE_TYPE]
-                                [-p PROB] [-f OVERWRITE] [-v]
+    subsample_bioseqfile.py [-h] [-i SEQFILEIN [SEQFILEIN ...]]
+                                [-o SEQFILEOUT] [-d OUTPUT_DIR]
+                                [-c CONFIG_FILE] [--paired]
+                                [-t FILE_TYPE] [-p PROB] [-f OVERWRITE]
+                                [-s SEEDVALUE]
+                                [-m {bernoulli,skip,reservoir}]
+                                [-n NUM_RECORDS] [--processes PROCESSES]
+                                [--summary-file SUMMARY_FILE] [-v]
 
 
     -h, --help                          show this help message and exit
-    -i SEQFILEIN, --input SEQFILEIN     SeqIO file input
-    -o SEQFILEOUT, --output SEQFILEOUT  SeqIO file output
+    -i SEQFILEIN [SEQFILEIN ...], --seqfilein SEQFILEIN [SEQFILEIN ...]
+                                        SeqIO file input(s)
+    -o SEQFILEOUT, --seqfileout SEQFILEOUT
+                                        SeqIO file output, if there is
+                                        one input file and OUTPUT_DIR
+                                        is not provided
+    -d OUTPUT_DIR, --output-dir OUTPUT_DIR
+                                        Output directory, into which
+                                        subsampled files, with the same
+                                        names as the input files, and a
+                                        summary are written
+    -c CONFIG_FILE, --config-file CONFIG_FILE
+                                        Workflow configuration file,
+                                        whose 'fq_files' and
+                                        'multiplex_fq_files' are
+                                        subsampled (requires OUTPUT_DIR)
+    --paired                            Input files are consecutive
+                                        pairs (e.g. R1 R2 R1 R2) which
+                                        are subsampled in lockstep
+                                        ('skip' and 'reservoir' modes
+                                        only, requires OUTPUT_DIR)
     -t FILE_TYPE, --type FILE_TYPE      SeqIO file type (default 'fastq')
     -p PROB, --probability PROB         proportion to sample (default 0.01)
     -f OVERWRITE, --overwrite           overwrite output if file exists
                                         (default False)
+    -s SEEDVALUE, --seedvalue SEEDVALUE random seed value (default 1)
+    -m {bernoulli,skip,reservoir}, --mode {bernoulli,skip,reservoir}
+                                        subsampling mode (default
+                                        'bernoulli'). 'bernoulli' parses
+                                        every record, 'skip' samples with
+                                        probability PROB but does not
+                                        parse unselected records,
+                                        'reservoir' samples exactly
+                                        NUM_RECORDS records. 'skip' and
+                                        'reservoir' support FASTQ and
+                                        FASTA only
+    -n NUM_RECORDS, --num-records NUM_RECORDS
+                                        number of records to sample
+                                        ('reservoir' mode only)
+    --processes PROCESSES               Number of processes, if
+                                        OUTPUT_DIR is provided (default
+                                        1)
+    --summary-file SUMMARY_FILE         Summary file, if OUTPUT_DIR is
+                                        provided (default
+                                        OUTPUT_DIR/subsample_summary.tsv)
     -v, --verbose                       print progress statements
 
 Examples::
@@ -32,9 +77,33 @@ Examples::
         -t fastq
         -p 0.00001
 
-See :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`.
+    python -m riboviz.tools.subsample_bioseqfile
+        -i vignette/input/SRR1042855_s1mi.fastq.gz
+        -o vignette/tmp/SRR1042855_1000.fastq.gz
+        -m reservoir
+        -n 1000
+
+    python -m riboviz.tools.subsample_bioseqfile
+        -i sample1_R1.fastq.gz sample1_R2.fastq.gz
+           sample2_R1.fastq.gz sample2_R2.fastq.gz
+        -d subsampled/
+        --paired
+        -m skip
+        -p 0.01
+        --processes 2
+
+    python -m riboviz.tools.subsample_bioseqfile
+        -c vignette/vignette_config.yaml
+        -d vignette/subsampled/
+        -m reservoir
+        -n 10000
+
+See :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile` and
+:py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfiles`.
 """
 import argparse
+import os
+import sys
 from riboviz import subsample_bioseqfile
 from riboviz import provenance
 
@@ -47,17 +116,34 @@ def parse_command_line_options():
     :rtype: argparse.Namespace
     """
     parser = argparse.ArgumentParser(
-        description="Randomly subsample sequencing file with probability -p")
+        description="Randomly subsample sequencing files with probability "
+        "-p or to -n reads")
     parser.add_argument("-i",
                         "--seqfilein",
                         dest="seqfilein",
-                        required=True,
-                        help="SeqIO file input")
+                        nargs='+',
+                        default=[],
+                        help="SeqIO file input(s)")
     parser.add_argument("-o",
                         "--seqfileout",
                         dest="seqfileout",
-                        required=True,
-                        help="SeqIO file output")
+                        help="SeqIO file output, if there is one input "
+                        "file and -d is not provided")
+    parser.add_argument("-d",
+                        "--output-dir",
+                        dest="output_dir",
+                        help="Output directory, into which subsampled "
+                        "files and a summary are written")
+    parser.add_argument("-c",
+                        "--config-file",
+                        dest="config_file",
+                        help="Workflow configuration file, whose "
+                        "fastq files are subsampled (requires -d)")
+    parser.add_argument("--paired",
+                        dest="paired",
+                        action="store_true",
+                        help="Input files are consecutive pairs which "
+                        "are subsampled in lockstep (requires -d)")
     parser.add_argument("-t",
                         "--type",
                         dest="file_type",
@@ -79,7 +165,29 @@ def parse_command_line_options():
                         dest="seedvalue",
                         type=int,
                         default=1,
-                        help="proportion to sample (default 1)")
+                        help="random seed value (default 1)")
+    parser.add_argument("-m",
+                        "--mode",
+                        dest="mode",
+                        choices=subsample_bioseqfile.MODES,
+                        default=subsample_bioseqfile.BERNOULLI,
+                        help="subsampling mode (default '{}')".format(
+                            subsample_bioseqfile.BERNOULLI))
+    parser.add_argument("-n",
+                        "--num-records",
+                        dest="num_records",
+                        type=int,
+                        help="number of records to sample ('{}' mode only)"
+                        .format(subsample_bioseqfile.RESERVOIR))
+    parser.add_argument("--processes",
+                        dest="processes",
+                        type=int,
+                        default=1,
+                        help="Number of processes (default 1)")
+    parser.add_argument("--summary-file",
+                        dest="summary_file",
+                        help="Summary file (default OUTPUT_DIR/{})".format(
+                            subsample_bioseqfile.SUMMARY_FILE))
     parser.add_argument("-v",
                         "--verbose",
                         dest="verbose",
@@ -92,25 +200,60 @@ def parse_command_line_options():
 def invoke_subsample_bioseqfile():
     """
     Parse command-line options then invoke
-    See :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`
-    for information ...
+    :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfile`, or,
+    if an output directory is provided,
+    :py:func:`riboviz.subsample_bioseqfile.subsample_bioseqfiles`.
     """
     print((provenance.write_provenance_to_str(__file__)))
     options = parse_command_line_options()
-    seqfilein = options.seqfilein
-    seqfileout = options.seqfileout
+    seqfilesin = options.seqfilein
     file_type = options.file_type
     prob = options.prob
     overwrite = options.overwrite
     seedvalue = options.seedvalue
     verbose = options.verbose
-    subsample_bioseqfile.subsample_bioseqfile(seqfilein,
-                                              seqfileout,
-                                              file_type,
-                                              prob,
-                                              overwrite,
-                                              seedvalue,
-                                              verbose)
+    mode = options.mode
+    num_records = options.num_records
+    output_dir = options.output_dir
+    try:
+        if output_dir is None:
+            if len(seqfilesin) != 1 or options.seqfileout is None or \
+               options.config_file is not None or options.paired:
+                raise ValueError("-o requires one input file, -c and "
+                                 "--paired require -d")
+            subsample_bioseqfile.subsample_bioseqfile(seqfilesin[0],
+                                                      options.seqfileout,
+                                                      file_type,
+                                                      prob,
+                                                      overwrite,
+                                                      seedvalue,
+                                                      verbose,
+                                                      mode,
+                                                      num_records)
+            return
+        if options.paired:
+            seqfilesin = subsample_bioseqfile.get_pairs(seqfilesin)
+        if options.config_file is not None:
+            seqfilesin = seqfilesin + subsample_bioseqfile.get_fq_files(
+                options.config_file)
+        summary_file = options.summary_file
+        if summary_file is None:
+            summary_file = os.path.join(output_dir,
+                                        subsample_bioseqfile.SUMMARY_FILE)
+        subsample_bioseqfile.subsample_bioseqfiles(seqfilesin,
+                                                   output_dir,
+                                                   file_type,
+                                                   prob,
+                                                   overwrite,
+                                                   seedvalue,
+                                                   verbose,
+                                                   mode,
+                                                   num_records,
+                                                   options.processes,
+                                                   summary_file)
+    except (FileNotFoundError, ValueError) as e:
+        print("{}: {}".format(type(e).__name__, e), file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == "__main__":
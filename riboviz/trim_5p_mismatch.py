@@ -3,7 +3,6 @@ Trim 5' reads constants and functions.
 """
 import re
 import pysam
-import pandas as pd
 from riboviz import provenance
 
 
@@ -204,6 +203,7 @@ def trim_5p_mismatch_file(sam_file_in,
     :param summary_file: Summary file name
     :type summary_file: str or unicode
     """
+    import pandas as pd
     summary = trim_5p_mismatch(sam_file_in,
                                sam_file_out,
                                fivep_remove,
@@ -3,8 +3,6 @@ Useful functions.
 """
 import os
 import os.path
-import numpy as np
-import pandas as pd
 
 
 def list_to_str(lst):
@@ -105,6 +103,7 @@ def equal_dataframes(data1, data2, tolerance=0.0001, ignore_row_order=False):
     :type ignore_row_order: bool
     :raise AssertionError: If the data frames differ in their content
     """
+    import numpy as np
     assert data1.shape == data2.shape,\
         "Unequal shape: %s, %s"\
         % (str(data1.shape), str(data2.shape))
@@ -155,6 +154,7 @@ def equal_tsv(file1, file2, tolerance=0.0001, ignore_row_order=False,
     :raise AssertionError: If files differ in their contents
     :raise Exception: If problems arise when loading the files
     """
+    import pandas as pd
     data1 = pd.read_csv(file1, sep="\t", comment=comment)
     data2 = pd.read_csv(file2, sep="\t", comment=comment)
     if na_to_empty_str: